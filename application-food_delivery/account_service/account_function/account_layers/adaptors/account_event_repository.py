@@ -2,11 +2,19 @@ import decimal
 import os
 import abc
 from datetime import datetime
-import boto3
-from boto3.dynamodb.types import TypeSerializer
-from boto3.dynamodb.types import TypeDeserializer
 from account_layers.service import domain_event_envelope
 from account_layers.adaptors import dynamo_exception as dx
+from account_layers.adaptors import dynamo_codec
+from account_layers.adaptors import id_allocator
+from account_layers.adaptors import aws_clients
+
+
+ACCOUNT_EVENT_CODEC = dynamo_codec.ItemCodec({
+    'PK': dynamo_codec.S,
+    'SK': dynamo_codec.S,
+    'timestamp': dynamo_codec.S,
+    'event_id': dynamo_codec.N,
+})
 
 
 class AbstractRepository(abc.ABC):
@@ -24,8 +32,12 @@ class DynamoDbRepository(AbstractRepository):
     """
 
     def __init__(self):
-        self.client = boto3.client('dynamodb')
+        self.client = aws_clients.client('dynamodb')
         self.table_name = os.environ.get('DYNAMODB_EVENT_TABLE_NAME', 'AccountEvent')
+        self.event_id_allocator = id_allocator.get_allocator(self.client,
+                                                             self.table_name,
+                                                             'IDCOUNTER#EVENT',
+                                                             block_size=id_allocator.EVENT_ID_BLOCK_SIZE)
 
     def save(self, event: domain_event_envelope.DomainEventEnvelope):
 
@@ -53,33 +65,12 @@ class DynamoDbRepository(AbstractRepository):
         event_dict['timestamp'] = timestamp
         event_dict['event_id'] = event_id
 
-        serializer = boto3.dynamodb.types.TypeSerializer()
-        item = {k: serializer.serialize(v) for k, v in event_dict.items()}
+        item = ACCOUNT_EVENT_CODEC.encode(event_dict)
         # del event_dict['consumer_id']
         return item
 
     def _get_sequential_event_id(self) -> int:
-        with dx.dynamo_exception_check():
-            resp = self.client.update_item(
-                TableName=self.table_name,
-                Key={
-                    'PK': {'S': 'IDCOUNTER#EVENT'},
-                    'SK': {'S': 'IDCOUNTER#EVENT'},
-                },
-                # UpdateExpression='SET #id_count = #id_count + :incr',
-                UpdateExpression='SET #id_count = if_not_exists(#id_count, :default) + :incr',
-                # Todo: itemがあれば+1更新、itemがなければif_not_exists()で:default値を初期値とする。
-                ExpressionAttributeNames={
-                  '#id_count': 'id_count',
-                },
-                ExpressionAttributeValues={
-                    ':incr': {'N': '1'},
-                    ':default': {'N': '0'}
-                },
-                ReturnValues='UPDATED_NEW',
-            )
-        new_consumer_id = int(resp['Attributes']['id_count']['N'])
-        return new_consumer_id
+        return self.event_id_allocator.next_id()
 
     # @staticmethod
     # def to_batch_write_items(items):
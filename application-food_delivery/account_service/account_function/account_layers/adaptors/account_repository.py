@@ -1,11 +1,25 @@
 import os
 import abc
-import boto3
-from boto3.dynamodb.types import TypeSerializer
-from boto3.dynamodb.types import TypeDeserializer
 from account_layers.domain import account_model
 from account_layers.adaptors import dynamo_exception as dx
+from account_layers.adaptors import dynamo_codec
 from account_layers.common import exceptions as ex
+from account_layers.adaptors import aws_clients
+from account_layers.common import log
+
+logger = log.get_logger(__name__)
+
+
+ACCOUNT_CODEC = dynamo_codec.ItemCodec({
+    'PK': dynamo_codec.S,
+    'SK': dynamo_codec.S,
+    'consumer_id': dynamo_codec.N,
+    'account_id': dynamo_codec.S,
+    'card_information': dynamo_codec.Map({
+        'card_number': dynamo_codec.S,
+        'expiry_date': dynamo_codec.S,
+    }),
+})
 
 
 class AbstractRepository(abc.ABC):
@@ -30,7 +44,7 @@ class DynamoDbRepository(AbstractRepository):
     """
 
     def __init__(self):
-        self.client = boto3.client('dynamodb')
+        self.client = aws_clients.client('dynamodb')
         self.table_name = os.environ.get('DYNAMODB_TABLE_NAME', 'AccountService')
 
     def save(self, account: account_model.Account):
@@ -52,7 +66,7 @@ class DynamoDbRepository(AbstractRepository):
                 ScanIndexForward=True
             )
 
-        print(f'account_repo.find_by_id(): resp: {resp}')
+        logger.payload('account_repo.find_by_id(): resp', resp)
         # if resp['Items'] is None:
         if not resp.get('Items', None):
             raise ex.ItemNotFoundException(f'ItemNotFoundException consumer_id: {consumer_id}')
@@ -73,15 +87,13 @@ class DynamoDbRepository(AbstractRepository):
         account_dict.clear()
         account_dict.update(without_none)
 
-        serializer = boto3.dynamodb.types.TypeSerializer()
-        dynamo_dict = {k: serializer.serialize(v) for k, v in account_dict.items()}
+        dynamo_dict = ACCOUNT_CODEC.encode(account_dict)
         return dynamo_dict
 
     @staticmethod
     def _dynamo_obj_to_account_obj(dynamo_item):
         """ DynamoDB obj -> Account Obj """
-        deserializer = boto3.dynamodb.types.TypeDeserializer()
-        python_obj = {k: deserializer.deserialize(v) for k, v in dynamo_item.items()}
+        python_obj = ACCOUNT_CODEC.decode(dynamo_item)
         python_obj['consumer_id'] = python_obj['PK'].split('#')[1]
         python_obj['account_id'] = python_obj['SK'].split('#')[1]
         del python_obj['PK']
@@ -6,6 +6,9 @@ import json
 import datetime
 from account_layers.common import common
 from account_layers.domain import domain_events
+from account_layers.common import log
+
+logger = log.get_logger(__name__)
 
 
 class Account:
@@ -67,7 +70,7 @@ class Account:
         return True
 
     def revise_authorize_card(self, consumer_id: int, order_id: str, money_total: common.Money):
-        print(f' account_model.revise_authorize_card()')
+        logger.debug(' account_model.revise_authorize_card()')
 
         # Todo: implement some business logic
 
@@ -1,20 +1,31 @@
-import re
+from __future__ import annotations  # classの依存関係の許可
+import functools
 import json
-import traceback
+from typing import TYPE_CHECKING
 from account_layers.common import common
 from account_layers.common import exceptions
 from account_layers.common import json_encoder
-from account_layers.domain import account_model
-from account_layers.service import commands
-from account_layers.service import handlers
-from account_layers.adaptors import account_repository
-from account_layers.adaptors import account_event_repository
+from account_layers.presentation import router
+from account_layers.common import log
 
+if TYPE_CHECKING:  # service / adaptors の module は route と handler() の中でだけ import する
+    from account_layers.service import handlers
 
-ACCOUNT_REPOSITORY = account_repository.DynamoDbRepository()
-ACCOUNT_EVENT_REPOSITORY = account_event_repository.DynamoDbRepository()
-HANDLER = handlers.Handler(account_repo=ACCOUNT_REPOSITORY,
-                           account_event_repo=ACCOUNT_EVENT_REPOSITORY)
+logger = log.get_logger(__name__)
+
+
+ROUTER = router.Router()
+SAGA_REGISTRY = router.Registry()
+
+
+@functools.lru_cache(maxsize=None)
+def handler() -> handlers.Handler:
+    """ repository と Handler は最初の invocation で生成する (import 時に DynamoDB client を作らない) """
+    from account_layers.service import handlers
+    from account_layers.adaptors import account_repository
+    from account_layers.adaptors import account_event_repository
+    return handlers.Handler(account_repo=account_repository.DynamoDbRepository(),
+                            account_event_repo=account_event_repository.DynamoDbRepository())
 
 
 # -------------------------------------------------
@@ -30,37 +41,50 @@ def rest_request(event):
     return http_method, query_string_parameters, path, path_parameters, body_json
 
 
+@ROUTER.route('POST', '/accounts')
+def create_account(request: router.Request):
+    """ POST /accounts  - Create Account
+    http_method: POST
+    path: "/accounts"
+    path_parameters: None
+    query_string_parameters: None
+    body = Consumer Information JSON
+    """
+    from account_layers.service import commands
+    return commands.CreateAccount.from_json(body_json=request.body_json)
+
+
+@ROUTER.route('GET', '/accounts')
+def get_account(request: router.Request):
+    """ GET /accounts?consumer_id=1  - Get Account
+    http_method: GET
+    path: "/accounts"
+    path_parameters: None
+    query_string_parameters: consumer_id: 1
+    body: None
+    """
+    # return commands.GetAccount(account_id=request.path_parameters.get('account_id'))
+    from account_layers.service import commands
+    return commands.GetAccount(consumer_id=request.query_string_parameters.get('consumer_id'))
+
+
 def rest_invocation(event: dict):
-    print(f'rest_invocation(): event: {event}')
+    logger.payload('rest_invocation(): event', event)
     try:
         http_method, query_string_parameters, path, path_parameters, body_json \
             = rest_request(event)
 
-        cmd = None
-        if re.fullmatch('/accounts', path) and http_method == 'POST':
-            """ POST /accounts  - Create Account
-            http_method: POST
-            path: "/accounts"
-            path_parameters: None
-            query_string_parameters: None
-            body = Consumer Information JSON
-            """
-            cmd = commands.CreateAccount.from_json(body_json=body_json)
-        elif re.fullmatch('/accounts', path) and http_method == 'GET':
-            """ GET /accounts?consumer_id=1  - Get Account
-            http_method: GET
-            path: "/accounts"
-            path_parameters: None
-            query_string_parameters: consumer_id: 1
-            body: None
-            """
-            # cmd = commands.GetAccount(account_id=path_parameters.get('account_id'))
-            cmd = commands.GetAccount(consumer_id=query_string_parameters.get('consumer_id'))
-        else:
-            raise exceptions.UnsupportedRoute(f'Unsupported Route :{http_method}')
-
-        resp = HANDLER.commands_handler(cmd)
+        # method + 先頭segment で route を引き、path parameterはpathから取り出す
+        route_handler, path_parameters = ROUTER.resolve(http_method, path)
+        cmd = route_handler(router.Request(http_method=http_method,
+                                           path=path,
+                                           path_parameters=path_parameters,
+                                           query_string_parameters=query_string_parameters,
+                                           body_json=body_json))
+
+        resp = handler().commands_handler(cmd)
 
+        from account_layers.domain import account_model
         resp_ = None
         if isinstance(resp, account_model.Account):
             resp_ = resp.to_dict()
@@ -79,12 +103,11 @@ def rest_invocation(event: dict):
                         cls=json_encoder.JSONEncoder
                     )
         }
-        print(f'return response: {rest_response}')
+        logger.payload('return response', rest_response)
         return rest_response
 
     except exceptions.InvalidName as e:
-        print(str(e))
-        traceback.print_exc()
+        logger.exception('%s', e)
         return {
             'statusCode': 400,
             'body': json.dumps({
@@ -92,19 +115,27 @@ def rest_invocation(event: dict):
             })
         }
 
-    except exceptions.UnsupportedRoute as e:
-        print(str(e))
-        traceback.print_exc()
+    except router.RouteNotFound as e:
+        logger.warning('%s', e)
+        return {
+            'statusCode': 404,
+            'body': json.dumps({
+                'message': str(e),
+            })
+        }
+
+    except router.MethodNotAllowed as e:
+        logger.warning('%s', e)
         return {
             'statusCode': 405,
+            'headers': {'Allow': ', '.join(e.allowed_methods)},
             'body': json.dumps({
                 'message': str(e),
             })
         }
 
     except Exception as e:
-        print(e)
-        traceback.print_exc()
+        logger.exception('%s', e)
         return {
             'statusCode': 500,
             'body': json.dumps({
@@ -118,6 +149,31 @@ def rest_invocation(event: dict):
 # from StepFunctions
 # -------------------------------------------------
 
+@SAGA_REGISTRY.register('CreateOrderSaga', 'AUTHORIZE_CARD')
+def authorize_card(event):
+    from account_layers.service import commands
+    money_total = common.Money.from_dict(event['order_total'])
+    return commands.AuthorizeCard(consumer_id=event['consumer_id'], money_total=money_total)
+
+
+@SAGA_REGISTRY.register('CancelOrderSaga', 'REVERSE_AUTHORIZE_CARD')
+def reverse_authorize_card(event):
+    from account_layers.service import commands
+    money_total = common.Money.from_dict(event['order_total'])
+    return commands.ReverseAuthorizeCard(consumer_id=event['consumer_id'],
+                                         order_id=event['order_id'],
+                                         money_total=money_total)
+
+
+@SAGA_REGISTRY.register('ReviseOrderSaga', 'REVISE_AUTHORIZE_CARD')
+def revise_authorize_card(event):
+    from account_layers.service import commands
+    money_total = common.Money.from_dict(event['new_order_total'])
+    return commands.ReviseAuthorizeCard(consumer_id=event['consumer_id'],
+                                        order_id=event['order_id'],
+                                        money_total=money_total)
+
+
 def stepfunctions_invocation(event: dict):
     """
     {
@@ -137,36 +193,19 @@ def stepfunctions_invocation(event: dict):
     }
     """
     try:
-        print(f'stepfunctions_invocation(): event: {event}')
+        logger.payload('stepfunctions_invocation(): event', event)
         state_machine = event['task_context']['value']['state_machine']
         action = event['task_context']['value']['action']
 
-        cmd = None
-        if state_machine == "CreateOrderSaga" and action == 'AUTHORIZE_CARD':
-            money_total = common.Money.from_dict(event['order_total'])
-            cmd = commands.AuthorizeCard(consumer_id=event['consumer_id'],
-                                         money_total=money_total)
-
-        elif state_machine == "CancelOrderSaga" and action == 'REVERSE_AUTHORIZE_CARD':
-            money_total = common.Money.from_dict(event['order_total'])
-            cmd = commands.ReverseAuthorizeCard(consumer_id=event['consumer_id'],
-                                                order_id=event['order_id'],
-                                                money_total=money_total)
-
-        elif state_machine == "ReviseOrderSaga" and action == 'REVISE_AUTHORIZE_CARD':
-            money_total = common.Money.from_dict(event['new_order_total'])
-            cmd = commands.ReviseAuthorizeCard(consumer_id=event['consumer_id'],
-                                               order_id=event['order_id'],
-                                               money_total=money_total)
-
-        else:
+        to_command = SAGA_REGISTRY.get((state_machine, action))
+        if to_command is None:
             raise exceptions.InvalidSagaCmd(f'stepfunctions_invocation: '
                                             f'state_machine:{state_machine}, action:{action}')
+        cmd = to_command(event)
 
-        saga_resp = HANDLER.saga_commands_handler(cmd)
+        saga_resp = handler().saga_commands_handler(cmd)
         return saga_resp
 
     except Exception as e:
-        print(str(e))
-        traceback.print_exc()
+        logger.exception('%s', e)
         raise e
@@ -1,21 +1,45 @@
+from __future__ import annotations  # classの依存関係の許可
+from typing import TYPE_CHECKING
 from account_layers.service import service
-from account_layers.service import commands
-from account_layers.service import events
+from account_layers.common import log
+from account_layers.common import metrics
+
+if TYPE_CHECKING:  # commands / events は table を組み立てる時にだけ import する
+    from account_layers.service import commands
+    from account_layers.service import events
+
+logger = log.get_logger(__name__)
 
 
 class Handler:
     def __init__(self, account_repo, account_event_repo):
         self.account_service = service.AccountService(account_repo, account_event_repo)
-        self.COMMAND_HANDLER = {
-            commands.CreateAccount: getattr(self.account_service, 'create_account'),
-        }
-        self.SAGACOMMAND_HANDLER = {
-            commands.AuthorizeCard: getattr(self.account_service, 'authorize_card'),
-            commands.ReverseAuthorizeCard: getattr(self.account_service, 'reverse_authorize_card'),
-            commands.ReviseAuthorizeCard: getattr(self.account_service, 'revise_authorize_card'),
-        }
+        # table は route (REST / Saga / EventBridge) ごとに最初の呼び出しで組み立てる
+        self._command_handler = None
+        self._saga_command_handler = None
         self.EVENT_HANDLER = {}
 
+    @property
+    def COMMAND_HANDLER(self) -> dict:
+        if self._command_handler is None:
+            from account_layers.service import commands
+            self._command_handler = {
+                commands.CreateAccount: getattr(self.account_service, 'create_account'),
+            }
+        return self._command_handler
+
+    @property
+    def SAGACOMMAND_HANDLER(self) -> dict:
+        if self._saga_command_handler is None:
+            from account_layers.service import commands
+            self._saga_command_handler = {
+                commands.AuthorizeCard: getattr(self.account_service, 'authorize_card'),
+                commands.ReverseAuthorizeCard: getattr(self.account_service, 'reverse_authorize_card'),
+                commands.ReviseAuthorizeCard: getattr(self.account_service, 'revise_authorize_card'),
+            }
+        return self._saga_command_handler
+
+    @metrics.instrument('commands')
     def commands_handler(self, cmd: commands.Command):
         try:
             method = self.COMMAND_HANDLER[cmd.__class__]
@@ -23,9 +47,10 @@ class Handler:
             return response
 
         except Exception as e:
-            print(str(e))
+            logger.exception('%s', e)
             raise e
 
+    @metrics.instrument('saga_commands')
     def saga_commands_handler(self, cmd: commands.Command):
         try:
             method = self.SAGACOMMAND_HANDLER[cmd.__class__]
@@ -33,9 +58,10 @@ class Handler:
             return response
 
         except Exception as e:
-            print(str(e))
+            logger.exception('%s', e)
             raise e
 
+    @metrics.instrument('events')
     def events_handler(self, event: events.Event):
         try:
             method = self.EVENT_HANDLER[event.__class__]
@@ -43,5 +69,5 @@ class Handler:
             return response
 
         except Exception as e:
-            print(str(e))
+            logger.exception('%s', e)
             raise e
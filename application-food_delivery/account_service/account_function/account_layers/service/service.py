@@ -2,6 +2,9 @@ from account_layers.domain import account_model
 from account_layers.service import commands
 from account_layers.common import exceptions
 from account_layers.service.domain_event_envelope import DomainEventEnvelope
+from account_layers.common import log
+
+logger = log.get_logger(__name__)
 
 
 class AccountService:
@@ -56,12 +59,12 @@ class AccountService:
     # -------------------------------------------------------------------------
     def revise_authorize_card(self, cmd: commands.ReviseAuthorizeCard):
 
-        print(f'revise_authorize_card cmd: {cmd}')
+        logger.debug('revise_authorize_card cmd: %s', cmd)
 
         account: account_model.Account = self.account_repo.find_by_id(consumer_id=cmd.consumer_id)
         if account:
 
-            print(f'PRE account.revise_authorize_card() cmd: {cmd}')
+            logger.debug('PRE account.revise_authorize_card() cmd: %s', cmd)
             result = account.revise_authorize_card(consumer_id=cmd.consumer_id,
                                                    order_id=cmd.order_id,
                                                    money_total=cmd.money_total)
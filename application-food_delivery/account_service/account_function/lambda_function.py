@@ -1,14 +1,22 @@
-import json
+import os
 from account_layers.presentation import controller
 from aws_xray_sdk import core as x_ray
+from account_layers.common import log
 
-x_ray.patch_all()
+logger = log.get_logger(__name__)
+
+# XRAY_PATCH=botocore: AWS SDK の呼び出しだけを patch する (patch_all() は対応する全 library を import する)
+if os.environ.get('XRAY_PATCH', 'all') == 'botocore':
+    x_ray.patch(['botocore'])
+else:
+    x_ray.patch_all()
 
 
 def lambda_handler(event, context):
 
-    print(json.dumps(event))
-    print(context)
+    log.sample()  # LOG_DEBUG_SAMPLE_RATE の割合で、この invocation を DEBUG で出力する
+    logger.payload('event', event)
+    logger.debug('context: %s', context)
 
     response = None
     if event.get('Records', None):  # from SQS
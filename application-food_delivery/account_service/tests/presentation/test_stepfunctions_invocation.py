@@ -0,0 +1,47 @@
+import pytest
+from account_layers.common import exceptions
+from account_layers.service import commands
+from account_layers.presentation import controller
+
+ORDER_ID = '04516f76f6b0456d9e9916d667777890'
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.commands = []
+
+    def saga_commands_handler(self, cmd):
+        self.commands.append(cmd)
+        return {'consumer_id': cmd.consumer_id}
+
+
+@pytest.fixture
+def saga_handler(monkeypatch):
+    recording = RecordingHandler()
+    monkeypatch.setattr(controller, 'handler', lambda: recording)
+    return recording
+
+
+def task(state_machine, action, **payload) -> dict:
+    return {'task_context': {'type': 1, 'value': {'state_machine': state_machine, 'action': action}}, **payload}
+
+
+@pytest.mark.parametrize('state_machine, action, command, payload', [
+    ('CreateOrderSaga', 'AUTHORIZE_CARD', commands.AuthorizeCard,
+     {'order_total': {'value': 2400, 'currency': 'JPY'}}),
+    ('CancelOrderSaga', 'REVERSE_AUTHORIZE_CARD', commands.ReverseAuthorizeCard,
+     {'order_id': ORDER_ID, 'order_total': {'value': 2400, 'currency': 'JPY'}}),
+    ('ReviseOrderSaga', 'REVISE_AUTHORIZE_CARD', commands.ReviseAuthorizeCard,
+     {'order_id': ORDER_ID, 'new_order_total': {'value': 800, 'currency': 'JPY'}}),
+])
+def test_saga_command_is_handled(saga_handler, state_machine, action, command, payload):
+    resp = controller.stepfunctions_invocation(task(state_machine, action, consumer_id=4, **payload))
+
+    assert resp == {'consumer_id': 4}
+    assert [type(cmd) for cmd in saga_handler.commands] == [command]
+
+
+def test_unregistered_action(saga_handler):
+    with pytest.raises(exceptions.InvalidSagaCmd):
+        controller.stepfunctions_invocation(task('CreateOrderSaga', 'UNKNOWN', consumer_id=4))
+    assert saga_handler.commands == []
@@ -0,0 +1,77 @@
+"""
+boto3 client startup (cold start init) benchmark
+    service 毎に新しい python process で presentation.controller を import して handler() を呼び、
+    import boto3 から repository の生成完了までの時間を計測する。
+
+    legacy: 変更前と同じく repository 毎に boto3.client('dynamodb') を生成する
+            (aws_clients.client を boto3.client に差し替える)
+    shared: aws_clients.client() で service 毎に1つの client を共有する
+
+    cd application-food_delivery
+    python benchmarks/bench_client_startup.py
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 15
+
+LAYERS = [  # (function dir, layer package, aws_clients module)
+    ('order_service/order_function', 'order_layers', 'order_layers.adaptors.aws_clients'),
+    ('consumer_service/consumer_function', 'consumer_layers', 'consumer_layers.adaptors.aws_clients'),
+    ('kitchen_service/kitchen_function', 'kitchen_layer', 'kitchen_layer.adaptors.aws_clients'),
+    ('account_service/account_function', 'account_layers', 'account_layers.adaptors.aws_clients'),
+    ('delivery_service/delivery_function', 'delivery_layer', 'delivery_layer.adaptors.aws_clients'),
+    ('restaurant_service/restaurant_function', 'restaurant_layers',
+     'restaurant_layers.adaptors.aws_clients'),
+    ('order_history_service/order_history_function', 'order_history_layers',
+     'order_history_layers.store.aws_clients'),
+]
+
+INIT = '''
+import contextlib, importlib, io, sys, time
+started = time.perf_counter()
+import boto3
+aws_clients = importlib.import_module(sys.argv[2])
+created = []
+if sys.argv[1] == 'legacy':
+    def legacy_client(service_name):
+        created.append(service_name)
+        return boto3.client(service_name)
+    aws_clients.client = legacy_client
+with contextlib.redirect_stdout(io.StringIO()):
+    controller = importlib.import_module(sys.argv[3] + '.presentation.controller')
+    controller.handler()  # repository は最初の invocation で生成する
+elapsed = time.perf_counter() - started
+print(elapsed, len(created) if sys.argv[1] == 'legacy' else len(aws_clients._CLIENTS))
+'''
+
+
+def init(function_dir, package, aws_clients, mode):
+    env = dict(os.environ, PYTHONPATH=os.path.join(ROOT, function_dir),
+               AWS_DEFAULT_REGION=os.environ.get('AWS_DEFAULT_REGION', 'ap-northeast-1'))
+    output = subprocess.run([sys.executable, '-c', INIT, mode, aws_clients, package],
+                            env=env, check=True, capture_output=True, text=True).stdout.split()
+    return float(output[0]), int(output[1])
+
+
+def main():
+    print(f'runs: {RUNS} (median)')
+    for function_dir, package, aws_clients in LAYERS:
+        results = {'legacy': [], 'shared': []}
+        clients = {}
+        for _ in range(RUNS):
+            for mode in results:  # 交互に実行して OS の page cache の影響を揃える
+                elapsed, clients[mode] = init(function_dir, package, aws_clients, mode)
+                results[mode].append(elapsed)
+        legacy = statistics.median(results['legacy'])
+        shared = statistics.median(results['shared'])
+        print(f'{package:<22} legacy: {legacy * 1000:6.1f} ms ({clients["legacy"]} clients)  '
+              f'shared: {shared * 1000:6.1f} ms ({clients["shared"]} client)  '
+              f'{(legacy - shared) * 1000:+5.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+DynamoDB AttributeValue codec benchmark
+    変更前の TypeSerializer / TypeDeserializer と、schemaから組み立てた dynamo_codec.ItemCodec を
+    Item 1件あたりの encode / decode 時間と allocation (tracemalloc) で比較する。
+    計測前に両者の結果が一致することを確認する。
+
+    cd application-food_delivery
+    python benchmarks/bench_dynamo_codec.py
+"""
+import decimal
+import os
+import sys
+import timeit
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for function_dir in ['order_service/order_function',
+                     'kitchen_service/kitchen_function',
+                     'delivery_service/delivery_function']:
+    sys.path.insert(0, os.path.join(ROOT, function_dir))
+
+from boto3.dynamodb.types import TypeSerializer  # noqa: E402
+from boto3.dynamodb.types import TypeDeserializer  # noqa: E402
+from order_layers.adaptors import order_repository  # noqa: E402
+from order_layers.adaptors import order_event_repository  # noqa: E402
+from kitchen_layer.adaptors import kitchen_repository  # noqa: E402
+from delivery_layer.adaptors import courier_repository  # noqa: E402
+
+LINE_ITEMS = 20
+NUMBER = 2000
+D = decimal.Decimal
+
+ADDRESS = {'street1': '9 Amazing View', 'street2': 'Soi 8', 'city': 'Oakland', 'state': 'CA',
+           'zip': '94612'}
+TIME = '2022-11-30T05:00:30.001000Z'
+
+
+def make_items():
+    order = {
+        'PK': 'ORDER#a1b2', 'SK': 'METADATA#a1b2', 'lock_version': 3,
+        'order_state': 'APPROVED', 'consumer_id': 1, 'restaurant_id': 1,
+        'order_line_items': [{'menu_id': f'{i:06}', 'name': f'menu-{i}',
+                              'price': {'value': 800, 'currency': 'JPY'}, 'quantity': 2}
+                             for i in range(LINE_ITEMS)],
+        'delivery_information': {'delivery_time': TIME, 'delivery_address': ADDRESS},
+    }
+    event = {
+        'PK': 'ORDER#a1b2', 'SK': 'EVENT#000000000000000000000000000001', 'event_id': 1,
+        'timestamp': TIME, 'event_type': 'OrderCreated', 'aggregate_type': 'ORDER',
+        'aggregate_id': 'a1b2', 'order_details': {'consumer_id': 1, 'restaurant_id': 1},
+    }
+    ticket = {
+        'PK': 'TICKET#a1b2', 'SK': 'METADATA#a1b2', 'lock_version': D('1'),
+        'restaurant_id': D('1'), 'state': 'ACCEPTED', 'accept_time': TIME,
+        'line_items': [{'quantity': D('2'), 'menu_id': f'{i:06}', 'name': f'menu-{i}'}
+                       for i in range(LINE_ITEMS)],
+    }
+    courier = {
+        'PK': 'COURIER#1002', 'SK': 'METADATA#1002', 'available': True,
+        'courier_available': 'c0ffee',
+        'plan': [{'action_type': 'PICKUP', 'delivery_id': f'{i}', 'address': ADDRESS,
+                  'time': TIME} for i in range(LINE_ITEMS)],
+        'done': [],
+    }
+    # (name, codec, python dict)
+    return [
+        ('order.Order', order_repository.ORDER_CODEC, order),
+        ('order.Event', order_event_repository.ORDER_EVENT_CODEC, event),
+        ('kitchen.Ticket', kitchen_repository.TICKET_CODEC, ticket),
+        ('delivery.Courier', courier_repository.COURIER_CODEC, courier),
+    ]
+
+
+def allocation(func):
+    """ 1回の呼び出しで確保したメモリのpeak (bytes) """
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def report(name, number, before, after, before_bytes, after_bytes):
+    print(f'{name:<24} before: {before / number * 1e6:7.1f} us {before_bytes:7,d} B  '
+          f'after: {after / number * 1e6:7.1f} us {after_bytes:7,d} B  x{before / after:4.1f}')
+
+
+def main():
+    serializer = TypeSerializer()
+    deserializer = TypeDeserializer()
+
+    def legacy_encode(d):
+        return {k: serializer.serialize(v) for k, v in d.items()}
+
+    def legacy_decode(item):
+        return {k: deserializer.deserialize(v) for k, v in item.items()}
+
+    print(f'line_items: {LINE_ITEMS}, number: {NUMBER}')
+    for name, codec, d in make_items():
+        item = legacy_encode(d)
+        assert codec.encode(d) == item, name
+        assert codec.decode(item) == legacy_decode(item), name
+
+        report(f'{name} encode', NUMBER,
+               timeit.timeit(lambda: legacy_encode(d), number=NUMBER),
+               timeit.timeit(lambda: codec.encode(d), number=NUMBER),
+               allocation(lambda: legacy_encode(d)), allocation(lambda: codec.encode(d)))
+        report(f'{name} decode', NUMBER,
+               timeit.timeit(lambda: legacy_decode(item), number=NUMBER),
+               timeit.timeit(lambda: codec.decode(item), number=NUMBER),
+               allocation(lambda: legacy_decode(item)), allocation(lambda: codec.decode(item)))
+
+
+if __name__ == '__main__':
+    main()
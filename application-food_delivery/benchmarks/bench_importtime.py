@@ -0,0 +1,90 @@
+"""
+Lambda function import cost (python -X importtime)
+    function 毎に新しい python process で lambda_function を import し、-X importtime の出力から
+    import の合計時間と、top-level package 毎の self time (上位) を出力する。
+    cold start の init のうち、module の import と module level の処理 (client 生成等) にかかる時間。
+
+    aws_xray_sdk が無い環境では layer の presentation.controller を import する (表の * 印)。
+    XRAY_PATCH=botocore を付けると lambda_function は botocore だけを patch する。
+
+    cd application-food_delivery
+    python benchmarks/bench_importtime.py [--runs 5] [function名 ...]
+    XRAY_PATCH=botocore python benchmarks/bench_importtime.py
+"""
+import argparse
+import collections
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FUNCTIONS = {  # function名 -> (function dir, aws_xray_sdk が無い時に import する module)
+    'order': ('order_service/order_function', 'order_layers.presentation.controller'),
+    'consumer': ('consumer_service/consumer_function', 'consumer_layers.presentation.controller'),
+    'kitchen': ('kitchen_service/kitchen_function', 'kitchen_layer.presentation.controller'),
+    'account': ('account_service/account_function', 'account_layers.presentation.controller'),
+    'delivery': ('delivery_service/delivery_function', 'delivery_layer.presentation.controller'),
+    'restaurant': ('restaurant_service/restaurant_function', 'restaurant_layers.presentation.controller'),
+    'order_history': ('order_history_service/order_history_function',
+                      'order_history_layers.presentation.controller'),
+    'order_domain_event': ('order_service/order_domain_event_function', None),
+    'consumer_domain_event': ('consumer_service/consumer_domain_event_function', None),
+    'kitchen_domain_event': ('kitchen_service/kitchen_domain_event_function', None),
+    'delivery_domain_event': ('delivery_service/delivery_domain_event_function', None),
+    'restaurant_domain_event': ('restaurant_service/restaurant_domain_event_function', None),
+}
+TOP_PACKAGES = 4
+
+
+def importtime(function_dir: str, module: str) -> tuple[float, dict]:
+    """ (合計 ms, top-level package -> self ms) 失敗時は ImportError """
+    env = dict(os.environ, PYTHONPATH=os.path.join(ROOT, function_dir),
+               AWS_DEFAULT_REGION=os.environ.get('AWS_DEFAULT_REGION', 'ap-northeast-1'))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise ImportError(result.stderr.strip().splitlines()[-1])
+
+    total = 0.0
+    packages = collections.Counter()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        packages[name.strip().split('.')[0]] += int(self_us) / 1000
+        if not name[1:].startswith(' '):  # 字下げなし = -c で import した module と、その前の site 等
+            total += int(cumulative_us) / 1000
+    return total, packages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('functions', nargs='*', default=list(FUNCTIONS))
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f'runs: {args.runs} (median)  XRAY_PATCH: {os.environ.get("XRAY_PATCH", "all")}')
+    for name in args.functions:
+        function_dir, fallback = FUNCTIONS[name]
+        module = 'lambda_function'
+        try:
+            importtime(function_dir, module)
+        except ImportError as e:
+            if fallback is None:
+                print(f'{name:<24} skipped: {e}')
+                continue
+            module = fallback
+
+        runs = [importtime(function_dir, module) for _ in range(args.runs)]
+        total = statistics.median(r[0] for r in runs)
+        packages = collections.Counter({package: statistics.median(r[1][package] for r in runs)
+                                        for package in runs[0][1]})
+        top = '  '.join(f'{package} {ms:.1f}' for package, ms in packages.most_common(TOP_PACKAGES))
+        mark = '' if module == 'lambda_function' else '*'
+        print(f'{name + mark:<24} {total:7.1f} ms   {top}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Domain Model to_dict() benchmark
+    変更前の json.loads(json.dumps(o, default=encoder_)) と、
+    JSON文字列を経由しない to_dict() を Model ごとに比較する。
+    計測前に両者の結果 (int/float/Decimalの型とkeyの順序を含む) が一致することを確認する。
+
+    cd application-food_delivery
+    python benchmarks/bench_to_dict.py
+"""
+import dataclasses
+import datetime
+import decimal
+import enum
+import json
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for function_dir in ['order_service/order_function',
+                     'kitchen_service/kitchen_function',
+                     'delivery_service/delivery_function',
+                     'restaurant_service/restaurant_function',
+                     'order_history_service/order_history_function']:
+    sys.path.insert(0, os.path.join(ROOT, function_dir))
+
+from order_layers.common import common as order_common  # noqa: E402
+from order_layers.domain import order_model  # noqa: E402
+from order_layers.domain import restaurant_model as order_restaurant_model  # noqa: E402
+from kitchen_layer.domain import ticket_model  # noqa: E402
+from delivery_layer.common import common as delivery_common  # noqa: E402
+from delivery_layer.domain import courier_model  # noqa: E402
+from delivery_layer.domain import delivery_model  # noqa: E402
+from restaurant_layers.common import common as restaurant_common  # noqa: E402
+from restaurant_layers.domain import restaurant_model  # noqa: E402
+from order_history_layers.common import common as order_history_common  # noqa: E402
+from order_history_layers.model import order_history_model  # noqa: E402
+
+LINE_ITEMS = 20
+NUMBER = 2000
+D = decimal.Decimal
+
+
+def legacy_encoder(o):
+    """ 変更前の各Modelのencoder_をまとめたもの """
+    if isinstance(o, (order_model.DeliveryInformation, order_history_model.DeliveryInformation)):
+        return {'delivery_time': o.delivery_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+                'delivery_address': dataclasses.asdict(o.delivery_address)}
+    if isinstance(o, order_model.OrderLineItems):
+        return o.line_items
+    if isinstance(o, (courier_model.Plan, courier_model.Done)):
+        return o.actions
+    if isinstance(o, restaurant_model.MenuItems):
+        return o.menu_items
+    if isinstance(o, enum.Enum):
+        return o.value
+    if isinstance(o, datetime.datetime):
+        return o.isoformat() + 'Z'
+    if isinstance(o, decimal.Decimal):
+        if int(o) == o:
+            return int(o)
+        else:
+            return float(o)
+    if hasattr(o, '__dict__'):
+        return {k: v for k, v in o.__dict__.items() if not k.startswith('_')}
+    raise TypeError(f'{repr(o)} is not serializable')
+
+
+def legacy_to_dict(o, parse_float=None):
+    return json.loads(json.dumps(o, default=legacy_encoder), parse_float=parse_float)
+
+
+def make_models():
+    delivery_time = datetime.datetime(2022, 11, 30, 5, 0, 30, 1000)
+    order_address = order_common.Address('9 Amazing View', 'Soi 8', 'Oakland', 'CA', '94612')
+    order = order_model.Order(
+        consumer_id=D('1'), restaurant_id=D('1'),
+        delivery_information=order_model.DeliveryInformation(delivery_time, order_address),
+        order_line_items=order_model.OrderLineItems([
+            order_model.OrderLineItem(f'{i:06}', f'menu-{i}', order_common.Money(D('800'), 'JPY'),
+                                      D('2'))
+            for i in range(LINE_ITEMS)]),
+        lock_version=D('3'))
+
+    order_restaurant = order_restaurant_model.Restaurant(D('1'), 'skylark', [
+        order_restaurant_model.MenuItem(f'{i:06}', f'menu-{i}', order_common.Money(D('800'), 'JPY'))
+        for i in range(LINE_ITEMS)])
+
+    ticket = ticket_model.Ticket(
+        'a1b2', D('1'),
+        [ticket_model.TicketLineItem(D('2'), f'{i:06}', f'menu-{i}') for i in range(LINE_ITEMS)],
+        state=ticket_model.TicketState.ACCEPTED, accept_time=delivery_time)
+
+    delivery_address = delivery_common.Address('9 Amazing View', 'Soi 8', 'Oakland', 'CA', '94612')
+    delivery = delivery_model.Delivery('a1b2', D('1'), delivery_address, delivery_address,
+                                       state=delivery_model.DeliveryState.SCHEDULED,
+                                       ready_by=delivery_time, assigned_courier=D('1002'))
+
+    courier = courier_model.Courier(D('1002'), available=True)
+    for i in range(LINE_ITEMS // 2):
+        courier.add_action(courier_model.Action.make_pickup(f'{i}', delivery_address, delivery_time))
+        courier.add_action(
+            courier_model.Action.make_dropoff(f'{i}', delivery_address, delivery_time))
+
+    restaurant = restaurant_model.Restaurant(
+        'skylark', restaurant_common.Address('1 Main Street', 'Unit 99', 'Oakland', 'CA', '94611'),
+        restaurant_model.MenuItems([
+            restaurant_model.MenuItem(f'{i:06}', f'menu-{i}',
+                                      restaurant_common.Money(D('800'), 'JPY'))
+            for i in range(LINE_ITEMS)]),
+        restaurant_id=D('1'))
+
+    history_order = order_history_model.Order(
+        'a1b2', D('1'), D('1'), order_history_model.OrderState.APPROVED,
+        [order_history_model.OrderLineItem(f'{i:06}', f'menu-{i}',
+                                           order_history_common.Money(D('800'), 'JPY'), D('2'))
+         for i in range(LINE_ITEMS)],
+        order_history_model.DeliveryInformation(
+            delivery_time,
+            order_history_common.Address('9 Amazing View', 'Soi 8', 'Oakland', 'CA', '94612')))
+
+    # (name, model, 変更前のjson.loads()のparse_float)
+    return [
+        ('order.Order', order, None),
+        ('order.Restaurant', order_restaurant, None),
+        ('kitchen.Ticket', ticket, decimal.Decimal),
+        ('delivery.Delivery', delivery, decimal.Decimal),
+        ('delivery.Courier', courier, decimal.Decimal),
+        ('restaurant.Restaurant', restaurant, None),
+        ('order_history.Order', history_order, None),
+    ]
+
+
+def main():
+    print(f'line_items: {LINE_ITEMS}, number: {NUMBER}')
+    for name, model, parse_float in make_models():
+        assert repr(model.to_dict()) == repr(legacy_to_dict(model, parse_float)), name
+
+        before = timeit.timeit(lambda: legacy_to_dict(model, parse_float), number=NUMBER)
+        after = timeit.timeit(model.to_dict, number=NUMBER)
+        print(f'{name:<24} before: {before / NUMBER * 1e6:8.1f} us  '
+              f'after: {after / NUMBER * 1e6:8.1f} us  x{before / after:5.1f}')
+
+
+if __name__ == '__main__':
+    main()
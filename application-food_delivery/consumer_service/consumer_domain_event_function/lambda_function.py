@@ -1,12 +1,19 @@
 import os
-import json
-from json_encoder import JSONEncoder
+import stream_batch
+import aws_clients
 import boto3
 from boto3.dynamodb.types import TypeDeserializer
 from aws_xray_sdk import core as x_ray
+import log
 
-x_ray.patch_all()
-eventbus = boto3.client('events')
+logger = log.get_logger(__name__)
+
+# XRAY_PATCH=botocore: AWS SDK の呼び出しだけを patch する (patch_all() は対応する全 library を import する)
+if os.environ.get('XRAY_PATCH', 'all') == 'botocore':
+    x_ray.patch(['botocore'])
+else:
+    x_ray.patch_all()
+eventbus = aws_clients.client('events')
 
 
 class UnsupportedEventChannelException(Exception):
@@ -52,7 +59,7 @@ def event_handler(record):
     dynamo_item = record['dynamodb']['NewImage']
 
     python_obj = convert_to_python_obj(dynamo_item)
-    print(json.dumps(python_obj, cls=JSONEncoder))
+    logger.payload('python_obj', python_obj)
 
     event_type = python_obj['event_type']
     if event_type == "ConsumerCreated":
@@ -64,15 +71,13 @@ def event_handler(record):
 
 
 def lambda_handler(event, context):
-    print(json.dumps(event))
+    log.sample()  # LOG_DEBUG_SAMPLE_RATE の割合で、この invocation を DEBUG で出力する
+    logger.payload('event', event)
 
     resp = None
     if event.get('Records', None):  # from DynamoDB Streams
-        for record in event['Records']:
-            if record['eventSource'] == 'aws:dynamodb':
-                event_handler(record)
-            else:
-                raise Exception(f"NotSupportEvent:{record['eventSource']}")
+        # 最初に失敗したrecordのSequenceNumberを batchItemFailures で返す
+        resp = stream_batch.process_records(event['Records'], event_handler)
     else:
         raise Exception(f"NotSupportEvent: {event}")
 
@@ -1,11 +1,24 @@
 import os
 import abc
-import boto3
-from boto3.dynamodb.types import TypeSerializer
-from boto3.dynamodb.types import TypeDeserializer
 from consumer_layers.domain import consumer_model
 from consumer_layers.adaptors import dynamo_exception as dx
+from consumer_layers.adaptors import dynamo_codec
+from consumer_layers.adaptors import id_allocator
 from consumer_layers.common import exceptions as ex
+from consumer_layers.adaptors import aws_clients
+from consumer_layers.common import log
+
+logger = log.get_logger(__name__)
+
+
+CONSUMER_CODEC = dynamo_codec.ItemCodec({
+    'PK': dynamo_codec.S,
+    'SK': dynamo_codec.S,
+    'name': dynamo_codec.Map({
+        'first_name': dynamo_codec.S,
+        'last_name': dynamo_codec.S,
+    }),
+})
 
 
 class AbstractRepository(abc.ABC):
@@ -30,31 +43,14 @@ class DynamoDbRepository(AbstractRepository):
     """
 
     def __init__(self):
-        self.client = boto3.client('dynamodb')
+        self.client = aws_clients.client('dynamodb')
         self.table_name = os.environ.get('DYNAMODB_TABLE_NAME', 'ConsumerService')
+        self.consumer_id_allocator = id_allocator.get_allocator(self.client,
+                                                                self.table_name,
+                                                                'IDCOUNTER#Consumer')
 
     def get_unique_consumer_id(self) -> int:
-        with dx.dynamo_exception_check():
-            resp = self.client.update_item(
-                TableName=self.table_name,
-                Key={
-                    'PK': {'S': 'IDCOUNTER#Consumer'},
-                    'SK': {'S': 'IDCOUNTER#Consumer'},
-                },
-                UpdateExpression='SET #id_count = if_not_exists(#id_count, :default) + :incr',
-                # itemがあれば+1更新、itemがなければif_not_exists()で:default値を初期値とする。
-                ExpressionAttributeNames={
-                  '#id_count': 'id_count',
-                },
-                ExpressionAttributeValues={
-                    ':incr': {'N': '1'},
-                    ':default': {'N': '0'}
-                },
-                ReturnValues='UPDATED_NEW',
-            )
-
-        new_consumer_id = int(resp['Attributes']['id_count']['N'])
-        return new_consumer_id
+        return self.consumer_id_allocator.next_id()
 
     def save(self, consumer: consumer_model.Consumer):
         consumer_dynamo_dict = self.to_dynamo_dict(consumer)
@@ -72,7 +68,7 @@ class DynamoDbRepository(AbstractRepository):
                 },
             )
 
-        print(f'consumer_repo.find_by_id(): resp: {resp}')
+        logger.payload('consumer_repo.find_by_id(): resp', resp)
         # if resp['Item'] is None:
         if not resp.get('Item', None):
             raise ex.ItemNotFoundException(f'ItemNotFoundException consumer_id: {consumer_id}')
@@ -91,15 +87,13 @@ class DynamoDbRepository(AbstractRepository):
         consumer_dict.clear()
         consumer_dict.update(without_none)
 
-        serializer = boto3.dynamodb.types.TypeSerializer()
-        dynamo_dict = {k: serializer.serialize(v) for k, v in consumer_dict.items()}
+        dynamo_dict = CONSUMER_CODEC.encode(consumer_dict)
         return dynamo_dict
 
     @staticmethod
     def _dynamo_obj_to_consumer_obj(dynamo_item):
         """ DynamoDB obj -> Consumer Obj """
-        deserializer = boto3.dynamodb.types.TypeDeserializer()
-        python_obj = {k: deserializer.deserialize(v) for k, v in dynamo_item.items()}
+        python_obj = CONSUMER_CODEC.decode(dynamo_item)
         python_obj['consumer_id'] = python_obj['PK'].split('#')[1]
         del python_obj['PK']
         del python_obj['SK']
@@ -0,0 +1,239 @@
+"""
+DynamoDB AttributeValue Codec
+    boto3.dynamodb.types.TypeSerializer / TypeDeserializer と同じ wire format を、
+    attributeごとに事前に組み立てた field encoder/decoder で直接作る。
+
+        ORDER_CODEC = dynamo_codec.ItemCodec({
+            'PK': dynamo_codec.S,
+            'lock_version': dynamo_codec.N,
+            'order_minimum': dynamo_codec.MONEY,
+            'order_line_items': dynamo_codec.List(dynamo_codec.Map({...})),
+        })
+        item = ORDER_CODEC.encode(order_dict)       # dict -> {'PK': {'S': ...}, ...}
+        order_dict = ORDER_CODEC.decode(item)       # {'PK': {'S': ...}, ...} -> dict
+
+    schemaに無いattributeや、schemaと型が違うvalueは TypeSerializer / TypeDeserializer と
+    同じ規則で変換する。(floatはTypeErrorになる。Numberは Decimal で返す)
+"""
+import collections.abc
+import decimal
+from boto3.dynamodb.types import Binary
+from boto3.dynamodb.types import DYNAMODB_CONTEXT
+from consumer_layers.common import metrics
+
+_INT_LIMIT = 10 ** 38  # DynamoDB Numberの精度 (38桁) 未満のintはstr()だけで変換できる
+
+
+# ------------------------------ encoder ------------------------------
+def _encode_null(value):
+    return {'NULL': True}
+
+
+def _encode_bool(value):
+    return {'BOOL': value}
+
+
+def _encode_n(value):
+    if type(value) is int and -_INT_LIMIT < value < _INT_LIMIT:
+        return {'N': str(value)}
+    if isinstance(value, float):
+        raise TypeError('Float types are not supported. Use Decimal types instead.')
+    number = str(DYNAMODB_CONTEXT.create_decimal(value))
+    if number in ('Infinity', 'NaN'):
+        raise TypeError('Infinity and NaN not supported')
+    return {'N': number}
+
+
+def _encode_s(value):
+    return {'S': value}
+
+
+def _encode_b(value):
+    if isinstance(value, Binary):
+        value = value.value
+    return {'B': value}
+
+
+def _encode_set(value):
+    if all(_is_number(v) for v in value):
+        return {'NS': [_encode_n(v)['N'] for v in value]}
+    if all(isinstance(v, str) for v in value):
+        return {'SS': list(value)}
+    if all(isinstance(v, (Binary, bytes, bytearray)) for v in value):
+        return {'BS': [_encode_b(v)['B'] for v in value]}
+    raise TypeError(f'Unsupported type "{type(value)}" for value "{value}"')
+
+
+def _encode_m(value):
+    return {'M': {k: encode_value(v) for k, v in value.items()}}
+
+
+def _encode_l(value):
+    return {'L': [encode_value(v) for v in value]}
+
+
+def _is_number(value):
+    return isinstance(value, (int, decimal.Decimal)) and not isinstance(value, bool)
+
+
+_ENCODERS = {
+    type(None): _encode_null,
+    bool: _encode_bool,
+    int: _encode_n,
+    decimal.Decimal: _encode_n,
+    str: _encode_s,
+    bytes: _encode_b,
+    bytearray: _encode_b,
+    Binary: _encode_b,
+    set: _encode_set,
+    frozenset: _encode_set,
+    dict: _encode_m,
+    list: _encode_l,
+    tuple: _encode_l,
+}
+
+
+def _find_encoder(value):
+    # subclass (str Enum, OrderedDict など) は TypeSerializer と同じ順序で判定する
+    if isinstance(value, bool):
+        return _encode_bool
+    if isinstance(value, float) or _is_number(value):
+        return _encode_n
+    if isinstance(value, str):
+        return _encode_s
+    if isinstance(value, (Binary, bytes, bytearray)):
+        return _encode_b
+    if isinstance(value, collections.abc.Set):
+        return _encode_set
+    if isinstance(value, collections.abc.Mapping):
+        return _encode_m
+    if isinstance(value, (list, tuple)):
+        return _encode_l
+    raise TypeError(f'Unsupported type "{type(value)}" for value "{value}"')
+
+
+def encode_value(value) -> dict:
+    """ python value -> AttributeValue (TypeSerializer.serialize()と同じ) """
+    encoder = _ENCODERS.get(type(value))
+    if encoder is None:
+        encoder = _find_encoder(value)
+    return encoder(value)
+
+
+# ------------------------------ decoder ------------------------------
+_DECODERS = {
+    'NULL': lambda value: None,
+    'BOOL': lambda value: value,
+    'N': DYNAMODB_CONTEXT.create_decimal,
+    'S': lambda value: value,
+    'B': Binary,
+    'NS': lambda value: set(map(DYNAMODB_CONTEXT.create_decimal, value)),
+    'SS': set,
+    'BS': lambda value: set(map(Binary, value)),
+    'M': lambda value: {k: decode_value(v) for k, v in value.items()},
+    'L': lambda value: [decode_value(v) for v in value],
+}
+
+
+def decode_value(attribute_value: dict):
+    """ AttributeValue -> python value (TypeDeserializer.deserialize()と同じ) """
+    if not attribute_value:
+        raise TypeError('Value must be a nonempty dictionary whose key is a valid dynamodb type.')
+    [(dynamodb_type, value)] = attribute_value.items()
+    try:
+        decoder = _DECODERS[dynamodb_type]
+    except KeyError:
+        raise TypeError(f'Dynamodb type {dynamodb_type} is not supported')
+    return decoder(value)
+
+
+# ------------------------------ schema ------------------------------
+class Field:
+    """ 1つのattributeのencoder/decoder """
+
+    def __init__(self, encode, decode):
+        self.encode = encode
+        self.decode = decode
+
+
+def _scalar(dynamodb_type, python_type, encoder, decoder) -> Field:
+    def encode(value):
+        if type(value) is python_type:
+            return encoder(value)
+        return encode_value(value)
+
+    def decode(attribute_value):
+        value = attribute_value.get(dynamodb_type)
+        if value is None:
+            return decode_value(attribute_value)
+        return decoder(value)
+
+    return Field(encode, decode)
+
+
+ANY = Field(encode_value, decode_value)
+S = _scalar('S', str, _encode_s, lambda value: value)
+N = _scalar('N', int, _encode_n, DYNAMODB_CONTEXT.create_decimal)
+BOOL = _scalar('BOOL', bool, _encode_bool, lambda value: value)
+
+
+def Map(schema: dict) -> Field:
+    """ 'M': schemaのkeyはschemaのFieldで、それ以外はANYで変換する """
+    get = schema.get
+
+    def encode(value):
+        if type(value) is not dict:
+            return encode_value(value)
+        return {'M': {k: get(k, ANY).encode(v) for k, v in value.items()}}
+
+    def decode(attribute_value):
+        value = attribute_value.get('M')
+        if value is None:
+            return decode_value(attribute_value)
+        return {k: get(k, ANY).decode(v) for k, v in value.items()}
+
+    return Field(encode, decode)
+
+
+def List(item: Field) -> Field:
+    """ 'L': 全ての要素をitemのFieldで変換する """
+    item_encode = item.encode
+    item_decode = item.decode
+
+    def encode(value):
+        if type(value) is not list:
+            return encode_value(value)
+        return {'L': [item_encode(v) for v in value]}
+
+    def decode(attribute_value):
+        value = attribute_value.get('L')
+        if value is None:
+            return decode_value(attribute_value)
+        return [item_decode(v) for v in value]
+
+    return Field(encode, decode)
+
+
+# 各Serviceのcommon.Money / common.Address
+MONEY = Map({'value': N, 'currency': S})
+ADDRESS = Map({'street1': S, 'street2': S, 'city': S, 'state': S, 'zip': S})
+
+
+class ItemCodec:
+    """ Item (attribute名 -> AttributeValue) の encoder/decoder """
+
+    def __init__(self, schema: dict):
+        self.schema = schema
+
+    @metrics.timed
+    def encode(self, d: dict) -> dict:
+        get = self.schema.get
+        return {k: get(k, ANY).encode(v) for k, v in d.items()}
+
+    @metrics.timed
+    def decode(self, item: dict) -> dict:
+        get = self.schema.get
+        return {k: get(k, ANY).decode(v) for k, v in item.items()}
+
+    def encode_attribute(self, name: str, value) -> dict:
+        return self.schema.get(name, ANY).encode(value)
@@ -1,9 +1,12 @@
 import contextlib
 from botocore import exceptions
 from consumer_layers.common import exceptions
+from consumer_layers.common import log
 
 """ DynamoDB Exceptions """
 
+logger = log.get_logger(__name__)
+
 
 class ConditionalCheckFailedException(Exception):
     pass
@@ -36,7 +39,7 @@ def dynamo_exception_check():
 
     except exceptions.ClientError as e:
         if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
-            print(e.response['Error'])
+            logger.warning('%s', e.response['Error'])
             # raise ConditionalCheckFailedException(
             #     f'ConditionalCheckFailedException: {e.response["Error"]}')
             raise exceptions.ConsumerNameAlreadyExists(e.response['Error'])
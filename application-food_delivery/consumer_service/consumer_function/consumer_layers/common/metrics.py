@@ -0,0 +1,177 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+"""
+Hot path instrumentation (CloudWatch Embedded Metric Format)
+    Handler の commands_handler / saga_commands_handler / events_handler を instrument() で包み、
+    invocation 毎に1行の EMF の log を出力する。CloudWatch Logs が metric に変換するので、
+    Service と Operation (command / event の class名) の dimension で p50/p99 を見ることができる。
+
+        class Handler:
+            @metrics.instrument('commands')
+            def commands_handler(self, cmd): ...
+
+    記録する値
+        Latency:                 handler 全体 (ms)
+        <AWS service>Calls/Time: aws_clients の client の API call の回数と時間 (ms)  例: DynamoDBCalls
+        ConsumedCapacity:        DynamoDB の ConsumedCapacity (ReturnConsumedCapacity=TOTAL を付ける)
+        SerializationTime:       timed() で包んだ処理 (dynamo_codec の encode/decode) の時間 (ms)
+        AwsCalls (property):     'DynamoDB.Query' 等の operation 毎の回数と時間
+
+    環境変数
+        METRICS_ENABLED:   true (default) | false
+                           false の時は instrument() / timed() は関数をそのまま返し、client に hook を登録しない
+                           (import 時に決まるので、変更は新しい実行環境から有効になる)
+        METRICS_NAMESPACE: FoodDelivery
+        METRICS_SERVICE:   consumer
+"""
+
+ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'FoodDelivery')
+SERVICE = os.environ.get('METRICS_SERVICE', 'consumer')
+
+_lock = threading.Lock()
+_recorder = None  # 実行中の invocation の Recorder (Lambda の実行環境は同時に1つの invocation を処理する)
+
+
+class Recorder:
+    def __init__(self, handler: str, operation: str):
+        self.handler = handler
+        self.operation = operation
+        self.started = time.perf_counter()
+        self.calls = {}  # (service_id, operation) -> [count, ms]
+        self.consumed_capacity = 0.0
+        self.serialization_ms = 0.0
+
+    def add_call(self, service_id: str, operation: str, elapsed_ms: float, consumed_capacity: float):
+        with _lock:  # repository を thread から呼ぶ場合がある
+            call = self.calls.setdefault((service_id, operation), [0, 0.0])
+            call[0] += 1
+            call[1] += elapsed_ms
+            self.consumed_capacity += consumed_capacity
+
+    def add_serialization(self, elapsed_ms: float):
+        with _lock:
+            self.serialization_ms += elapsed_ms
+
+    def to_emf(self, error: bool) -> dict:
+        latency_ms = (time.perf_counter() - self.started) * 1000
+        values = {'Latency': latency_ms, 'Errors': int(error),
+                  'ConsumedCapacity': self.consumed_capacity, 'SerializationTime': self.serialization_ms}
+        units = {'Latency': 'Milliseconds', 'Errors': 'Count',
+                 'ConsumedCapacity': 'Count', 'SerializationTime': 'Milliseconds'}
+        for (service_id, _), (count, elapsed_ms) in self.calls.items():
+            values[f'{service_id}Calls'] = values.get(f'{service_id}Calls', 0) + count
+            values[f'{service_id}Time'] = values.get(f'{service_id}Time', 0.0) + elapsed_ms
+            units[f'{service_id}Calls'] = 'Count'
+            units[f'{service_id}Time'] = 'Milliseconds'
+
+        return {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': NAMESPACE,
+                    'Dimensions': [['Service', 'Operation']],
+                    'Metrics': [{'Name': name, 'Unit': unit} for name, unit in units.items()],
+                }],
+            },
+            'Service': SERVICE,
+            'Operation': self.operation,
+            'Handler': self.handler,
+            **{name: round(value, 3) for name, value in values.items()},
+            'AwsCalls': {f'{service_id}.{operation}': {'count': count, 'ms': round(elapsed_ms, 3)}
+                         for (service_id, operation), (count, elapsed_ms) in self.calls.items()},
+        }
+
+
+def emit(record: dict):
+    sys.stdout.write(json.dumps(record) + '\n')
+
+
+def instrument(handler: str):
+    """ handler(self, message) を包み、invocation 毎に EMF を1行出力する (入れ子の呼び出しは外側で出力する) """
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(self, message, *args, **kwargs):
+            global _recorder
+            if _recorder is not None:
+                return func(self, message, *args, **kwargs)
+
+            _recorder = recorder = Recorder(handler, message.__class__.__name__)
+            error = True
+            try:
+                response = func(self, message, *args, **kwargs)
+                error = False
+                return response
+            finally:
+                _recorder = None
+                emit(recorder.to_emf(error))
+
+        return wrapper
+    return decorator
+
+
+def timed(func):
+    """ 関数の実行時間を SerializationTime に加える """
+    if not ENABLED:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        recorder = _recorder
+        if recorder is None:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            recorder.add_serialization((time.perf_counter() - started) * 1000)
+
+    return wrapper
+
+
+def _return_consumed_capacity(params, model, **kwargs):
+    if 'ReturnConsumedCapacity' in model.input_shape.members and 'ReturnConsumedCapacity' not in params:
+        params['ReturnConsumedCapacity'] = 'TOTAL'
+
+
+def _before_call(model, context, **kwargs):
+    context['metrics_call'] = (model.service_model.service_id.replace(' ', ''), model.name, time.perf_counter())
+
+
+def _after_call(context, parsed=None, **kwargs):
+    """ after-call (成功) と after-call-error (retry の後の失敗) で呼ばれる """
+    recorder = _recorder
+    call = context.pop('metrics_call', None)
+    if recorder is None or call is None:
+        return
+
+    service_id, operation, started = call
+    consumed = parsed.get('ConsumedCapacity') if isinstance(parsed, dict) else None
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    consumed_capacity = sum(c.get('CapacityUnits', 0) for c in consumed or [])
+
+    recorder.add_call(service_id, operation, (time.perf_counter() - started) * 1000, consumed_capacity)
+
+
+def register(client):
+    """ aws_clients が生成した client の API call を記録する """
+    if not ENABLED:
+        return client
+    events = client.meta.events  # client 毎の event emitter
+    if client.meta.service_model.service_name == 'dynamodb':
+        events.register('provide-client-params.dynamodb.*', _return_consumed_capacity,
+                        unique_id='metrics-return-consumed-capacity')
+    # before-call に response を返す handler (botocore.stub.Stubber 等) より先に呼ぶ
+    events.register_first('before-call.*.*', _before_call, unique_id='metrics-before-call')
+    events.register('after-call.*.*', _after_call, unique_id='metrics-after-call')
+    events.register('after-call-error.*.*', _after_call, unique_id='metrics-after-call-error')
+    return client
@@ -1,19 +1,31 @@
-import re
+from __future__ import annotations  # classの依存関係の許可
+import functools
 import json
-import traceback
+from typing import TYPE_CHECKING
 from consumer_layers.common import common
 from consumer_layers.common import exceptions
 from consumer_layers.common import json_encoder
-from consumer_layers.service import commands
-from consumer_layers.service import handlers
-from consumer_layers.adaptors import consumer_repository
-from consumer_layers.adaptors import consumer_event_repository
+from consumer_layers.presentation import router
+from consumer_layers.common import log
 
+if TYPE_CHECKING:  # service / adaptors の module は route と handler() の中でだけ import する
+    from consumer_layers.service import handlers
 
-CONSUMER_REPOSITORY = consumer_repository.DynamoDbRepository()
-CONSUMER_EVENT_REPOSITORY = consumer_event_repository.DynamoDbRepository()
-HANDLER = handlers.Handler(consumer_repo=CONSUMER_REPOSITORY,
-                           consumer_event_repo=CONSUMER_EVENT_REPOSITORY)
+logger = log.get_logger(__name__)
+
+
+ROUTER = router.Router()
+SAGA_REGISTRY = router.Registry()
+
+
+@functools.lru_cache(maxsize=None)
+def handler() -> handlers.Handler:
+    """ repository と Handler は最初の invocation で生成する (import 時に DynamoDB client を作らない) """
+    from consumer_layers.service import handlers
+    from consumer_layers.adaptors import consumer_repository
+    from consumer_layers.adaptors import consumer_event_repository
+    return handlers.Handler(consumer_repo=consumer_repository.DynamoDbRepository(),
+                            consumer_event_repo=consumer_event_repository.DynamoDbRepository())
 
 
 # -------------------------------------------------
@@ -29,35 +41,47 @@ def rest_request(event):
     return http_method, query_string_parameters, path, path_parameters, body_json
 
 
+@ROUTER.route('POST', '/consumers')
+def create_consumer(request: router.Request):
+    """ POST /consumers  - Create Consumer
+    http_method: POST
+    path: "/consumers"
+    path_parameters: None
+    query_string_parameters: None
+    body = Consumer Information JSON
+    """
+    from consumer_layers.service import commands
+    return commands.CreateConsumer.from_json(body_json=request.body_json)
+
+
+@ROUTER.route('GET', '/consumers/{consumer_id:[0-9]+}')
+def get_consumer(request: router.Request):
+    """ GET /consumers  - Get Consumer
+    http_method: GET
+    path: "/consumers/12345678"
+    path_parameters: {"consumer_id": 12345678}
+    query_string_parameters: None
+    body: None
+    """
+    from consumer_layers.service import commands
+    return commands.GetConsumer(consumer_id=request.path_parameters['consumer_id'])
+
+
 def rest_invocation(event: dict):
-    print(f'rest_invocation(): event: {event}')
+    logger.payload('rest_invocation(): event', event)
     try:
         http_method, query_string_parameters, path, path_parameters, body_json \
             = rest_request(event)
 
-        cmd = None
-        if re.fullmatch('/consumers', path) and http_method == 'POST':
-            """ POST /consumers  - Create Consumer
-            http_method: POST
-            path: "/consumers"
-            path_parameters: None
-            query_string_parameters: None
-            body = Consumer Information JSON
-            """
-            cmd = commands.CreateConsumer.from_json(body_json=body_json)
-        elif re.fullmatch('/consumers/[0-9]+', path) and http_method == 'GET':
-            """ GET /consumers  - Get Consumer
-            http_method: GET
-            path: "/consumers/12345678"
-            path_parameters: {"consumer_id": 12345678}
-            query_string_parameters: None
-            body: None
-            """
-            cmd = commands.GetConsumer(consumer_id=path_parameters.get('consumer_id'))
-        else:
-            raise exceptions.UnsupportedRoute(f'Unsupported Route :{http_method}')
-
-        resp = HANDLER.commands_handler(cmd)
+        # method + 先頭segment で route を引き、path parameterはpathから取り出す
+        route_handler, path_parameters = ROUTER.resolve(http_method, path)
+        cmd = route_handler(router.Request(http_method=http_method,
+                                           path=path,
+                                           path_parameters=path_parameters,
+                                           query_string_parameters=query_string_parameters,
+                                           body_json=body_json))
+
+        resp = handler().commands_handler(cmd)
         resp_dict = resp.to_dict()
 
         rest_response = {
@@ -70,12 +94,11 @@ def rest_invocation(event: dict):
                         cls=json_encoder.JSONEncoder
                     )
         }
-        print(f'return response: {rest_response}')
+        logger.payload('return response', rest_response)
         return rest_response
 
     except exceptions.InvalidName as e:
-        print(str(e))
-        traceback.print_exc()
+        logger.exception('%s', e)
         return {
             'statusCode': 400,
             'body': json.dumps({
@@ -83,19 +106,27 @@ def rest_invocation(event: dict):
             })
         }
 
-    except exceptions.UnsupportedRoute as e:
-        print(str(e))
-        traceback.print_exc()
+    except router.RouteNotFound as e:
+        logger.warning('%s', e)
+        return {
+            'statusCode': 404,
+            'body': json.dumps({
+                'message': str(e),
+            })
+        }
+
+    except router.MethodNotAllowed as e:
+        logger.warning('%s', e)
         return {
             'statusCode': 405,
+            'headers': {'Allow': ', '.join(e.allowed_methods)},
             'body': json.dumps({
                 'message': str(e),
             })
         }
 
     except Exception as e:
-        print(e)
-        traceback.print_exc()
+        logger.exception('%s', e)
         return {
             'statusCode': 500,
             'body': json.dumps({
@@ -109,6 +140,14 @@ def rest_invocation(event: dict):
 # from StepFunctions
 # -------------------------------------------------
 
+@SAGA_REGISTRY.register('CreateOrderSaga', 'VALIDATE_CONSUMER')
+def validate_consumer(event):
+    from consumer_layers.service import commands
+    money_total = common.Money.from_dict(event['order_details']['order_total'])
+    return commands.ValidateOrderForConsumer(consumer_id=event['order_details']['consumer_id'],
+                                             money_total=money_total)
+
+
 def stepfunctions_invocation(event: dict):
     """
     {
@@ -159,24 +198,19 @@ def stepfunctions_invocation(event: dict):
     }
     """
     try:
-        print(f'stepfunctions_invocation(): event: {event}')
+        logger.payload('stepfunctions_invocation(): event', event)
         state_machine = event['task_context']['value']['state_machine']
         action = event['task_context']['value']['action']
 
-        cmd = None
-        if state_machine == "CreateOrderSaga" and action == 'VALIDATE_CONSUMER':
-            money_total = common.Money.from_dict(event['order_details']['order_total'])
-            cmd = commands.ValidateOrderForConsumer(
-                                        consumer_id=event['order_details']['consumer_id'],
-                                        money_total=money_total)
-        else:
+        to_command = SAGA_REGISTRY.get((state_machine, action))
+        if to_command is None:
             raise exceptions.InvalidSagaCmd(f'stepfunctions_invocation: '
                                             f'state_machine:{state_machine}, action:{action}')
+        cmd = to_command(event)
 
-        saga_resp = HANDLER.saga_commands_handler(cmd)
+        saga_resp = handler().saga_commands_handler(cmd)
         return saga_resp
 
     except Exception as e:
-        print(str(e))
-        traceback.print_exc()
+        logger.exception('%s', e)
         raise e
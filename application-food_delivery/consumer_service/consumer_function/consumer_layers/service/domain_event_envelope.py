@@ -1,6 +1,9 @@
 from __future__ import annotations  # classの依存関係の許可
 import dataclasses
 from consumer_layers.domain import domain_events
+from consumer_layers.common import log
+
+logger = log.get_logger(__name__)
 
 
 @dataclasses.dataclass(frozen=True)
@@ -15,7 +18,7 @@ class DomainEventEnvelope:
     @classmethod
     def wrap(cls, event: domain_events.DomainEvent):
 
-        print(f'event: {event}')
+        logger.payload('event', event)
 
         return DomainEventEnvelope(
             aggregate='CONSUMER',
@@ -1,21 +1,45 @@
+from __future__ import annotations  # classの依存関係の許可
+from typing import TYPE_CHECKING
 from consumer_layers.service import service
-from consumer_layers.service import commands
-from consumer_layers.service import events
+from consumer_layers.common import log
+from consumer_layers.common import metrics
+
+if TYPE_CHECKING:  # commands / events は table を組み立てる時にだけ import する
+    from consumer_layers.service import commands
+    from consumer_layers.service import events
+
+logger = log.get_logger(__name__)
 
 
 class Handler:
     def __init__(self, consumer_repo, consumer_event_repo):
         self.consumer_service = service.ConsumerService(consumer_repo, consumer_event_repo)
-        self.COMMAND_HANDLER = {
-            commands.CreateConsumer: getattr(self.consumer_service, 'create_consumer'),
-            commands.GetConsumer: getattr(self.consumer_service, 'get_consumer_by_id'),
-        }
-        self.SAGACOMMAND_HANDLER = {
-            commands.ValidateOrderForConsumer: getattr(self.consumer_service,
-                                                       'validate_order_for_consumer'),
-        }
+        # table は route (REST / Saga / EventBridge) ごとに最初の呼び出しで組み立てる
+        self._command_handler = None
+        self._saga_command_handler = None
         self.EVENT_HANDLER = {}
 
+    @property
+    def COMMAND_HANDLER(self) -> dict:
+        if self._command_handler is None:
+            from consumer_layers.service import commands
+            self._command_handler = {
+                commands.CreateConsumer: getattr(self.consumer_service, 'create_consumer'),
+                commands.GetConsumer: getattr(self.consumer_service, 'get_consumer_by_id'),
+            }
+        return self._command_handler
+
+    @property
+    def SAGACOMMAND_HANDLER(self) -> dict:
+        if self._saga_command_handler is None:
+            from consumer_layers.service import commands
+            self._saga_command_handler = {
+                commands.ValidateOrderForConsumer: getattr(self.consumer_service,
+                                                           'validate_order_for_consumer'),
+            }
+        return self._saga_command_handler
+
+    @metrics.instrument('saga_commands')
     def saga_commands_handler(self, cmd: commands.Command):
         try:
             method = self.SAGACOMMAND_HANDLER[cmd.__class__]
@@ -23,9 +47,10 @@ class Handler:
             return response
 
         except Exception as e:
-            print(str(e))
+            logger.exception('%s', e)
             raise e
 
+    @metrics.instrument('commands')
     def commands_handler(self, cmd: commands.Command):
         try:
             method = self.COMMAND_HANDLER[cmd.__class__]
@@ -33,9 +58,10 @@ class Handler:
             return response
 
         except Exception as e:
-            print(str(e))
+            logger.exception('%s', e)
             raise e
 
+    @metrics.instrument('events')
     def events_handler(self, event: events.Event):
         try:
             method = self.EVENT_HANDLER[event.__class__]
@@ -43,5 +69,5 @@ class Handler:
             return response
 
         except Exception as e:
-            print(str(e))
+            logger.exception('%s', e)
             raise e
@@ -0,0 +1,41 @@
+import pytest
+from consumer_layers.common import exceptions
+from consumer_layers.service import commands
+from consumer_layers.presentation import controller
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.commands = []
+
+    def saga_commands_handler(self, cmd):
+        self.commands.append(cmd)
+        return {'consumer_id': cmd.consumer_id}
+
+
+@pytest.fixture
+def saga_handler(monkeypatch):
+    recording = RecordingHandler()
+    monkeypatch.setattr(controller, 'handler', lambda: recording)
+    return recording
+
+
+def task(state_machine, action, **payload) -> dict:
+    return {'task_context': {'type': 1, 'value': {'state_machine': state_machine, 'action': action}}, **payload}
+
+
+def test_validate_consumer(saga_handler):
+    resp = controller.stepfunctions_invocation(task(
+        'CreateOrderSaga', 'VALIDATE_CONSUMER',
+        order_details={'consumer_id': 4, 'order_total': {'value': 2400, 'currency': 'JPY'}}))
+
+    assert resp == {'consumer_id': 4}
+    [cmd] = saga_handler.commands
+    assert isinstance(cmd, commands.ValidateOrderForConsumer)
+    assert cmd.money_total.value == 2400
+
+
+def test_unregistered_action(saga_handler):
+    with pytest.raises(exceptions.InvalidSagaCmd):
+        controller.stepfunctions_invocation(task('CreateOrderSaga', 'UNKNOWN'))
+    assert saga_handler.commands == []
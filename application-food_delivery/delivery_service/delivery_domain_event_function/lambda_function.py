@@ -1,17 +1,27 @@
 import os
 import json
 from json_encoder import JSONEncoder
+import event_publisher
+import stream_batch
+import aws_clients
 import boto3
 from boto3.dynamodb.types import TypeDeserializer
 from botocore.exceptions import ClientError
 from aws_xray_sdk import core as x_ray
+import log
 
-x_ray.patch_all()
+logger = log.get_logger(__name__)
+
+# XRAY_PATCH=botocore: AWS SDK の呼び出しだけを patch する (patch_all() は対応する全 library を import する)
+if os.environ.get('XRAY_PATCH', 'all') == 'botocore':
+    x_ray.patch(['botocore'])
+else:
+    x_ray.patch_all()
 EVENTBUS_NAME = os.environ.get('EVENT_BUS_NAME')
 EVENT_SOURCE = os.environ.get('EVENT_SOURCE')
 EVENT_DETAIL_TYPE = os.environ.get('EVENT_DETAIL_TYPE')
 
-eventbus = boto3.client('events')
+eventbus = aws_clients.client('events')
 
 
 class UnsupportedEventTypeException(Exception):
@@ -22,7 +32,7 @@ def convert_to_python_obj(dynamo_item) -> dict:
     deserializer = boto3.dynamodb.types.TypeDeserializer()
     python_obj = {k: deserializer.deserialize(v) for k, v in dynamo_item.items()}
 
-    print(f'convert_to_python_obj() python_obj: {python_obj}')
+    logger.payload('convert_to_python_obj() python_obj', python_obj)
 
     # EventEnvelopの変換
     python_obj['aggregate'] = python_obj['PK'].split('#')[0]
@@ -35,22 +45,12 @@ def convert_to_python_obj(dynamo_item) -> dict:
     return python_obj
 
 
-def event_publish(record):
-
-    print(f'put_event.Detail: {json.dumps(record, cls=JSONEncoder)}')
+def event_publish(record, publisher):
+    detail_json = json.dumps(record, cls=JSONEncoder)
+    logger.payload('put_event.Detail', detail_json)
 
-    # publish to EventBridge
-    resp = eventbus.put_events(
-        Entries=[
-            {
-                'EventBusName': EVENTBUS_NAME,
-                'Source': EVENT_SOURCE,
-                'DetailType': EVENT_DETAIL_TYPE,
-                'Detail': json.dumps(record, cls=JSONEncoder),  # needs JSON
-            }
-        ],
-    )
-    print(f'EventBridge put_events resp: {resp}')
+    # publish to EventBridge: lambda_handler()の最後にまとめてput_eventsする
+    publisher.add(detail_json, ordering_key=f"{record['aggregate']}#{record['aggregate_id']}")
 
 
 def is_dynamo_insert(record):
@@ -67,7 +67,7 @@ def is_delivery_domain_event(record):
     return True
 
 
-def event_handler(record):
+def event_handler(record, publisher):
     if not is_dynamo_insert(record):
         return
     if not is_delivery_domain_event(record):
@@ -77,23 +77,25 @@ def event_handler(record):
 
     event_type = item_dict['event_type']
     if event_type == "DeliveryPickedup":
-        event_publish(item_dict)
+        event_publish(item_dict, publisher)
     elif event_type == "DeliveryDelivered":
-        event_publish(item_dict)
+        event_publish(item_dict, publisher)
     else:
         raise UnsupportedEventTypeException(f'event_type:{event_type}')
 
 
 def lambda_handler(event, context):
-    print(f'event: {json.dumps(event)}')
+    log.sample()  # LOG_DEBUG_SAMPLE_RATE の割合で、この invocation を DEBUG で出力する
+    logger.payload('event', event)
 
     resp = None
     if event.get('Records', None):  # from SQS or DynamoDB Streams
-        for record in event['Records']:
-            if record['eventSource'] == 'aws:dynamodb':
-                event_handler(record)
-            else:
-                raise Exception(f"NotSupportEvent:{record['eventSource']}")
+        publisher = event_publisher.EventPublisher(eventbus, EVENTBUS_NAME,
+                                                   EVENT_SOURCE, EVENT_DETAIL_TYPE)
+        # 最初に失敗したrecordのSequenceNumberを batchItemFailures で返す
+        resp = stream_batch.process_records(event['Records'],
+                                            lambda record: event_handler(record, publisher),
+                                            publisher)
     else:
         raise Exception(f"NotSupportEvent: {event}")
 
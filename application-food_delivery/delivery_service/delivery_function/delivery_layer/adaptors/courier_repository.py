@@ -2,12 +2,30 @@ import json
 import os
 import abc
 import uuid
-import boto3
-from boto3.dynamodb.types import TypeSerializer
-from boto3.dynamodb.types import TypeDeserializer
 from delivery_layer.domain import courier_model
 from delivery_layer.common import exception as ex
 from delivery_layer.adaptors import dynamo_exception as dx
+from delivery_layer.adaptors import dynamo_codec
+from delivery_layer.adaptors import aws_clients
+from delivery_layer.common import log
+
+logger = log.get_logger(__name__)
+
+
+ACTION = dynamo_codec.Map({
+    'action_type': dynamo_codec.S,
+    'delivery_id': dynamo_codec.S,
+    'address': dynamo_codec.ADDRESS,
+    'time': dynamo_codec.S,
+})
+COURIER_CODEC = dynamo_codec.ItemCodec({
+    'PK': dynamo_codec.S,
+    'SK': dynamo_codec.S,
+    'available': dynamo_codec.BOOL,
+    'courier_available': dynamo_codec.S,
+    'plan': dynamo_codec.List(ACTION),
+    'done': dynamo_codec.List(ACTION),
+})
 
 
 class AbstractRepository(abc.ABC):
@@ -65,7 +83,7 @@ class DynamoDbRepository(AbstractRepository):
     """
 
     def __init__(self):
-        self.client = boto3.client('dynamodb')
+        self.client = aws_clients.client('dynamodb')
         self.table_name = os.environ.get('DYNAMODB_COURIER_TABLE_NAME', 'Delivery-Courier')
 
     def create(self, courier: courier_model.Courier):
@@ -78,7 +96,7 @@ class DynamoDbRepository(AbstractRepository):
                 # ReturnValues='ALL_NEW',  # Todo: ReturnValues can only be ALL_OLD or NONE
             )
 
-            print(f'courier_repository: create() resp: {resp}')
+            logger.payload('courier_repository: create() resp', resp)
             return resp
 
     def save(self, courier: courier_model.Courier):
@@ -110,20 +128,19 @@ class DynamoDbRepository(AbstractRepository):
         courier_dict = courier.to_dict()
         courier_dict = without_none(courier_dict)
 
-        print(f'CourierRepo.to_dynamo_dict: courier_dict: {courier_dict}')
+        logger.payload('CourierRepo.to_dynamo_dict: courier_dict', courier_dict)
 
         courier_dict['PK'] = f"COURIER#{courier_dict['courier_id']}"
         courier_dict['SK'] = f"METADATA#{courier_dict['courier_id']}"
         del courier_dict['courier_id']
         if courier_dict.get('available', None):  # available: Trueの場合
             courier_dict['courier_available'] = uuid.uuid4().hex
-        serializer = boto3.dynamodb.types.TypeSerializer()
-        dynamo_dict = {k: serializer.serialize(v) for k, v, in courier_dict.items()}
+        dynamo_dict = COURIER_CODEC.encode(courier_dict)
         return dynamo_dict
 
     def find_by_id(self, courier_id) -> courier_model.Courier:
 
-        print(f'find_by_id(): courier_id: {courier_id}')
+        logger.debug('find_by_id(): courier_id: %s', courier_id)
 
         with dx.dynamo_exception_check():
             resp = self.client.get_item(
@@ -146,7 +163,7 @@ class DynamoDbRepository(AbstractRepository):
                 TableName=self.table_name,
                 IndexName='CourierAvailable')  # CourierAvailable DynamoDB GSI
 
-        print(f'resp: {resp}')
+        logger.payload('resp', resp)
         if not resp.get('Items', None):
             raise ex.AvailableCourierNotFoundException('CourierAvailable GSI - Space Index')
 
@@ -156,8 +173,7 @@ class DynamoDbRepository(AbstractRepository):
     @staticmethod
     def _dynamo_obj_to_courier_python_obj(dynamo_item):
         """ DynamoDB obj -> Courier Obj """
-        deserializer = boto3.dynamodb.types.TypeDeserializer()
-        python_obj = {k: deserializer.deserialize(v) for k, v in dynamo_item.items()}
+        python_obj = COURIER_CODEC.decode(dynamo_item)
         python_obj['courier_id'] = int(python_obj['PK'].split('#')[1])
         del python_obj['PK']
         del python_obj['SK']
@@ -168,3 +184,38 @@ class DynamoDbRepository(AbstractRepository):
 
         courier = courier_model.Courier.from_dict(python_obj)
         return courier
+
+
+class InMemoryRepository(DynamoDbRepository):
+    """
+    test / benchmark 用の in-memory 実装
+        DynamoDbRepository と同じ Item を dict (PK, SK) -> Item に書き込む。
+        create() の書き込み条件も同じ: attribute_not_exists(PK) (満たさない場合は dx.ConditionalCheckFailedException)
+        find_all_available_courier() は CourierAvailable GSI の代わりに courier_available を持つ Item を返す。
+    """
+    def __init__(self):
+        self.table_name = 'Delivery-Courier'
+        self.items = {}
+
+    def create(self, courier: courier_model.Courier):
+        item = self.to_dynamo_dict(courier)
+        key = (item['PK']['S'], item['SK']['S'])
+        if key in self.items:
+            raise dx.ConditionalCheckFailedException(f'ConditionalCheckFailedException: {key}')
+        self.items[key] = item
+
+    def save(self, courier: courier_model.Courier):
+        item = self.to_dynamo_dict(courier)
+        self.items[(item['PK']['S'], item['SK']['S'])] = item
+
+    def find_by_id(self, courier_id) -> courier_model.Courier:
+        item = self.items.get((f'COURIER#{courier_id}', f'METADATA#{courier_id}'))
+        if item is None:
+            raise ex.ItemNotFoundException(f'courier_id: {courier_id}')
+        return self._dynamo_obj_to_courier_python_obj(item)
+
+    def find_all_available_courier(self):
+        items = [item for item in self.items.values() if 'courier_available' in item]
+        if not items:
+            raise ex.AvailableCourierNotFoundException('CourierAvailable GSI - Space Index')
+        return [self._dynamo_obj_to_courier_python_obj(item) for item in items]
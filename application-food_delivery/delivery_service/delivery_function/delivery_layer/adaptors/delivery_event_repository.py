@@ -1,11 +1,20 @@
 import os
 import abc
 import datetime
-import boto3
-from boto3.dynamodb.types import TypeSerializer
-from boto3.dynamodb.types import TypeDeserializer
+import itertools
 from delivery_layer.service import domain_event_envelope
 from delivery_layer.adaptors import dynamo_exception as dx
+from delivery_layer.adaptors import dynamo_codec
+from delivery_layer.adaptors import id_allocator
+from delivery_layer.adaptors import aws_clients
+
+
+DELIVERY_EVENT_CODEC = dynamo_codec.ItemCodec({
+    'PK': dynamo_codec.S,
+    'SK': dynamo_codec.S,
+    'timestamp': dynamo_codec.S,
+    'event_id': dynamo_codec.N,
+})
 
 
 class AbstractRepository(abc.ABC):
@@ -22,8 +31,12 @@ class DynamoDbRepository(AbstractRepository):
     """
 
     def __init__(self):
-        self.client = boto3.client('dynamodb')
+        self.client = aws_clients.client('dynamodb')
         self.table_name = os.environ.get('DYNAMODB_EVENT_TABLE_NAME', 'DeliveryEvent')
+        self.event_id_allocator = id_allocator.get_allocator(self.client,
+                                                             self.table_name,
+                                                             'IDCOUNTER#EVENT',
+                                                             block_size=id_allocator.EVENT_ID_BLOCK_SIZE)
 
     def save(self, event: domain_event_envelope.DomainEventEnvelope):
 
@@ -61,8 +74,7 @@ class DynamoDbRepository(AbstractRepository):
         event_dict['event_id'] = event_id
 
         # DynamoDBシリアライズ
-        serializer = boto3.dynamodb.types.TypeSerializer()
-        item = {k: serializer.serialize(v) for k, v in event_dict.items()}
+        item = DELIVERY_EVENT_CODEC.encode(event_dict)
 
         # 不要なものを削除
         # del event_dict['delivery_id']
@@ -70,23 +82,24 @@ class DynamoDbRepository(AbstractRepository):
         return item
 
     def _get_sequential_event_id(self) -> int:
-        with dx.dynamo_exception_check():
-            resp = self.client.update_item(
-                TableName=self.table_name,
-                Key={
-                    'PK': {'S': 'IDCOUNTER#EVENT'},
-                    'SK': {'S': 'IDCOUNTER#EVENT'},
-                },
-                UpdateExpression='SET #id_count = if_not_exists(#id_count, :default) + :incr',
-                # itemがあれば+1更新、itemがなければif_not_exists()で:default値を初期値とする。
-                ExpressionAttributeNames={
-                  '#id_count': 'id_count',
-                },
-                ExpressionAttributeValues={
-                    ':incr': {'N': '1'},
-                    ':default': {'N': '0'}
-                },
-                ReturnValues='UPDATED_NEW',
-            )
-        new_id = int(resp['Attributes']['id_count']['N'])
-        return new_id
+        return self.event_id_allocator.next_id()
+
+
+class InMemoryRepository(DynamoDbRepository):
+    """
+    test / benchmark 用の in-memory 実装
+        DynamoDbRepository と同じ Item を dict (PK, SK) -> Item に書き込む。
+        event_id は IDCOUNTER の代わりに container 内の連番で採番する。
+    """
+    def __init__(self):
+        self.table_name = 'DeliveryEvent'
+        self.items = {}
+        self._event_ids = itertools.count(1)
+
+    def save(self, event: domain_event_envelope.DomainEventEnvelope):
+        item = self.to_dynamo_dict(event)
+        self.items[(item['PK']['S'], item['SK']['S'])] = item
+        return item['event_id']
+
+    def _get_sequential_event_id(self) -> int:
+        return next(self._event_ids)
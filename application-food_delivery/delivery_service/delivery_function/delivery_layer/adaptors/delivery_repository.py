@@ -1,13 +1,29 @@
-import json
 import os
 import abc
-import boto3
-from boto3.dynamodb.types import TypeSerializer
-from boto3.dynamodb.types import TypeDeserializer
 from delivery_layer.domain import delivery_model
 from delivery_layer.adaptors import dynamo_exception as dx
+from delivery_layer.adaptors import dynamo_codec
 from delivery_layer.common import exception as ex
-from delivery_layer.common import json_encoder
+from delivery_layer.adaptors import aws_clients
+from delivery_layer.common import log
+
+logger = log.get_logger(__name__)
+
+DELIVERY_CODEC = dynamo_codec.ItemCodec({
+    'PK': dynamo_codec.S,
+    'SK': dynamo_codec.S,
+    'state': dynamo_codec.S,
+    'pickup_address': dynamo_codec.ADDRESS,
+    'delivery_address': dynamo_codec.ADDRESS,
+    'restaurant_id': dynamo_codec.N,
+    'ready_by': dynamo_codec.S,
+    'pickup_time': dynamo_codec.S,
+    'delivery_time': dynamo_codec.S,
+    'pickedup_time': dynamo_codec.S,
+    'delivered_time': dynamo_codec.S,
+    'assigned_courier': dynamo_codec.N,
+})
+
 
 class AbstractRepository(abc.ABC):
     @abc.abstractmethod
@@ -47,15 +63,15 @@ class DynamoDbRepository(AbstractRepository):
     """
 
     def __init__(self):
-        self.client = boto3.client('dynamodb')
+        self.client = aws_clients.client('dynamodb')
         self.table_name = os.environ.get('DYNAMODB_TABLE_NAME', 'DeliveryService')
 
     def save(self, delivery: delivery_model.Delivery):
-        print(f'delivery_repo.save() delivery: {delivery}')
+        logger.payload('delivery_repo.save() delivery', delivery)
 
         delivery_dynamo_dict = self.to_dynamo_dict(delivery)
 
-        print(f'delivery_dynamo_dict: {json.dumps(delivery_dynamo_dict, cls=json_encoder.JSONEncoder)}')
+        logger.payload('delivery_dynamo_dict', delivery_dynamo_dict)
 
         with dx.dynamo_exception_check():
             resp = self.client.put_item(TableName=self.table_name,
@@ -75,8 +91,7 @@ class DynamoDbRepository(AbstractRepository):
         delivery_dict = without_none(delivery_dict)
         delivery_dict['PK'] = f"DELIVERY#{delivery.delivery_id}"
         delivery_dict['SK'] = f"METADATA#{delivery.delivery_id}"
-        serializer = boto3.dynamodb.types.TypeSerializer()
-        item = {k: serializer.serialize(v) for k, v in delivery_dict.items()}
+        item = DELIVERY_CODEC.encode(delivery_dict)
         del delivery_dict['delivery_id']
         return item
 
@@ -98,14 +113,33 @@ class DynamoDbRepository(AbstractRepository):
     @staticmethod
     def _dynamo_obj_to_delivery_python_obj(dynamo_item):
         """ DynamoDB obj -> delivery Obj """
-        deserializer = boto3.dynamodb.types.TypeDeserializer()
-        python_obj = {k: deserializer.deserialize(v) for k, v in dynamo_item.items()}
+        python_obj = DELIVERY_CODEC.decode(dynamo_item)
         python_obj['delivery_id'] = python_obj['PK'].split('#')[1]
         del python_obj['PK']
         del python_obj['SK']
 
-        print(f'_dynamo_obj_to_delivery_python_obj() python_obj: {python_obj}')
+        logger.payload('_dynamo_obj_to_delivery_python_obj() python_obj', python_obj)
 
         delivery = delivery_model.Delivery.from_dict(python_obj)
 
         return delivery
+
+
+class InMemoryRepository(DynamoDbRepository):
+    """
+    test / benchmark 用の in-memory 実装
+        DynamoDbRepository と同じ Item を dict (PK, SK) -> Item に書き込む。(save は条件なしの上書き)
+    """
+    def __init__(self):
+        self.table_name = 'DeliveryService'
+        self.items = {}
+
+    def save(self, delivery: delivery_model.Delivery):
+        item = self.to_dynamo_dict(delivery)
+        self.items[(item['PK']['S'], item['SK']['S'])] = item
+
+    def find_by_id(self, delivery_id) -> delivery_model.Delivery:
+        item = self.items.get((f'DELIVERY#{delivery_id}', f'METADATA#{delivery_id}'))
+        if item is None:
+            raise ex.ItemNotFoundException(f'delivery_id: {delivery_id}')
+        return self._dynamo_obj_to_delivery_python_obj(item)
@@ -1,11 +1,21 @@
 import os
 import abc
-import boto3
-from boto3.dynamodb.types import TypeSerializer
-from boto3.dynamodb.types import TypeDeserializer
 from delivery_layer.domain import restaurant_model
 from delivery_layer.adaptors import dynamo_exception as dx
+from delivery_layer.adaptors import dynamo_codec
 from delivery_layer.common import exception as ex
+from delivery_layer.adaptors import aws_clients
+
+
+RESTAURANT_REPLICA_CODEC = dynamo_codec.ItemCodec({
+    'PK': dynamo_codec.S,
+    'SK': dynamo_codec.S,
+    'timestamp': dynamo_codec.S,
+    'event_id': dynamo_codec.N,
+    'restaurant_id': dynamo_codec.N,
+    'restaurant_name': dynamo_codec.S,
+    'restaurant_address': dynamo_codec.ADDRESS,
+})
 
 
 class AbstractRepository(abc.ABC):
@@ -34,7 +44,7 @@ class DynamoDbRepository(AbstractRepository):
         }
     """
     def __init__(self):
-        self.client = boto3.client('dynamodb')
+        self.client = aws_clients.client('dynamodb')
         self.table_name = os.environ.get('DYNAMODB_RESTAURANT_REPLICA_TABLE_NAME',
                                          'Delivery-RestaurantReplica')
 
@@ -66,8 +76,7 @@ class DynamoDbRepository(AbstractRepository):
         restaurant_dict['event_id'] = event_id
         restaurant_dict['timestamp'] = timestamp
 
-        serializer = boto3.dynamodb.types.TypeSerializer()
-        item = {k: serializer.serialize(v) for k, v in restaurant_dict.items()}
+        item = RESTAURANT_REPLICA_CODEC.encode(restaurant_dict)
         del restaurant_dict['restaurant_id']
         return item
 
@@ -89,10 +98,35 @@ class DynamoDbRepository(AbstractRepository):
     @staticmethod
     def _dynamo_obj_to_ticket_python_obj(dynamo_item):
         """ DynamoDB obj -> Restaurant Obj """
-        deserializer = boto3.dynamodb.types.TypeDeserializer()
-        python_obj = {k: deserializer.deserialize(v) for k, v in dynamo_item.items()}
+        python_obj = RESTAURANT_REPLICA_CODEC.decode(dynamo_item)
         python_obj['restaurant_id'] = int(python_obj['PK'].split('#')[1])
         del python_obj['PK']
         del python_obj['SK']
         restaurant = restaurant_model.Restaurant.from_dict(python_obj)
         return restaurant
+
+
+class InMemoryRepository(DynamoDbRepository):
+    """
+    test / benchmark 用の in-memory 実装
+        DynamoDbRepository と同じ Item を dict (PK, SK) -> Item に書き込む。
+        書き込み条件も同じ: attribute_not_exists(#event_id) OR #event_id < :event_id
+        (満たさない場合は dx.ConditionalCheckFailedException)
+    """
+    def __init__(self):
+        self.table_name = 'Delivery-RestaurantReplica'
+        self.items = {}
+
+    def save(self, restaurant: restaurant_model.Restaurant, event_id, timestamp):
+        item = self.to_dynamo_dict(restaurant, event_id, timestamp)
+        key = (item['PK']['S'], item['SK']['S'])
+        current = self.items.get(key)
+        if current is not None and 'event_id' in current and int(current['event_id']['N']) >= int(event_id):
+            raise dx.ConditionalCheckFailedException(f'ConditionalCheckFailedException: {key}')
+        self.items[key] = item
+
+    def find_by_id(self, restaurant_id) -> restaurant_model.Restaurant:
+        item = self.items.get((f'RESTAURANT#{restaurant_id}', f'METADATA#{restaurant_id}'))
+        if item is None:
+            raise ex.ItemNotFoundException(f'restaurant_id: {restaurant_id}')
+        return self._dynamo_obj_to_ticket_python_obj(item)
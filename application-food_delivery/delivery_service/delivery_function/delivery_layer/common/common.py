@@ -26,7 +26,7 @@ class Money:
         return Money(self.value * other, self.currency)
 
     def to_dict(self):
-        return dataclasses.asdict(self)
+        return {'value': self.value, 'currency': self.currency}
 
     @classmethod
     def from_dict(cls, d):
@@ -42,7 +42,13 @@ class Address:
     zip: str
 
     def to_dict(self):
-        return dataclasses.asdict(self)
+        return {
+            'street1': self.street1,
+            'street2': self.street2,
+            'city': self.city,
+            'state': self.state,
+            'zip': self.zip,
+        }
 
     @classmethod
     def from_dict(cls, d):
@@ -55,7 +61,7 @@ class PersonName:
     last_name: str
 
     def to_dict(self):
-        return dataclasses.asdict(self)
+        return {'first_name': self.first_name, 'last_name': self.last_name}
 
     @classmethod
     def from_dict(cls, d):
@@ -1,10 +1,9 @@
 from __future__ import annotations  # classの依存関係の許可
-import dataclasses
 import decimal
 import datetime
 import enum
-import json
 from delivery_layer.common import common
+from delivery_layer.common import serializer
 
 
 class DeliveryActionType(enum.Enum):
@@ -259,26 +258,19 @@ class Courier:
         return cls(**d)
 
     def to_dict(self):
-        def encoder_(o):
-            if isinstance(o, Courier):
-                return o.__dict__  # Todo: ここがポイント
-            if isinstance(o, Plan):
-                return o.actions
-            if isinstance(o, Done):
-                return o.actions
-            if isinstance(o, Action):
-                return o.__dict__  # Todo: ここがポイント
-            if isinstance(o, DeliveryActionType):
-                return o.value
-            if isinstance(o, common.Address):
-                return dataclasses.asdict(o)
-            if isinstance(o, datetime.datetime):
-                return o.isoformat() + 'Z'
-            if isinstance(o, decimal.Decimal):
-                if int(o) == o:
-                    return int(o)
-                else:
-                    return float(o)
-            raise TypeError(f'{repr(o)} is not serializable')
-
-        return json.loads(json.dumps(self, default=encoder_), parse_float=decimal.Decimal)
+        # JSON文字列を経由せずにattributeを1回だけ辿る (keyの順序は__init__と同じ)
+        def action_(action: Action):
+            return {
+                'action_type': action.action_type,
+                'delivery_id': action.delivery_id,
+                'address': action.address.to_dict(),
+                'time': action.time,
+            }
+
+        d = {
+            'courier_id': self.courier_id,
+            'available': self.available,
+            'plan': [action_(action) for action in self.plan.actions],
+            'done': [action_(action) for action in self.done.actions],
+        }
+        return serializer.to_plain(d, parse_float=decimal.Decimal)
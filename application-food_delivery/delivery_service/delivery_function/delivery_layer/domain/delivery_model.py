@@ -1,10 +1,9 @@
 from __future__ import annotations  # classの依存関係の許可
-import dataclasses
 import enum
 import decimal
 import datetime
-import json
 from delivery_layer.common import common
+from delivery_layer.common import serializer
 from delivery_layer.domain import domain_event
 
 
@@ -127,24 +126,21 @@ class Delivery:
                    delivery_address=delivery_address)
 
     def to_dict(self):
-        def encoder_(o):
-            if isinstance(o, Delivery):
-                return o.__dict__  # Todo: ここがポイント
-            if isinstance(o, common.Address):
-                return dataclasses.asdict(o)
-            if isinstance(o, DeliveryState):  # Enum
-                return o.value
-            if isinstance(o, datetime.datetime):
-                return o.isoformat() + 'Z'
-            if isinstance(o, decimal.Decimal):
-                if int(o) == o:
-                    return int(o)
-                else:
-                    return float(o)
-            raise TypeError(f'{repr(o)} is not serializable')
-
-        dict_ = json.loads(json.dumps(self, default=encoder_), parse_float=decimal.Decimal)
-        return dict_
+        # JSON文字列を経由せずにattributeを1回だけ辿る (keyの順序は__init__と同じ)
+        d = {
+            'delivery_id': self.delivery_id,
+            'state': self.state,
+            'pickup_address': self.pickup_address.to_dict(),
+            'delivery_address': self.delivery_address.to_dict(),
+            'restaurant_id': self.restaurant_id,
+            'ready_by': self.ready_by,
+            'pickup_time': self.pickup_time,
+            'delivery_time': self.delivery_time,
+            'pickedup_time': self.pickedup_time,
+            'delivered_time': self.delivered_time,
+            'assigned_courier': self.assigned_courier,
+        }
+        return serializer.to_plain(d, parse_float=decimal.Decimal)
 
     def schedule(self, ready_by: datetime.datetime, assigned_courier: int) -> Delivery:
         self.ready_by = ready_by
@@ -1,8 +1,6 @@
 from __future__ import annotations  # classの依存関係の許可
-import dataclasses
-import decimal
-import json
 from delivery_layer.common import common
+from delivery_layer.common import serializer
 
 """
 Restaurant - Dynamo Item
@@ -36,17 +34,8 @@ class Restaurant:
         return cls(**d)
 
     def to_dict(self):
-        def encoder_(o):
-            if isinstance(o, Restaurant):
-                return o.__dict__  # Todo: ここがポイント
-            if isinstance(o, common.Address):
-                return dataclasses.asdict(o)
-            if isinstance(o, decimal.Decimal):
-                if int(o) == o:
-                    return int(o)
-                else:
-                    return float(o)
-            raise TypeError(f'{repr(o)} is not serializable')
-
-        d = json.loads(json.dumps(self, default=encoder_))
-        return d
+        return serializer.to_plain({
+            'restaurant_id': self.restaurant_id,
+            'restaurant_name': self.restaurant_name,
+            'restaurant_address': self.restaurant_address.to_dict(),
+        })
@@ -1,28 +1,35 @@
+from __future__ import annotations  # classの依存関係の許可
 import decimal
-import re
+import functools
 import json
-import traceback
+from typing import TYPE_CHECKING
 from delivery_layer.common import exception
 from delivery_layer.common import json_encoder
-from delivery_layer.service import commands
-from delivery_layer.service import events
-from delivery_layer.service import handlers
-from delivery_layer.adaptors import restaurant_replica_repository
-from delivery_layer.adaptors import delivery_repository
-from delivery_layer.adaptors import delivery_event_repository
-from delivery_layer.adaptors import courier_repository
-from delivery_layer.domain import delivery_model
-
-
-DELIVERY_REPOSITORY = delivery_repository.DynamoDbRepository()
-DELIVERY_EVENT_REPOSITORY = delivery_event_repository.DynamoDbRepository()
-COURIER_REPOSITORY = courier_repository.DynamoDbRepository()
-RESTAURANT_REPLICA_REPOSITORY = restaurant_replica_repository.DynamoDbRepository()
-
-HANDLER = handlers.Handler(delivery_repo=DELIVERY_REPOSITORY,
-                           delivery_event_repo=DELIVERY_EVENT_REPOSITORY,
-                           courier_repo=COURIER_REPOSITORY,
-                           restaurant_repo=RESTAURANT_REPLICA_REPOSITORY)
+from delivery_layer.presentation import router
+from delivery_layer.common import log
+
+if TYPE_CHECKING:  # service / adaptors の module は route と handler() の中でだけ import する
+    from delivery_layer.service import handlers
+
+logger = log.get_logger(__name__)
+
+
+ROUTER = router.Router()
+
+
+@functools.lru_cache(maxsize=None)
+def handler() -> handlers.Handler:
+    """ repository と Handler は最初の invocation で生成する (import 時に DynamoDB client を作らない) """
+    from delivery_layer.service import handlers
+    from delivery_layer.adaptors import restaurant_replica_repository
+    from delivery_layer.adaptors import delivery_repository
+    from delivery_layer.adaptors import delivery_event_repository
+    from delivery_layer.adaptors import courier_repository
+    return handlers.Handler(delivery_repo=delivery_repository.DynamoDbRepository(),
+                            delivery_event_repo=delivery_event_repository.DynamoDbRepository(),
+                            courier_repo=courier_repository.DynamoDbRepository(),
+                            restaurant_repo=restaurant_replica_repository.DynamoDbRepository())
+
 
 # -------------------------------------------------
 # Eventbus Invocation
@@ -37,16 +44,18 @@ def extract_parameter_from_event(event):
 
 
 def eventbus_invocation(event: dict):
+    # 更新 (writer path) の module は EventBridge の invocation でだけ import する
+    from delivery_layer.service import events
     try:
         event_source, event_detail, event_type = extract_parameter_from_event(event)
         if event_source == 'com.restaurant.created' and event_type == 'RestaurantCreated':
             event_ = events.RestaurantCreated.from_event(event_detail)
-            HANDLER.events_handler(event_)
+            handler().events_handler(event_)
 
         elif event_source == 'com.order.created' and event_type == 'OrderCreated':
-            print(f'eventbus_invocation() OrderCreated')
+            logger.debug('eventbus_invocation() OrderCreated')
             event_ = events.OrderCreated.from_event(event_detail)
-            HANDLER.events_handler(event_)
+            handler().events_handler(event_)
 
         elif event_source == 'com.order.created' and event_type == 'OrderAuthorized':
             pass
@@ -54,16 +63,16 @@ def eventbus_invocation(event: dict):
         elif event_source == 'com.ticket.accepted' and event_type == 'TicketCreated':
             pass
             # event_ = events.TicketCreated.from_event(event_detail)
-            # HANDLER.events_handler(event_)
+            # handler().events_handler(event_)
             # 現在TicketCreatedはDeliveryで使用していない。
 
         elif event_source == 'com.ticket.accepted' and event_type == 'TicketAccepted':
             event_ = events.TicketAccepted.from_event(event_detail)
-            HANDLER.events_handler(event_)
+            handler().events_handler(event_)
 
         elif event_source == 'com.ticket.accepted' and event_type == 'TicketCancelled':
             event_ = events.TicketCancelled.from_event(event_detail)
-            HANDLER.events_handler(event_)
+            handler().events_handler(event_)
 
         else:
             raise Exception(f"NotSupportEvent: {event_source} : {event_type}")
@@ -84,43 +93,57 @@ def rest_request(event):
     query_string_parameters = event.get('queryStringParameters')
     body_json = event.get('body', '{}')  # JSON
 
-    print(f'http_method: {http_method}')
-    print(f'query_string_parameters: {query_string_parameters}')
-    print(f'path: {path}')
-    print(f'path_parameters: {path_parameters}')
-    print(f'body_json: {body_json}')
+    logger.debug('http_method: %s', http_method)
+    logger.debug('query_string_parameters: %s', query_string_parameters)
+    logger.debug('path: %s', path)
+    logger.debug('path_parameters: %s', path_parameters)
+    logger.payload('body_json', body_json)
 
     return http_method, query_string_parameters, path, path_parameters, body_json
 
 
+@ROUTER.route('POST', '/couriers/{courier_id:[0-9a-f]+}/availability')
+def courier_availability(request: router.Request):
+    from delivery_layer.service import commands
+    d = json.loads(request.body_json, parse_float=decimal.Decimal)
+    logger.payload('rest_invocation: courier availability', d)
+    return commands.CourierAvailability(courier_id=request.path_parameters['courier_id'],
+                                        available=d['available'])
+
+
+# Todo ここから 2023.01.16
+@ROUTER.route('POST', '/couriers/{courier_id:[0-9a-f]+}/pickedup')
+def courier_pickedup(request: router.Request):
+    from delivery_layer.service import commands
+    d = json.loads(request.body_json, parse_float=decimal.Decimal)
+    logger.payload('rest_invocation: courier pickedup', d)
+    return commands.CourierPickedUp(courier_id=request.path_parameters['courier_id'],
+                                    delivery_id=d['delivery_id'])
+
+
+@ROUTER.route('POST', '/couriers/{courier_id:[0-9a-f]+}/delivered')
+def courier_delivered(request: router.Request):
+    from delivery_layer.service import commands
+    d = json.loads(request.body_json, parse_float=decimal.Decimal)
+    logger.payload('rest_invocation: courier delivered', d)
+    return commands.CourierDelivered(courier_id=request.path_parameters['courier_id'],
+                                     delivery_id=d['delivery_id'])
+
+
 def rest_invocation(event: dict):
     try:
         http_method, query_string_parameters, path, path_parameters, body_json \
             = rest_request(event)
 
-        cmd = None
-        if re.fullmatch('/couriers/[0-9a-f]+/availability', path) and http_method == 'POST':
-            d = json.loads(body_json, parse_float=decimal.Decimal)
-            print(f'rest_invocation: courier availability: {d}')
-            cmd = commands.CourierAvailability(courier_id=path_parameters.get('courier_id'),
-                                               available=d['available'])
-        # Todo ここから 2023.01.16
-        elif re.fullmatch('/couriers/[0-9a-f]+/pickedup', path) and http_method == 'POST':
-            d = json.loads(body_json, parse_float=decimal.Decimal)
-            print(f'rest_invocation: courier pickedup: {d}')
-
-            cmd = commands.CourierPickedUp(courier_id=path_parameters.get('courier_id'),
-                                           delivery_id=d['delivery_id'])
-        elif re.fullmatch('/couriers/[0-9a-f]+/delivered', path) and http_method == 'POST':
-            d = json.loads(body_json, parse_float=decimal.Decimal)
-            print(f'rest_invocation: courier delivered: {d}')
-
-            cmd = commands.CourierDelivered(courier_id=path_parameters.get('courier_id'),
-                                            delivery_id=d['delivery_id'])
-        else:
-            raise exception.UnsupportedRoute(f'Unsupported Route :{http_method}')
+        # method + 先頭segment で route を引き、path parameterはpathから取り出す
+        route_handler, path_parameters = ROUTER.resolve(http_method, path)
+        cmd = route_handler(router.Request(http_method=http_method,
+                                           path=path,
+                                           path_parameters=path_parameters,
+                                           query_string_parameters=query_string_parameters,
+                                           body_json=body_json))
 
-        resp = HANDLER.commands_handler(cmd)
+        resp = handler().commands_handler(cmd)
 
         resp_dict = resp.to_dict() if hasattr(resp, 'to_dict') else resp
 
@@ -134,12 +157,11 @@ def rest_invocation(event: dict):
                         cls=json_encoder.JSONEncoder
                     )
         }
-        print(f'return response: {rest_response}')
+        logger.payload('return response', rest_response)
         return rest_response
 
     except exception.InvalidName as e:
-        print(str(e))
-        traceback.print_exc()
+        logger.exception('%s', e)
         return {
             'statusCode': 400,
             'body': json.dumps({
@@ -147,19 +169,27 @@ def rest_invocation(event: dict):
             })
         }
 
-    except exception.UnsupportedRoute as e:
-        print(str(e))
-        traceback.print_exc()
+    except router.RouteNotFound as e:
+        logger.warning('%s', e)
+        return {
+            'statusCode': 404,
+            'body': json.dumps({
+                'message': str(e),
+            })
+        }
+
+    except router.MethodNotAllowed as e:
+        logger.warning('%s', e)
         return {
             'statusCode': 405,
+            'headers': {'Allow': ', '.join(e.allowed_methods)},
             'body': json.dumps({
                 'message': str(e),
             })
         }
 
     except Exception as e:
-        print(str(e))
-        traceback.print_exc()
+        logger.exception('%s', e)
         return {
             'statusCode': 500,
             'body': json.dumps({
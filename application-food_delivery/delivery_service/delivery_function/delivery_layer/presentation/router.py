@@ -0,0 +1,157 @@
+"""
+REST API Router / Saga Registry
+    import時に route table を組み立て、request毎には dict lookup と少数の compiled regex だけで
+    handlerを決める。
+
+        ROUTER = router.Router()
+
+        @ROUTER.route('GET', '/orders/{order_id:[0-9a-f]+}')
+        def get_order(request: router.Request):
+            return commands.GetOrder(order_id=request.path_parameters['order_id'])
+
+        handler, path_parameters = ROUTER.resolve('GET', '/orders/dc83abae')
+
+    path template
+        /orders                     固定path
+        /orders/{order_id}          1 segment ('/'以外) を path parameter として取り出す
+        /orders/{order_id:[0-9a-f]+}/cancel   ':'の後ろはsegmentの正規表現
+
+    resolve()
+        pathに一致するrouteが無い               -> RouteNotFound     (404)
+        pathは一致するがmethodが登録されていない -> MethodNotAllowed  (405)
+"""
+import dataclasses
+import re
+from typing import Callable, Optional
+
+_PARAMETER = re.compile(r'\{(?P<name>\w+)(?::(?P<pattern>[^{}]+))?\}')
+
+
+class RouteNotFound(Exception):
+    pass
+
+
+class MethodNotAllowed(Exception):
+    def __init__(self, message, allowed_methods: list[str]):
+        super().__init__(message)
+        self.allowed_methods = allowed_methods
+
+
+@dataclasses.dataclass(frozen=True)
+class Request:
+    http_method: str
+    path: str
+    path_parameters: dict
+    query_string_parameters: Optional[dict]
+    body_json: Optional[str]
+
+
+class _Route:
+    """ 1つのpath templateと、methodごとのhandler """
+
+    def __init__(self, template: str):
+        self.template = template
+        self.segments = template.split('/')
+        self.literals = []    # (index, segment)          先頭segment以外の固定segment
+        self.parameters = []  # (index, name, regex|None) path parameter
+        for i, segment in enumerate(self.segments[2:], start=2):
+            m = _PARAMETER.fullmatch(segment)
+            if m is None:
+                if '{' in segment:
+                    raise ValueError(f'path parameter must be a whole segment: {template}')
+                self.literals.append((i, segment))
+            else:
+                pattern = m.group('pattern')
+                self.parameters.append((i, m.group('name'),
+                                        re.compile(pattern) if pattern else None))
+        self.handlers = {}
+
+    def match(self, segments: list[str]) -> Optional[dict]:
+        for i, literal in self.literals:
+            if segments[i] != literal:
+                return None
+        path_parameters = {}
+        for i, name, regex in self.parameters:
+            value = segments[i]
+            if not value or (regex is not None and regex.fullmatch(value) is None):
+                return None
+            path_parameters[name] = value
+        return path_parameters
+
+
+class Router:
+    def __init__(self):
+        self._static: dict[str, _Route] = {}                # path parameterの無いpath -> route
+        self._dynamic: dict[tuple, list[_Route]] = {}       # (先頭segment, segment数) -> routes
+        self._templates: dict[str, _Route] = {}
+
+    def route(self, http_method: str, template: str) -> Callable:
+        """ handlerを登録するdecorator。先頭segmentはpath parameterにできない """
+        route = self._templates.get(template)
+        if route is None:
+            route = _Route(template)
+            if len(route.segments) < 2 or '{' in route.segments[1] or route.segments[0]:
+                raise ValueError(f'template must start with a literal segment: {template}')
+            self._templates[template] = route
+            if route.parameters:
+                key = (route.segments[1], len(route.segments))
+                self._dynamic.setdefault(key, []).append(route)
+            else:
+                self._static[template] = route
+
+        def decorator(handler):
+            if http_method in route.handlers:
+                raise ValueError(f'duplicate route: {http_method} {template}')
+            route.handlers[http_method] = handler
+            return handler
+
+        return decorator
+
+    def resolve(self, http_method: str, path: str) -> tuple[Callable, dict]:
+        """ (handler, path_parameters) を返す """
+        allowed_methods = []
+        route = self._static.get(path)
+        if route is not None:
+            handler = route.handlers.get(http_method)
+            if handler is not None:
+                return handler, {}
+            allowed_methods.extend(route.handlers)
+
+        if path:
+            segments = path.split('/')
+            for route in self._dynamic.get((segments[1] if len(segments) > 1 else '',
+                                            len(segments)), ()):
+                path_parameters = route.match(segments)
+                if path_parameters is None:
+                    continue
+                handler = route.handlers.get(http_method)
+                if handler is not None:
+                    return handler, path_parameters
+                allowed_methods.extend(route.handlers)
+
+        if allowed_methods:
+            raise MethodNotAllowed(f'Method Not Allowed: {http_method} {path}',
+                                   sorted(set(allowed_methods)))
+        raise RouteNotFound(f'Not Found: {http_method} {path}')
+
+
+class Registry(dict):
+    """
+    StepFunctions task_context 用の dict: (state_machine, action) -> handler
+        SAGA_REGISTRY = router.Registry()
+
+        @SAGA_REGISTRY.register('CreateOrderSaga', 'APPROVE_ORDER')
+        def approve_order(event):
+            return commands.ApproveOrder(order_id=event['order_id'])
+
+        to_command = SAGA_REGISTRY.get((state_machine, action))  # 未登録はNone
+    """
+
+    def register(self, *key) -> Callable:
+        def decorator(handler):
+            if key in self:
+                raise ValueError(f'duplicate key: {key}')
+            self[key] = handler
+            return handler
+
+        return decorator
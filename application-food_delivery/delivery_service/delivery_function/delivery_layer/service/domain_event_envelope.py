@@ -2,6 +2,9 @@ from __future__ import annotations  # classの依存関係の許可
 import dataclasses
 import datetime
 from delivery_layer.domain import domain_event
+from delivery_layer.common import log
+
+logger = log.get_logger(__name__)
 
 
 @dataclasses.dataclass(frozen=True)
@@ -16,7 +19,7 @@ class DomainEventEnvelope:
     @classmethod
     def wrap(cls, event: domain_event.DomainEvent):
 
-        print(f'event: {event}')
+        logger.payload('event', event)
 
         return DomainEventEnvelope(
             aggregate='DELIVERY',
@@ -1,9 +1,17 @@
+from __future__ import annotations  # classの依存関係の許可
+from typing import TYPE_CHECKING
 # from delivery_layer.adaptors import delivery_repository
 # from delivery_layer.adaptors import courier_repository
 # from delivery_layer.adaptors import restaurant_replica_repository
 from delivery_layer.service import service
-from delivery_layer.service import commands
-from delivery_layer.service import events
+from delivery_layer.common import log
+from delivery_layer.common import metrics
+
+if TYPE_CHECKING:  # commands / events は table を組み立てる時にだけ import する
+    from delivery_layer.service import commands
+    from delivery_layer.service import events
+
+logger = log.get_logger(__name__)
 
 
 class Handler:
@@ -14,21 +22,37 @@ class Handler:
                                                         delivery_event_repo=delivery_event_repo,
                                                         restaurant_repo=restaurant_repo,
                                                         courier_repo=courier_repo)
-        self.EVENT_HANDLER = {
-            events.RestaurantCreated: getattr(self.delivery_service, 'create_replica_restaurant'),
-            events.OrderCreated: getattr(self.delivery_service, 'create_delivery'),
-            # events.TicketCreated: getattr(self.delivery_service, 'create_delivery'),
-            events.TicketAccepted: getattr(self.delivery_service, 'schedule_delivery'),
-            events.TicketCancelled: getattr(self.delivery_service, 'cancel_delivery'),
-        }
-
-        self.COMMAND_HANDLER = {
-            commands.CourierAvailability: getattr(self.delivery_service,
-                                                  'update_courier_availability'),
-            commands.CourierPickedUp: getattr(self.delivery_service, 'update_pickedup'),
-            commands.CourierDelivered: getattr(self.delivery_service, 'update_delivered'),
-        }
+        # table は route (REST / Saga / EventBridge) ごとに最初の呼び出しで組み立てる
+        self._event_handler = None
+        self._command_handler = None
+
+    @property
+    def EVENT_HANDLER(self) -> dict:
+        # 更新 (writer path) の table は最初の event で組み立てる
+        if self._event_handler is None:
+            from delivery_layer.service import events
+            self._event_handler = {
+                events.RestaurantCreated: getattr(self.delivery_service, 'create_replica_restaurant'),
+                events.OrderCreated: getattr(self.delivery_service, 'create_delivery'),
+                # events.TicketCreated: getattr(self.delivery_service, 'create_delivery'),
+                events.TicketAccepted: getattr(self.delivery_service, 'schedule_delivery'),
+                events.TicketCancelled: getattr(self.delivery_service, 'cancel_delivery'),
+            }
+        return self._event_handler
+
+    @property
+    def COMMAND_HANDLER(self) -> dict:
+        if self._command_handler is None:
+            from delivery_layer.service import commands
+            self._command_handler = {
+                commands.CourierAvailability: getattr(self.delivery_service,
+                                                      'update_courier_availability'),
+                commands.CourierPickedUp: getattr(self.delivery_service, 'update_pickedup'),
+                commands.CourierDelivered: getattr(self.delivery_service, 'update_delivered'),
+            }
+        return self._command_handler
 
+    @metrics.instrument('events')
     def events_handler(self, event: events.Event):
         try:
             method = self.EVENT_HANDLER[event.__class__]
@@ -36,9 +60,10 @@ class Handler:
             return response
 
         except Exception as e:
-            print(str(e))
+            logger.exception('%s', e)
             raise e
 
+    @metrics.instrument('commands')
     def commands_handler(self, cmd: commands.Command):
         try:
             method = self.COMMAND_HANDLER[cmd.__class__]
@@ -46,5 +71,5 @@ class Handler:
             return response
 
         except Exception as e:
-            print(str(e))
+            logger.exception('%s', e)
             raise e
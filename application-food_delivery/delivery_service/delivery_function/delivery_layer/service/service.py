@@ -8,6 +8,9 @@ from delivery_layer.service import events
 from delivery_layer.service import commands
 from delivery_layer.common import exception as ex
 from delivery_layer.service.domain_event_envelope import DomainEventEnvelope
+from delivery_layer.common import log
+
+logger = log.get_logger(__name__)
 
 
 class DeliveryService:
@@ -120,7 +123,7 @@ class DeliveryService:
     # ---
     # from OrderCreated Event
     def create_delivery(self, event: events.OrderCreated):
-        print(f'create_delivery() event: {event}')
+        logger.payload('create_delivery() event', event)
         restaurant = self.restaurant_repo.find_by_id(restaurant_id=event.restaurant_id)
         delivery = delivery_model.Delivery.create(delivery_id=event.order_id,  # order_idとdelivery_idは同じもの
                                                   delivery_address=event.delivery_address,
@@ -169,10 +172,10 @@ class DeliveryService:
         #  2. PostMan: Kitchen:AcceptTicket (order_id)
         #  3. PostMan: Order:CancelOrder (order_id)
 
-        print(f'cancel_delivery(): event: {event}')
+        logger.payload('cancel_delivery(): event', event)
         delivery: delivery_model.Delivery = self.delivery_repo.find_by_id(delivery_id=event.ticket_id)
 
-        print(f'delivery.assigned_courier: {delivery.assigned_courier}')
+        logger.debug('delivery.assigned_courier: %s', delivery.assigned_courier)
 
         if delivery.assigned_courier:
             courier: courier_model.Courier = self.courier_repo.find_by_id(
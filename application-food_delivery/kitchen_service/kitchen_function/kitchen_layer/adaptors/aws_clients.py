@@ -0,0 +1,56 @@
+import os
+import threading
+import boto3
+from botocore.config import Config
+from kitchen_layer.common import metrics
+
+"""
+AWS client factory
+    container (Lambda実行環境) 内で boto3 の default session と service 毎の client を1つずつ共有する。
+    repository は boto3.client() の代わりに aws_clients.client('dynamodb') を使う。
+    (client の生成は service model の読み込みを含むので、cold start の init に時間がかかる)
+
+    botocore の設定は環境変数で変更できる。
+        BOTO_RETRY_MODE:            adaptive (default) | standard | legacy
+        BOTO_MAX_ATTEMPTS:          3     最初の呼び出しを含む試行回数
+        BOTO_MAX_POOL_CONNECTIONS:  10    client 毎の HTTP connection pool
+        BOTO_CONNECT_TIMEOUT:       2     秒
+        BOTO_READ_TIMEOUT:          5     秒
+        BOTO_TCP_KEEPALIVE:         true
+"""
+
+_LOCK = threading.Lock()
+_CLIENTS = {}
+
+
+def client_config() -> Config:
+    return Config(
+        retries={
+            'mode': os.environ.get('BOTO_RETRY_MODE', 'adaptive'),
+            'total_max_attempts': int(os.environ.get('BOTO_MAX_ATTEMPTS', '3')),
+        },
+        max_pool_connections=int(os.environ.get('BOTO_MAX_POOL_CONNECTIONS', '10')),
+        connect_timeout=float(os.environ.get('BOTO_CONNECT_TIMEOUT', '2')),
+        read_timeout=float(os.environ.get('BOTO_READ_TIMEOUT', '5')),
+        tcp_keepalive=os.environ.get('BOTO_TCP_KEEPALIVE', 'true').lower() == 'true',
+    )
+
+
+def session() -> boto3.Session:
+    if boto3.DEFAULT_SESSION is None:
+        boto3.setup_default_session()
+    return boto3.DEFAULT_SESSION
+
+
+def client(service_name: str):
+    """ service 毎に1つの client を返す (botocore の client は thread safe) """
+    with _LOCK:  # boto3.Session は thread safe ではないので生成をロックする
+        if service_name not in _CLIENTS:
+            _CLIENTS[service_name] = metrics.register(session().client(service_name, config=client_config()))
+        return _CLIENTS[service_name]
+
+
+def reset():
+    """ test 用: 共有している client を破棄する """
+    with _LOCK:
+        _CLIENTS.clear()
@@ -1,13 +1,34 @@
-import json
 import os
 import abc
-import boto3
-from boto3.dynamodb.types import TypeSerializer
-from boto3.dynamodb.types import TypeDeserializer
 from kitchen_layer.domain import ticket_model
 from kitchen_layer.common import common
 from kitchen_layer.adaptors import dynamo_exception as dx
+from kitchen_layer.adaptors import dynamo_codec
 from kitchen_layer.common import exceptions as ex
+from kitchen_layer.adaptors import aws_clients
+from kitchen_layer.common import log
+
+logger = log.get_logger(__name__)
+
+
+TICKET_CODEC = dynamo_codec.ItemCodec({
+    'PK': dynamo_codec.S,
+    'SK': dynamo_codec.S,
+    'lock_version': dynamo_codec.N,
+    'restaurant_id': dynamo_codec.N,
+    'line_items': dynamo_codec.List(dynamo_codec.Map({
+        'quantity': dynamo_codec.N,
+        'menu_id': dynamo_codec.S,
+        'name': dynamo_codec.S,
+    })),
+    'state': dynamo_codec.S,
+    'previous_state': dynamo_codec.S,
+    'ready_by': dynamo_codec.S,
+    'accept_time': dynamo_codec.S,
+    'preparing_time': dynamo_codec.S,
+    'picked_up_time': dynamo_codec.S,
+    'ready_for_pickup_time': dynamo_codec.S,
+})
 
 
 class AbstractRepository(abc.ABC):
@@ -42,11 +63,11 @@ class DynamoDbRepository(AbstractRepository):
     """
 
     def __init__(self):
-        self.client = boto3.client('dynamodb')
+        self.client = aws_clients.client('dynamodb')
         self.table_name = os.environ.get('DYNAMODB_TABLE_NAME', 'KitchenService')
 
     def save(self, ticket: ticket_model.Ticket):
-        print(f'kitchen_repository.py save(): {ticket}')
+        logger.payload('kitchen_repository.py save()', ticket)
         ticket_dynamo_dict = self._ticket_obj_to_dynamo_dict(ticket)
 
         with dx.dynamo_exception_check():
@@ -75,7 +96,7 @@ class DynamoDbRepository(AbstractRepository):
     @staticmethod
     def _ticket_obj_to_dynamo_dict(ticket: ticket_model.Ticket):
         """ Ticket -> DynamoDB obj """
-        print(f'kitchen_repository.py _ticket_obj_to_dynamo_dict(): {ticket}')
+        logger.payload('kitchen_repository.py _ticket_obj_to_dynamo_dict()', ticket)
 
         # ticketをPython obj(dict)に変換
         ticket_dict = ticket.to_dict()
@@ -91,19 +112,16 @@ class DynamoDbRepository(AbstractRepository):
         ticket_dict.update(without_none)
 
         # Dynamo objに変換
-        serializer = boto3.dynamodb.types.TypeSerializer()
-        dynamo_dict = {k: serializer.serialize(v) for k, v, in ticket_dict.items()}
+        dynamo_dict = TICKET_CODEC.encode(ticket_dict)
         return dynamo_dict
 
     @staticmethod
     def _dynamo_obj_to_ticket_python_obj(dynamo_item):
         """ DynamoDB obj -> Ticket Obj """
         # Dynamo obj -> Python obj
-        print(f'kitchen_repository.py _dynamo_obj_to_ticket_python_obj(): '
-              f'{json.dumps(dynamo_item)}')
+        logger.payload('kitchen_repository.py _dynamo_obj_to_ticket_python_obj()', dynamo_item)
 
-        deserializer = boto3.dynamodb.types.TypeDeserializer()
-        python_obj = {k: deserializer.deserialize(v) for k, v in dynamo_item.items()}
+        python_obj = TICKET_CODEC.decode(dynamo_item)
         # Primary Keyの変更: PK, SKをticket attributeに変換
         python_obj['ticket_id'] = python_obj['PK'].split('#')[1]
         del python_obj['PK']
@@ -111,3 +129,23 @@ class DynamoDbRepository(AbstractRepository):
 
         ticket = ticket_model.Ticket.from_dict(python_obj)
         return ticket
+
+
+class InMemoryRepository(DynamoDbRepository):
+    """
+    test / benchmark 用の in-memory 実装
+        DynamoDbRepository と同じ Item を dict (PK, SK) -> Item に書き込む。(save は条件なしの上書き)
+    """
+    def __init__(self):
+        self.table_name = 'KitchenService'
+        self.items = {}
+
+    def save(self, ticket: ticket_model.Ticket):
+        item = self._ticket_obj_to_dynamo_dict(ticket)
+        self.items[(item['PK']['S'], item['SK']['S'])] = item
+
+    def find_by_id(self, ticket_id) -> ticket_model.Ticket:
+        item = self.items.get((f'TICKET#{ticket_id}', f'TICKET#{ticket_id}'))
+        if item is None:
+            raise ex.ItemNotFoundException(f'ticket_id: {ticket_id}')
+        return self._dynamo_obj_to_ticket_python_obj(item)
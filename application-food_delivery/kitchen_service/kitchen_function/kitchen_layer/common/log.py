@@ -0,0 +1,127 @@
+import json
+import os
+import random
+import sys
+import time
+import traceback
+from decimal import Decimal
+
+"""
+Structured logger
+    print(json.dumps(...)) の代わりに使う。1行1 JSON で CloudWatch Logs に出力する。
+
+        from kitchen_layer.common import log
+        logger = log.get_logger(__name__)
+
+        logger.info('create_order: order_id: %s', order_id)   # format は level が有効な時だけ行う
+        logger.payload('query() resp', resp)                   # event や DynamoDB の response 等の大きな値
+        logger.payload('event', event.to_dict)                 # callable は level が有効な時だけ呼ぶ
+        logger.error('%r', e)
+
+    payload() は DEBUG level で出力し、json.dumps した結果を LOG_PAYLOAD_MAX_CHARS で切り詰める。
+    (level が無効な時は json.dumps しない)
+
+    環境変数
+        LOG_LEVEL:              INFO (default) | DEBUG | WARNING | ERROR
+        LOG_DEBUG_SAMPLE_RATE:  0.0  invocation をこの割合でサンプリングし、その invocation は DEBUG で出力する
+        LOG_PAYLOAD_MAX_CHARS:  2048 payload を出力する最大文字数
+
+    sample() は lambda_handler の先頭で invocation 毎に1回呼ぶ。
+"""
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVELS = {'DEBUG': DEBUG, 'INFO': INFO, 'WARNING': WARNING, 'ERROR': ERROR}
+
+_sampled = False  # この invocation を DEBUG で出力するか (Lambda の実行環境は同時に1つの invocation を処理する)
+_loggers = {}
+
+
+def level() -> int:
+    return LEVELS.get(os.environ.get('LOG_LEVEL', 'INFO').upper(), INFO)
+
+
+def payload_max_chars() -> int:
+    return int(os.environ.get('LOG_PAYLOAD_MAX_CHARS', '2048'))
+
+
+def sample(rate: float = None) -> bool:
+    """ invocation の先頭で呼び、LOG_DEBUG_SAMPLE_RATE の割合で DEBUG を有効にする """
+    global _sampled
+    if rate is None:
+        rate = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', '0'))
+    _sampled = rate > 0 and random.random() < rate
+    return _sampled
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    return str(obj)
+
+
+def truncate(text: str, max_chars: int = None) -> str:
+    max_chars = payload_max_chars() if max_chars is None else max_chars
+    if len(text) <= max_chars:
+        return text
+    return f'{text[:max_chars]}...(truncated {len(text) - max_chars} chars)'
+
+
+class Logger:
+    def __init__(self, name: str):
+        self.name = name
+
+    def enabled(self, log_level: int) -> bool:
+        return log_level >= level() or (log_level == DEBUG and _sampled)
+
+    def _write(self, level_name: str, message: str, args: tuple, fields: dict):
+        record = {'timestamp': round(time.time(), 3), 'level': level_name, 'logger': self.name,
+                  'message': message % args if args else message}
+        record.update(fields)
+        sys.stdout.write(json.dumps(record, default=_default, ensure_ascii=False) + '\n')
+
+    def debug(self, message: str, *args, **fields):
+        if self.enabled(DEBUG):
+            self._write('DEBUG', message, args, fields)
+
+    def info(self, message: str, *args, **fields):
+        if self.enabled(INFO):
+            self._write('INFO', message, args, fields)
+
+    def warning(self, message: str, *args, **fields):
+        if self.enabled(WARNING):
+            self._write('WARNING', message, args, fields)
+
+    def error(self, message: str, *args, **fields):
+        if self.enabled(ERROR):
+            self._write('ERROR', message, args, fields)
+
+    def exception(self, message: str, *args, **fields):
+        """ except 節の中で呼び、traceback を付けて ERROR で出力する """
+        if self.enabled(ERROR):
+            self._write('ERROR', message, args, dict(fields, traceback=traceback.format_exc()))
+
+    def payload(self, message: str, value, log_level: int = DEBUG):
+        """ 大きな値を json.dumps して切り詰めて出力する (level が無効なら何もしない) """
+        if self.enabled(log_level):
+            if callable(value):
+                value = value()
+            text = value if isinstance(value, str) else json.dumps(value, default=_default,
+                                                                   ensure_ascii=False)
+            self._write(_level_name(log_level), message, (), {'payload': truncate(text)})
+
+
+def _level_name(log_level: int) -> str:
+    return next(name for name, value in LEVELS.items() if value == log_level)
+
+
+def get_logger(name: str) -> Logger:
+    if name not in _loggers:
+        _loggers[name] = Logger(name)
+    return _loggers[name]
@@ -82,7 +82,7 @@ class Restaurant:
             if isinstance(o, MenuItem):
                 return dataclasses.asdict(o)
             if isinstance(o, common.Money):
-                return dataclasses.asdict(o)
+                return o.to_dict()
             if isinstance(o, decimal.Decimal):
                 return o  # Decimalのまま返す
             raise TypeError(f'{repr(o)} is not serializable')
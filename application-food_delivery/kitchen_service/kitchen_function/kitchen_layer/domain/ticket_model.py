@@ -2,12 +2,15 @@ from __future__ import annotations
 import dataclasses
 import datetime
 import enum
-import json
 import decimal
 import uuid
 from kitchen_layer.domain import kitchen_domain_event
 from kitchen_layer.common import exceptions
 from kitchen_layer.common import common
+from kitchen_layer.common import serializer
+from kitchen_layer.common import log
+
+logger = log.get_logger(__name__)
 
 
 class TicketState(enum.Enum):
@@ -46,18 +49,11 @@ class TicketLineItem:
         return cls(**d)
 
     def to_dict(self):
-        def encoder_(o):
-            if isinstance(o, TicketLineItem):
-                return o.__dict__  # ここがポイント
-            if isinstance(o, common.Money):
-                return o.to_dict()
-            if isinstance(o, decimal.Decimal):
-                if int(o) == o:
-                    return int(o)
-                else:
-                    return float(o)
-            raise TypeError(f'{repr(o)} is not serializable')
-        return json.loads(json.dumps(self, default=encoder_))
+        return {
+            'quantity': serializer.to_plain(self.quantity),
+            'menu_id': serializer.to_plain(self.menu_id),
+            'name': serializer.to_plain(self.name),
+        }
 
 
 # @dataclasses.dataclass(frozen=True)
@@ -161,25 +157,24 @@ class Ticket:
     #                ready_for_pickup_time=ready_for_pickup_time)
 
     def to_dict(self):
-        def encoder_(o):
-            if isinstance(o, Ticket):
-                return o.__dict__  # Todo: ここがポイント
-            if isinstance(o, TicketLineItem):
-                # return o.__dict__
-                return o.to_dict()
-            if isinstance(o, TicketState):
-                return o.value
-            if isinstance(o, decimal.Decimal):
-                if int(o) == o:
-                    return int(o)
-                else:
-                    return float(o)
-            if isinstance(o, datetime.datetime):
-                return o.isoformat() + 'Z'
-            raise TypeError(f'{repr(o)} is not serializable')
-
-        d = json.loads(json.dumps(self, default=encoder_), parse_float=decimal.Decimal)
-        return d
+        # JSON文字列を経由せずにattributeを1回だけ辿る (keyの順序は__init__と同じ)
+        line_items = None if self.line_items is None else \
+            [item.to_dict() if isinstance(item, TicketLineItem) else item
+             for item in self.line_items]
+        d = {
+            'ticket_id': self.ticket_id,
+            'lock_version': self.lock_version,
+            'restaurant_id': self.restaurant_id,
+            'line_items': line_items,
+            'state': self.state,
+            'previous_state': self.previous_state,
+            'ready_by': self.ready_by,
+            'accept_time': self.accept_time,
+            'preparing_time': self.preparing_time,
+            'picked_up_time': self.picked_up_time,
+            'ready_for_pickup_time': self.ready_for_pickup_time,
+        }
+        return serializer.to_plain(d, parse_float=decimal.Decimal)
 
     @classmethod
     def create_ticket(cls,
@@ -187,7 +182,7 @@ class Ticket:
                       restaurant_id,
                       line_items) -> (Ticket, kitchen_domain_event.DomainEvent):
 
-        print(f'ticket_model.py create_ticket: {ticket_id}')
+        logger.debug('ticket_model.py create_ticket: %s', ticket_id)
 
         return cls(ticket_id, restaurant_id, line_items), None
 
@@ -1,24 +1,34 @@
+from __future__ import annotations  # classの依存関係の許可
 import decimal
-import re
+import functools
 import json
 import datetime
-import traceback
+from typing import TYPE_CHECKING
 from kitchen_layer.common import exceptions
 from kitchen_layer.common import json_encoder
-from kitchen_layer.service import commands
-from kitchen_layer.service import events
-from kitchen_layer.service import handlers
-from kitchen_layer.adaptors import restaurant_replica_repository
-from kitchen_layer.adaptors import kitchen_repository
-from kitchen_layer.adaptors import kitchen_event_repository
-from kitchen_layer.domain import ticket_model
-
-KITCHEN_REPOSITORY = kitchen_repository.DynamoDbRepository()
-KITCHEN_EVENT_REPOSITORY = kitchen_event_repository.DynamoDbRepository()
-RESTAURANT_REPLICA_REPOSITORY = restaurant_replica_repository.DynamoDbRepository()
-HANDLER = handlers.Handler(kitchen_repo=KITCHEN_REPOSITORY,
-                           kitchen_event_repo=KITCHEN_EVENT_REPOSITORY,
-                           restaurant_replica_repo=RESTAURANT_REPLICA_REPOSITORY)
+from kitchen_layer.presentation import router
+from kitchen_layer.common import log
+
+if TYPE_CHECKING:  # service / adaptors の module は route と handler() の中でだけ import する
+    from kitchen_layer.service import handlers
+
+logger = log.get_logger(__name__)
+
+ROUTER = router.Router()
+SAGA_REGISTRY = router.Registry()
+
+
+@functools.lru_cache(maxsize=None)
+def handler() -> handlers.Handler:
+    """ repository と Handler は最初の invocation で生成する (import 時に DynamoDB client を作らない) """
+    from kitchen_layer.service import handlers
+    from kitchen_layer.adaptors import restaurant_replica_repository
+    from kitchen_layer.adaptors import kitchen_repository
+    from kitchen_layer.adaptors import kitchen_event_repository
+    return handlers.Handler(kitchen_repo=kitchen_repository.DynamoDbRepository(),
+                            kitchen_event_repo=kitchen_event_repository.DynamoDbRepository(),
+                            restaurant_replica_repo=restaurant_replica_repository.DynamoDbRepository())
+
 
 # -------------------------------------------------
 # Eventbus Invocation
@@ -36,14 +46,16 @@ def eventbus_invocation(event: dict):
     try:
         event_source, event_detail, event_type = extract_parameter_from_event(event)
         if event_source == 'com.restaurant.created' and event_type == 'RestaurantCreated':
+            # 更新 (writer path) の module は EventBridge の invocation でだけ import する
+            from kitchen_layer.service import events
             event_ = events.RestaurantCreated.from_event(event_detail)
-            HANDLER.events_handler(event_)
+            handler().events_handler(event_)
         else:
             raise Exception(f"NotSupportEvent: {event_source} : {event_type}")
         return None
 
     except Exception as e:
-        traceback.print_exc()
+        logger.exception('%s', e)
         raise e
 
 
@@ -51,8 +63,82 @@ def eventbus_invocation(event: dict):
 # StepFunctions - Saga
 # -------------------------------------------------
 
+@SAGA_REGISTRY.register('CreateOrderSaga', 'CREATE_TICKET')
+def create_ticket(event):
+    from kitchen_layer.domain import ticket_model
+    from kitchen_layer.service import commands
+    line_items = [
+        ticket_model.TicketLineItem(quantity=item['quantity'],
+                                    menu_id=item['menu_id'],
+                                    name=item['name'])
+        for item in event['order_line_items']
+    ]
+    return commands.CreateTicket(ticket_id=event['order_id'],
+                                 restaurant_id=event['restaurant_id'],
+                                 line_items=line_items)
+
+
+@SAGA_REGISTRY.register('CreateOrderSaga', 'CONFIRM_CREATE_TICKET')
+def confirm_create_ticket(event):
+    # Create Order Saga
+    from kitchen_layer.service import commands
+    return commands.ConfirmCreateTicket(ticket_id=event['ticket_id'])
+
+
+@SAGA_REGISTRY.register('CreateOrderSaga', 'CANCEL_CREATE_TICKET')
+def cancel_create_ticket(event):
+    # Create Order Saga 補償トランザクション
+    from kitchen_layer.service import commands
+    return commands.CancelCreateTicket(ticket_id=event['ticket_id'])
+
+
+# 注意 Cancel/Revise Order Saga の order_idとticket_idは同じもの
+@SAGA_REGISTRY.register('CancelOrderSaga', 'BEGIN_CANCEL_TICKET')
+def begin_cancel_ticket(event):
+    # Cancel Order Saga
+    from kitchen_layer.service import commands
+    return commands.BeginCancelTicket(ticket_id=event['order_id'])
+
+
+@SAGA_REGISTRY.register('CancelOrderSaga', 'CONFIRM_CANCEL_TICKET')
+def confirm_cancel_ticket(event):
+    # Cancel Order Saga
+    from kitchen_layer.service import commands
+    return commands.ConfirmCancelTicket(ticket_id=event['order_id'])
+
+
+@SAGA_REGISTRY.register('CancelOrderSaga', 'UNDO_BEGIN_CANCEL_TICKET')
+def undo_begin_cancel_ticket(event):
+    # Cancel Order Saga - 補償トランザクション
+    from kitchen_layer.service import commands
+    return commands.UndoBeginCancelTicket(ticket_id=event['order_id'])
+
+
+@SAGA_REGISTRY.register('ReviseOrderSaga', 'BEGIN_REVISE_TICKET')
+def begin_revise_ticket(event):
+    # Revise Order Saga
+    from kitchen_layer.service import commands
+    return commands.BeginReviseTicket(ticket_id=event['order_id'],
+                                      revised_order_line_items=event['revised_order_line_items'])
+
+
+@SAGA_REGISTRY.register('ReviseOrderSaga', 'CONFIRM_REVISE_TICKET')
+def confirm_revise_ticket(event):
+    # Revise Order Saga
+    from kitchen_layer.service import commands
+    return commands.ConfirmReviseTicket(ticket_id=event['order_id'],
+                                        revised_order_line_items=event['revised_order_line_items'])
+
+
+@SAGA_REGISTRY.register('ReviseOrderSaga', 'UNDO_BEGIN_REVISE_TICKET')
+def undo_begin_revise_ticket(event):
+    # Revise Order Saga
+    from kitchen_layer.service import commands
+    return commands.UndoBeginReviseTicket(ticket_id=event['order_id'])
+
+
 def stepfunctions_invocation(event: dict):
-    print(f'stepfunctions_invocation(): event: {json.dumps(event)}')
+    logger.payload('stepfunctions_invocation(): event', event)
 
     """
     {
@@ -100,69 +186,17 @@ def stepfunctions_invocation(event: dict):
         state_machine = event['task_context']['value']['state_machine']
         action = event['task_context']['value']['action']
 
-        cmd = None
-        if state_machine == "CreateOrderSaga" and action == 'CREATE_TICKET':
-
-            line_items = [
-                ticket_model.TicketLineItem(quantity=item['quantity'],
-                                            menu_id=item['menu_id'],
-                                            name=item['name'])
-                for item in event['order_line_items']
-            ]
-            cmd = commands.CreateTicket(ticket_id=event['order_id'],
-                                        restaurant_id=event['restaurant_id'],
-                                        line_items=line_items)
-
-        elif state_machine == "CreateOrderSaga" and action == 'CONFIRM_CREATE_TICKET':
-            # Create Order Saga
-            cmd = commands.ConfirmCreateTicket(ticket_id=event['ticket_id'])
-
-        elif state_machine == "CreateOrderSaga" and action == 'CANCEL_CREATE_TICKET':
-            # Create Order Saga 補償トランザクション
-            cmd = commands.CancelCreateTicket(ticket_id=event['ticket_id'])
-
-        elif state_machine == "CancelOrderSaga" and action == 'BEGIN_CANCEL_TICKET':
-            # Cancel Order Saga
-            cmd = commands.BeginCancelTicket(ticket_id=event['order_id'])
-            # 注意 order_idとticket_idは同じもの
-
-        elif state_machine == "CancelOrderSaga" and action == 'CONFIRM_CANCEL_TICKET':
-            # Cancel Order Saga
-            cmd = commands.ConfirmCancelTicket(ticket_id=event['order_id'])
-            # 注意 order_idとticket_idは同じもの
-
-        elif state_machine == "CancelOrderSaga" and action == 'UNDO_BEGIN_CANCEL_TICKET':
-            # Cancel Order Saga - 補償トランザクション
-            cmd = commands.UndoBeginCancelTicket(ticket_id=event['order_id'])
-            # 注意 order_idとticket_idは同じもの
-
-        elif state_machine == "ReviseOrderSaga" and action == 'BEGIN_REVISE_TICKET':
-            # Revise Order Saga
-            cmd = commands.BeginReviseTicket(
-                                     ticket_id=event['order_id'],
-                                     revised_order_line_items=event['revised_order_line_items'])
-            # 注意 order_idとticket_idは同じもの
-        elif state_machine == "ReviseOrderSaga" and action == 'CONFIRM_REVISE_TICKET':
-            # Revise Order Saga
-            cmd = commands.ConfirmReviseTicket(
-                                     ticket_id=event['order_id'],
-                                     revised_order_line_items=event['revised_order_line_items'])
-            # 注意 order_idとticket_idは同じもの
-        elif state_machine == "ReviseOrderSaga" and action == 'UNDO_BEGIN_REVISE_TICKET':
-            # Revise Order Saga
-            cmd = commands.UndoBeginReviseTicket(ticket_id=event['order_id'])
-            # 注意 order_idとticket_idは同じもの
-
-        else:
+        to_command = SAGA_REGISTRY.get((state_machine, action))
+        if to_command is None:
             raise exceptions.InvalidSagaCmd(f'InvalidSagaCmd '
                                             f'state_machine:{state_machine}, action:{action}')
+        cmd = to_command(event)
 
-        saga_resp = HANDLER.saga_commands_handler(cmd)
+        saga_resp = handler().saga_commands_handler(cmd)
         return saga_resp
 
     except Exception as e:
-        print(str(e))
-        traceback.print_exc()
+        logger.exception('%s', e)
         raise e
 
 
@@ -179,33 +213,39 @@ def rest_request(event):
     return http_method, query_string_parameters, path, path_parameters, body_json
 
 
+@ROUTER.route('POST', '/tickets/{ticket_id:[0-9a-f]+}/accept')
+def accept_ticket(request: router.Request):
+    """ POST /tickets/ticket_id/accept  - Accept Ticket
+    http_method: POST
+    path: "/tickets/a477f597d28d172789f06886806bc55" # order_idとticket_idは同じもの
+    path_parameters: {"ticket_id": 1}
+    query_string_parameters: None
+    body: {
+            "ready_by": "2022-11-30T05:00:30.001000Z"
+          }
+    """
+    from kitchen_layer.service import commands
+    d = json.loads(request.body_json, parse_float=decimal.Decimal)
+    redy_by = datetime.datetime.strptime(d['ready_by'], '%Y-%m-%dT%H:%M:%S.%fZ')
+    return commands.AcceptTicket(ticket_id=request.path_parameters['ticket_id'],
+                                 ready_by=redy_by)
+
+
 def rest_invocation(event: dict):
-    print(f'rest_invocation(): event: {event}')
+    logger.payload('rest_invocation(): event', event)
     try:
         http_method, query_string_parameters, path, path_parameters, body_json \
             = rest_request(event)
 
-        # path="/tickets/{ticketId}/accept" POST
-
-        cmd = None
-        if re.fullmatch('/tickets/[0-9a-f]+/accept', path) and http_method == 'POST':
-            """ POST /tickets/ticket_id/accept  - Accept Ticket
-            http_method: POST
-            path: "/tickets/a477f597d28d172789f06886806bc55" # order_idとticket_idは同じもの
-            path_parameters: {"ticket_id": 1}
-            query_string_parameters: None
-            body: {
-                    "ready_by": "2022-11-30T05:00:30.001000Z"
-                  }
-            """
-            d = json.loads(body_json, parse_float=decimal.Decimal)
-            redy_by = datetime.datetime.strptime(d['ready_by'], '%Y-%m-%dT%H:%M:%S.%fZ')
-            cmd = commands.AcceptTicket(ticket_id=path_parameters.get('ticket_id'),
-                                        ready_by=redy_by)
-        else:
-            raise exceptions.UnsupportedRoute(f'Unsupported Route :{http_method}')
+        # method + 先頭segment で route を引き、path parameterはpathから取り出す
+        route_handler, path_parameters = ROUTER.resolve(http_method, path)
+        cmd = route_handler(router.Request(http_method=http_method,
+                                           path=path,
+                                           path_parameters=path_parameters,
+                                           query_string_parameters=query_string_parameters,
+                                           body_json=body_json))
 
-        resp = HANDLER.commands_handler(cmd)
+        resp = handler().commands_handler(cmd)
         resp_dict = resp.to_dict() if hasattr(resp, 'to_dict') else resp
 
         rest_response = {
@@ -218,11 +258,11 @@ def rest_invocation(event: dict):
                         cls=json_encoder.JSONEncoder
                     )
         }
-        print(f'return response: {rest_response}')
+        logger.payload('return response', rest_response)
         return rest_response
 
     except exceptions.InvalidName as e:
-        print(str(e))
+        logger.warning('%s', e)
         return {
             'statusCode': 400,
             'body': json.dumps({
@@ -230,17 +270,27 @@ def rest_invocation(event: dict):
             })
         }
 
-    except exceptions.UnsupportedRoute as e:
-        print(str(e))
+    except router.RouteNotFound as e:
+        logger.warning('%s', e)
+        return {
+            'statusCode': 404,
+            'body': json.dumps({
+                'message': str(e),
+            })
+        }
+
+    except router.MethodNotAllowed as e:
+        logger.warning('%s', e)
         return {
             'statusCode': 405,
+            'headers': {'Allow': ', '.join(e.allowed_methods)},
             'body': json.dumps({
                 'message': str(e),
             })
         }
 
     except Exception as e:
-        print(e)
+        logger.exception('%s', e)
         return {
             'statusCode': 500,
             'body': json.dumps({
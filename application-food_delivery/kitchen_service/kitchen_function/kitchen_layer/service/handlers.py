@@ -1,7 +1,14 @@
-import traceback
+from __future__ import annotations  # classの依存関係の許可
+from typing import TYPE_CHECKING
 from kitchen_layer.service import service
-from kitchen_layer.service import commands
-from kitchen_layer.service import events
+from kitchen_layer.common import log
+from kitchen_layer.common import metrics
+
+if TYPE_CHECKING:  # commands / events は table を組み立てる時にだけ import する
+    from kitchen_layer.service import commands
+    from kitchen_layer.service import events
+
+logger = log.get_logger(__name__)
 
 
 class Handler:
@@ -10,26 +17,48 @@ class Handler:
         self.kitchen_service = service.KitchenService(kitchen_repo,
                                                       kitchen_event_repo,
                                                       restaurant_replica_repo)
-        self.COMMAND_HANDLER = {
-            commands.AcceptTicket: getattr(self.kitchen_service, 'accept_ticket')
-        }
-
-        self.SAGACOMMAND_HANDLER = {
-            commands.CreateTicket: getattr(self.kitchen_service, 'create_ticket'),
-            commands.ConfirmCreateTicket: getattr(self.kitchen_service, 'confirm_create_ticket'),
-            commands.CancelCreateTicket: getattr(self.kitchen_service, 'cancel_create_ticket'),
-            commands.BeginCancelTicket: getattr(self.kitchen_service, 'cancel_ticket'),
-            commands.ConfirmCancelTicket: getattr(self.kitchen_service, 'confirm_cancel_ticket'),
-            commands.UndoBeginCancelTicket: getattr(self.kitchen_service, 'undo_cancel_ticket'),
-            commands.BeginReviseTicket: getattr(self.kitchen_service, 'begin_revise_ticket'),
-            commands.UndoBeginReviseTicket: getattr(self.kitchen_service, 'undo_begin_revise_ticket'),
-            commands.ConfirmReviseTicket: getattr(self.kitchen_service, 'confirm_revise_ticket'),
-        }
-
-        self.EVENT_HANDLER = {
-            events.RestaurantCreated: getattr(self.kitchen_service, 'create_replica_restaurant'),
-        }
+        # table は route (REST / Saga / EventBridge) ごとに最初の呼び出しで組み立てる
+        self._command_handler = None
+        self._saga_command_handler = None
+        self._event_handler = None
+
+    @property
+    def COMMAND_HANDLER(self) -> dict:
+        if self._command_handler is None:
+            from kitchen_layer.service import commands
+            self._command_handler = {
+                commands.AcceptTicket: getattr(self.kitchen_service, 'accept_ticket')
+            }
+        return self._command_handler
+
+    @property
+    def SAGACOMMAND_HANDLER(self) -> dict:
+        if self._saga_command_handler is None:
+            from kitchen_layer.service import commands
+            self._saga_command_handler = {
+                commands.CreateTicket: getattr(self.kitchen_service, 'create_ticket'),
+                commands.ConfirmCreateTicket: getattr(self.kitchen_service, 'confirm_create_ticket'),
+                commands.CancelCreateTicket: getattr(self.kitchen_service, 'cancel_create_ticket'),
+                commands.BeginCancelTicket: getattr(self.kitchen_service, 'cancel_ticket'),
+                commands.ConfirmCancelTicket: getattr(self.kitchen_service, 'confirm_cancel_ticket'),
+                commands.UndoBeginCancelTicket: getattr(self.kitchen_service, 'undo_cancel_ticket'),
+                commands.BeginReviseTicket: getattr(self.kitchen_service, 'begin_revise_ticket'),
+                commands.UndoBeginReviseTicket: getattr(self.kitchen_service, 'undo_begin_revise_ticket'),
+                commands.ConfirmReviseTicket: getattr(self.kitchen_service, 'confirm_revise_ticket'),
+            }
+        return self._saga_command_handler
+
+    @property
+    def EVENT_HANDLER(self) -> dict:
+        # 更新 (writer path) の table は最初の event で組み立てる
+        if self._event_handler is None:
+            from kitchen_layer.service import events
+            self._event_handler = {
+                events.RestaurantCreated: getattr(self.kitchen_service, 'create_replica_restaurant'),
+            }
+        return self._event_handler
 
+    @metrics.instrument('events')
     def events_handler(self, event: events.Event):
         try:
             method = self.EVENT_HANDLER[event.__class__]
@@ -37,9 +66,10 @@ class Handler:
             return response
 
         except Exception as e:
-            print(str(e))
+            logger.exception('%s', e)
             raise e
 
+    @metrics.instrument('commands')
     def commands_handler(self, cmd: commands.Command):
         try:
             method = self.COMMAND_HANDLER[cmd.__class__]
@@ -47,9 +77,10 @@ class Handler:
             return response
 
         except Exception as e:
-            print(str(e))
+            logger.exception('%s', e)
             raise e
 
+    @metrics.instrument('saga_commands')
     def saga_commands_handler(self, cmd: commands.Command):
         try:
             method = self.SAGACOMMAND_HANDLER[cmd.__class__]
@@ -57,6 +88,5 @@ class Handler:
             return response
 
         except Exception as e:
-            traceback.print_exc()
-            print(str(e))
+            logger.exception('%s', e)
             raise e
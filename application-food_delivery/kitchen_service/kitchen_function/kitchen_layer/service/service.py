@@ -5,6 +5,9 @@ from kitchen_layer.service import events
 from kitchen_layer.service import commands
 from kitchen_layer.common import common
 from kitchen_layer.service.domain_event_envelope import DomainEventEnvelope
+from kitchen_layer.common import log
+
+logger = log.get_logger(__name__)
 
 
 class KitchenService:
@@ -45,7 +48,7 @@ class KitchenService:
         #  Ticketドメインロジックではない。
         #  RestaurantDomainとTicketの間の処理なので、ServiceLayerで実装する？
 
-        print(f'service.py create_ticket: {cmd}')
+        logger.debug('service.py create_ticket: %s', cmd)
         ticket, event = ticket_model.Ticket.create_ticket(ticket_id=cmd.ticket_id,
                                                           restaurant_id=cmd.restaurant_id,
                                                           line_items=cmd.line_items)
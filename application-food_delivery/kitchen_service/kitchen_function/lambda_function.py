@@ -1,14 +1,23 @@
+import os
 import json
 from kitchen_layer.presentation import controller
 from aws_xray_sdk import core as x_ray
+from kitchen_layer.common import log
 
-x_ray.patch_all()
+logger = log.get_logger(__name__)
+
+# XRAY_PATCH=botocore: AWS SDK の呼び出しだけを patch する (patch_all() は対応する全 library を import する)
+if os.environ.get('XRAY_PATCH', 'all') == 'botocore':
+    x_ray.patch(['botocore'])
+else:
+    x_ray.patch_all()
 
 
 def lambda_handler(event, context):
 
-    print(json.dumps(event))
-    print(context)
+    log.sample()  # LOG_DEBUG_SAMPLE_RATE の割合で、この invocation を DEBUG で出力する
+    logger.payload('event', event)
+    logger.debug('context: %s', context)
 
     response = None
     if event.get('Records', None):  # from SQS
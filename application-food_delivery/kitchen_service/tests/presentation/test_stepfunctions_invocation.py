@@ -0,0 +1,54 @@
+import pytest
+from kitchen_layer.common import exceptions
+from kitchen_layer.service import commands
+from kitchen_layer.presentation import controller
+
+ORDER_ID = 'b347f866e4dd484da4caeb1e4e7bff4a'
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.commands = []
+
+    def saga_commands_handler(self, cmd):
+        self.commands.append(cmd)
+        return {'ticket_id': cmd.ticket_id}
+
+
+@pytest.fixture
+def saga_handler(monkeypatch):
+    recording = RecordingHandler()
+    monkeypatch.setattr(controller, 'handler', lambda: recording)
+    return recording
+
+
+def task(state_machine, action, **payload) -> dict:
+    return {'task_context': {'type': 1, 'value': {'state_machine': state_machine, 'action': action}}, **payload}
+
+
+def test_create_ticket(saga_handler):
+    resp = controller.stepfunctions_invocation(task(
+        'CreateOrderSaga', 'CREATE_TICKET', order_id=ORDER_ID, restaurant_id=1,
+        order_line_items=[{'menu_id': '000001', 'name': 'Curry Rice', 'quantity': 3}]))
+
+    assert resp == {'ticket_id': ORDER_ID}
+    [cmd] = saga_handler.commands
+    assert isinstance(cmd, commands.CreateTicket)
+    assert [line_item.menu_id for line_item in cmd.line_items] == ['000001']
+
+
+@pytest.mark.parametrize('state_machine, action, command', [
+    ('CancelOrderSaga', 'BEGIN_CANCEL_TICKET', commands.BeginCancelTicket),
+    ('ReviseOrderSaga', 'UNDO_BEGIN_REVISE_TICKET', commands.UndoBeginReviseTicket),
+])
+def test_saga_command_is_handled(saga_handler, state_machine, action, command):
+    resp = controller.stepfunctions_invocation(task(state_machine, action, order_id=ORDER_ID))
+
+    assert resp == {'ticket_id': ORDER_ID}
+    assert [type(cmd) for cmd in saga_handler.commands] == [command]
+
+
+def test_unregistered_action(saga_handler):
+    with pytest.raises(exceptions.InvalidSagaCmd):
+        controller.stepfunctions_invocation(task('CreateOrderSaga', 'UNKNOWN', order_id=ORDER_ID))
+    assert saga_handler.commands == []
@@ -0,0 +1,99 @@
+"""
+Logging CPU time benchmark (GET /orders, 100 orders)
+    DynamoDB の query が 100件の order を返す GET /orders を controller.rest_invocation() で処理し、
+    lambda_handler と同じく event を payload で出力した時の CPU time (time.process_time) を
+    LOG_LEVEL / LOG_PAYLOAD_MAX_CHARS 毎に比較する。 (出力先は os.devnull)
+
+    DEBUG, no truncation: 変更前の print と同じく event, query() の resp, response を全て出力する
+    DEBUG:                payload を LOG_PAYLOAD_MAX_CHARS (2048) で切り詰める
+    INFO:                 default。payload は json.dumps しない
+
+    cd application-food_delivery
+    PYTHONPATH=order_history_service/order_history_function \
+        python order_history_service/benchmarks/bench_logging.py
+"""
+import contextlib
+import datetime
+import decimal
+import os
+import time
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-1')
+from order_history_layers.common import common  # noqa: E402
+from order_history_layers.common import log  # noqa: E402
+from order_history_layers.model import order_history_model  # noqa: E402
+from order_history_layers.presentation import controller  # noqa: E402
+from order_history_layers.store import aws_clients  # noqa: E402
+from order_history_layers.store import order_history_dao  # noqa: E402
+
+ORDERS = 100
+LINE_ITEMS = 5
+NUMBER = 200
+D = decimal.Decimal
+
+MODES = [  # (表示名, LOG_LEVEL, LOG_PAYLOAD_MAX_CHARS)
+    ('DEBUG, no truncation', 'DEBUG', str(10 ** 9)),
+    ('DEBUG', 'DEBUG', '2048'),
+    ('INFO (default)', 'INFO', '2048'),
+]
+
+EVENT = {
+    'resource': '/orders', 'path': '/orders', 'httpMethod': 'GET',
+    'headers': {'Accept': 'application/json', 'Host': 'example.execute-api.ap-northeast-1.amazonaws.com'},
+    'queryStringParameters': None, 'pathParameters': None, 'body': None,
+    'requestContext': {'stage': 'prod', 'requestId': 'c6af9ac6-7b61-11e6-9a41-93e8deadbeef'},
+}
+
+
+class FakeDynamoDbClient:
+    def __init__(self, items):
+        self.resp = {'Items': items, 'Count': len(items), 'ScannedCount': len(items),
+                     'ResponseMetadata': {'HTTPStatusCode': 200}}
+
+    def query(self, **kwargs):
+        return self.resp
+
+
+def make_items() -> list[dict]:
+    address = common.Address('9 Amazing View', 'Soi 8', 'Oakland', 'CA', '94612')
+    items = []
+    for i in range(ORDERS):
+        order = order_history_model.Order(
+            f'{i:032x}', D('4'), D('1'), order_history_model.OrderState.APPROVED,
+            [order_history_model.OrderLineItem(f'{j:06}', f'menu-{j}', common.Money(D('800'), 'JPY'), D('2'))
+             for j in range(LINE_ITEMS)],
+            order_history_model.DeliveryInformation(datetime.datetime(2022, 11, 30, 5, 0, 30), address))
+        items.append(order_history_dao.DynamoDbDao._to_dynamo_dict(order, i))
+    return items
+
+
+def invoke():
+    """ lambda_handler と同じ順序で log を出力する """
+    log.sample()
+    controller.logger.payload('event', EVENT)
+    return controller.rest_invocation(EVENT)
+
+
+def main():
+    aws_clients._CLIENTS['dynamodb'] = FakeDynamoDbClient(make_items())
+    print(f'orders: {ORDERS}, line items: {LINE_ITEMS}, requests: {NUMBER}')
+
+    with open(os.devnull, 'w') as devnull:
+        results = {}
+        for name, level, max_chars in MODES:
+            os.environ['LOG_LEVEL'] = level
+            os.environ['LOG_PAYLOAD_MAX_CHARS'] = max_chars
+            with contextlib.redirect_stdout(devnull):
+                assert invoke()['statusCode'] == 200
+                started = time.process_time()
+                for _ in range(NUMBER):
+                    invoke()
+                results[name] = (time.process_time() - started) / NUMBER
+
+    baseline = results[MODES[0][0]]
+    for name, elapsed in results.items():
+        print(f'{name:<22} {elapsed * 1000:7.3f} ms/request  ({baseline / elapsed:4.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+GET /orders?status= / ?keyword= benchmark (consumer 1人に ORDERS 件, in-memory DAO)
+    filter-after-query (CREATION_DATE_INDEX を MAX_PAGE_SIZE 件ずつ Query し、読んだ Item を status / keyword で
+    絞り込む。FilterExpression と同じく読んだ Item 全てが RCU になる) と、ORDER_STATE_INDEX / Keyword Item で
+    PAGE_SIZE 件の1 page を読む時の、読んだ Item の数・RCU (eventually consistent)・request の回数を比べる。
+    in-memory の Query は table の全 Item を走査するので、時間ではなく DynamoDB が読む量を測る。
+
+    cd application-food_delivery
+    PYTHONPATH=order_history_service/order_history_function \
+        python order_history_service/benchmarks/bench_order_history_filters.py
+"""
+import math
+import os
+from order_history_layers.service import events
+from order_history_layers.service import service
+from order_history_layers.store import order_history_dao
+
+ORDERS = 10_000
+PAGE_SIZE = 20
+CONSUMER_ID = 1
+MENUS = ['Curry Rice', 'Hamburger', 'Pad Thai', 'Green Curry', 'Fried Rice', 'Gyoza', 'Salad',
+         'Spring Roll', 'Tom Yum', 'Udon', 'Soba', 'Tempura', 'Katsu Don', 'Pho', 'Steak',
+         'Pizza', 'Pasta', 'Sushi', 'Ice Cream', 'Ramen']
+# (event, n, r): i % n == r の order の状態。CANCELLED 2%, REJECTED 1%, その他は APPROVED
+STATE_EVENTS = [(events.OrderCancelled, 50, 1), (events.OrderRejected, 100, 2)]
+
+
+def item_size(item: dict) -> int:
+    """ attribute 名 + 値の大きさ (DynamoDB の Item size の近似) """
+    return len(repr(item).encode())
+
+
+class MeteredDao(order_history_dao.InMemoryDao):
+    """ Query / BatchGetItem の回数と読んだ Item の RCU を数える """
+
+    def __init__(self):
+        super().__init__()
+        self.requests = 0
+        self.read_units = 0.0
+
+    def meter(self, items):
+        self.requests += 1
+        self.read_units += math.ceil(sum(item_size(item) for item in items) / 4096) * 0.5
+
+    def query(self, request: dict) -> dict:
+        resp = super().query(request)
+        self.meter(resp['Items'])
+        return resp
+
+    def get_orders(self, order_ids: list[str]) -> list[dict]:
+        items = super().get_orders(order_ids)
+        self.meter(items)
+        return items
+
+
+def envelope(event_type, event_id, order_id) -> dict:
+    return {'aggregate': 'ORDER', 'aggregate_id': order_id, 'event_type': event_type,
+            'event_id': event_id, 'timestamp': '2023-01-10T07:53:40.478405Z'}
+
+
+def load(dao) -> None:
+    order_history_service = service.OrderHistoryService(dao)
+    for i in range(ORDERS):
+        order_id = f'{i:032x}'
+        # 1 order に 2〜3 menu。Ramen は 20 order に 1回だけ
+        menu_names = [MENUS[(i * 7 + j * 3) % 18] for j in range(2 + i % 2)] + (['Ramen'] if i % 20 == 0 else [])
+        order_history_service.create_order(events.OrderCreated.from_event({
+            **envelope('OrderCreated', 1, order_id),
+            'order_id': order_id,
+            'order_details': {
+                'consumer_id': CONSUMER_ID, 'restaurant_id': 27,
+                'order_line_items': [{'menu_id': f'{j:06}', 'name': name,
+                                      'price': {'value': 800, 'currency': 'JPY'}, 'quantity': 1}
+                                     for j, name in enumerate(menu_names)],
+                'order_total': {'value': 800 * len(menu_names), 'currency': 'JPY'},
+            },
+            'delivery_information': {
+                'delivery_time': '2022-11-30T05:00:30.001000Z',
+                'delivery_address': {'street1': '9 Amazing View', 'street2': 'Soi 8',
+                                     'city': 'Oakland', 'state': 'CA', 'zip': '94612'},
+            },
+        }))
+        event_class = next((event_class for event_class, n, r in STATE_EVENTS if i % n == r), events.OrderAuthorized)
+        order_history_service.update_order_state(
+            event_class(**envelope(event_class.__name__, 2, order_id), order_id=order_id))
+
+
+def filter_after_query(dao, order_history_filter) -> list:
+    """ CREATION_DATE_INDEX の page を読みながら絞り込み、PAGE_SIZE 件になるまで続ける """
+    orders, token = [], None
+    while len(orders) < PAGE_SIZE:
+        page = dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(page_size=order_history_dao.MAX_PAGE_SIZE,
+                                                                          start_key_token=token))
+        for order in page.orders:
+            names = ' '.join(line_item.name for line_item in order.order_line_items)
+            if (order_history_filter.status in (None, order.order_state.value)
+                    and (order_history_filter.keyword is None
+                         or set(order_history_dao.tokenize(order_history_filter.keyword))
+                         <= set(order_history_dao.tokenize(names)))):
+                orders.append(order)
+        token = page.next_token
+        if token is None:
+            break
+    return orders[:PAGE_SIZE]
+
+
+def indexed(dao, order_history_filter) -> list:
+    order_history_filter.page_size = PAGE_SIZE
+    return dao.find_order_history(CONSUMER_ID, order_history_filter).orders
+
+
+def measure(dao, find, order_history_filter):
+    dao.items_read, dao.requests, dao.read_units = 0, 0, 0.0
+    orders = find(dao, order_history_filter)
+    return len(orders), dao.items_read, dao.read_units, dao.requests
+
+
+def main():
+    os.environ.setdefault('ORDER_HISTORY_PAGE_TOKEN_KEY', 'bench-page-token-key')  # next_token の署名
+    dao = MeteredDao()
+    load(dao)
+    print(f'orders: {ORDERS}, page size: {PAGE_SIZE}')
+    print(f'{"filter":<20} {"method":<18} {"orders":>6} {"items read":>10} {"RCU":>8} {"requests":>8}')
+    for name, make_filter in [('status=APPROVED', lambda: dao.OrderHistoryFilter(status='APPROVED')),
+                              ('status=REJECTED', lambda: dao.OrderHistoryFilter(status='REJECTED')),
+                              ('keyword=curry', lambda: dao.OrderHistoryFilter(keyword='curry')),
+                              ('keyword=ramen', lambda: dao.OrderHistoryFilter(keyword='ramen'))]:
+        for method, find in [('filter-after-query', filter_after_query), ('index', indexed)]:
+            orders, items_read, read_units, requests = measure(dao, find, make_filter())
+            print(f'{name:<20} {method:<18} {orders:>6} {items_read:>10} {read_units:>8.1f} {requests:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Order History projection engine benchmark
+    1. UpdateItem request の組み立て: projection.to_update_request() で compile_update() の cache あり / なし
+       (なしは表から毎回 UpdateExpression / ConditionExpression / ExpressionAttributeNames を組み立てる)
+    2. ORDERS 件の order の pending event (Order / Kitchen / Delivery の state 変更 4件) を
+       1 event 毎の UpdateItem と、order 毎に1つにまとめた UpdateItem で in-memory DAO に書き込み、
+       UpdateItem と consumer_id の GetItem の回数 (DynamoDB の round trip) と WCU (ceil(Item size / 1KB)) を比べる。
+
+    cd application-food_delivery
+    PYTHONPATH=order_history_service/order_history_function \
+        python order_history_service/benchmarks/bench_projection_engine.py
+"""
+import math
+import timeit
+from order_history_layers.service import events
+from order_history_layers.service import service
+from order_history_layers.store import order_history_dao
+from order_history_layers.store import projection
+
+ORDERS = 1_000
+NUMBER = 20_000
+TIMESTAMP = '2023-01-10T07:53:41.478405Z'
+
+
+def envelope(aggregate, event_class, event_id, order_id) -> dict:
+    return {'aggregate': aggregate, 'aggregate_id': order_id, 'event_type': event_class.__name__,
+            'event_id': event_id, 'timestamp': TIMESTAMP}
+
+
+def pending_events(order_id) -> list:
+    return [
+        events.OrderAuthorized(**envelope('ORDER', events.OrderAuthorized, 2, order_id), order_id=order_id),
+        events.TicketAccepted(**envelope('TICKET', events.TicketAccepted, 1, order_id), ticket_id=order_id,
+                              ready_by='2022-11-30T05:00:30.001000Z'),
+        events.DeliveryPickedup(**envelope('DELIVERY', events.DeliveryPickedup, 1, order_id), delivery_id=order_id),
+        events.DeliveryDelivered(**envelope('DELIVERY', events.DeliveryDelivered, 2, order_id), delivery_id=order_id),
+    ]
+
+
+class MeteredDao(order_history_dao.InMemoryDao):
+    """ UpdateItem / GetItem の回数と METADATA Item の WCU を数える """
+
+    def __init__(self):
+        super().__init__()
+        self.updates = 0
+        self.get_items = 0
+        self.write_units = 0
+
+    def write(self, request: dict):
+        super().write(request)
+        if 'Key' in request:
+            self.updates += 1
+            item = self.items[(request['Key']['PK']['S'], request['Key']['SK']['S'])]
+            self.write_units += math.ceil(len(repr(item).encode()) / 1024)
+
+    def find_consumer_id(self, order_id):
+        self.get_items += 1
+        return super().find_consumer_id(order_id)
+
+
+def load(dao) -> list[str]:
+    order_history_service = service.OrderHistoryService(dao)
+    order_ids = [f'{i:032x}' for i in range(ORDERS)]
+    for order_id in order_ids:
+        order_history_service.create_order(events.OrderCreated.from_event({
+            **envelope('ORDER', events.OrderCreated, 1, order_id),
+            'order_id': order_id,
+            'order_details': {
+                'consumer_id': 1, 'restaurant_id': 27,
+                'order_line_items': [{'menu_id': '000001', 'name': 'Curry Rice',
+                                      'price': {'value': 800, 'currency': 'JPY'}, 'quantity': 2}],
+                'order_total': {'value': 1600, 'currency': 'JPY'},
+            },
+            'delivery_information': {
+                'delivery_time': '2022-11-30T05:00:30.001000Z',
+                'delivery_address': {'street1': '9 Amazing View', 'street2': 'Soi 8',
+                                     'city': 'Oakland', 'state': 'CA', 'zip': '94612'},
+            },
+        }))
+    return order_ids
+
+
+def build_time(compile_update) -> float:
+    """ 1 event の UpdateItem request の組み立て (us) """
+    original = projection.compile_update
+    projection.compile_update = compile_update
+    try:
+        pending = pending_events('a' * 32)
+        seconds = timeit.timeit(lambda: [projection.to_update_request('OrderHistory', 'a' * 32, [event],
+                                                                      order_history_dao.ORDER_HISTORY_CODEC,
+                                                                      {'consumer_id': 1})
+                                         for event in pending], number=NUMBER)
+        return seconds / NUMBER / len(pending) * 1e6
+    finally:
+        projection.compile_update = original
+
+
+def round_trips(merge: bool) -> tuple:
+    dao = MeteredDao()
+    order_ids = load(dao)
+    for order_id in order_ids:
+        pending = pending_events(order_id)
+        if merge:
+            dao.project_events(order_id, pending)
+        else:
+            for event in pending:
+                dao.project_events(order_id, [event])
+    states = {(order.order_state.value, order.ticket_state.value, order.delivery_state.value)
+              for order in map(dao.find_by_id, order_ids)}
+    assert states == {('APPROVED', 'ACCEPTED', 'DELIVERED')}, states
+    return dao.updates, dao.get_items, dao.write_units
+
+
+def main():
+    print(f'request build (per event, {NUMBER} x 4 events)')
+    print(f'  compile_update cached     {build_time(projection.compile_update):6.2f} us')
+    print(f'  compile_update uncached   {build_time(projection.compile_update.__wrapped__):6.2f} us')
+    print(f'\norders: {ORDERS}, pending events per order: 4 (Order 1, Kitchen 1, Delivery 2)')
+    print(f'{"write":<10} {"UpdateItem":>10} {"GetItem":>8} {"WCU":>6}')
+    for name, merge in [('per-event', False), ('merged', True)]:
+        updates, get_items, write_units = round_trips(merge)
+        print(f'{name:<10} {updates:>10} {get_items:>8} {write_units:>6}')
+
+
+if __name__ == '__main__':
+    main()
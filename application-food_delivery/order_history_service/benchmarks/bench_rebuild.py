@@ -0,0 +1,119 @@
+"""
+Order History rebuild benchmark (in-memory, DynamoDB の latency は sleep で模擬する)
+    ORDERS 件の order の event (OrderCreated, OrderAuthorized, TicketAccepted, DeliveryPickedup, 半数は OrderCancelled)
+    を rebuild.InMemoryRebuild で rebuild し、worker の数毎の orders/秒 と、REBUILD_ORDERS 件の見積もり時間を出す。
+        Scan:           1 page (PAGE_SIZE Item, 約1MB) 毎に SCAN_LATENCY 秒
+        BatchWriteItem: 25 Item 毎に WRITE_LATENCY 秒
+    latency 0 の行は1 process の CPU (decode / projection / encode) の上限。latency は sleep (GIL を離す) なので
+    worker で重なるが、CPU の処理は重ならない。実際の table では max_wcu (table の WCU) も上限になる。
+
+    cd application-food_delivery
+    PYTHONPATH=order_history_service/order_history_function \
+        python order_history_service/benchmarks/bench_rebuild.py
+"""
+import os
+import tempfile
+import time
+from order_history_layers.store import dynamo_codec
+from order_history_layers.store import order_history_dao
+from order_history_layers.store import rebuild
+
+ORDERS = 5_000
+REBUILD_ORDERS = 1_000_000
+PAGE_SIZE = 2_000
+SCAN_LATENCY = 0.05
+WRITE_LATENCY = 0.015
+SEGMENTS = 16
+SHARDS = 64
+WORKERS = [1, 8, 32]
+MAX_WCU = [10_000, 40_000]
+TIMESTAMP = '2023-01-10T07:53:41.478405Z'
+ORDER_DETAILS = {
+    'consumer_id': 4, 'restaurant_id': 27,
+    'order_line_items': [{'menu_id': '000001', 'name': 'Curry Rice',
+                          'price': {'value': 800, 'currency': 'JPY'}, 'quantity': 3},
+                         {'menu_id': '000002', 'name': 'Hamburger',
+                          'price': {'value': 1000, 'currency': 'JPY'}, 'quantity': 2}],
+    'order_total': {'value': 4400, 'currency': 'JPY'},
+}
+DELIVERY_INFORMATION = {
+    'delivery_time': '2022-11-30T05:00:30.001000Z',
+    'delivery_address': {'street1': '9 Amazing View', 'street2': 'Soi 8',
+                         'city': 'Oakland', 'state': 'CA', 'zip': '94612'},
+}
+CODEC = dynamo_codec.ItemCodec({})
+
+
+def event_item(aggregate, event_type, event_id, aggregate_id, **attributes) -> dict:
+    return CODEC.encode({'PK': f'{aggregate}#{aggregate_id}', 'SK': f'EVENTTYPE#{event_type}#EVENTID#{event_id}',
+                         'timestamp': TIMESTAMP, 'event_id': event_id, **attributes})
+
+
+def event_tables() -> dict:
+    tables = {'OrderEvent': [], 'KitchenEvent': [], 'DeliveryEvent': []}
+    for i in range(ORDERS):
+        order_id = f'{i:032x}'
+        tables['OrderEvent'] += [
+            event_item('ORDER', 'OrderCreated', 10 * i + 1, order_id, order_id=order_id,
+                       order_details=ORDER_DETAILS, delivery_information=DELIVERY_INFORMATION),
+            event_item('ORDER', 'OrderAuthorized', 10 * i + 2, order_id, order_id=order_id)]
+        tables['KitchenEvent'].append(
+            event_item('TICKET', 'TicketAccepted', 10 * i + 3, order_id, ticket_id=order_id, ready_by=TIMESTAMP))
+        tables['DeliveryEvent'].append(
+            event_item('DELIVERY', 'DeliveryPickedup', 10 * i + 4, order_id, delivery_id=order_id))
+        if i % 2:
+            tables['OrderEvent'].append(event_item('ORDER', 'OrderCancelled', 10 * i + 5, order_id, order_id=order_id))
+    return tables
+
+
+class SlowDao(order_history_dao.InMemoryDao):
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+
+    def write_items(self, items: list[dict]):
+        time.sleep(self.latency)
+        super().write_items(items)
+
+
+class SlowRebuild(rebuild.InMemoryRebuild):
+    def __init__(self, *args, latency: float, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latency = latency
+
+    def scan_page(self, request: dict) -> dict:
+        time.sleep(self.latency)
+        return super().scan_page(request)
+
+
+def measure(tables, workers, scan_latency, write_latency) -> tuple[float, dict]:
+    with tempfile.TemporaryDirectory() as work_dir:
+        rebuilder = SlowRebuild(SlowDao(write_latency), tables, work_dir, page_size=PAGE_SIZE, latency=scan_latency,
+                                segments=SEGMENTS, shards=SHARDS, workers=workers)
+        start = time.perf_counter()
+        stats = rebuilder.run()
+        return time.perf_counter() - start, stats
+
+
+def main():
+    os.environ['LOG_LEVEL'] = 'WARNING'
+    tables = event_tables()
+    print(f'orders: {ORDERS}, segments: {SEGMENTS} x {len(tables)} tables, shards: {SHARDS}, '
+          f'scan latency: {SCAN_LATENCY * 1000:.0f}ms/page, write latency: {WRITE_LATENCY * 1000:.0f}ms/batch')
+    print(f'{"workers":>7} {"latency":>7} {"seconds":>8} {"orders/s":>9} {f"{REBUILD_ORDERS:,} orders":>18}')
+    wcu_per_order = None
+    for workers in WORKERS:
+        for scan_latency, write_latency in [(0, 0), (SCAN_LATENCY, WRITE_LATENCY)]:
+            seconds, stats = measure(tables, workers, scan_latency, write_latency)
+            wcu_per_order = stats['write_units'] / stats['orders']
+            rate = stats['orders'] / seconds
+            print(f'{workers:>7} {"yes" if scan_latency else "no":>7} {seconds:>8.2f} {rate:>9.0f} '
+                  f'{REBUILD_ORDERS / rate / 60:>14.1f} min')
+    print(f'WCU/order: {wcu_per_order:.1f} (Order Item + Keyword Item)')
+    for max_wcu in MAX_WCU:
+        print(f'max_wcu {max_wcu:>6}: {max_wcu / wcu_per_order:>7.0f} orders/s, '
+              f'{REBUILD_ORDERS / (max_wcu / wcu_per_order) / 60:.1f} min for {REBUILD_ORDERS:,} orders')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Order History projection benchmark: EventBridge -> Lambda (event 毎) vs EventBridge -> SQS -> Lambda (batch)
+    ORDERS 件の order の OrderCreated / OrderAuthorized / DeliveryPickedup / DeliveryDelivered を
+    controller.eventbus_invocation() (1 event で1回起動) と controller.sqs_invocation() (BATCH_SIZE 件で1回起動) で
+    in-memory DAO に projection し、Lambda の起動回数・METADATA Item の書き込み回数 (PutItem / UpdateItem)・
+    WCU・consumer_id の GetItem の回数を DynamoDB の計算方法で比べる。
+        WCU: ceil(Item size / 1KB)。UpdateItem は更新前と更新後の大きい方。
+        Keyword Item (BatchWriteItem) はどちらも OrderCreated 毎に同じ数なので含めない。
+    event の届き方を2通り測る。
+        burst:  1 order の event が続けて届く (batch 内で order 毎にまとめられる)
+        spread: event の種類毎に全 order 分が届く (batch 内の order は全て別。まとめられるのは起動回数だけ)
+
+    cd application-food_delivery
+    PYTHONPATH=order_history_service/order_history_function \
+        python order_history_service/benchmarks/bench_sqs_batching.py
+"""
+import decimal
+import json
+import math
+from order_history_layers.presentation import controller
+from order_history_layers.store import order_history_dao
+
+ORDERS = 1_000
+BATCH_SIZE = 100
+
+
+def value_size(attribute_value: dict) -> int:
+    [(dynamodb_type, value)] = attribute_value.items()
+    if dynamodb_type == 'S':
+        return len(value.encode())
+    if dynamodb_type == 'N':
+        digits = len(decimal.Decimal(value).normalize().as_tuple().digits)
+        return (digits + 1) // 2 + 1
+    if dynamodb_type in ('BOOL', 'NULL'):
+        return 1
+    if dynamodb_type == 'M':
+        return 3 + sum(len(k.encode()) + value_size(v) + 1 for k, v in value.items())
+    if dynamodb_type == 'L':
+        return 3 + sum(value_size(v) + 1 for v in value)
+    return len(value)
+
+
+def item_size(item: dict) -> int:
+    return sum(len(name.encode()) + value_size(value) for name, value in item.items())
+
+
+class MeteredDao(order_history_dao.InMemoryDao):
+    """ METADATA Item の書き込み回数 / WCU と consumer_id の GetItem の回数を数える """
+
+    def __init__(self):
+        super().__init__()
+        self.write_requests = 0
+        self.write_units = 0
+        self.get_items = 0
+
+    def write(self, request: dict):
+        key_attributes = request['Key'] if 'Key' in request else request['Item']
+        key = (key_attributes['PK']['S'], key_attributes['SK']['S'])
+        before = item_size(self.items.get(key, {}))
+        self.write_requests += 1
+        try:
+            super().write(request)
+        finally:  # 条件を満たさない書き込みも WCU を消費する
+            self.write_units += max(math.ceil(max(before, item_size(self.items.get(key, {}))) / 1024), 1)
+
+    def find_consumer_id(self, order_id):
+        self.get_items += 1
+        return super().find_consumer_id(order_id)
+
+
+def envelope(aggregate, event_type, event_id, order_id) -> dict:
+    source = 'com.order.created' if aggregate == 'ORDER' else 'com.delivery.created'
+    return {'source': source, 'detail-type': f'{aggregate.title()}Created',
+            'detail': {'aggregate': aggregate, 'aggregate_id': order_id, 'event_type': event_type,
+                       'event_id': str(event_id), 'timestamp': '2023-01-10T07:53:40.478405Z'}}
+
+
+def order_events(i) -> list[dict]:
+    order_id = f'{i:032x}'
+    created = envelope('ORDER', 'OrderCreated', 1, order_id)
+    created['detail'].update({
+        'order_id': order_id,
+        'order_details': {
+            'consumer_id': i % 100, 'restaurant_id': 27,
+            'order_line_items': [{'menu_id': f'{j:06}', 'name': name, 'price': {'value': 800, 'currency': 'JPY'},
+                                  'quantity': 1} for j, name in enumerate(['Curry Rice', 'Gyoza', 'Pad Thai'])],
+            'order_total': {'value': 2400, 'currency': 'JPY'},
+        },
+        'delivery_information': {
+            'delivery_time': '2022-11-30T05:00:30.001000Z',
+            'delivery_address': {'street1': '9 Amazing View', 'street2': 'Soi 8',
+                                 'city': 'Oakland', 'state': 'CA', 'zip': '94612'},
+        },
+    })
+    authorized = envelope('ORDER', 'OrderAuthorized', 2, order_id)
+    authorized['detail']['order_id'] = order_id
+    pickedup = envelope('DELIVERY', 'DeliveryPickedup', 1, order_id)
+    delivered = envelope('DELIVERY', 'DeliveryDelivered', 2, order_id)
+    for event in (pickedup, delivered):
+        event['detail']['delivery_id'] = order_id
+    return [created, authorized, pickedup, delivered]
+
+
+def arrivals(arrival: str) -> list[dict]:
+    events_ = [order_events(i) for i in range(ORDERS)]
+    if arrival == 'burst':
+        return [event for order_events_ in events_ for event in order_events_]
+    return [order_events_[n] for n in range(4) for order_events_ in events_]
+
+
+def per_event(eventbridge_events) -> int:
+    for event in eventbridge_events:
+        controller.eventbus_invocation(event)
+    return len(eventbridge_events)
+
+
+def batched(eventbridge_events) -> int:
+    invocations = 0
+    for i in range(0, len(eventbridge_events), BATCH_SIZE):
+        resp = controller.sqs_invocation({'Records': [
+            {'messageId': str(i + j), 'body': json.dumps(event)}
+            for j, event in enumerate(eventbridge_events[i:i + BATCH_SIZE])]})
+        assert resp['batchItemFailures'] == []
+        invocations += 1
+    return invocations
+
+
+def measure(invoke, arrival) -> tuple:
+    eventbridge_events = arrivals(arrival)  # from_event() は event の dict を書き換えるので毎回作る
+    dao = MeteredDao()
+    controller.order_history_dao.DynamoDbDao = lambda: dao
+    controller.handler.cache_clear()
+    invocations = invoke(eventbridge_events)
+    final_states = {(item['order_state']['S'], item['delivery_state']['S'])
+                    for (pk, _), item in dao.items.items() if pk.startswith('ORDER#')}
+    assert final_states == {('APPROVED', 'DELIVERED')}, final_states
+    return invocations, dao.write_requests, dao.write_units, dao.get_items
+
+
+def main():
+    print(f'orders: {ORDERS}, events: {ORDERS * 4}, batch size: {BATCH_SIZE}')
+    print(f'{"arrival":<8} {"ingestion":<10} {"invocations":>11} {"writes":>7} {"WCU":>6} {"GetItem":>8}')
+    for arrival in ['burst', 'spread']:
+        for name, invoke in [('per-event', per_event), ('sqs batch', batched)]:
+            invocations, writes, write_units, get_items = measure(invoke, arrival)
+            print(f'{arrival:<8} {name:<10} {invocations:>11} {writes:>7} {write_units:>6} {get_items:>8}')
+
+
+if __name__ == '__main__':
+    main()
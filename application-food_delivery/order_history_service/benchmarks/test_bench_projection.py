@@ -0,0 +1,102 @@
+"""
+OrderHistoryService projection benchmark (pytest-benchmark, in-memory DAO)
+    order_history_dao.InMemoryDao で OrderHistoryService を組み立て、OrderCreated / OrderAuthorized /
+    DeliveryPickedup / DeliveryDelivered の projection と GET /orders (find_order_history の1 page) を
+    I/O なしで測る。DAO には consumer 1人あたり ORDERS 件の order を入れておく。
+
+    cd application-food_delivery
+    PYTHONPATH=order_history_service/order_history_function \
+        python -m pytest order_history_service/benchmarks/test_bench_projection.py
+
+    profile: --benchmark-cprofile=cumtime
+"""
+import itertools
+import uuid
+import pytest
+from order_history_layers.service import commands
+from order_history_layers.service import events
+from order_history_layers.service import service
+from order_history_layers.store import order_history_dao
+
+pytest.importorskip('pytest_benchmark')
+
+ORDERS = 100
+LINE_ITEMS = 5
+CONSUMER_ID = 1
+
+_event_ids = itertools.count(1)
+
+
+def envelope(event_type, order_id) -> dict:
+    return {'aggregate': 'ORDER', 'aggregate_id': order_id, 'event_type': event_type,
+            'event_id': next(_event_ids), 'timestamp': '2023-01-10T07:53:40.478405Z'}
+
+
+def order_created(order_id, consumer_id=CONSUMER_ID) -> events.OrderCreated:
+    return events.OrderCreated.from_event({
+        **envelope('OrderCreated', order_id),
+        'order_id': order_id,
+        'order_details': {
+            'consumer_id': consumer_id, 'restaurant_id': 27,
+            'order_line_items': [{'menu_id': f'{i:06}', 'name': f'menu-{i}',
+                                  'price': {'value': 800, 'currency': 'JPY'}, 'quantity': 2}
+                                 for i in range(LINE_ITEMS)],
+            'order_total': {'value': 800 * 2 * LINE_ITEMS, 'currency': 'JPY'},
+        },
+        'delivery_information': {
+            'delivery_time': '2022-11-30T05:00:30.001000Z',
+            'delivery_address': {'street1': '9 Amazing View', 'street2': 'Soi 8',
+                                 'city': 'Oakland', 'state': 'CA', 'zip': '94612'},
+        },
+    })
+
+
+@pytest.fixture(autouse=True)
+def page_token_key(monkeypatch):
+    monkeypatch.setenv('ORDER_HISTORY_PAGE_TOKEN_KEY', 'bench-page-token-key')  # next_token の署名
+
+
+@pytest.fixture(scope='module')
+def order_history_service():
+    order_history_service = service.OrderHistoryService(order_history_dao.InMemoryDao())
+    for _ in range(ORDERS):
+        order_history_service.create_order(order_created(uuid.uuid4().hex))
+    return order_history_service
+
+
+def test_order_created(benchmark, order_history_service):
+    benchmark.pedantic(order_history_service.create_order,
+                       setup=lambda: ((order_created(uuid.uuid4().hex, consumer_id=2),), {}),
+                       rounds=1000)
+
+
+def test_order_lifecycle(benchmark, order_history_service):
+    """ OrderCreated -> OrderAuthorized -> DeliveryPickedup -> DeliveryDelivered """
+    def setup():
+        order_id = uuid.uuid4().hex
+        return (order_created(order_id, consumer_id=3),
+                events.OrderAuthorized(**envelope('OrderAuthorized', order_id), order_id=order_id),
+                events.DeliveryPickedup(**envelope('DeliveryPickedup', order_id), delivery_id=order_id),
+                events.DeliveryDelivered(**envelope('DeliveryDelivered', order_id), delivery_id=order_id)), {}
+
+    def order_lifecycle(created, authorized, pickedup, delivered):
+        order_history_service.create_order(created)
+        order_history_service.update_order_state(authorized)
+        order_history_service.update_delivery_state(pickedup)
+        order_history_service.update_delivery_state(delivered)
+
+    benchmark.pedantic(order_lifecycle, setup=setup, rounds=1000)
+
+
+def test_get_order_history(benchmark, order_history_service):
+    page = benchmark(order_history_service.get_order_history, commands.GetOrders(consumer_id=CONSUMER_ID))
+
+    assert len(page.orders) == order_history_dao.DEFAULT_PAGE_SIZE
+
+
+def test_get_order_history_projected(benchmark, order_history_service):
+    """ GET /orders?fields=order_id,order_state: Order を組み立てない """
+    page = benchmark(order_history_service.get_order_history,
+                     commands.GetOrders(consumer_id=CONSUMER_ID, fields=['order_id', 'order_state']))
+
+    assert set(page.orders[0]) == {'order_id', 'order_state'}
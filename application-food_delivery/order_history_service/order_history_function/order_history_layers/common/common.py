@@ -1,37 +1,137 @@
 from __future__ import annotations  # classの依存関係の許可
 import dataclasses
 import decimal
+import functools
+import operator
 from order_history_layers.common import exceptions
 
 
-@dataclasses.dataclass(frozen=True, order=True, unsafe_hash=True)  # Todo 比較のためにhash値を使えるようにする！
 class Money:
-    value: decimal.Decimal | int  # Decimal or int
-    currency: str = 'JPY'
+    """
+    金額 (immutable)
+        value を 10 ** -scale 単位の整数 (amount) で持つ。JPY 800 は (800, 0)、USD 8.50 は (850, 2)。
+        同じ scale の加減算、数量との積、line item の合計 (Money.total) は int の演算だけで行い、
+        value を参照した時 (DynamoDB / JSON の境界) に int または Decimal に正確に戻す。
+    """
+    __slots__ = ('amount', 'scale', 'currency')
+
+    def __init__(self, value: decimal.Decimal | int, currency: str = 'JPY'):
+        amount, scale = _to_minor_units(value)
+        object.__setattr__(self, 'amount', amount)
+        object.__setattr__(self, 'scale', scale)
+        object.__setattr__(self, 'currency', currency)
+
+    @classmethod
+    def of_minor_units(cls, amount: int, scale: int, currency: str) -> Money:
+        money = object.__new__(cls)
+        object.__setattr__(money, 'amount', amount)
+        object.__setattr__(money, 'scale', scale)
+        object.__setattr__(money, 'currency', currency)
+        return money
+
+    @classmethod
+    def total(cls, prices: list[Money], quantities: list[int]) -> Money:
+        """ sum(price * quantity) currency の確認は1回、同じ scale なら int の積和だけで求める """
+        first = prices[0]
+        if any(price.currency != first.currency for price in prices):
+            raise exceptions.InvalidCurrency(f'{first.currency}')
+        counts = quantities
+        if not all(type(q) is int for q in quantities):  # DynamoDB の Number は Decimal
+            counts = [q if type(q) is int else int(q) for q in quantities]
+        if all(price.scale == first.scale for price in prices) and counts == quantities:
+            return cls.of_minor_units(sum(map(operator.mul, [price.amount for price in prices], counts)),
+                                      first.scale, first.currency)
+        return functools.reduce(operator.add, map(operator.mul, prices, quantities))
+
+    @property
+    def value(self) -> decimal.Decimal | int:
+        if self.scale == 0:
+            return self.amount
+        return decimal.Decimal(self.amount).scaleb(-self.scale)
+
+    def __setattr__(self, name, value):
+        raise dataclasses.FrozenInstanceError(f'cannot assign to field {name!r}')
+
+    def __delattr__(self, name):
+        raise dataclasses.FrozenInstanceError(f'cannot delete field {name!r}')
+
+    def __reduce__(self):  # copy.deepcopy / dataclasses.asdict / pickle
+        return self.of_minor_units, (self.amount, self.scale, self.currency)
+
+    def __repr__(self):
+        return f'Money(value={self.value!r}, currency={self.currency!r})'
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        if self.scale == other.scale:
+            return self.amount == other.amount and self.currency == other.currency
+        return self.value == other.value and self.currency == other.currency
+
+    def __hash__(self):
+        return hash((self.value, self.currency))
+
+    def __lt__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.value, self.currency) < (other.value, other.currency)
+
+    def __le__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.value, self.currency) <= (other.value, other.currency)
+
+    def __gt__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.value, self.currency) > (other.value, other.currency)
+
+    def __ge__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.value, self.currency) >= (other.value, other.currency)
 
     def __add__(self, other: Money) -> Money:
-        if self.currency == other.currency:
-            return Money(self.value + other.value, other.currency)
-        else:
-            raise exception.InvalidCurrency(f'{self.currency}')
+        if self.currency != other.currency:
+            raise exceptions.InvalidCurrency(f'{self.currency}')
+        if self.scale == other.scale:
+            return self.of_minor_units(self.amount + other.amount, self.scale, self.currency)
+        return Money(self.value + other.value, other.currency)
 
     def __sub__(self, other: Money) -> Money:
-        if self.currency == other.currency:
-            return Money(self.value - other.value, other.currency)
-        else:
-            raise exception.InvalidCurrency(f'{self.currency}')
+        if self.currency != other.currency:
+            raise exceptions.InvalidCurrency(f'{self.currency}')
+        if self.scale == other.scale:
+            return self.of_minor_units(self.amount - other.amount, self.scale, self.currency)
+        return Money(self.value - other.value, other.currency)
 
     def __mul__(self, other: int) -> Money:
+        if type(other) is int:
+            return self.of_minor_units(self.amount * other, self.scale, self.currency)
         return Money(self.value * other, self.currency)
 
     def to_dict(self):
-        return dataclasses.asdict(self)
+        return {'value': self.value, 'currency': self.currency}
 
     @classmethod
     def from_dict(cls, d):
         return cls(**d)
 
 
+def _to_minor_units(value) -> tuple[int, int]:
+    """ value -> (amount, scale)  value == amount * 10 ** -scale """
+    if type(value) is int:
+        return value, 0
+    if not isinstance(value, decimal.Decimal):
+        value = decimal.Decimal(str(value))  # int の subclass, float, str
+    if not value.is_finite():
+        raise ValueError(f'Money value: {value}')
+    sign, digits, exponent = value.as_tuple()
+    if exponent >= 0:
+        return int(value), 0
+    return int(value.scaleb(-exponent)), -exponent
+
+
 @dataclasses.dataclass(unsafe_hash=True, frozen=True)
 class Address:
     street1: str
@@ -45,6 +145,12 @@ class Address:
         return cls(**d)
 
     def to_dict(self):
-        return dataclasses.asdict(self)
+        return {
+            'street1': self.street1,
+            'street2': self.street2,
+            'city': self.city,
+            'state': self.state,
+            'zip': self.zip,
+        }
 
 
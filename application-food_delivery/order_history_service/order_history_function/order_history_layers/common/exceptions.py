@@ -44,3 +44,15 @@ class ItemNotFoundException(Exception):
 
 class InvalidSagaCmd(Exception):
     pass
+
+
+class InvalidQueryParameter(Exception):
+    pass
+
+
+class InvalidPageToken(InvalidQueryParameter):
+    pass
+
+
+class PageTokenKeyNotConfigured(Exception):
+    pass
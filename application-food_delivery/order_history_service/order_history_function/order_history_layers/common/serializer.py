@@ -0,0 +1,70 @@
+"""
+Domain Model の to_dict() 用
+    json.loads(json.dumps(o, default=encoder_)) と同じ値を、JSON文字列を経由せずに作る。
+    encoder_ で変換していた Decimal / Enum / datetime もここで変換する。
+"""
+import datetime
+import decimal
+import enum
+import math
+
+
+def to_plain(o, parse_float=None):
+    """
+    o: str, int, float, bool, None, Decimal, Enum, datetime.datetime と、それらの dict, list, tuple
+    parse_float: 元の実装が json.loads(..., parse_float=decimal.Decimal) だった場合に指定する
+    """
+    t = type(o)
+    if t is str or t is int or t is bool or o is None:
+        return o
+    if t is dict:
+        return {k if type(k) is str else _to_plain_key(k): to_plain(v, parse_float)
+                for k, v in o.items()}
+    if t is list or t is tuple:
+        return [to_plain(v, parse_float) for v in o]
+    if t is decimal.Decimal:
+        i = int(o)
+        return i if i == o else to_plain(float(o), parse_float)
+
+    # json.dumps()の判定順 (str, int, float, list/tuple, dict, default) に合わせる
+    if isinstance(o, str):
+        return str.__str__(o)
+    if isinstance(o, int):
+        return int(o)
+    if isinstance(o, float):
+        o = float(o)
+        if parse_float is not None and math.isfinite(o):
+            return parse_float(repr(o))
+        return o
+    if isinstance(o, (list, tuple)):
+        return [to_plain(v, parse_float) for v in o]
+    if isinstance(o, dict):
+        return {_to_plain_key(k): to_plain(v, parse_float) for k, v in o.items()}
+    if isinstance(o, decimal.Decimal):
+        return to_plain(int(o) if int(o) == o else float(o), parse_float)
+    if isinstance(o, enum.Enum):
+        return to_plain(o.value, parse_float)
+    if isinstance(o, datetime.datetime):
+        return o.isoformat() + 'Z'
+    raise TypeError(f'{repr(o)} is not serializable')
+
+
+def _to_plain_key(k):
+    # json.dumps()はdictのkeyを文字列にする
+    if isinstance(k, str):
+        return str.__str__(k)
+    if k is True:
+        return 'true'
+    if k is False:
+        return 'false'
+    if k is None:
+        return 'null'
+    if isinstance(k, int):
+        return int.__repr__(k)
+    if isinstance(k, float):
+        if math.isnan(k):
+            return 'NaN'
+        if math.isinf(k):
+            return 'Infinity' if k > 0 else '-Infinity'
+        return float.__repr__(k)
+    raise TypeError(f'keys must be str, int, float, bool or None, not {type(k).__name__}')
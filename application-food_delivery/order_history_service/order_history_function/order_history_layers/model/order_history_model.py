@@ -1,10 +1,13 @@
 from __future__ import annotations  # classの依存関係の許可
 import dataclasses
-import json
-import decimal
 import enum
 import datetime
+from typing import Optional
 from order_history_layers.common import common
+from order_history_layers.common import serializer
+from order_history_layers.common import log
+
+logger = log.get_logger(__name__)
 
 
 class OrderState(enum.Enum):
@@ -16,6 +19,11 @@ class OrderState(enum.Enum):
     CANCELLED = 'CANCELLED'
 
 
+class TicketState(enum.Enum):
+    ACCEPTED = 'ACCEPTED'
+    CANCELLED = 'CANCELLED'
+
+
 class DeliveryState(enum.Enum):
     PICKEDUP = 'PICKEDUP'
     DELIVERED = 'DELIVERED'
@@ -34,9 +42,11 @@ class DeliveryInformation:
         return cls(**d)
 
     def to_dict(self):
-        d = dataclasses.asdict(self)
-        d['delivery_time'] = datetime.datetime.strftime(d['delivery_time'], '%Y-%m-%dT%H:%M:%S.%fZ')
-        return d
+        return {
+            'delivery_time':
+                datetime.datetime.strftime(self.delivery_time, '%Y-%m-%dT%H:%M:%S.%fZ'),
+            'delivery_address': self.delivery_address.to_dict(),
+        }
 
 
 # for Order Created Event
@@ -54,24 +64,12 @@ class OrderDetails:
         return cls(**d)
 
     def to_dict(self):
-        def encoder_(o):
-            if isinstance(o, OrderDetails):
-                return o.__dict__  # Todo: ここがポイント
-            if isinstance(o, OrderLineItem):
-                return o.to_dict()
-            if isinstance(o, common.Address):
-                return o.to_dict()
-            if isinstance(o, common.Money):
-                return o.to_dict()
-            if isinstance(o, decimal.Decimal):
-                if int(o) == o:
-                    return int(o)
-                else:
-                    return float(o)
-            raise TypeError(f'{repr(o)} is not serializable')
-
-        d = json.loads(json.dumps(self, default=encoder_))
-        return d
+        return {
+            'consumer_id': serializer.to_plain(self.consumer_id),
+            'restaurant_id': serializer.to_plain(self.restaurant_id),
+            'order_line_items': [item.to_dict() for item in self.order_line_items],
+            'order_total': serializer.to_plain(self.order_total.to_dict()),
+        }
 
 
 @dataclasses.dataclass
@@ -89,18 +87,12 @@ class OrderLineItem:
         return cls(**d)
 
     def to_dict(self):
-        def encoder_(o):
-            if isinstance(o, OrderLineItem):
-                return o.__dict__  # ここがポイント
-            if isinstance(o, common.Money):
-                return o.to_dict()
-            if isinstance(o, decimal.Decimal):
-                if int(o) == o:
-                    return int(o)
-                else:
-                    return float(o)
-            raise TypeError(f'{repr(o)} is not serializable')
-        return json.loads(json.dumps(self, default=encoder_))
+        return {
+            'menu_id': serializer.to_plain(self.menu_id),
+            'name': serializer.to_plain(self.name),
+            'price': serializer.to_plain(self.price.to_dict()),
+            'quantity': serializer.to_plain(self.quantity),
+        }
 
     # def delta_for_changed_quantity(self, new_quantity: int) -> common.Money:
     #     return self.price * (new_quantity - self.quantity)
@@ -129,6 +121,8 @@ class Order:
                  order_line_items: list[OrderLineItem],
                  delivery_information: DeliveryInformation,
                  delivery_state: DeliveryState = None,
+                 ticket_state: TicketState = None,
+                 ready_by: str = None,
                  ) -> None:
 
         self.order_id = order_id
@@ -138,6 +132,8 @@ class Order:
         self.order_line_items = order_line_items
         self.delivery_information: DeliveryInformation = delivery_information
         self.delivery_state = delivery_state
+        self.ticket_state = ticket_state  # Kitchen Service の Ticket
+        self.ready_by = ready_by
 
     @classmethod
     def create_order(cls,
@@ -145,9 +141,9 @@ class Order:
                      order_details: OrderDetails,
                      delivery_information: DeliveryInformation) -> Order:
 
-        print(f'create_order() order_id: {order_id}')
-        print(f'create_order() order_details: {order_details}')
-        print(f'create_order() delivery_information: {delivery_information}')
+        logger.debug('create_order() order_id: %s', order_id)
+        logger.payload('create_order() order_details', order_details)
+        logger.debug('create_order() delivery_information: %s', delivery_information)
 
         order = Order(order_id=order_id,
                       consumer_id=order_details.consumer_id,
@@ -161,31 +157,18 @@ class Order:
 
     def to_dict(self):
         # for DynamoDB
-        def encoder_(o):
-            if isinstance(o, Order):
-                return o.__dict__
-            if isinstance(o, DeliveryInformation):
-                return o.to_dict()  # ここがポイント
-            if isinstance(o, OrderLineItem):
-                return o.to_dict()
-            if isinstance(o, OrderState):
-                return o.value
-            if isinstance(o, DeliveryState):
-                return o.value
-            if isinstance(o, common.Money):
-                return o.to_dict()
-            if isinstance(o, datetime.datetime):
-                return o.isoformat() + 'Z'
-            if isinstance(o, common.Address):
-                return o.to_dict()
-            if isinstance(o, decimal.Decimal):
-                if int(o) == o:
-                    return int(o)
-                else:
-                    return float(o)
-            raise TypeError(f'{repr(o)} is not serializable')
-
-        return json.loads(json.dumps(self, default=encoder_))
+        # JSON文字列を経由せずにattributeを1回だけ辿る (keyの順序は__init__と同じ)
+        return {
+            'order_id': serializer.to_plain(self.order_id),
+            'consumer_id': serializer.to_plain(self.consumer_id),
+            'restaurant_id': serializer.to_plain(self.restaurant_id),
+            'order_state': serializer.to_plain(self.order_state),
+            'order_line_items': [item.to_dict() for item in self.order_line_items],
+            'delivery_information': serializer.to_plain(self.delivery_information.to_dict()),
+            'delivery_state': serializer.to_plain(self.delivery_state),
+            'ticket_state': serializer.to_plain(self.ticket_state),
+            'ready_by': serializer.to_plain(self.ready_by),
+        }
 
     @classmethod
     def from_dict(cls, d: dict):
@@ -194,4 +177,22 @@ class Order:
         d['order_line_items'] = [OrderLineItem.from_dict(item) for item in d['order_line_items']]
         d['order_state'] = OrderState(d['order_state'])
         d['delivery_state'] = DeliveryState(d['delivery_state']) if d.get('delivery_state') else None
+        d['ticket_state'] = TicketState(d['ticket_state']) if d.get('ticket_state') else None
         return cls(**d)
+
+
+@dataclasses.dataclass
+class OrderHistoryPage:
+    """
+    GET /orders の1 page
+        orders: Order のlist。fields を指定した Query では指定した attribute だけの dict のlist
+        next_token: 次の page の page token。最後の page は None
+    """
+    orders: list
+    next_token: Optional[str] = None
+
+    def to_dict(self):
+        return {
+            'orders': [order.to_dict() if isinstance(order, Order) else order for order in self.orders],
+            'next_token': self.next_token,
+        }
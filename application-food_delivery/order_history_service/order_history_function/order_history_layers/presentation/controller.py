@@ -1,17 +1,25 @@
 import decimal
-import re
+import functools
 import json
-import traceback
 from order_history_layers.common import exceptions
 from order_history_layers.common import json_encoder
 from order_history_layers.service import commands
-from order_history_layers.service import events
 from order_history_layers.service import handlers
 from order_history_layers.store import order_history_dao
 from order_history_layers.model import order_history_model
+from order_history_layers.presentation import router
+from order_history_layers.common import log
+
+logger = log.get_logger(__name__)
+
+ROUTER = router.Router()
+
+
+@functools.lru_cache(maxsize=None)
+def handler() -> handlers.Handler:
+    """ DAO と Handler は最初の invocation で生成する (import 時に DynamoDB client を作らない) """
+    return handlers.Handler(order_history_dao=order_history_dao.DynamoDbDao())
 
-ORDER_HISTORY_DAO = order_history_dao.DynamoDbDao()
-HANDLER = handlers.Handler(order_history_dao=ORDER_HISTORY_DAO)
 
 # -------------------------------------------------
 # Eventbus Invocation
@@ -93,36 +101,64 @@ def eventbus_invocation(event: dict):
         }
     }
     """
-    try:
-        print(f'eventbus_invocation() event: {json.dumps(event, cls=json_encoder.JSONEncoder)}')
-
-        event_source, event_detail, event_type = extract_parameter_from_event(event)
-
-        if event_source == 'com.order.created' and event_type == 'OrderCreated':
-            event_ = events.OrderCreated.from_event(event_detail)
-            HANDLER.events_handler(event_)
-        elif event_source == 'com.order.created' and event_type == 'OrderAuthorized':
-            event_ = events.OrderAuthorized.from_event(event_detail)
-            HANDLER.events_handler(event_)
-        elif event_source == 'com.order.created' and event_type == 'OrderRejected':
-            event_ = events.OrderRejected.from_event(event_detail)
-            HANDLER.events_handler(event_)
-        elif event_source == 'com.order.created' and event_type == 'OrderCancelled':
-            event_ = events.OrderCancelled.from_event(event_detail)
-            HANDLER.events_handler(event_)
-        elif event_source == 'com.delivery.created' and event_type == 'DeliveryPickedup':
-            event_ = events.DeliveryPickedup.from_event(event_detail)
-            HANDLER.events_handler(event_)
-        elif event_source == 'com.delivery.created' and event_type == 'DeliveryDelivered':
-            event_ = events.DeliveryDelivered.from_event(event_detail)
-            HANDLER.events_handler(event_)
+    logger.payload('eventbus_invocation() event', event)
+    handler().events_handler(to_event(event))
+    return None
 
-        else:
-            raise Exception(f"NotSupportEvent: {event_source} : {event_type}")
-        return None
 
-    except Exception as e:
-        raise e
+def to_event(event: dict):
+    """ EventBridge の event (SQS の message の body も同じ) -> events の DomainEventEnvelope """
+    # 更新 (writer path) の module は EventBridge / SQS の invocation でだけ import する
+    from order_history_layers.service import events
+
+    event_source, event_detail, event_type = extract_parameter_from_event(event)
+
+    if event_source == 'com.order.created' and event_type == 'OrderCreated':
+        return events.OrderCreated.from_event(event_detail)
+    elif event_source == 'com.order.created' and event_type == 'OrderAuthorized':
+        return events.OrderAuthorized.from_event(event_detail)
+    elif event_source == 'com.order.created' and event_type == 'OrderRejected':
+        return events.OrderRejected.from_event(event_detail)
+    elif event_source == 'com.order.created' and event_type == 'OrderCancelled':
+        return events.OrderCancelled.from_event(event_detail)
+    elif event_source == 'com.ticket.accepted' and event_type == 'TicketAccepted':
+        return events.TicketAccepted.from_event(event_detail)
+    elif event_source == 'com.ticket.accepted' and event_type == 'TicketCancelled':
+        return events.TicketCancelled.from_event(event_detail)
+    elif event_source == 'com.delivery.created' and event_type == 'DeliveryPickedup':
+        return events.DeliveryPickedup.from_event(event_detail)
+    elif event_source == 'com.delivery.created' and event_type == 'DeliveryDelivered':
+        return events.DeliveryDelivered.from_event(event_detail)
+    else:
+        raise Exception(f"NotSupportEvent: {event_source} : {event_type}")
+
+
+# -------------------------------------------------
+# SQS Invocation (EventBridge Rule -> SQS -> Lambda)
+# -------------------------------------------------
+
+def sqs_invocation(event: dict) -> dict:
+    """
+    SQS の batch (最大100 message) を order ごとにまとめて projection する。
+    message の body は EventBridge の event。
+    解釈できない message と、projection に失敗した order の message を batchItemFailures で返し、
+    SQS にそれらだけを再配信させる。(event source mapping の report_batch_item_failures=True)
+    """
+    from order_history_layers.service import events
+
+    logger.payload('sqs_invocation() event', event)
+    batch = events.EventBatch()
+    failed_message_ids = []
+    for record in event['Records']:
+        try:
+            batch.add(record['messageId'], to_event(json.loads(record['body'])))
+        except Exception as e:
+            logger.exception('messageId: %s, %s', record['messageId'], e)
+            failed_message_ids.append(record['messageId'])
+
+    if batch.orders:
+        failed_message_ids += handler().event_batch_handler(batch)
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_message_ids]}
 
 
 # -------------------------------------------------
@@ -136,203 +172,238 @@ def rest_request(event):
     query_string_parameters = event.get('queryStringParameters')
     body_json = event.get('body', '{}')  # JSON
 
-    print(f'http_method: {http_method}')
-    print(f'query_string_parameters: {query_string_parameters}')
-    print(f'path: {path}')
-    print(f'path_parameters: {path_parameters}')
-    print(f'body_json: {body_json}')
+    logger.debug('http_method: %s', http_method)
+    logger.debug('query_string_parameters: %s', query_string_parameters)
+    logger.debug('path: %s', path)
+    logger.debug('path_parameters: %s', path_parameters)
+    logger.payload('body_json', body_json)
 
     return http_method, query_string_parameters, path, path_parameters, body_json
 
 
+@ROUTER.route('GET', '/orders')
+def get_orders(request: router.Request):
+    """
+    - Get Order History
+    GET /orders?page_size=20&next_token=xxxx&fields=order_id,order_state&status=APPROVED&keyword=curry
+    http_method: GET
+    path: "/orders"
+    path_parameters: None
+    query_string_parameters: None | {"page_size": "20", "next_token": "xxxx", "fields": "order_id,order_state"}
+        page_size: 1 page の件数 (既定 20, 最大 100)
+        next_token: 前の page の response の next_token
+        fields: 返す attribute (既定は全attribute)
+        status: order_state で絞り込む
+        keyword: menu の name に含む単語で絞り込む
+    body: None
+    """
+    # Todo:
+    #  consumer_idは"Lambda Authorizer"で設定し、
+    #  REST API Lambdaではevent.requestContext.authorizer.key を呼び出して取得する
+    #  [API Gateway Lambda オーソライザーを使用する]
+    #  https://docs.aws.amazon.com/ja_jp/apigateway/latest/developerguide/apigateway-use-lambda-authorizer.html
+    #  [Amazon API Gateway Lambda オーソライザーからの出力]
+    #  https://docs.aws.amazon.com/ja_jp/apigateway/latest/developerguide/api-gateway-lambda-authorizer-output.html
+    dummy_request_context = {
+        'requestContext': {
+            'authorizer': {
+                'consumer_id': 4
+            }
+        }
+    }
+    consumer_id = dummy_request_context.get('requestContext').get('authorizer').get('consumer_id')
+
+    query_string_parameters = request.query_string_parameters or {}
+    page_size = query_string_parameters.get('page_size')
+    if page_size is not None:
+        if not page_size.isdigit():
+            raise exceptions.InvalidQueryParameter(f'page_size: {page_size}')
+        page_size = int(page_size)
+    fields = query_string_parameters.get('fields')
+    if fields is not None:
+        fields = [field for field in fields.split(',') if field]
+
+    return commands.GetOrders(consumer_id=consumer_id,
+                              page_size=page_size,
+                              next_token=query_string_parameters.get('next_token'),
+                              fields=fields,
+                              status=query_string_parameters.get('status'),
+                              keyword=query_string_parameters.get('keyword'))
+
+
+@ROUTER.route('GET', '/orders/{order_id:[0-9a-f]+}')  # uuid
+def get_order(request: router.Request):
+    """
+    - Get Order 
+    GET /orders/xxxxxx
+    http_method: GET
+    path: "/orders/dc83abae951c4185ab3780a5b7c5f055"
+    path_parameters: {"order_id": "dc83abae951c4185ab3780a5b7c5f055"}
+    query_string_parameters: None
+    body: None
+    """
+    """
+    {
+        "resource": "/orders/{order_id}",
+        "path": "/orders/4824a7e36cd042c79192e3a4a2641ea1",
+        "httpMethod": "GET",
+        "headers": {
+            "Accept": "*/*",
+            "Accept-Encoding": "gzip, deflate, br",
+            "CloudFront-Forwarded-Proto": "https",
+            "CloudFront-Is-Desktop-Viewer": "true",
+            "CloudFront-Is-Mobile-Viewer": "false",
+            "CloudFront-Is-SmartTV-Viewer": "false",
+            "CloudFront-Is-Tablet-Viewer": "false",
+            "CloudFront-Viewer-ASN": "17676",
+            "CloudFront-Viewer-Country": "JP",
+            "Host": "qnieunod45.execute-api.ap-northeast-1.amazonaws.com",
+            "Postman-Token": "f6e621f7-1475-47fc-8bb9-398068c37ee2",
+            "User-Agent": "PostmanRuntime/7.29.2",
+            "Via": "1.1 28cc684478478d9f9a85bebbb1ed4154.cloudfront.net (CloudFront)",
+            "X-Amz-Cf-Id": "l0JjQBHErviZ3OqmDc1hp_4-qm-9fCwfVQ9_W7ysfmC0bdnojiHMnw==",
+            "X-Amzn-Trace-Id": "Root=1-63c7bc96-379cb58d7705d4474e8eb758",
+            "X-Forwarded-For": "60.116.89.182, 130.176.189.234",
+            "X-Forwarded-Port": "443",
+            "X-Forwarded-Proto": "https"
+        },
+        "multiValueHeaders": {
+            "Accept": [
+                "*/*"
+            ],
+            "Accept-Encoding": [
+                "gzip, deflate, br"
+            ],
+            "CloudFront-Forwarded-Proto": [
+                "https"
+            ],
+            "CloudFront-Is-Desktop-Viewer": [
+                "true"
+            ],
+            "CloudFront-Is-Mobile-Viewer": [
+                "false"
+            ],
+            "CloudFront-Is-SmartTV-Viewer": [
+                "false"
+            ],
+            "CloudFront-Is-Tablet-Viewer": [
+                "false"
+            ],
+            "CloudFront-Viewer-ASN": [
+                "17676"
+            ],
+            "CloudFront-Viewer-Country": [
+                "JP"
+            ],
+            "Host": [
+                "qnieunod45.execute-api.ap-northeast-1.amazonaws.com"
+            ],
+            "Postman-Token": [
+                "f6e621f7-1475-47fc-8bb9-398068c37ee2"
+            ],
+            "User-Agent": [
+                "PostmanRuntime/7.29.2"
+            ],
+            "Via": [
+                "1.1 28cc684478478d9f9a85bebbb1ed4154.cloudfront.net (CloudFront)"
+            ],
+            "X-Amz-Cf-Id": [
+                "l0JjQBHErviZ3OqmDc1hp_4-qm-9fCwfVQ9_W7ysfmC0bdnojiHMnw=="
+            ],
+            "X-Amzn-Trace-Id": [
+                "Root=1-63c7bc96-379cb58d7705d4474e8eb758"
+            ],
+            "X-Forwarded-For": [
+                "60.116.89.182, 130.176.189.234"
+            ],
+            "X-Forwarded-Port": [
+                "443"
+            ],
+            "X-Forwarded-Proto": [
+                "https"
+            ]
+        },
+        "queryStringParameters": null,
+        "multiValueQueryStringParameters": null,
+        "pathParameters": {
+            "order_id": "4824a7e36cd042c79192e3a4a2641ea1"
+        },
+        "stageVariables": null,
+        "requestContext": {
+            "resourceId": "ajck76",
+            "resourcePath": "/orders/{order_id}",
+            "httpMethod": "GET",
+            "extendedRequestId": "e7pnnG1lNjMFcGg=",
+            "requestTime": "18/Jan/2023:09:32:06 +0000",
+            "path": "/prod/orders/4824a7e36cd042c79192e3a4a2641ea1",
+            "accountId": "338456725408",
+            "protocol": "HTTP/1.1",
+            "stage": "prod",
+            "domainPrefix": "qnieunod45",
+            "requestTimeEpoch": 1674034326903,
+            "requestId": "1379e16b-a808-4e93-bf26-c3b37178a5c9",
+            "identity": {
+                "cognitoIdentityPoolId": null,
+                "accountId": null,
+                "cognitoIdentityId": null,
+                "caller": null,
+                "sourceIp": "60.116.89.182",
+                "principalOrgId": null,
+                "accessKey": null,
+                "cognitoAuthenticationType": null,
+                "cognitoAuthenticationProvider": null,
+                "userArn": null,
+                "userAgent": "PostmanRuntime/7.29.2",
+                "user": null
+            },
+            "domainName": "qnieunod45.execute-api.ap-northeast-1.amazonaws.com",
+            "apiId": "qnieunod45"
+        },
+        "body": null,
+        "isBase64Encoded": false
+    }            
+    """
+    return commands.GetOrder(order_id=request.path_parameters['order_id'])
+
+
+# @ROUTER.route('POST', '/orders/{order_id:[0-9a-f]+}/cancel')
+#     cmd = commands.CancelOrder(order_id=path_parameters.get('order_id'))
+#
+# @ROUTER.route('POST', '/orders/{order_id:[0-9a-f]+}/revise')
+#     d = json.loads(body_json, parse_float=decimal.Decimal)
+#     delivery_information = order_history_model.DeliveryInformation.from_dict(
+#                                                         d['delivery_information'])
+#     revised_order_line_items = [order_history_model.RevisedOrderLineItem.from_dict(item)
+#                                 for item in d['revised_order_line_items']]
+#     order_revision = order_history_model.OrderRevision(
+#                                     delivery_information=delivery_information,
+#                                     revised_order_line_items=revised_order_line_items)
+#     cmd = commands.ReviseOrder(order_id=path_parameters.get('order_id'),
+#                                order_revision=order_revision)
+
+
 def rest_invocation(event: dict):
     try:
         http_method, query_string_parameters, path, path_parameters, body_json \
             = rest_request(event)
 
-        cmd = None
-        if re.fullmatch('/orders', path) and http_method == 'GET':
-            """
-            - Get Order History
-            POST /orders
-            http_method: GET
-            path: "/orders"
-            path_parameters: None
-            query_string_parameters: None
-            body: None
-            """
-            # Todo:
-            #  consumer_idは"Lambda Authorizer"で設定し、
-            #  REST API Lambdaではevent.requestContext.authorizer.key を呼び出して取得する
-            #  [API Gateway Lambda オーソライザーを使用する]
-            #  https://docs.aws.amazon.com/ja_jp/apigateway/latest/developerguide/apigateway-use-lambda-authorizer.html
-            #  [Amazon API Gateway Lambda オーソライザーからの出力]
-            #  https://docs.aws.amazon.com/ja_jp/apigateway/latest/developerguide/api-gateway-lambda-authorizer-output.html
-            dummy_request_context = {
-                'requestContext': {
-                    'authorizer': {
-                        'consumer_id': 4
-                    }
-                }
-            }
-            consumer_id = dummy_request_context.get('requestContext').get('authorizer').get('consumer_id')
-            cmd = commands.GetOrders(consumer_id=consumer_id)
-
-        elif re.fullmatch('/orders/[0-9a-f]+', path) and http_method == 'GET':  # uuid
-            """
-            - Get Order 
-            GET /orders/xxxxxx
-            http_method: GET
-            path: "/orders/dc83abae951c4185ab3780a5b7c5f055"
-            path_parameters: {"order_id": "dc83abae951c4185ab3780a5b7c5f055"}
-            query_string_parameters: None
-            body: None
-            """
-            """
-            {
-                "resource": "/orders/{order_id}",
-                "path": "/orders/4824a7e36cd042c79192e3a4a2641ea1",
-                "httpMethod": "GET",
-                "headers": {
-                    "Accept": "*/*",
-                    "Accept-Encoding": "gzip, deflate, br",
-                    "CloudFront-Forwarded-Proto": "https",
-                    "CloudFront-Is-Desktop-Viewer": "true",
-                    "CloudFront-Is-Mobile-Viewer": "false",
-                    "CloudFront-Is-SmartTV-Viewer": "false",
-                    "CloudFront-Is-Tablet-Viewer": "false",
-                    "CloudFront-Viewer-ASN": "17676",
-                    "CloudFront-Viewer-Country": "JP",
-                    "Host": "qnieunod45.execute-api.ap-northeast-1.amazonaws.com",
-                    "Postman-Token": "f6e621f7-1475-47fc-8bb9-398068c37ee2",
-                    "User-Agent": "PostmanRuntime/7.29.2",
-                    "Via": "1.1 28cc684478478d9f9a85bebbb1ed4154.cloudfront.net (CloudFront)",
-                    "X-Amz-Cf-Id": "l0JjQBHErviZ3OqmDc1hp_4-qm-9fCwfVQ9_W7ysfmC0bdnojiHMnw==",
-                    "X-Amzn-Trace-Id": "Root=1-63c7bc96-379cb58d7705d4474e8eb758",
-                    "X-Forwarded-For": "60.116.89.182, 130.176.189.234",
-                    "X-Forwarded-Port": "443",
-                    "X-Forwarded-Proto": "https"
-                },
-                "multiValueHeaders": {
-                    "Accept": [
-                        "*/*"
-                    ],
-                    "Accept-Encoding": [
-                        "gzip, deflate, br"
-                    ],
-                    "CloudFront-Forwarded-Proto": [
-                        "https"
-                    ],
-                    "CloudFront-Is-Desktop-Viewer": [
-                        "true"
-                    ],
-                    "CloudFront-Is-Mobile-Viewer": [
-                        "false"
-                    ],
-                    "CloudFront-Is-SmartTV-Viewer": [
-                        "false"
-                    ],
-                    "CloudFront-Is-Tablet-Viewer": [
-                        "false"
-                    ],
-                    "CloudFront-Viewer-ASN": [
-                        "17676"
-                    ],
-                    "CloudFront-Viewer-Country": [
-                        "JP"
-                    ],
-                    "Host": [
-                        "qnieunod45.execute-api.ap-northeast-1.amazonaws.com"
-                    ],
-                    "Postman-Token": [
-                        "f6e621f7-1475-47fc-8bb9-398068c37ee2"
-                    ],
-                    "User-Agent": [
-                        "PostmanRuntime/7.29.2"
-                    ],
-                    "Via": [
-                        "1.1 28cc684478478d9f9a85bebbb1ed4154.cloudfront.net (CloudFront)"
-                    ],
-                    "X-Amz-Cf-Id": [
-                        "l0JjQBHErviZ3OqmDc1hp_4-qm-9fCwfVQ9_W7ysfmC0bdnojiHMnw=="
-                    ],
-                    "X-Amzn-Trace-Id": [
-                        "Root=1-63c7bc96-379cb58d7705d4474e8eb758"
-                    ],
-                    "X-Forwarded-For": [
-                        "60.116.89.182, 130.176.189.234"
-                    ],
-                    "X-Forwarded-Port": [
-                        "443"
-                    ],
-                    "X-Forwarded-Proto": [
-                        "https"
-                    ]
-                },
-                "queryStringParameters": null,
-                "multiValueQueryStringParameters": null,
-                "pathParameters": {
-                    "order_id": "4824a7e36cd042c79192e3a4a2641ea1"
-                },
-                "stageVariables": null,
-                "requestContext": {
-                    "resourceId": "ajck76",
-                    "resourcePath": "/orders/{order_id}",
-                    "httpMethod": "GET",
-                    "extendedRequestId": "e7pnnG1lNjMFcGg=",
-                    "requestTime": "18/Jan/2023:09:32:06 +0000",
-                    "path": "/prod/orders/4824a7e36cd042c79192e3a4a2641ea1",
-                    "accountId": "338456725408",
-                    "protocol": "HTTP/1.1",
-                    "stage": "prod",
-                    "domainPrefix": "qnieunod45",
-                    "requestTimeEpoch": 1674034326903,
-                    "requestId": "1379e16b-a808-4e93-bf26-c3b37178a5c9",
-                    "identity": {
-                        "cognitoIdentityPoolId": null,
-                        "accountId": null,
-                        "cognitoIdentityId": null,
-                        "caller": null,
-                        "sourceIp": "60.116.89.182",
-                        "principalOrgId": null,
-                        "accessKey": null,
-                        "cognitoAuthenticationType": null,
-                        "cognitoAuthenticationProvider": null,
-                        "userArn": null,
-                        "userAgent": "PostmanRuntime/7.29.2",
-                        "user": null
-                    },
-                    "domainName": "qnieunod45.execute-api.ap-northeast-1.amazonaws.com",
-                    "apiId": "qnieunod45"
-                },
-                "body": null,
-                "isBase64Encoded": false
-            }            
-            """
-            cmd = commands.GetOrder(order_id=path_parameters.get('order_id'))
-
-        # elif re.fullmatch('/orders/[0-9a-f]+/cancel', path) and http_method == 'POST':
-        #     cmd = commands.CancelOrder(order_id=path_parameters.get('order_id'))
-        #
-        # elif re.fullmatch('/orders/[0-9a-f]+/revise', path) and http_method == 'POST':
-        #     d = json.loads(body_json, parse_float=decimal.Decimal)
-        #     delivery_information = order_history_model.DeliveryInformation.from_dict(
-        #                                                         d['delivery_information'])
-        #     revised_order_line_items = [order_history_model.RevisedOrderLineItem.from_dict(item)
-        #                                 for item in d['revised_order_line_items']]
-        #     order_revision = order_history_model.OrderRevision(
-        #                                     delivery_information=delivery_information,
-        #                                     revised_order_line_items=revised_order_line_items)
-        #     cmd = commands.ReviseOrder(order_id=path_parameters.get('order_id'),
-        #                                order_revision=order_revision)
+        # method + 先頭segment で route を引き、path parameterはpathから取り出す
+        route_handler, path_parameters = ROUTER.resolve(http_method, path)
+        cmd = route_handler(router.Request(http_method=http_method,
+                                           path=path,
+                                           path_parameters=path_parameters,
+                                           query_string_parameters=query_string_parameters,
+                                           body_json=body_json))
 
-        else:
-            raise exceptions.UnsupportedRoute(f'Unsupported Route :{http_method}')
-
-        resp = HANDLER.commands_handler(cmd)
+        resp = handler().commands_handler(cmd)
 
         resp_ = None
-        if isinstance(resp, list):
+        next_token = None
+        if isinstance(resp, order_history_model.OrderHistoryPage):
+            page = resp.to_dict()
+            resp_, next_token = page['orders'], page['next_token']
+
+        elif isinstance(resp, list):
             resp_ = [order.to_dict() for order in resp]
 
         elif isinstance(resp, order_history_model.Order):
@@ -346,16 +417,16 @@ def rest_invocation(event: dict):
                         {
                             'message': f'Successfully finished operation: {http_method}',
                             'body': resp_,
+                            **({'next_token': next_token} if next_token else {}),
                         },
                         cls=json_encoder.JSONEncoder
                     )
         }
-        print(f'return response: {rest_response}')
+        logger.payload('return response', rest_response)
         return rest_response
 
-    except exceptions.InvalidName as e:
-        print(str(e))
-        traceback.print_exc()
+    except (exceptions.InvalidName, exceptions.InvalidQueryParameter) as e:
+        logger.exception('%s', e)
         return {
             'statusCode': 400,
             'body': json.dumps({
@@ -363,19 +434,27 @@ def rest_invocation(event: dict):
             })
         }
 
-    except exceptions.UnsupportedRoute as e:
-        print(str(e))
-        traceback.print_exc()
+    except router.RouteNotFound as e:
+        logger.warning('%s', e)
+        return {
+            'statusCode': 404,
+            'body': json.dumps({
+                'message': str(e),
+            })
+        }
+
+    except router.MethodNotAllowed as e:
+        logger.warning('%s', e)
         return {
             'statusCode': 405,
+            'headers': {'Allow': ', '.join(e.allowed_methods)},
             'body': json.dumps({
                 'message': str(e),
             })
         }
 
     except Exception as e:
-        print(str(e))
-        traceback.print_exc()
+        logger.exception('%s', e)
         return {
             'statusCode': 500,
             'body': json.dumps({
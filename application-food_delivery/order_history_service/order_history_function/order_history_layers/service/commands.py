@@ -4,6 +4,7 @@ Commands from client with REST API
 import json
 import dataclasses
 import decimal
+from typing import Optional
 from order_history_layers.model import order_history_model
 
 
@@ -75,3 +76,8 @@ class GetOrder(Command):
 @dataclasses.dataclass
 class GetOrders(Command):
     consumer_id: str
+    page_size: Optional[int] = None
+    next_token: Optional[str] = None
+    fields: Optional[list[str]] = None  # ['order_id', 'order_state'] など。None は全attribute
+    status: Optional[str] = None        # OrderState ex. 'APPROVED'
+    keyword: Optional[str] = None       # menu の name の単語 ex. 'curry'
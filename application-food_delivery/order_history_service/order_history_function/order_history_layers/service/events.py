@@ -196,6 +196,53 @@ class OrderCancelled(DomainEventEnvelope):
         return d
 
 
+@dataclasses.dataclass
+class TicketAccepted(DomainEventEnvelope):
+    ticket_id: str  # order_idと同じ
+    ready_by: str  # ISO 8601: 2022-11-30T05:00:30.001000Z
+
+    @classmethod
+    def from_event(cls, event: dict):
+        return cls(**event)
+
+    def to_dict(self):
+        def encoder_(o):
+            if isinstance(o, TicketAccepted):
+                return o.__dict__
+            if isinstance(o, decimal.Decimal):
+                if int(o) == o:
+                    return int(o)
+                else:
+                    return float(o)
+            raise TypeError(f'{repr(o)} is not serializable')
+
+        d = json.loads(json.dumps(self, default=encoder_))
+        return d
+
+
+@dataclasses.dataclass
+class TicketCancelled(DomainEventEnvelope):
+    ticket_id: str  # order_idと同じ
+
+    @classmethod
+    def from_event(cls, event: dict):
+        return cls(**event)
+
+    def to_dict(self):
+        def encoder_(o):
+            if isinstance(o, TicketCancelled):
+                return o.__dict__
+            if isinstance(o, decimal.Decimal):
+                if int(o) == o:
+                    return int(o)
+                else:
+                    return float(o)
+            raise TypeError(f'{repr(o)} is not serializable')
+
+        d = json.loads(json.dumps(self, default=encoder_))
+        return d
+
+
 @dataclasses.dataclass
 class DeliveryPickedup(DomainEventEnvelope):
     delivery_id: str
@@ -242,3 +289,15 @@ class DeliveryDelivered(DomainEventEnvelope):
 
         d = json.loads(json.dumps(self, default=encoder_))
         return d
+
+
+@dataclasses.dataclass
+class EventBatch:
+    """
+    SQS の batch の events を order ごとにまとめる (delivery の aggregate_id は order_id と同じ)
+        orders: order_id -> [(messageId, event)] (受信順)
+    """
+    orders: dict = dataclasses.field(default_factory=dict)
+
+    def add(self, message_id: str, event: DomainEventEnvelope):
+        self.orders.setdefault(event.aggregate_id, []).append((message_id, event))
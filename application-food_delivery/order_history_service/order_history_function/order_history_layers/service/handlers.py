@@ -1,6 +1,9 @@
 from order_history_layers.service import service
 from order_history_layers.service import commands
-from order_history_layers.service import events
+from order_history_layers.common import log
+from order_history_layers.common import metrics
+
+logger = log.get_logger(__name__)
 
 
 class Handler:
@@ -15,33 +18,57 @@ class Handler:
             commands.GetOrders: getattr(self.order_history_service, 'get_order_history'),
         }
 
-        self.EVENT_HANDLER = {
-            events.OrderCreated: getattr(self.order_history_service, 'create_order'),
-            events.OrderAuthorized: getattr(self.order_history_service, 'update_order_state'),
-            events.OrderRejected: getattr(self.order_history_service, 'update_order_state'),
-            events.OrderCancelled: getattr(self.order_history_service, 'update_order_state'),
-            events.DeliveryPickedup: getattr(self.order_history_service, 'update_delivery_state'),
-            events.DeliveryDelivered: getattr(self.order_history_service, 'update_delivery_state'),
-        }
+        self._event_handler = None
 
-    def events_handler(self, event: events.DomainEventEnvelope):
+    @property
+    def EVENT_HANDLER(self) -> dict:
+        # 更新 (writer path) の table は最初の event で組み立てる。GET では events を import しない
+        if self._event_handler is None:
+            from order_history_layers.service import events
+            self._event_handler = {
+                events.OrderCreated: getattr(self.order_history_service, 'create_order'),
+                events.OrderAuthorized: getattr(self.order_history_service, 'update_order_state'),
+                events.OrderRejected: getattr(self.order_history_service, 'update_order_state'),
+                events.OrderCancelled: getattr(self.order_history_service, 'update_order_state'),
+                events.TicketAccepted: getattr(self.order_history_service, 'update_ticket_state'),
+                events.TicketCancelled: getattr(self.order_history_service, 'update_ticket_state'),
+                events.DeliveryPickedup: getattr(self.order_history_service, 'update_delivery_state'),
+                events.DeliveryDelivered: getattr(self.order_history_service, 'update_delivery_state'),
+            }
+        return self._event_handler
+
+    @metrics.instrument('events')
+    def events_handler(self, event):
         try:
             method = self.EVENT_HANDLER[event.__class__]
-            print(f'event_handler: method: {method}')
+            logger.debug('event_handler: method: %s', method)
             response = method(event)
             return response
 
         except Exception as e:
-            print(str(e))
+            logger.exception('%s', e)
             raise e
 
+    @metrics.instrument('events')
+    def event_batch_handler(self, batch) -> list[str]:
+        """ events.EventBatch を order ごとに projection し、失敗した order の messageId を返す """
+        failed_message_ids = []
+        for order_id, entries in batch.orders.items():
+            try:
+                self.order_history_service.project_order_events(order_id, [event for _, event in entries])
+            except Exception as e:
+                logger.exception('order_id: %s, %s', order_id, e)
+                failed_message_ids += [message_id for message_id, _ in entries]
+        return failed_message_ids
+
+    @metrics.instrument('commands')
     def commands_handler(self, cmd: commands.Command):
         try:
             method = self.COMMAND_HANDLER[cmd.__class__]
-            print(f'commands_handler: method: {method}')
+            logger.debug('commands_handler: method: %s', method)
             response = method(cmd)
             return response
 
         except Exception as e:
-            print(str(e))
+            logger.exception('%s', e)
             raise e
@@ -1,13 +1,16 @@
 from __future__ import annotations  # classの依存関係の許可
 
 import dataclasses
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
 from order_history_layers.model import order_history_model
-from order_history_layers.service import events
 from order_history_layers.service import commands
+from order_history_layers.common import log
+
+logger = log.get_logger(__name__)
 # from order_history_layers.service.domain_event_envelope import DomainEventEnvelope
-from order_history_layers.service.events import DomainEventEnvelope
+if TYPE_CHECKING:  # events は更新 (writer path) でだけ import する
+    from order_history_layers.service import events
 
 
 class OrderHistoryService:
@@ -19,7 +22,7 @@ class OrderHistoryService:
     # Order Service Event
     # ------------------------------------------------------------
     def create_order(self, event: events.OrderCreated):
-        print("create_order:")
+        logger.debug('create_order:')
 
         order = order_history_model.Order.create_order(
             order_id=event.order_id,
@@ -34,15 +37,40 @@ class OrderHistoryService:
         service layerから直接DynamoDBを操作する。    
     """
     def update_order_state(self, event: events.DomainEventEnvelope):
-        self.order_history_dao.update_order_state(event, order_event_id=event.event_id)
+        self.order_history_dao.project_events(event.order_id, [event])
 
+    # ------------------------------------------------------------
+    # Kitchen Service Event
+    # ------------------------------------------------------------
+    def update_ticket_state(self, event: events.DomainEventEnvelope):
+        self.order_history_dao.project_events(event.ticket_id, [event])  # 注: ticket_idとorder_idは同じ
+
+    # ------------------------------------------------------------
+    # Delivery Service Event
+    # ------------------------------------------------------------
     def update_delivery_state(self, event: events.DomainEventEnvelope):
-        self.order_history_dao.update_delivery_state(event, delivery_event_id=event.event_id)
+        self.order_history_dao.project_events(event.delivery_id, [event])  # 注: delivery_idとorder_idは同じ
         # Todo:Test方法
         #  1. PostMan: Order:CreateOrder -> order_id
         #  2. PostMan: Kitchen:AcceptTicket (order_id)
         #  3. PostMan: Delivery:CourierPickedup (order_id)
 
+    def project_order_events(self, order_id, events_: list[events.DomainEventEnvelope]):
+        """
+        1 order の events (SQS の batch) を1回の書き込みにまとめる
+            OrderCreated があれば Order を作り、DAO が order_state / delivery_state の最新の event を反映する。
+        """
+        created = next((event for event in events_ if event.__class__.__name__ == 'OrderCreated'), None)
+        if created is None:
+            self.order_history_dao.save_events(order_id, events_)
+            return
+
+        order = order_history_model.Order.create_order(
+            order_id=created.order_id,
+            order_details=created.order_details,
+            delivery_information=created.delivery_information)
+        self.order_history_dao.save_events(order_id, events_, order=order, order_event_id=created.event_id)
+
     # /orders/{order_id} GET
     def get_order(self, cmd: commands.GetOrder) -> order_history_model.Order:
         order = self.order_history_dao.find_by_id(cmd.order_id)
@@ -54,10 +82,14 @@ class OrderHistoryService:
         #  4. PostMan: OrderHistory:GetOrder (order_id)
 
     # /orders GET
-    def get_order_history(self, cmd: commands.GetOrders) -> list[order_history_model.Order]:
-        orders = self.order_history_dao.find_order_history(
-            cmd.consumer_id, self.order_history_dao.OrderHistoryFilter())
-        return orders
+    def get_order_history(self, cmd: commands.GetOrders) -> order_history_model.OrderHistoryPage:
+        page = self.order_history_dao.find_order_history(
+            cmd.consumer_id, self.order_history_dao.OrderHistoryFilter(status=cmd.status,
+                                                                      keyword=cmd.keyword,
+                                                                      start_key_token=cmd.next_token,
+                                                                      page_size=cmd.page_size,
+                                                                      fields=cmd.fields))
+        return page
         # Todo:Test方法
         #  1. PostMan: Order:CreateOrder -> order_id
         #  2. PostMan: Kitchen:AcceptTicket (order_id)
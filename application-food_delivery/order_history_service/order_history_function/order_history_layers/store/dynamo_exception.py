@@ -1,8 +1,11 @@
 import contextlib
 from botocore import exceptions
+from order_history_layers.common import log
 
 """ DynamoDB Exceptions """
 
+logger = log.get_logger(__name__)
+
 
 class ConditionalCheckFailedException(Exception):
     pass
@@ -35,7 +38,7 @@ def dynamo_exception_check():
 
     except exceptions.ClientError as e:
         if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
-            print(e.response['Error'])
+            logger.warning('%s', e.response['Error'])
             raise ConditionalCheckFailedException(
                 f'ConditionalCheckFailedException: {e.response["Error"]}')
 
@@ -1,18 +1,21 @@
 import os
+import re
 import abc
-import json
+import time
 import enum
 import datetime
 import dataclasses
 from typing import Optional
-import boto3
-from boto3.dynamodb.types import TypeSerializer
-from boto3.dynamodb.types import TypeDeserializer
 from order_history_layers.model import order_history_model
 from order_history_layers.store import dynamo_exception as dx
+from order_history_layers.store import dynamo_codec
 from order_history_layers.common import exceptions as ex
-from order_history_layers.service import events
-from order_history_layers.common import json_encoder
+from order_history_layers.store import aws_clients
+from order_history_layers.store import page_token
+from order_history_layers.store import projection
+from order_history_layers.common import log
+
+logger = log.get_logger(__name__)
 
 
 # class DeliveryState(enum.Enum):
@@ -20,6 +23,59 @@ from order_history_layers.common import json_encoder
 #     DELIVERED = 'DELIVERED'
 
 
+class OrderAlreadyCreated(dx.ConditionalCheckFailedException):
+    """ OrderCreated を適用済み (Order Item に creation_date がある) """
+    pass
+
+
+ORDER_HISTORY_CODEC = dynamo_codec.ItemCodec({
+    'PK': dynamo_codec.S,
+    'SK': dynamo_codec.S,
+    'order_event_id': dynamo_codec.N,
+    'delivery_event_id': dynamo_codec.N,
+    'ticket_event_id': dynamo_codec.N,
+    'creation_date': dynamo_codec.S,
+    'consumer_id': dynamo_codec.N,
+    'restaurant_id': dynamo_codec.N,
+    'order_state': dynamo_codec.S,
+    'consumer_order_state': dynamo_codec.S,
+    'delivery_state': dynamo_codec.S,
+    'ticket_state': dynamo_codec.S,
+    'ready_by': dynamo_codec.S,
+    'order_line_items': dynamo_codec.List(dynamo_codec.Map({
+        'menu_id': dynamo_codec.S,
+        'name': dynamo_codec.S,
+        'price': dynamo_codec.MONEY,
+        'quantity': dynamo_codec.N,
+    })),
+    'delivery_information': dynamo_codec.Map({
+        'delivery_time': dynamo_codec.S,
+        'delivery_address': dynamo_codec.ADDRESS,
+    }),
+})
+
+
+# GSI
+CREATION_DATE_INDEX = 'OrderHistoryByConsumerIdAndCreationTime'   # consumer_id, creation_date
+ORDER_STATE_INDEX = 'OrderHistoryByConsumerOrderState'            # consumer_order_state, creation_date
+BATCH_WRITE_ITEMS_LIMIT = 25
+BATCH_GET_ITEMS_LIMIT = 100
+KEYWORD_MAX_READ_ITEMS = 1000  # GET /orders?keyword= の1 request で読む Keyword Item の上限
+MERGE_CREATED_ATTEMPTS = 3  # OrderCreated と先に届いた event の Item の merge を、他の書き込みと競合した時に読み直す回数
+
+# GET /orders の page
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# GET /orders?fields= で指定できる attribute (order_id は PK から作る)
+PROJECTION_FIELDS = ('order_id', 'consumer_id', 'restaurant_id', 'order_state', 'delivery_state',
+                     'ticket_state', 'ready_by', 'order_line_items', 'delivery_information')
+
+
+def tokenize(text: str) -> list[str]:
+    """ keyword index の token: 小文字の単語 (重複なし、出現順) """
+    return list(dict.fromkeys(re.findall(r'\w+', text.lower())))
+
+
 class AbstractDao(abc.ABC):
     @abc.abstractmethod
     def save(self,
@@ -62,156 +118,375 @@ class DynamoDbDao(AbstractDao):
             }
         }
         creation_date: '2023-01-17T10:35:16.453147Z'  GSI SK  DAOで追加するAttribute
+        consumer_order_state: '1#APPROVAL_PENDING'    ORDER_STATE_INDEX の PK  DAOで追加するAttribute
+        delivery_state: PICKEDUP                      以下は projection.PROJECTIONS の event で更新する
+        ticket_state: ACCEPTED
+        ready_by: '2022-11-30T05:00:30.001000Z'
+        delivery_event_id: 68                         for Idempotence (event の発行元毎の event_id)
+        ticket_event_id: 12
+
+    Keyword Item (menu の name の inverted index。OrderCreated で Order Item と一緒に書く)
+        PK: KEYWORD#{consumer_id}#{token}       ex. KEYWORD#1#curry
+        SK: {creation_date}#{order_id}
+        order_id: 1b3d5cc1a8d64c53aba796364af9eab6
+
+    GET /orders の Query
+        filter なし:  CREATION_DATE_INDEX (consumer_id)
+        status:       ORDER_STATE_INDEX (consumer_order_state = {consumer_id}#{status})
+        keyword:      Keyword Item (PK = KEYWORD#{consumer_id}#{最初の token}) -> BatchGetItem で Order Item
+                      残りの token と status は読んだ Order Item で絞り込む (page_size 件になるまで Query を続ける)
     """
     def __init__(self):
-        self.client = boto3.client('dynamodb')
+        self.client = aws_clients.client('dynamodb')
         self.table_name = os.environ.get('DYNAMODB_TABLE_NAME', 'OrderHistory')
 
     @dataclasses.dataclass
     class OrderHistoryFilter:
-        since: Optional[str] = datetime.datetime.strftime(
-            datetime.datetime.utcnow() + datetime.timedelta(days=-30), '%Y-%m-%dT%H:%M:%S.%fZ')
+        # 既定値は import 時ではなく Filter を作る時の30日前
+        since: Optional[str] = dataclasses.field(default_factory=lambda: datetime.datetime.strftime(
+            datetime.datetime.utcnow() + datetime.timedelta(days=-30), '%Y-%m-%dT%H:%M:%S.%fZ'))
         status: Optional[str] = None
         keyword: Optional[str] = None
-        start_key_token: Optional[str] = None
-        page_size: Optional[int] = None
+        start_key_token: Optional[str] = None   # page_token.encode() した LastEvaluatedKey
+        page_size: Optional[int] = None         # None は DEFAULT_PAGE_SIZE。MAX_PAGE_SIZE で頭打ち
+        fields: Optional[list[str]] = None      # ProjectionExpression。None は全attribute
 
-    def save(self, order: order_history_model.Order, order_event_id):
-        order_dynamo_dict = self._to_dynamo_dict(order, order_event_id)
-        with dx.dynamo_exception_check():
-            resp = self.client.put_item(TableName=self.table_name,
-                                        Item=order_dynamo_dict,
-                                        ConditionExpression='attribute_not_exists(#order_event_id) OR #order_event_id < :order_event_id',
-                                        ExpressionAttributeNames={
-                                            '#order_event_id': 'order_event_id',
-                                        },
-                                        ExpressionAttributeValues={
-                                            ':order_event_id': {'N': str(order_event_id)},
-                                        })
-
-    def update_order_state(self, event, order_event_id):
-        print(f'update_order_state() event: {json.dumps(event.to_dict(), cls=json_encoder.JSONEncoder)}')
-        print(f'event: {event.__class__.__name__}')
+    def save(self, order: order_history_model.Order, order_event_id, events: list = ()):
         """
-        {
-            "aggregate": "ORDER",
-            "aggregate_id": "8555620f791b49c19cc1eca9274b6e99",
-            "event_type": "OrderAuthorized",
-            "event_id": "66",
-            "timestamp": "2023-01-11T10:33:27.824076Z",
-            "order_id": "8555620f791b49c19cc1eca9274b6e99"
-        }
+        OrderCreated の Order Item を書き込む
+            Item が無い時:                 PutItem (attribute_not_exists(PK))
+            先に届いた event の Item がある: その Item と merge して書き直す (merge_created)
+            OrderCreated を適用済みの時:     OrderAlreadyCreated
         """
+        request = self.to_put_request(order, order_event_id, events)
+        try:
+            self.write(request)
+        except dx.ConditionalCheckFailedException:
+            self.merge_created(request)
+        self.write_items(self.to_keyword_items(order, request['Item']['creation_date']['S']))
+
+    def merge_created(self, request: dict):
+        """
+        OrderCreated より先に届いた event の Item (creation_date が無い) に Order の attribute を書き込む
+            event の発行元 (version) 毎に、version の大きい方 (Item か、OrderCreated と同じ batch の events) の
+            projection を残す。consumer_order_state は残した order_state と consumer_id から作り直す。
+            読んだ後に別の event が書き込まれた場合は条件を満たさないので読み直す。
+        """
+        item = request['Item']
+        order_id = item['PK']['S'].split('#')[1]
+        for _ in range(MERGE_CREATED_ATTEMPTS):
+            current = self.get_order_item(order_id)
+            if current is None:  # 競合した書き込みが無い限り起きないが、新しい Item として書く
+                merge_request = request
+            elif 'creation_date' in current:
+                raise OrderAlreadyCreated(f'OrderCreated is already applied: {order_id}')
+            else:
+                merge_request = self.to_merge_request(item, current)
+            try:
+                self.write(merge_request)
+                return
+            except dx.ConditionalCheckFailedException as e:
+                logger.debug('merge_created() order_id: %s, %r: 読み直す', order_id, e)
+        raise dx.ConditionalCheckFailedException(f'merge_created: conflicted {MERGE_CREATED_ATTEMPTS} times: {order_id}')
+
+    def to_merge_request(self, item: dict, current: dict) -> dict:
+        merged = dict(item)
+        for version, attributes in projection.ATTRIBUTES.items():
+            if version in current and (version not in item or int(current[version]['N']) >= int(item[version]['N'])):
+                for name in attributes:
+                    merged.pop(name, None)
+                    if name in current:
+                        merged[name] = current[name]
+                merged[version] = current[version]
+        merged['consumer_order_state'] = {'S': f"{merged['consumer_id']['N']}#{merged['order_state']['S']}"}
+
+        # 読んだ Item から変わっていない時だけ書き込む (先に届いた event の Item には必ず version がある)
+        return {
+            'TableName': self.table_name,
+            'Item': merged,
+            'ConditionExpression': ' AND '.join(
+                ['attribute_not_exists(#creation_date)'] +
+                [f'#{version} = :{version}' if version in current else f'attribute_not_exists(#{version})'
+                 for version in projection.VERSIONS]),
+            'ExpressionAttributeNames': {f'#{name}': name for name in ('creation_date', *projection.VERSIONS)},
+            'ExpressionAttributeValues': {f':{version}': current[version]
+                                          for version in projection.VERSIONS if version in current},
+        }
 
-        # -----------------------
-        # Delivery State
-        # order_state = event.__class__.__name__  # OrderAuthorized, OrderCancelled, OrderRejected
-        event_type = event.__class__.__name__  # DeliveryPickedup, DeliveryDelivered
-        if event_type == 'OrderAuthorized':
-            order_state = order_history_model.OrderState('APPROVED').value
-        elif event_type == 'OrderCancelled':
-            order_state = order_history_model.OrderState('CANCELLED').value
-        elif event_type == 'OrderRejected':
-            order_state = order_history_model.OrderState('REJECTED').value
-        else:
-            raise Exception(f"NotSupportEvent: {event_type}")
-
+    def get_order_item(self, order_id) -> Optional[dict]:
         with dx.dynamo_exception_check():
-
-            resp = self.client.update_item(
+            resp = self.client.get_item(
                 TableName=self.table_name,
                 Key={
-                    'PK': {'S': f'ORDER#{event.order_id}'},
-                    'SK': {'S': f'METADATA#{event.order_id}'},
-                },
-                UpdateExpression='SET #order_state = :order_state',
-                ConditionExpression='attribute_not_exists(#order_event_id) '
-                                    'OR #order_event_id < :order_event_id',
-                ExpressionAttributeNames={
-                    '#order_state': 'order_state',
-                    '#order_event_id': 'order_event_id',
-                },
-                ExpressionAttributeValues={
-                    ':order_state': {'S': order_state},
-                    ':order_event_id': {'N': str(order_event_id)},
+                    'PK': {'S': f'ORDER#{order_id}'},
+                    'SK': {'S': f'METADATA#{order_id}'},
                 },
-                ReturnValues='NONE',
+                ConsistentRead=True,
             )
+        return resp.get('Item')
 
-    def update_delivery_state(self, event, delivery_event_id):
-        print(f'update_delivery_state() event: {json.dumps(event.to_dict(), cls=json_encoder.JSONEncoder)}')
-        print(f'event: {event.__class__.__name__}')
-        # 注:   delivery_idとorder_idは同じ
+    def write(self, request: dict):
+        """ to_put_request / to_projection_request の request を書き込む """
+        with dx.dynamo_exception_check():
+            if 'Item' in request:
+                resp = self.client.put_item(**request)
+            else:
+                resp = self.client.update_item(**request)
+
+    def project_events(self, order_id, events: list):
+        """ order の events (projection.PROJECTIONS の event) を1回の UpdateItem で書き込む """
+        logger.debug('project_events() order_id: %s, events: %s',
+                     order_id, [event.__class__.__name__ for event in events])
+        self.write(self.to_projection_request(order_id, events))
+
+    def to_projection_request(self, order_id, events: list) -> dict:
+        context = {}
+        if 'consumer_id' in projection.context_keys(events):
+            context['consumer_id'] = self.find_consumer_id(order_id)
+        return projection.to_update_request(self.table_name, order_id, events, ORDER_HISTORY_CODEC, context)
+
+    def save_events(self, order_id, events: list, order: order_history_model.Order = None, order_event_id=None):
         """
-        {
-            "aggregate": "DELIVERY",
-            "aggregate_id": "8555620f791b49c19cc1eca9274b6e99",
-            "event_type": "DeliveryPickedup",
-            "event_id": "68",
-            "timestamp": "2023-01-11T10:33:27.824076Z",
-            "delivery_id": "8555620f791b49c19cc1eca9274b6e99"
-        }
+        1 order の events (SQS の batch) を1回の書き込みにまとめる
+            order (OrderCreated) あり: events を反映した Order Item を書き込む (save)
+                                      OrderCreated を適用済みの時は、events を order なしと同じく書き込む
+            order なし:               events を1回の UpdateItem (project_events)
+        まとめた UpdateItem の条件を満たさない場合 (再送された event を含む batch など) は event 毎に書き込み、
+        version の条件を満たさない event (同じ発行元の event_id が同じか大きい event を適用済み) は読み飛ばす。
         """
+        events = [event for event in events if event.__class__.__name__ in projection.PROJECTIONS]
+        if order is not None:
+            try:
+                self.save(order, order_event_id, events)
+                return
+            except OrderAlreadyCreated:
+                logger.debug('save_events() order_id: %s: OrderCreated は適用済み', order_id)
+        if not events:
+            return
+        try:
+            self.project_events(order_id, events)
+            return
+        except dx.ConditionalCheckFailedException as e:
+            logger.debug('save_events() order_id: %s, %r: 1 event 毎に書き込む', order_id, e)
+
+        for event in sorted(events, key=lambda event: int(event.event_id)):
+            try:
+                self.project_events(order_id, [event])
+            except dx.ConditionalCheckFailedException:
+                logger.debug('save_events() order_id: %s, %s (event_id: %s): 適用済み',
+                             order_id, event.__class__.__name__, event.event_id)
+
+    def write_items(self, items: list[dict]):
+        for i in range(0, len(items), BATCH_WRITE_ITEMS_LIMIT):
+            request_items = {self.table_name: [{'PutRequest': {'Item': item}}
+                                               for item in items[i:i + BATCH_WRITE_ITEMS_LIMIT]]}
+            for attempt in range(5):
+                with dx.dynamo_exception_check():
+                    resp = self.client.batch_write_item(RequestItems=request_items)
+                request_items = resp.get('UnprocessedItems')
+                if not request_items:
+                    break
+                time.sleep(0.05 * 2 ** attempt)
+            else:
+                raise dx.ProvisionedThroughputExceededException(f'UnprocessedItems: {request_items}')
 
-        # Delivery State
-        event_type = event.__class__.__name__  # DeliveryPickedup, DeliveryDelivered
-        if event_type == 'DeliveryPickedup':
-            delivery_state = order_history_model.DeliveryState('PICKEDUP').value
-        elif event_type == 'DeliveryDelivered':
-            delivery_state = order_history_model.DeliveryState('DELIVERED').value
-        else:
-            raise Exception(f"NotSupportEvent: {event_type}")
+    @staticmethod
+    def to_keyword_items(order: order_history_model.Order, creation_date: str) -> list[dict]:
+        tokens = tokenize(' '.join(item.name for item in order.order_line_items))
+        return [{
+            'PK': {'S': f'KEYWORD#{order.consumer_id}#{token}'},
+            'SK': {'S': f'{creation_date}#{order.order_id}'},
+            'order_id': {'S': order.order_id},
+        } for token in tokens]
+
+    def to_put_request(self, order: order_history_model.Order, order_event_id, events: list = (),
+                       creation_date: str = None) -> dict:
+        item = self._to_dynamo_dict(order, order_event_id, creation_date)
+        if events:  # OrderCreated と同じ batch の events を反映する (save_events)
+            attributes, versions = projection.fold(events, {'consumer_id': order.consumer_id})
+            item.update(ORDER_HISTORY_CODEC.encode(attributes))
+            for version, (_, last) in versions.items():
+                item[version] = {'N': str(max(last, int(order_event_id)) if version == 'order_event_id' else last)}
+        return {
+            'TableName': self.table_name,
+            'Item': item,
+            # 先に届いた event の Item があれば save() が merge する (order_event_id では比べない)
+            'ConditionExpression': 'attribute_not_exists(PK)',
+        }
 
+    def find_consumer_id(self, order_id) -> Optional[int]:
+        """ consumer_order_state を更新するため consumer_id だけ読む (OrderCreated より先に届いた event では None) """
         with dx.dynamo_exception_check():
-            resp = self.client.update_item(
+            resp = self.client.get_item(
                 TableName=self.table_name,
                 Key={
-                    'PK': {'S': f'ORDER#{event.delivery_id}'},  # 注: delivery_idとorder_idは同じ
-                    'SK': {'S': f'METADATA#{event.delivery_id}'},  # 注: delivery_idとorder_idは同じ
-                },
-                UpdateExpression='SET #delivery_state = :delivery_state',
-                ConditionExpression='attribute_not_exists(#delivery_event_id) '
-                                    'OR #delivery_event_id < :delivery_event_id',
-                ExpressionAttributeNames={
-                    '#delivery_state': 'delivery_state',
-                    '#delivery_event_id': 'delivery_event_id',
-                },
-                ExpressionAttributeValues={
-                    ':delivery_state': {'S': delivery_state},
-                    ':delivery_event_id': {'N': str(delivery_event_id)},
+                    'PK': {'S': f'ORDER#{order_id}'},
+                    'SK': {'S': f'METADATA#{order_id}'},
                 },
-                ReturnValues='NONE',
+                ProjectionExpression='consumer_id',
             )
+        return int(resp['Item']['consumer_id']['N']) if 'consumer_id' in resp.get('Item', {}) else None
 
-    # Todo: ここから 2023.01.17
-    #  この実装のテスト Postmanで・・・
     def find_order_history(
             self,
             consumer_id,
-            order_history_filter: OrderHistoryFilter) -> list[order_history_model.Order]:
+            order_history_filter: OrderHistoryFilter) -> order_history_model.OrderHistoryPage:
 
-        print(f'find_order_history() consumer_id: {consumer_id}')
-        print(f'find_order_history() since: {order_history_filter.since}')
+        logger.debug('find_order_history() consumer_id: %s', consumer_id)
+        logger.debug('find_order_history() since: %s', order_history_filter.since)
 
+        request = self.to_query_request(consumer_id, order_history_filter)
+        if order_history_filter.keyword:
+            items, last_evaluated_key = self.find_keyword_hits(request, order_history_filter)
+        else:
+            resp = self.query(request)
+            items, last_evaluated_key = resp.get('Items', []), resp.get('LastEvaluatedKey')
+        return self.to_order_history_page(consumer_id, order_history_filter, items, last_evaluated_key)
+
+    def query(self, request: dict) -> dict:
         with dx.dynamo_exception_check():
-            resp = self.client.query(
-                TableName=self.table_name,
-                IndexName='OrderHistoryByConsumerIdAndCreationTime',
-                KeyConditionExpression="consumer_id = :consumer_id AND creation_date > :creation_date",
-                ExpressionAttributeValues={
-                    ":consumer_id": {"N": f"{consumer_id}"},
-                    ":creation_date": {"S": order_history_filter.since},
-                },
-                ScanIndexForward=False,
-            )
+            resp = self.client.query(**request)
+        logger.payload('query() resp', resp)
+        return resp
 
-        print(f'query() resp: {json.dumps(resp, cls=json_encoder.JSONEncoder)}')
+    def find_keyword_hits(self, request: dict, order_history_filter: OrderHistoryFilter) -> tuple[list, Optional[dict]]:
+        """
+        Keyword Item を Query し、BatchGetItem で読んだ Order Item を filter_keyword_hits() で絞り込む
+            残りの token / status で絞り込むと1回の Query では page_size 件に足りないので、page_size 件になるか
+            Keyword Item が無くなるまで Query を続ける。
+            読んだ Keyword Item が KEYWORD_MAX_READ_ITEMS 件以上になった時は、途中までの page と続きの key を返す。
+            page_size 件を超えた時は、page の最後の Order の Keyword Item を続きの key にする。
+        return: (Order Item, LastEvaluatedKey)
+        """
+        page_size = request['Limit']
+        # token が1つで status が無い場合は、Keyword Item が全て hit になる
+        filtered = len(tokenize(order_history_filter.keyword)) > 1 or order_history_filter.status is not None
+        request = dict(request)
+        hits, items_read = [], 0
+        while True:
+            remaining = page_size - len(hits)
+            request['Limit'] = BATCH_GET_ITEMS_LIMIT if filtered else remaining
+            resp = self.query(request)
+            keyword_items = {item['order_id']['S']: item for item in resp.get('Items', [])}
+            items_read += len(keyword_items)
+            orders = self.filter_keyword_hits(self.get_orders(list(keyword_items)), order_history_filter)
+            last_evaluated_key = resp.get('LastEvaluatedKey')
+
+            if len(orders) >= remaining:
+                hits += orders[:remaining]
+                last = keyword_items[orders[remaining - 1]['PK']['S'].split('#', 1)[1]]
+                if last is not list(keyword_items.values())[-1]:
+                    last_evaluated_key = {'PK': last['PK'], 'SK': last['SK']}
+                return hits, last_evaluated_key
+
+            hits += orders
+            if not last_evaluated_key or items_read >= KEYWORD_MAX_READ_ITEMS:
+                return hits, last_evaluated_key
+            request['ExclusiveStartKey'] = last_evaluated_key
+
+    def to_query_request(self, consumer_id, order_history_filter: OrderHistoryFilter) -> dict:
+        """
+        consumer の Order を creation_date の降順に page_size 件 Query する
+            status / keyword: Query する index (DynamoDbDao の docstring)
+            start_key_token: 前の page の LastEvaluatedKey (別の partition の token は InvalidPageToken)
+            fields: ProjectionExpression (order_id は PK)。keyword は読んだ Order Item から取り出す
+        """
+        page_size = order_history_filter.page_size or DEFAULT_PAGE_SIZE
+        if page_size < 1:
+            raise ex.InvalidQueryParameter(f'page_size: {page_size}')
+
+        if order_history_filter.keyword:
+            tokens = tokenize(order_history_filter.keyword)
+            if not tokens:
+                raise ex.InvalidQueryParameter(f'keyword: {order_history_filter.keyword}')
+            index_name, partition_key, sort_key = None, 'PK', 'SK'
+            partition = {'S': f'KEYWORD#{consumer_id}#{tokens[0]}'}
+        elif order_history_filter.status:
+            if order_history_filter.status not in order_history_model.OrderState.__members__:
+                raise ex.InvalidQueryParameter(f'status: {order_history_filter.status}')
+            index_name, partition_key, sort_key = ORDER_STATE_INDEX, 'consumer_order_state', 'creation_date'
+            partition = {'S': f'{consumer_id}#{order_history_filter.status}'}
+        else:
+            index_name, partition_key, sort_key = CREATION_DATE_INDEX, 'consumer_id', 'creation_date'
+            partition = {'N': f'{consumer_id}'}
+
+        request = {
+            'TableName': self.table_name,
+            'KeyConditionExpression': '#pk = :pk AND #sk > :since',
+            'ExpressionAttributeNames': {'#pk': partition_key, '#sk': sort_key},
+            'ExpressionAttributeValues': {
+                ':pk': partition,
+                ':since': {'S': order_history_filter.since},
+            },
+            'ScanIndexForward': False,
+            'Limit': min(page_size, MAX_PAGE_SIZE),
+        }
+        if index_name:
+            request['IndexName'] = index_name
+
+        if order_history_filter.start_key_token:
+            start_key = page_token.decode(order_history_filter.start_key_token)
+            if start_key.get(partition_key) != partition:
+                raise ex.InvalidPageToken(f'page token is not for consumer_id: {consumer_id}')
+            request['ExclusiveStartKey'] = start_key
+
+        if order_history_filter.fields:
+            unknown = set(order_history_filter.fields) - set(PROJECTION_FIELDS)
+            if unknown:
+                raise ex.InvalidQueryParameter(f'fields: {sorted(unknown)}')
+            if not order_history_filter.keyword:
+                attributes = ['PK' if field == 'order_id' else field for field in order_history_filter.fields]
+                request['ProjectionExpression'] = ', '.join(f'#p{i}' for i in range(len(attributes)))
+                request['ExpressionAttributeNames'].update(
+                    {f'#p{i}': attribute for i, attribute in enumerate(attributes)})
+
+        return request
+
+    def get_orders(self, order_ids: list[str]) -> list[dict]:
+        """ BatchGetItem で Order Item を読む (order_ids の順) """
+        items = {}
+        for i in range(0, len(order_ids), BATCH_GET_ITEMS_LIMIT):
+            request_items = {self.table_name: {'Keys': [
+                {'PK': {'S': f'ORDER#{order_id}'}, 'SK': {'S': f'METADATA#{order_id}'}}
+                for order_id in order_ids[i:i + BATCH_GET_ITEMS_LIMIT]]}}
+            for attempt in range(5):
+                with dx.dynamo_exception_check():
+                    resp = self.client.batch_get_item(RequestItems=request_items)
+                for item in resp['Responses'].get(self.table_name, []):
+                    items[item['PK']['S']] = item
+                request_items = resp.get('UnprocessedKeys')
+                if not request_items:
+                    break
+                time.sleep(0.05 * 2 ** attempt)
+            else:
+                raise dx.ProvisionedThroughputExceededException(f'UnprocessedKeys: {request_items}')
+        return [items[f'ORDER#{order_id}'] for order_id in order_ids if f'ORDER#{order_id}' in items]
 
-        if not resp.get('Items', None):  # Todo: Itemsが無い場合の対応
+    @staticmethod
+    def filter_keyword_hits(items: list[dict], order_history_filter: OrderHistoryFilter) -> list[dict]:
+        """ keyword の全ての token を menu の name に含み、status が一致する Order Item """
+        tokens = set(tokenize(order_history_filter.keyword))
+        status = order_history_filter.status
+        return [item for item in items
+                if (status is None or item['order_state']['S'] == status)
+                and tokens <= set(tokenize(' '.join(line_item['M']['name']['S']
+                                                    for line_item in item['order_line_items']['L'])))]
+
+    def to_order_history_page(self, consumer_id, order_history_filter: OrderHistoryFilter,
+                              items: list[dict], last_evaluated_key: dict = None) \
+            -> order_history_model.OrderHistoryPage:
+        # 最初の page が空で、続きも無い時だけ ItemNotFoundException
+        # (Limit 件ちょうどで終わると次の page は空になる。keyword は読む上限で空の page に続きがあることがある)
+        if not items and not last_evaluated_key and not order_history_filter.start_key_token:
             raise ex.ItemNotFoundException(f'consumer_id: {consumer_id}')
 
-        # return self._dynamo_obj_to_order_obj(resp['Item'])
-        return [self._dynamo_obj_to_order_obj(item) for item in resp['Items']]
+        if order_history_filter.fields:
+            orders = [self._to_projected_dict(item, order_history_filter.fields) for item in items]
+        else:
+            orders = [self._dynamo_obj_to_order_obj(item) for item in items]
+        return order_history_model.OrderHistoryPage(
+                    orders=orders,
+                    next_token=page_token.encode(last_evaluated_key) if last_evaluated_key else None)
 
     def find_by_id(self, order_id) -> order_history_model.Order:
         with dx.dynamo_exception_check():
@@ -229,7 +504,7 @@ class DynamoDbDao(AbstractDao):
         return self._dynamo_obj_to_order_obj(resp['Item'])
 
     @staticmethod
-    def _to_dynamo_dict(order, order_event_id):
+    def _to_dynamo_dict(order, order_event_id, creation_date: str = None):
         order_dict = order.to_dict()
 
         # order_idをDynamo PrimaryKeyに変換
@@ -237,33 +512,153 @@ class DynamoDbDao(AbstractDao):
         order_dict['SK'] = f"METADATA#{order.order_id}"
         del order_dict['order_id']
 
-        # for Idempotence
-        order_dict['order_event_id'] = order_event_id
+        # for Idempotence (event の event_id は文字列 "66" なので、条件式で比べられるよう N にする)
+        order_dict['order_event_id'] = int(order_event_id)
 
-        # DynamoDB GSI SK for Sorted Query
-        order_dict['creation_date'] = datetime.datetime.strftime(datetime.datetime.utcnow(),
-                                                                 '%Y-%m-%dT%H:%M:%S.%fZ')
+        # DynamoDB GSI SK for Sorted Query (rebuild では OrderCreated の timestamp)
+        order_dict['creation_date'] = creation_date or datetime.datetime.strftime(datetime.datetime.utcnow(),
+                                                                                  '%Y-%m-%dT%H:%M:%S.%fZ')
+        # ORDER_STATE_INDEX の PK
+        order_dict['consumer_order_state'] = f"{order.consumer_id}#{order_dict['order_state']}"
 
         # valueがNoneのものを削除する (MAPなどのnest階層はそのまま)
         without_none = {k: v for k, v in order_dict.items() if v is not None}
         order_dict.clear()
         order_dict.update(without_none)
 
-        serializer = boto3.dynamodb.types.TypeSerializer()
-        dynamo_dict = {k: serializer.serialize(v) for k, v in order_dict.items()}
+        dynamo_dict = ORDER_HISTORY_CODEC.encode(order_dict)
         return dynamo_dict
 
+    @staticmethod
+    def _to_projected_dict(dynamo_item, fields: list[str]) -> dict:
+        """ ProjectionExpression で読んだ Item -> fields の dict (Order は組み立てない) """
+        python_obj = ORDER_HISTORY_CODEC.decode(dynamo_item)
+        if 'PK' in python_obj:
+            python_obj['order_id'] = python_obj['PK'].split('#')[1]
+        return {field: python_obj.get(field) for field in fields}
+
     @staticmethod
     def _dynamo_obj_to_order_obj(dynamo_item):
         """ DynamoDB obj -> Order Obj """
-        deserializer = boto3.dynamodb.types.TypeDeserializer()
-        python_obj = {k: deserializer.deserialize(v) for k, v in dynamo_item.items()}
+        python_obj = ORDER_HISTORY_CODEC.decode(dynamo_item)
         python_obj['order_id'] = python_obj['PK'].split('#')[1]
 
         del python_obj['PK']
         del python_obj['SK']
         del python_obj['creation_date']  # DynamoDB GSI SK for Sorted Query
-        del python_obj['order_event_id']  # for 冪等性
+        python_obj.pop('consumer_order_state', None)  # ORDER_STATE_INDEX の PK
+        for version in projection.VERSIONS:  # for 冪等性
+            python_obj.pop(version, None)
 
         order = order_history_model.Order.from_dict(python_obj)
         return order
+
+
+CONDITION_TERM = re.compile(r'attribute_not_exists\((#?\w+)\)|(#?\w+) ([<=]) (:\w+)')
+
+
+class InMemoryDao(DynamoDbDao):
+    """
+    test / benchmark 用の in-memory 実装
+        DynamoDbDao と同じ request (to_put_request / to_projection_request / to_merge_request) を作り、
+        DynamoDB の代わりに dict (PK, SK) -> Item に書き込む。
+        書き込み条件も同じ: 'attribute_not_exists(#x)', '#x < :y', '#x = :y' を OR / AND でつないだもの
+        (満たさない場合は dx.ConditionalCheckFailedException)
+        update は DynamoDB の UpdateItem と同じく Item が無ければ作成する。
+        Query / BatchGetItem は同じ request を items に適用し、読んだ Item の数を items_read に数える。
+    """
+    def __init__(self):
+        self.table_name = 'OrderHistory'
+        self.items = {}
+        self.items_read = 0
+
+    def write_items(self, items: list[dict]):
+        for item in items:
+            self.items[(item['PK']['S'], item['SK']['S'])] = item
+
+    def find_consumer_id(self, order_id) -> Optional[int]:
+        item = self.items.get((f'ORDER#{order_id}', f'METADATA#{order_id}'), {})
+        return int(item['consumer_id']['N']) if 'consumer_id' in item else None
+
+    def get_order_item(self, order_id) -> Optional[dict]:
+        return self.items.get((f'ORDER#{order_id}', f'METADATA#{order_id}'))
+
+    @staticmethod
+    def condition_holds(request: dict, item: Optional[dict]) -> bool:
+        """ ConditionExpression: '(attribute_not_exists(#x) OR #x < :y) AND #z = :w' """
+        names = request.get('ExpressionAttributeNames', {})
+        values = request.get('ExpressionAttributeValues', {})
+        item = item or {}
+
+        def holds(term: re.Match) -> bool:
+            not_exists, name, operator, value = term.groups()
+            if not_exists:
+                return names.get(not_exists, not_exists) not in item
+            attribute = names.get(name, name)
+            if attribute not in item:
+                return False
+            if operator == '=':
+                return item[attribute] == values[value]
+            return int(item[attribute]['N']) < int(values[value]['N'])
+
+        return all(any(holds(term) for term in CONDITION_TERM.finditer(clause))
+                   for clause in request['ConditionExpression'].split(' AND '))
+
+    def write(self, request: dict):
+        key_attributes = request['Key'] if 'Key' in request else request['Item']
+        key = (key_attributes['PK']['S'], key_attributes['SK']['S'])
+        current = self.items.get(key)
+        if not self.condition_holds(request, current):
+            raise dx.ConditionalCheckFailedException(f'ConditionalCheckFailedException: {key}')
+
+        if 'Item' in request:
+            self.items[key] = request['Item']
+            return
+        # UpdateExpression: 'SET #a = :a'
+        item = dict(current or request['Key'])
+        for action in request['UpdateExpression'].removeprefix('SET ').split(', '):
+            name, value = action.split(' = ')
+            item[request['ExpressionAttributeNames'][name]] = request['ExpressionAttributeValues'][value]
+        self.items[key] = item
+
+    @staticmethod
+    def index_key(request: dict, item: dict) -> dict:
+        """ LastEvaluatedKey (table の key + index の key) """
+        names = request['ExpressionAttributeNames']
+        return {k: item[k] for k in ('PK', 'SK', names['#pk'], names['#sk'])}
+
+    def query(self, request: dict) -> dict:
+        """ KeyConditionExpression '#pk = :pk AND #sk > :since' を満たす Item の #sk の降順 (Query の response) """
+        names = request['ExpressionAttributeNames']
+        values = request['ExpressionAttributeValues']
+        partition_key, sort_key_name = names['#pk'], names['#sk']
+        items = [item for item in self.items.values()
+                 if item.get(partition_key) == values[':pk']
+                 and sort_key_name in item
+                 and item[sort_key_name]['S'] > values[':since']['S']]
+        sort_key = lambda item: (item[sort_key_name]['S'], item['PK']['S'], item['SK']['S'])
+        items.sort(key=sort_key, reverse=True)
+        if 'ExclusiveStartKey' in request:
+            start = sort_key(request['ExclusiveStartKey'])
+            items = [item for item in items if sort_key(item) < start]
+        items = items[:request['Limit']]
+        self.items_read += len(items)
+        resp = {'Items': items}
+        if len(items) == request['Limit']:
+            resp['LastEvaluatedKey'] = self.index_key(request, items[-1])
+        if 'ProjectionExpression' in request:
+            attributes = {names[name] for name in request['ProjectionExpression'].split(', ')}
+            resp['Items'] = [{k: v for k, v in item.items() if k in attributes} for item in items]
+        return resp
+
+    def get_orders(self, order_ids: list[str]) -> list[dict]:
+        items = [self.items[key] for key in ((f'ORDER#{order_id}', f'METADATA#{order_id}') for order_id in order_ids)
+                 if key in self.items]
+        self.items_read += len(items)
+        return items
+
+    def find_by_id(self, order_id) -> order_history_model.Order:
+        item = self.items.get((f'ORDER#{order_id}', f'METADATA#{order_id}'))
+        if item is None:
+            raise ex.ItemNotFoundException(f'order_id: {order_id}')
+        return self._dynamo_obj_to_order_obj(item)
@@ -0,0 +1,55 @@
+"""
+GET /orders の page token
+    Query の LastEvaluatedKey を JSON にして HMAC-SHA256 で署名し、不透明な文字列にする。
+    client は次の page の request に page token をそのまま渡す。改竄された token は InvalidPageToken。
+
+        token = page_token.encode(resp['LastEvaluatedKey'])
+        request['ExclusiveStartKey'] = page_token.decode(token)
+
+    環境変数
+        ORDER_HISTORY_PAGE_TOKEN_KEY: 署名の key (Lambda の全ての実行環境で同じ値にする)
+                                      未設定の時は token を作らず PageTokenKeyNotConfigured を送出する
+                                      (repository に書いた既定の key では誰でも token を偽造できる)
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+from order_history_layers.common import exceptions as ex
+
+SIGNATURE_BYTES = 16
+
+
+def _key() -> bytes:
+    key = os.environ.get('ORDER_HISTORY_PAGE_TOKEN_KEY')
+    if not key:
+        raise ex.PageTokenKeyNotConfigured('ORDER_HISTORY_PAGE_TOKEN_KEY is not set')
+    return key.encode()
+
+
+def _b64encode(b: bytes) -> bytes:
+    return base64.urlsafe_b64encode(b).rstrip(b'=')
+
+
+def _b64decode(b: bytes) -> bytes:
+    return base64.urlsafe_b64decode(b + b'=' * (-len(b) % 4))
+
+
+def _sign(payload: bytes) -> bytes:
+    return _b64encode(hmac.new(_key(), payload, hashlib.sha256).digest()[:SIGNATURE_BYTES])
+
+
+def encode(last_evaluated_key: dict) -> str:
+    payload = _b64encode(json.dumps(last_evaluated_key, separators=(',', ':'), sort_keys=True).encode())
+    return (payload + b'.' + _sign(payload)).decode()
+
+
+def decode(token: str) -> dict:
+    try:
+        payload, signature = token.encode().split(b'.')
+    except (UnicodeEncodeError, ValueError):
+        raise ex.InvalidPageToken(f'page token: {token}')
+    if not hmac.compare_digest(signature, _sign(payload)):
+        raise ex.InvalidPageToken(f'page token: {token}')
+    return json.loads(_b64decode(payload))
@@ -0,0 +1,126 @@
+"""
+Order History Item (METADATA#{order_id}) への event の projection
+    event type 毎に、更新する attribute と冪等性の version (event の発行元毎の event_id) を PROJECTIONS の表で持つ。
+    UpdateExpression / ConditionExpression / ExpressionAttributeNames は attribute と version の組み合わせ毎に
+    1回だけ組み立てる (compile_update)。
+    同じ Item の複数の event は1回の UpdateItem にまとめる (to_update_request)。
+        SET:  event_id の順に event を適用した attribute と、version (最大の event_id)
+        条件: attribute_not_exists(#version) OR #version < :version_guard (最小の event_id)
+              まだ1つも適用していない event だけの時に書き込む。event を1つずつ書き込んだ場合と同じ結果になる。
+"""
+import dataclasses
+import functools
+from typing import Optional
+from order_history_layers.model import order_history_model
+
+
+@dataclasses.dataclass(frozen=True)
+class Projection:
+    """
+    1 event type の projection
+        version:    冪等性の attribute。この event の event_id と比べ、書き込む
+        attributes: attribute 名 -> 値。関数の場合は (event, context) から値を作る (None の attribute は SET しない)
+        context:    attributes の関数が使う context の key (DAO が読む)
+    """
+    version: str
+    attributes: dict
+    context: tuple = ()
+
+
+def order_state(state: order_history_model.OrderState) -> Projection:
+    def consumer_order_state(event, context: dict) -> Optional[str]:
+        # ORDER_STATE_INDEX の PK。OrderCreated より先に届いた event では consumer_id が無い
+        consumer_id = context.get('consumer_id')
+        return f'{consumer_id}#{state.value}' if consumer_id is not None else None
+
+    return Projection(version='order_event_id',
+                      attributes={'order_state': state.value, 'consumer_order_state': consumer_order_state},
+                      context=('consumer_id',))
+
+
+def ticket_state(state: order_history_model.TicketState, **attributes) -> Projection:
+    return Projection(version='ticket_event_id', attributes={'ticket_state': state.value, **attributes})
+
+
+def delivery_state(state: order_history_model.DeliveryState) -> Projection:
+    return Projection(version='delivery_event_id', attributes={'delivery_state': state.value})
+
+
+PROJECTIONS = {
+    # Order Service
+    'OrderAuthorized': order_state(order_history_model.OrderState.APPROVED),
+    'OrderCancelled': order_state(order_history_model.OrderState.CANCELLED),
+    'OrderRejected': order_state(order_history_model.OrderState.REJECTED),
+    # Kitchen Service (ticket_id は order_id と同じ)
+    'TicketAccepted': ticket_state(order_history_model.TicketState.ACCEPTED,
+                                   ready_by=lambda event, context: event.ready_by),
+    'TicketCancelled': ticket_state(order_history_model.TicketState.CANCELLED),
+    # Delivery Service (delivery_id は order_id と同じ)
+    'DeliveryPickedup': delivery_state(order_history_model.DeliveryState.PICKEDUP),
+    'DeliveryDelivered': delivery_state(order_history_model.DeliveryState.DELIVERED),
+}
+VERSIONS = tuple(dict.fromkeys(projection.version for projection in PROJECTIONS.values()))
+# version -> その発行元の event が SET する attribute (OrderCreated より先に届いた event の Item との merge に使う)
+ATTRIBUTES = {version: tuple(dict.fromkeys(name for projection in PROJECTIONS.values() if projection.version == version
+                                           for name in projection.attributes))
+              for version in VERSIONS}
+
+
+def projection_of(event) -> Projection:
+    event_type = event.__class__.__name__
+    if event_type not in PROJECTIONS:
+        raise Exception(f"NotSupportEvent: {event_type}")
+    return PROJECTIONS[event_type]
+
+
+def context_keys(events: list) -> set:
+    return {key for event in events for key in projection_of(event).context}
+
+
+def fold(events: list, context: dict) -> tuple[dict, dict]:
+    """
+    events を event_id の順に適用する
+        return: (attribute 名 -> 値, version -> (最小の event_id, 最大の event_id))
+    """
+    attributes, versions = {}, {}
+    for event in sorted(events, key=lambda event: int(event.event_id)):
+        projection = projection_of(event)
+        for name, value in projection.attributes.items():
+            value = value(event, context) if callable(value) else value
+            if value is not None:
+                attributes[name] = value
+        event_id = int(event.event_id)
+        versions[projection.version] = (versions.get(projection.version, (event_id,))[0], event_id)
+    return attributes, versions
+
+
+@functools.lru_cache(maxsize=None)
+def compile_update(attributes: tuple, versions: tuple) -> tuple[str, str, dict]:
+    """ (UpdateExpression, ConditionExpression, ExpressionAttributeNames) """
+    names = attributes + versions
+    update_expression = 'SET ' + ', '.join(f'#{name} = :{name}' for name in names)
+    condition_expression = ' AND '.join(f'(attribute_not_exists(#{version}) OR #{version} < :{version}_guard)'
+                                        for version in versions)
+    return update_expression, condition_expression, {f'#{name}': name for name in names}
+
+
+def to_update_request(table_name: str, order_id: str, events: list, codec, context: dict = None) -> dict:
+    """ 同じ order の events を1つの UpdateItem request にする。codec は attribute の値の encoder (ItemCodec) """
+    attributes, versions = fold(events, context or {})
+    update_expression, condition_expression, names = compile_update(tuple(sorted(attributes)), tuple(sorted(versions)))
+    values = {f':{name}': value for name, value in codec.encode(attributes).items()}
+    for version, (first, last) in versions.items():
+        values[f':{version}'] = {'N': str(last)}
+        values[f':{version}_guard'] = {'N': str(first)}
+    return {
+        'TableName': table_name,
+        'Key': {
+            'PK': {'S': f'ORDER#{order_id}'},
+            'SK': {'S': f'METADATA#{order_id}'},
+        },
+        'UpdateExpression': update_expression,
+        'ConditionExpression': condition_expression,
+        'ExpressionAttributeNames': dict(names),  # cache した dict を request 毎に書き換えられないように copy
+        'ExpressionAttributeValues': values,
+        'ReturnValues': 'NONE',
+    }
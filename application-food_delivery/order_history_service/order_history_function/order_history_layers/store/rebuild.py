@@ -0,0 +1,314 @@
+"""
+Order History rebuild (backfill)
+    OrderEvent / KitchenEvent / DeliveryEvent table の event を読み直し、OrderHistory table の Order Item と
+    Keyword Item を作り直す。(Item の schema や GSI を変更した時、table を作り直す時)
+
+    1. scan:    event table 毎に segments 個の segment を worker pool で並行に Scan し、
+                event の Item を order_id の hash で shard に分けて work_dir に書き出す。
+                1 order の event は3つの table に分かれ、Scan の順序も決まらないので、一度 shard に集める。
+    2. project: shard 毎に event を order でまとめ、OrderHistoryService と同じ projection
+                (DynamoDbDao.to_put_request() と projection.PROJECTIONS。event_id の順に適用) で Item を作り、
+                BatchWriteItem (UnprocessedItems の再試行) で書き込む。書き込みは max_wcu (WCU/秒) で制限する。
+
+    work_dir/checkpoint.json に完了した segment と shard を記録し、同じ work_dir で再実行すると続きから実行する。
+    (途中の segment / shard は最初からやり直す。Put は同じ Item になるので、やり直しても結果は同じ)
+
+    OrderCreated が無い order は書き込まず skipped に数える。creation_date は OrderCreated の timestamp。
+    SQS からの projection と同時に実行すると、rebuild の Put が新しい state を上書きすることがある。
+    新しい table に rebuild してから切り替えるか、event source mapping を止めて実行する。
+
+    cd application-food_delivery
+    PYTHONPATH=order_history_service/order_history_function \
+        python -m order_history_layers.store.rebuild --table OrderHistoryService --work-dir /tmp/rebuild \
+            --segments 32 --workers 32 --max-wcu 20000
+"""
+import os
+import json
+import math
+import time
+import zlib
+import shutil
+import pathlib
+import argparse
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from order_history_layers.common import log
+from order_history_layers.common import serializer
+from order_history_layers.model import order_history_model
+from order_history_layers.service import events
+from order_history_layers.store import aws_clients
+from order_history_layers.store import dynamo_codec
+from order_history_layers.store import dynamo_exception as dx
+from order_history_layers.store import order_history_dao
+from order_history_layers.store import projection
+
+logger = log.get_logger(__name__)
+
+EVENT_TABLES = ('OrderEvent', 'KitchenEvent', 'DeliveryEvent')
+EVENT_CODEC = dynamo_codec.ItemCodec({
+    'PK': dynamo_codec.S,
+    'SK': dynamo_codec.S,
+    'timestamp': dynamo_codec.S,
+    'event_id': dynamo_codec.N,
+})
+# OrderCreated と projection.PROJECTIONS の event だけを読む (OrderRevised, TicketCreated などは読み飛ばす)
+EVENT_CLASSES = {event_type: getattr(events, event_type) for event_type in ('OrderCreated', *projection.PROJECTIONS)}
+
+
+def shard_of(key: str, shards: int) -> int:
+    """ 実行毎に同じ shard にする (hash() は process 毎に変わる) """
+    return zlib.crc32(key.encode()) % shards
+
+
+def event_type_of(item: dict):
+    """ SK: EVENTTYPE#OrderCreated#EVENTID#1234 (IDCOUNTER などの Item は None) """
+    sk = item['SK']['S'].split('#')
+    return sk[1] if len(sk) == 4 and sk[0] == 'EVENTTYPE' else None
+
+
+def to_event(item: dict) -> events.DomainEventEnvelope:
+    """ event table の Item -> event (domain event function が EventBridge に publish する detail と同じ変換) """
+    detail = EVENT_CODEC.decode(item)
+    detail['aggregate'], detail['aggregate_id'] = detail.pop('PK').split('#', 1)
+    detail['event_type'] = event_type_of(item)
+    detail['event_id'] = int(detail.pop('SK').split('#')[3])
+    # Decimal は publish (JSONEncoder) と同じく int / float にする
+    return EVENT_CLASSES[detail['event_type']].from_event(serializer.to_plain(detail))
+
+
+def write_units(item: dict) -> int:
+    """ Item の WCU の見積もり (AttributeValue の JSON は Item size より大きいので、多めに見積もる) """
+    return max(math.ceil(len(json.dumps(item)) / 1024), 1)
+
+
+class RateLimiter:
+    """ token bucket (units/秒)。worker の thread で共有する。rate が None の場合は制限しない """
+
+    def __init__(self, rate: float = None):
+        self.rate = rate
+        self.tokens = rate or 0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, units: float):
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= units
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class Checkpoint:
+    """ work_dir/checkpoint.json: 完了した segment / shard と、その集計 """
+
+    def __init__(self, path: pathlib.Path, params: dict):
+        self.path = path
+        self.lock = threading.Lock()
+        if path.exists():
+            self.state = json.loads(path.read_text())
+            if self.state['params'] != params:
+                raise ValueError(f"checkpoint の設定と違う: {self.state['params']} != {params}")
+        else:
+            self.state = {'params': params, 'segments': [], 'shards': [], 'stats': {}}
+
+    def done(self, kind: str, key) -> bool:
+        return key in self.state[kind]
+
+    def complete(self, kind: str, key, stats: dict):
+        with self.lock:
+            self.state[kind].append(key)
+            for name, value in stats.items():
+                self.state['stats'][name] = self.state['stats'].get(name, 0) + value
+            tmp = self.path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(self.state))
+            os.replace(tmp, self.path)  # 書きかけの checkpoint を残さない
+
+    @property
+    def stats(self) -> dict:
+        return dict(self.state['stats'])
+
+
+class OrderHistoryRebuild:
+
+    def __init__(self, dao: order_history_dao.DynamoDbDao, work_dir, event_tables=EVENT_TABLES,
+                 segments: int = 16, shards: int = 64, workers: int = 16, max_wcu: float = None):
+        self.dao = dao
+        self.work_dir = pathlib.Path(work_dir)
+        self.event_tables = tuple(event_tables)
+        self.segments = segments
+        self.shards = shards
+        self.workers = workers
+        self.limiter = RateLimiter(max_wcu)
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self.checkpoint = Checkpoint(self.work_dir / 'checkpoint.json', {
+            'table': dao.table_name, 'event_tables': list(self.event_tables),
+            'segments': segments, 'shards': shards,
+        })
+
+    def run(self) -> dict:
+        self.run_tasks(self.scan_segment, [(table, segment) for table in self.event_tables
+                                           for segment in range(self.segments)
+                                           if not self.checkpoint.done('segments', f'{table}#{segment}')])
+        self.run_tasks(self.project_shard, [(shard,) for shard in range(self.shards)
+                                            if not self.checkpoint.done('shards', shard)])
+        return self.checkpoint.stats
+
+    def run_tasks(self, task, args_list: list):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(task, *args) for args in args_list]
+            for future in futures:
+                future.result()  # 失敗した task の例外を raise する (完了した task は checkpoint 済み)
+
+    # ------------------------------------------------------------
+    # 1. scan
+    # ------------------------------------------------------------
+    def scan_segment(self, table: str, segment: int):
+        directory = self.work_dir / 'scan' / f'{table}-{segment:04}'
+        tmp = directory.with_name(directory.name + '.tmp')
+        for path in (directory, tmp):  # 前回の途中の segment
+            shutil.rmtree(path, ignore_errors=True)
+        tmp.mkdir(parents=True)
+
+        files, scanned, events_ = {}, 0, 0
+        try:
+            for item in self.scan(table, segment):
+                scanned += 1
+                if event_type_of(item) not in EVENT_CLASSES:
+                    continue
+                shard = shard_of(item['PK']['S'].split('#', 1)[1], self.shards)
+                if shard not in files:
+                    files[shard] = open(tmp / f'shard-{shard:04}.jsonl', 'w')
+                files[shard].write(json.dumps(item) + '\n')
+                events_ += 1
+        finally:
+            for file in files.values():
+                file.close()
+        tmp.rename(directory)  # 書き終えた segment だけを project で読む
+        self.checkpoint.complete('segments', f'{table}#{segment}', {'scanned': scanned, 'events': events_})
+        logger.info('scan_segment() %s#%s: scanned: %s, events: %s', table, segment, scanned, events_)
+
+    def scan(self, table: str, segment: int):
+        request = {'TableName': table, 'Segment': segment, 'TotalSegments': self.segments}
+        while True:
+            resp = self.scan_page(request)
+            yield from resp.get('Items', [])
+            if 'LastEvaluatedKey' not in resp:
+                return
+            request['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+
+    def scan_page(self, request: dict) -> dict:
+        with dx.dynamo_exception_check():
+            return aws_clients.client('dynamodb').scan(**request)
+
+    # ------------------------------------------------------------
+    # 2. project
+    # ------------------------------------------------------------
+    def project_shard(self, shard: int):
+        order_events = collections.defaultdict(list)
+        for path in sorted((self.work_dir / 'scan').glob(f'*[0-9]/shard-{shard:04}.jsonl')):
+            with open(path) as file:
+                for line in file:
+                    event = to_event(json.loads(line))
+                    order_events[event.aggregate_id].append(event)
+
+        items, skipped = [], 0
+        for order_id, events_ in order_events.items():
+            order_items = self.to_items(events_)
+            if not order_items:
+                logger.debug('project_shard() order_id: %s: OrderCreated が無い', order_id)
+                skipped += 1
+            items += order_items
+
+        units = self.write(items)
+        self.checkpoint.complete('shards', shard, {'orders': len(order_events) - skipped, 'skipped': skipped,
+                                                   'items': len(items), 'write_units': units})
+        logger.info('project_shard() %s: orders: %s, skipped: %s', shard, len(order_events) - skipped, skipped)
+
+    def to_items(self, events_: list) -> list[dict]:
+        """ 1 order の events -> Order Item と Keyword Item (OrderCreated が無い場合は []) """
+        created = min((event for event in events_ if isinstance(event, events.OrderCreated)),
+                      key=lambda event: int(event.event_id), default=None)
+        if created is None:
+            return []
+        order = order_history_model.Order.create_order(
+            order_id=created.order_id,
+            order_details=created.order_details,
+            delivery_information=created.delivery_information)
+        state_events = [event for event in events_ if not isinstance(event, events.OrderCreated)]
+        item = self.dao.to_put_request(order, created.event_id, state_events, creation_date=created.timestamp)['Item']
+        return [item, *self.dao.to_keyword_items(order, item['creation_date']['S'])]
+
+    def write(self, items: list[dict]) -> int:
+        """ BatchWriteItem (25 Item 毎) を max_wcu で制限して書き込み、WCU の見積もりを返す """
+        total = 0
+        for i in range(0, len(items), order_history_dao.BATCH_WRITE_ITEMS_LIMIT):
+            chunk = items[i:i + order_history_dao.BATCH_WRITE_ITEMS_LIMIT]
+            units = sum(write_units(item) for item in chunk)
+            self.limiter.acquire(units)
+            self.dao.write_items(chunk)
+            total += units
+        return total
+
+
+class InMemoryRebuild(OrderHistoryRebuild):
+    """
+    test / benchmark 用の in-memory 実装
+        event table を dict (table名 -> [Item]) で持ち、Scan の segment は PK の crc32 で分ける。
+        page_size: 1回の Scan で返す Item の数 (DynamoDB は 1MB まで)
+    """
+    def __init__(self, dao, tables: dict, work_dir, page_size: int = 1000, **kwargs):
+        self.tables = tables
+        self.page_size = page_size
+        self.scan_pages = 0
+        self._segments = {}
+        self._segments_lock = threading.Lock()
+        super().__init__(dao, work_dir, event_tables=tuple(tables), **kwargs)
+
+    def scan_page(self, request: dict) -> dict:
+        with self._segments_lock:
+            self.scan_pages += 1
+            key = (request['TableName'], request['TotalSegments'])
+            if key not in self._segments:
+                segments = [[] for _ in range(request['TotalSegments'])]
+                for item in self.tables[request['TableName']]:
+                    segments[shard_of(item['PK']['S'], request['TotalSegments'])].append(item)
+                self._segments[key] = segments
+        items = self._segments[key][request['Segment']]
+        start = request.get('ExclusiveStartKey', 0)
+        resp = {'Items': items[start:start + self.page_size]}
+        if start + self.page_size < len(items):
+            resp['LastEvaluatedKey'] = start + self.page_size
+        return resp
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m order_history_layers.store.rebuild')
+    parser.add_argument('--table', default=os.environ.get('DYNAMODB_TABLE_NAME', 'OrderHistory'),
+                        help='書き込む OrderHistory table')
+    parser.add_argument('--event-tables', nargs='+', default=list(EVENT_TABLES))
+    parser.add_argument('--work-dir', required=True,
+                        help='shard と checkpoint.json の directory (同じ directory で再実行すると続きから実行する)')
+    parser.add_argument('--segments', type=int, default=16, help='event table 毎の Scan の TotalSegments')
+    parser.add_argument('--shards', type=int, default=64, help='project の単位 (order_id の hash)')
+    parser.add_argument('--workers', type=int, default=16, help='並行に Scan / project する thread の数')
+    parser.add_argument('--max-wcu', type=float, help='書き込みの上限 (WCU/秒)。default: 制限しない')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('BOTO_MAX_POOL_CONNECTIONS', str(args.workers))  # worker 毎に HTTP connection
+    dao = order_history_dao.DynamoDbDao()
+    dao.table_name = args.table
+    rebuild = OrderHistoryRebuild(dao, args.work_dir, event_tables=args.event_tables, segments=args.segments,
+                                  shards=args.shards, workers=args.workers, max_wcu=args.max_wcu)
+    start = time.monotonic()
+    stats = rebuild.run()
+    print(json.dumps({**stats, 'seconds': round(time.monotonic() - start, 1)}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+
+FUNCTION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                            'order_history_function')
+
+# sys.modules を見るので、新しい process で controller を import する
+SCRIPT = '''
+import contextlib, io, sys
+from order_history_layers.presentation import controller
+from order_history_layers.store import order_history_dao
+
+class FakeDao:
+    OrderHistoryFilter = order_history_dao.DynamoDbDao.OrderHistoryFilter
+    def find_order_history(self, consumer_id, order_history_filter):
+        return []
+
+def state():
+    return controller.handler.cache_info().currsize, 'order_history_layers.service.events' in sys.modules
+
+print(*state())
+order_history_dao.DynamoDbDao = FakeDao
+with contextlib.redirect_stdout(io.StringIO()):
+    response = controller.rest_invocation({'httpMethod': 'GET', 'path': '/orders'})
+print(response['statusCode'], *state())
+with contextlib.redirect_stdout(io.StringIO()), contextlib.suppress(Exception):
+    controller.eventbus_invocation({'source': 'com.order.created', 'detail': {'event_type': 'Unknown'}})
+print(*state())
+'''
+
+
+def test_get_orders_does_not_load_the_writer_path():
+    env = dict(os.environ, PYTHONPATH=FUNCTION_DIR, AWS_DEFAULT_REGION='ap-northeast-1')
+    output = subprocess.run([sys.executable, '-c', SCRIPT], env=env, check=True,
+                            capture_output=True, text=True).stdout.splitlines()
+
+    assert output[0] == '0 False'        # import 時は DAO / Handler を作らない
+    assert output[1] == '200 1 False'    # GET /orders は events を import しない
+    assert output[2] == '1 True'         # EventBridge の invocation で writer path を import する
@@ -0,0 +1,116 @@
+import json
+import pytest
+from order_history_layers.presentation import controller
+from order_history_layers.store import order_history_dao
+
+A = 'a' * 32
+B = 'b' * 32
+
+
+def order_event(event_type, event_id, aggregate_id, **detail) -> dict:
+    return {'source': 'com.order.created', 'detail-type': 'OrderCreated',
+            'detail': {'aggregate': 'ORDER', 'aggregate_id': aggregate_id, 'event_type': event_type,
+                       'event_id': str(event_id), 'timestamp': '2023-01-10T07:53:40.478405Z', **detail}}
+
+
+def order_created(event_id, order_id) -> dict:
+    return order_event('OrderCreated', event_id, order_id, order_id=order_id,
+                       order_details={'consumer_id': 4, 'restaurant_id': 27,
+                                      'order_line_items': [{'menu_id': '000001', 'name': 'Curry Rice',
+                                                            'price': {'value': 800, 'currency': 'JPY'},
+                                                            'quantity': 3}],
+                                      'order_total': {'value': 2400, 'currency': 'JPY'}},
+                       delivery_information={'delivery_time': '2022-11-30T05:00:30.001000Z',
+                                             'delivery_address': {'street1': '9 Amazing View', 'street2': 'Soi 8',
+                                                                  'city': 'Oakland', 'state': 'CA',
+                                                                  'zip': '94612'}})
+
+
+def delivery_event(event_type, event_id, order_id) -> dict:
+    return {'source': 'com.delivery.created', 'detail-type': 'DeliveryCreated',
+            'detail': {'aggregate': 'DELIVERY', 'aggregate_id': order_id, 'event_type': event_type,
+                       'event_id': str(event_id), 'timestamp': '2023-01-10T07:53:40.478405Z',
+                       'delivery_id': order_id}}
+
+
+def sqs_event(*bodies) -> dict:
+    return {'Records': [{'messageId': f'm{i}', 'body': body if isinstance(body, str) else json.dumps(body)}
+                        for i, body in enumerate(bodies)]}
+
+
+class CountingDao(order_history_dao.InMemoryDao):
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    def write(self, request: dict):
+        self.writes.append('Put' if 'Item' in request else 'Update')
+        super().write(request)
+
+
+@pytest.fixture
+def dao(monkeypatch):
+    dao = CountingDao()
+    monkeypatch.setattr(controller.order_history_dao, 'DynamoDbDao', lambda: dao)
+    controller.handler.cache_clear()
+    yield dao
+    controller.handler.cache_clear()
+
+
+def test_events_of_an_order_are_coalesced(dao):
+    controller.sqs_invocation(sqs_event(order_created(1, B)))
+    dao.writes.clear()
+
+    resp = controller.sqs_invocation(sqs_event(
+        order_created(1, A),
+        order_event('OrderAuthorized', 2, A, order_id=A),
+        delivery_event('DeliveryPickedup', 3, A),
+        order_event('OrderAuthorized', 2, B, order_id=B),
+        delivery_event('DeliveryPickedup', 3, B)))
+
+    assert resp == {'batchItemFailures': []}
+    assert dao.writes == ['Put', 'Update']
+    for order_id in [A, B]:
+        order = dao.find_by_id(order_id)
+        assert (order.order_state.value, order.delivery_state.value) == ('APPROVED', 'PICKEDUP')
+    assert dao.items[(f'ORDER#{A}', f'METADATA#{A}')]['consumer_order_state'] == {'S': '4#APPROVED'}
+    assert dao.items[(f'ORDER#{B}', f'METADATA#{B}')]['consumer_order_state'] == {'S': '4#APPROVED'}
+
+
+def test_latest_event_wins_within_a_batch(dao):
+    controller.sqs_invocation(sqs_event(
+        order_event('OrderCancelled', 5, A, order_id=A),
+        order_created(1, A),
+        order_event('OrderAuthorized', 2, A, order_id=A)))
+
+    assert dao.find_by_id(A).order_state.value == 'CANCELLED'
+
+
+def test_redelivered_event_falls_back_to_event_by_event(dao):
+    controller.sqs_invocation(sqs_event(order_created(1, A), order_event('OrderAuthorized', 2, A, order_id=A)))
+
+    resp = controller.sqs_invocation(sqs_event(order_created(1, A), delivery_event('DeliveryDelivered', 4, A)))
+
+    assert resp == {'batchItemFailures': []}
+    order = dao.find_by_id(A)
+    assert (order.order_state.value, order.delivery_state.value) == ('APPROVED', 'DELIVERED')
+
+
+def test_partial_batch_failures(dao, monkeypatch):
+    save_events = dao.save_events
+
+    def fail_b(order_id, *args, **kwargs):
+        if order_id == B:
+            raise Exception('DynamoDB error')
+        return save_events(order_id, *args, **kwargs)
+    monkeypatch.setattr(dao, 'save_events', fail_b)
+
+    resp = controller.sqs_invocation(sqs_event(
+        order_created(1, A),
+        'not json',
+        order_event('OrderRevised', 2, A, order_id=A),
+        order_created(1, B),
+        order_event('OrderAuthorized', 2, B, order_id=B)))
+
+    assert resp == {'batchItemFailures': [{'itemIdentifier': m} for m in ['m1', 'm2', 'm3', 'm4']]}
+    assert dao.find_by_id(A).order_state.value == 'APPROVAL_PENDING'
@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def page_token_key(monkeypatch):
+    # page_token は署名の key が未設定だと token を作らない
+    monkeypatch.setenv('ORDER_HISTORY_PAGE_TOKEN_KEY', 'test-page-token-key')
@@ -0,0 +1,71 @@
+import pytest
+from order_history_layers.common import exceptions as ex
+from order_history_layers.service import events
+from order_history_layers.service import service
+from order_history_layers.store import dynamo_exception as dx
+from order_history_layers.store import order_history_dao
+
+ORDER_ID = '1b3d5cc1a8d64c53aba796364af9eab6'
+
+
+def order_created(event_id, order_id=ORDER_ID, consumer_id=4):
+    return events.OrderCreated.from_event({
+        'aggregate': 'ORDER', 'aggregate_id': order_id, 'event_type': 'OrderCreated',
+        'event_id': event_id, 'timestamp': '2023-01-10T07:53:40.478405Z', 'order_id': order_id,
+        'order_details': {
+            'consumer_id': consumer_id, 'restaurant_id': 27,
+            'order_line_items': [{'menu_id': '000001', 'name': 'Curry Rice',
+                                  'price': {'value': 800, 'currency': 'JPY'}, 'quantity': 3}],
+            'order_total': {'value': 2400, 'currency': 'JPY'},
+        },
+        'delivery_information': {
+            'delivery_time': '2022-11-30T05:00:30.001000Z',
+            'delivery_address': {'street1': '9 Amazing View', 'street2': 'Soi 8',
+                                 'city': 'Oakland', 'state': 'CA', 'zip': '94612'},
+        },
+    })
+
+
+def order_authorized(event_id, order_id=ORDER_ID):
+    return events.OrderAuthorized(aggregate='ORDER', aggregate_id=order_id, event_type='OrderAuthorized',
+                                  event_id=event_id, timestamp='2023-01-10T07:53:41.478405Z', order_id=order_id)
+
+
+@pytest.fixture
+def dao():
+    return order_history_dao.InMemoryDao()
+
+
+@pytest.fixture
+def order_history_service(dao):
+    return service.OrderHistoryService(dao)
+
+
+def test_create_order_is_idempotent(dao, order_history_service):
+    order_history_service.create_order(order_created(event_id=43))
+
+    with pytest.raises(dx.ConditionalCheckFailedException):
+        order_history_service.create_order(order_created(event_id=43))
+    assert dao.find_by_id(ORDER_ID).order_state.value == 'APPROVAL_PENDING'
+
+
+def test_update_order_state(dao, order_history_service):
+    order_history_service.create_order(order_created(event_id=43))
+
+    order_history_service.update_order_state(order_authorized(event_id=44))
+
+    assert dao.find_by_id(ORDER_ID).order_state.value == 'APPROVED'
+    with pytest.raises(dx.ConditionalCheckFailedException):
+        order_history_service.update_order_state(order_authorized(event_id=42))
+
+
+def test_find_order_history_is_newest_first(dao, order_history_service):
+    for event_id, order_id in enumerate(['a' * 32, 'b' * 32, 'c' * 32], start=1):
+        order_history_service.create_order(order_created(event_id, order_id))
+
+    page = dao.find_order_history(4, dao.OrderHistoryFilter())
+
+    assert [order.order_id for order in page.orders] == ['c' * 32, 'b' * 32, 'a' * 32]
+    assert page.next_token is None
+    with pytest.raises(ex.ItemNotFoundException):
+        dao.find_order_history(5, dao.OrderHistoryFilter())
@@ -0,0 +1,153 @@
+import pytest
+from order_history_layers.common import exceptions as ex
+from order_history_layers.service import events
+from order_history_layers.service import service
+from order_history_layers.store import order_history_dao
+
+CONSUMER_ID = 4
+MENUS = {
+    'a' * 32: ['Curry Rice', 'Salad'],
+    'b' * 32: ['Hamburger'],
+    'c' * 32: ['Green Curry', 'Rice'],
+}
+
+
+def order_created(event_id, order_id, menu_names, consumer_id=CONSUMER_ID):
+    return events.OrderCreated.from_event({
+        'aggregate': 'ORDER', 'aggregate_id': order_id, 'event_type': 'OrderCreated',
+        'event_id': event_id, 'timestamp': '2023-01-10T07:53:40.478405Z', 'order_id': order_id,
+        'order_details': {
+            'consumer_id': consumer_id, 'restaurant_id': 27,
+            'order_line_items': [{'menu_id': f'{i:06}', 'name': name,
+                                  'price': {'value': 800, 'currency': 'JPY'}, 'quantity': 1}
+                                 for i, name in enumerate(menu_names)],
+            'order_total': {'value': 800 * len(menu_names), 'currency': 'JPY'},
+        },
+        'delivery_information': {
+            'delivery_time': '2022-11-30T05:00:30.001000Z',
+            'delivery_address': {'street1': '9 Amazing View', 'street2': 'Soi 8',
+                                 'city': 'Oakland', 'state': 'CA', 'zip': '94612'},
+        },
+    })
+
+
+def order_authorized(event_id, order_id):
+    return events.OrderAuthorized(aggregate='ORDER', aggregate_id=order_id, event_type='OrderAuthorized',
+                                  event_id=event_id, timestamp='2023-01-10T07:53:41.478405Z', order_id=order_id)
+
+
+@pytest.fixture
+def dao():
+    dao = order_history_dao.InMemoryDao()
+    order_history_service = service.OrderHistoryService(dao)
+    for event_id, (order_id, menu_names) in enumerate(MENUS.items(), start=1):
+        order_history_service.create_order(order_created(event_id, order_id, menu_names))
+    order_history_service.create_order(order_created(10, 'f' * 32, ['Curry Rice'], consumer_id=5))
+    order_history_service.update_order_state(order_authorized(20, 'a' * 32))
+    return dao
+
+
+def order_ids(page):
+    return [order.order_id for order in page.orders]
+
+
+def test_status_is_served_from_order_state_index(dao):
+    request = dao.to_query_request(CONSUMER_ID, dao.OrderHistoryFilter(status='APPROVED'))
+
+    assert request['IndexName'] == order_history_dao.ORDER_STATE_INDEX
+    assert request['ExpressionAttributeValues'][':pk'] == {'S': f'{CONSUMER_ID}#APPROVED'}
+    assert order_ids(dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(status='APPROVED'))) == ['a' * 32]
+    assert order_ids(dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(status='APPROVAL_PENDING'))) == \
+        ['c' * 32, 'b' * 32]
+    with pytest.raises(ex.InvalidQueryParameter):
+        dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(status='approved'))
+
+
+def test_state_update_before_order_created_has_no_index_key(dao):
+    dao.project_events('d' * 32, [order_authorized(30, 'd' * 32)])
+
+    assert 'consumer_order_state' not in dao.items[(f'ORDER#{"d" * 32}', f'METADATA#{"d" * 32}')]
+
+
+def test_keyword_is_served_from_keyword_items(dao):
+    request = dao.to_query_request(CONSUMER_ID, dao.OrderHistoryFilter(keyword='Curry'))
+
+    assert 'IndexName' not in request
+    assert request['ExpressionAttributeValues'][':pk'] == {'S': f'KEYWORD#{CONSUMER_ID}#curry'}
+    assert order_ids(dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(keyword='Curry'))) == \
+        ['c' * 32, 'a' * 32]
+    assert order_ids(dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(keyword='curry rice'))) == \
+        ['c' * 32, 'a' * 32]
+    assert order_ids(dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(keyword='green curry'))) == \
+        ['c' * 32]
+
+
+def test_keyword_with_status_and_fields(dao):
+    page = dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(keyword='curry', status='APPROVED',
+                                                                      fields=['order_id', 'order_state']))
+
+    assert page.orders == [{'order_id': 'a' * 32, 'order_state': 'APPROVED'}]
+
+
+def test_keyword_pages_read_only_matching_orders(dao):
+    dao.items_read = 0
+    page = dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(keyword='curry', page_size=1))
+    next_page = dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(keyword='curry', page_size=1,
+                                                                           start_key_token=page.next_token))
+
+    assert order_ids(page) + order_ids(next_page) == ['c' * 32, 'a' * 32]
+    assert dao.items_read == 4  # Keyword Item 2 + Order Item 2
+
+
+@pytest.fixture
+def dao_with_pending_orders():
+    # APPROVED の Curry Rice は1件だけで、それより新しい APPROVAL_PENDING の Curry Rice が30件
+    dao = order_history_dao.InMemoryDao()
+    order_history_service = service.OrderHistoryService(dao)
+    order_history_service.create_order(order_created(1, 'a' * 32, ['Curry Rice']))
+    order_history_service.update_order_state(order_authorized(2, 'a' * 32))
+    for i in range(30):
+        order_history_service.create_order(order_created(10 + i, f'{i:032x}', ['Curry Rice']))
+    return dao
+
+
+def test_keyword_with_status_queries_until_page_is_filled(dao_with_pending_orders):
+    dao = dao_with_pending_orders
+
+    page = dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(keyword='curry', status='APPROVED',
+                                                                      page_size=5))
+
+    assert order_ids(page) == ['a' * 32]
+    assert page.next_token is None
+
+
+def test_keyword_with_status_pages_continue_after_last_order(dao_with_pending_orders):
+    dao = dao_with_pending_orders
+    pages, token = [], None
+    while True:
+        page = dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(
+            keyword='curry rice', status='APPROVAL_PENDING', page_size=7, start_key_token=token))
+        pages.append(order_ids(page))
+        token = page.next_token
+        if token is None:
+            break
+
+    assert [len(page) for page in pages] == [7, 7, 7, 7, 2]
+    assert sorted(order_id for page in pages for order_id in page) == [f'{i:032x}' for i in range(30)]
+
+
+def test_keyword_read_limit_returns_next_token(dao_with_pending_orders, monkeypatch):
+    dao = dao_with_pending_orders
+    monkeypatch.setattr(order_history_dao, 'KEYWORD_MAX_READ_ITEMS', 10)
+    monkeypatch.setattr(order_history_dao, 'BATCH_GET_ITEMS_LIMIT', 10)
+    pages, token = [], None
+    while True:
+        page = dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(keyword='curry', status='APPROVED',
+                                                                          start_key_token=token))
+        pages.append(order_ids(page))
+        token = page.next_token
+        if token is None:
+            break
+
+    # Keyword Item 31件を10件ずつ読む。hit の無い page も ItemNotFoundException にせず、続きの token を返す
+    assert pages == [[], [], [], ['a' * 32]]
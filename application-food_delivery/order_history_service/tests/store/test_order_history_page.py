@@ -0,0 +1,130 @@
+import json
+import pytest
+from order_history_layers.common import exceptions as ex
+from order_history_layers.presentation import controller
+from order_history_layers.service import events
+from order_history_layers.service import service
+from order_history_layers.store import order_history_dao
+from order_history_layers.store import page_token
+
+CONSUMER_ID = 4
+ORDERS = 5
+
+
+def order_created(event_id, order_id, consumer_id=CONSUMER_ID):
+    return events.OrderCreated.from_event({
+        'aggregate': 'ORDER', 'aggregate_id': order_id, 'event_type': 'OrderCreated',
+        'event_id': event_id, 'timestamp': '2023-01-10T07:53:40.478405Z', 'order_id': order_id,
+        'order_details': {
+            'consumer_id': consumer_id, 'restaurant_id': 27,
+            'order_line_items': [{'menu_id': '000001', 'name': 'Curry Rice',
+                                  'price': {'value': 800, 'currency': 'JPY'}, 'quantity': 3}],
+            'order_total': {'value': 2400, 'currency': 'JPY'},
+        },
+        'delivery_information': {
+            'delivery_time': '2022-11-30T05:00:30.001000Z',
+            'delivery_address': {'street1': '9 Amazing View', 'street2': 'Soi 8',
+                                 'city': 'Oakland', 'state': 'CA', 'zip': '94612'},
+        },
+    })
+
+
+@pytest.fixture
+def dao():
+    dao = order_history_dao.InMemoryDao()
+    order_history_service = service.OrderHistoryService(dao)
+    for event_id in range(1, ORDERS + 1):
+        order_history_service.create_order(order_created(event_id, f'{event_id:032x}'))
+    order_history_service.create_order(order_created(99, 'f' * 32, consumer_id=5))
+    return dao
+
+
+def test_pages_follow_next_token(dao):
+    order_ids, token = [], None
+    for page_size in [2, 2, 2]:
+        page = dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(page_size=page_size,
+                                                                          start_key_token=token))
+        order_ids += [order.order_id for order in page.orders]
+        token = page.next_token
+
+    assert order_ids == [f'{event_id:032x}' for event_id in range(ORDERS, 0, -1)]
+    assert token is None
+
+
+def test_page_size_is_capped(dao):
+    request = dao.to_query_request(CONSUMER_ID, dao.OrderHistoryFilter(page_size=10_000))
+
+    assert request['Limit'] == order_history_dao.MAX_PAGE_SIZE
+    assert dao.to_query_request(CONSUMER_ID, dao.OrderHistoryFilter())['Limit'] == \
+        order_history_dao.DEFAULT_PAGE_SIZE
+
+
+def test_page_token_is_signed_and_bound_to_consumer(dao):
+    token = dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(page_size=2)).next_token
+    payload, signature = token.split('.')
+    forged_payload, _ = page_token.encode({'consumer_id': {'N': f'{CONSUMER_ID}'}}).split('.')
+    forged = f'{forged_payload}.{signature}'
+
+    with pytest.raises(ex.InvalidPageToken):
+        dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(start_key_token=forged))
+    with pytest.raises(ex.InvalidPageToken):
+        dao.find_order_history(5, dao.OrderHistoryFilter(start_key_token=token))
+
+
+def test_page_token_signed_with_another_key_is_rejected(dao, monkeypatch):
+    token = dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(page_size=2)).next_token
+    last_evaluated_key = page_token.decode(token)
+    monkeypatch.setenv('ORDER_HISTORY_PAGE_TOKEN_KEY', 'order-history-page-token')  # 以前の既定の key
+    forged = page_token.encode(last_evaluated_key)
+    monkeypatch.setenv('ORDER_HISTORY_PAGE_TOKEN_KEY', 'test-page-token-key')
+
+    assert forged != token
+
+    with pytest.raises(ex.InvalidPageToken):
+        dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(start_key_token=forged))
+    assert dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(start_key_token=token)).orders
+
+
+def test_page_token_requires_a_key(dao, monkeypatch):
+    token = dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(page_size=2)).next_token
+    monkeypatch.delenv('ORDER_HISTORY_PAGE_TOKEN_KEY')
+
+    with pytest.raises(ex.PageTokenKeyNotConfigured):
+        page_token.decode(token)
+    with pytest.raises(ex.PageTokenKeyNotConfigured):
+        dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(page_size=2))
+
+
+def test_fields_projection(dao):
+    request = dao.to_query_request(CONSUMER_ID, dao.OrderHistoryFilter(fields=['order_id', 'order_state']))
+    page = dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(fields=['order_id', 'order_state']))
+
+    assert request['ProjectionExpression'] == '#p0, #p1'
+    assert request['ExpressionAttributeNames'] == {'#pk': 'consumer_id', '#sk': 'creation_date',
+                                                   '#p0': 'PK', '#p1': 'order_state'}
+    assert page.orders[0] == {'order_id': f'{ORDERS:032x}', 'order_state': 'APPROVAL_PENDING'}
+    with pytest.raises(ex.InvalidQueryParameter):
+        dao.find_order_history(CONSUMER_ID, dao.OrderHistoryFilter(fields=['PK']))
+
+
+def test_get_orders_query_string_parameters(dao, monkeypatch):
+    monkeypatch.setattr(controller.order_history_dao, 'DynamoDbDao', lambda: dao)
+    controller.handler.cache_clear()
+    try:
+        resp = controller.rest_invocation({'httpMethod': 'GET', 'path': '/orders',
+                                           'queryStringParameters': {'page_size': '2', 'fields': 'order_id'}})
+        body = json.loads(resp['body'])
+        assert resp['statusCode'] == 200
+        assert body['body'] == [{'order_id': f'{ORDERS:032x}'}, {'order_id': f'{ORDERS - 1:032x}'}]
+
+        resp = controller.rest_invocation({'httpMethod': 'GET', 'path': '/orders',
+                                           'queryStringParameters': {'next_token': body['next_token']}})
+        assert [order['order_id'] for order in json.loads(resp['body'])['body']] == \
+            [f'{event_id:032x}' for event_id in range(ORDERS - 2, 0, -1)]
+        assert 'next_token' not in json.loads(resp['body'])
+
+        resp = controller.rest_invocation({'httpMethod': 'GET', 'path': '/orders',
+                                           'queryStringParameters': {'next_token': 'x.y'}})
+        assert resp['statusCode'] == 400
+    finally:
+        controller.handler.cache_clear()
@@ -0,0 +1,197 @@
+import pytest
+from order_history_layers.model import order_history_model
+from order_history_layers.service import events
+from order_history_layers.service import service
+from order_history_layers.store import dynamo_exception as dx
+from order_history_layers.store import order_history_dao
+from order_history_layers.store import projection
+
+ORDER_ID = '1b3d5cc1a8d64c53aba796364af9eab6'
+TIMESTAMP = '2023-01-10T07:53:41.478405Z'
+READY_BY = '2022-11-30T05:00:30.001000Z'
+
+
+def order_created(event_id):
+    return events.OrderCreated.from_event({
+        'aggregate': 'ORDER', 'aggregate_id': ORDER_ID, 'event_type': 'OrderCreated',
+        'event_id': event_id, 'timestamp': TIMESTAMP, 'order_id': ORDER_ID,
+        'order_details': {
+            'consumer_id': 4, 'restaurant_id': 27,
+            'order_line_items': [{'menu_id': '000001', 'name': 'Curry Rice',
+                                  'price': {'value': 800, 'currency': 'JPY'}, 'quantity': 3}],
+            'order_total': {'value': 2400, 'currency': 'JPY'},
+        },
+        'delivery_information': {
+            'delivery_time': '2022-11-30T05:00:30.001000Z',
+            'delivery_address': {'street1': '9 Amazing View', 'street2': 'Soi 8',
+                                 'city': 'Oakland', 'state': 'CA', 'zip': '94612'},
+        },
+    })
+
+
+def order_event(event_class, event_id):
+    return event_class(aggregate='ORDER', aggregate_id=ORDER_ID, event_type=event_class.__name__,
+                       event_id=event_id, timestamp=TIMESTAMP, order_id=ORDER_ID)
+
+
+def ticket_accepted(event_id):
+    return events.TicketAccepted(aggregate='TICKET', aggregate_id=ORDER_ID, event_type='TicketAccepted',
+                                 event_id=event_id, timestamp=TIMESTAMP, ticket_id=ORDER_ID, ready_by=READY_BY)
+
+
+def ticket_cancelled(event_id):
+    return events.TicketCancelled(aggregate='TICKET', aggregate_id=ORDER_ID, event_type='TicketCancelled',
+                                  event_id=event_id, timestamp=TIMESTAMP, ticket_id=ORDER_ID)
+
+
+def delivery_event(event_class, event_id):
+    return event_class(aggregate='DELIVERY', aggregate_id=ORDER_ID, event_type=event_class.__name__,
+                       event_id=event_id, timestamp=TIMESTAMP, delivery_id=ORDER_ID)
+
+
+@pytest.fixture
+def dao():
+    dao = order_history_dao.InMemoryDao()
+    service.OrderHistoryService(dao).create_order(order_created(event_id=10))
+    return dao
+
+
+def item(dao) -> dict:
+    return dao.items[(f'ORDER#{ORDER_ID}', f'METADATA#{ORDER_ID}')]
+
+
+def test_update_expression_is_compiled_once():
+    projection.compile_update.cache_clear()
+    codec = order_history_dao.ORDER_HISTORY_CODEC
+
+    first = projection.to_update_request('OrderHistory', 'a' * 32, [delivery_event(events.DeliveryPickedup, 1)], codec)
+    second = projection.to_update_request('OrderHistory', 'b' * 32, [delivery_event(events.DeliveryDelivered, 2)], codec)
+
+    assert projection.compile_update.cache_info().hits == 1
+    assert first['UpdateExpression'] == second['UpdateExpression'] == \
+        'SET #delivery_state = :delivery_state, #delivery_event_id = :delivery_event_id'
+    assert first['ConditionExpression'] == \
+        '(attribute_not_exists(#delivery_event_id) OR #delivery_event_id < :delivery_event_id_guard)'
+    assert second['ExpressionAttributeValues'][':delivery_state'] == {'S': 'DELIVERED'}
+
+
+def test_events_of_order_kitchen_and_delivery_are_merged_into_one_update(dao):
+    pending = [order_event(events.OrderAuthorized, 11), ticket_accepted(3),
+               delivery_event(events.DeliveryPickedup, 7), order_event(events.OrderCancelled, 12),
+               ticket_cancelled(4)]
+
+    request = dao.to_projection_request(ORDER_ID, pending)
+    dao.write(request)
+
+    assert request['ConditionExpression'].count(' AND ') == 2
+    assert request['ExpressionAttributeValues'][':order_event_id_guard'] == {'N': '11'}
+    order = dao.find_by_id(ORDER_ID)
+    assert (order.order_state.value, order.ticket_state.value, order.delivery_state.value) == \
+        ('CANCELLED', 'CANCELLED', 'PICKEDUP')
+    assert order.ready_by == READY_BY
+    assert item(dao)['consumer_order_state'] == {'S': '4#CANCELLED'}
+    assert {version: item(dao)[version]['N'] for version in projection.VERSIONS} == \
+        {'order_event_id': '12', 'ticket_event_id': '4', 'delivery_event_id': '7'}
+
+
+def test_version_guards_are_per_publisher(dao):
+    dao.project_events(ORDER_ID, [order_event(events.OrderCancelled, 12)])
+
+    # 再送された古い event は適用しない (version を更新するので、後の event を上書きしない)
+    with pytest.raises(dx.ConditionalCheckFailedException):
+        dao.project_events(ORDER_ID, [order_event(events.OrderAuthorized, 11)])
+    dao.project_events(ORDER_ID, [ticket_accepted(3)])
+
+    order = dao.find_by_id(ORDER_ID)
+    assert (order.order_state.value, order.ticket_state.value) == ('CANCELLED', 'ACCEPTED')
+
+
+def test_merged_update_with_applied_event_falls_back_to_event_by_event(dao):
+    dao.project_events(ORDER_ID, [ticket_accepted(3)])
+
+    dao.save_events(ORDER_ID, [ticket_accepted(3), delivery_event(events.DeliveryPickedup, 7)])
+
+    order = dao.find_by_id(ORDER_ID)
+    assert (order.ticket_state.value, order.delivery_state.value) == ('ACCEPTED', 'PICKEDUP')
+
+
+@pytest.fixture
+def empty_dao():
+    return order_history_dao.InMemoryDao()
+
+
+def created_order(order_event_id=10):
+    created = order_created(order_event_id)
+    return order_history_model.Order.create_order(order_id=ORDER_ID, order_details=created.order_details,
+                                                  delivery_information=created.delivery_information)
+
+
+def test_order_created_after_later_events_keeps_their_state(empty_dao):
+    order_history_service = service.OrderHistoryService(empty_dao)
+    # OrderCreated より先に OrderAuthorized と TicketAccepted が届く (consumer_id はまだ無い)
+    order_history_service.project_order_events(ORDER_ID, [order_event(events.OrderAuthorized, 11)])
+    order_history_service.project_order_events(ORDER_ID, [ticket_accepted(3)])
+    assert 'consumer_order_state' not in item(empty_dao)
+
+    order_history_service.project_order_events(ORDER_ID, [order_created(10)])
+
+    order = empty_dao.find_by_id(ORDER_ID)
+    assert (order.consumer_id, order.order_state.value, order.ticket_state.value) == (4, 'APPROVED', 'ACCEPTED')
+    assert item(empty_dao)['consumer_order_state'] == {'S': '4#APPROVED'}
+    assert {version: item(empty_dao)[version]['N'] for version in ('order_event_id', 'ticket_event_id')} == \
+        {'order_event_id': '11', 'ticket_event_id': '3'}
+    # GET /orders に出る
+    assert [o.order_id for o in empty_dao.find_order_history(4, empty_dao.OrderHistoryFilter()).orders] == [ORDER_ID]
+    assert [o.order_id for o in empty_dao.find_order_history(
+        4, empty_dao.OrderHistoryFilter(status='APPROVED')).orders] == [ORDER_ID]
+    assert [o.order_id for o in empty_dao.find_order_history(
+        4, empty_dao.OrderHistoryFilter(keyword='curry')).orders] == [ORDER_ID]
+
+
+def test_order_created_batch_merges_by_version(empty_dao):
+    empty_dao.project_events(ORDER_ID, [order_event(events.OrderAuthorized, 11), ticket_accepted(5)])
+
+    # 同じ batch の OrderCancelled (12) は適用し、先に適用した TicketAccepted (5) より古い TicketCancelled (4) は適用しない
+    empty_dao.save_events(ORDER_ID, [order_created(10), order_event(events.OrderCancelled, 12), ticket_cancelled(4)],
+                          order=created_order(), order_event_id=10)
+
+    order = empty_dao.find_by_id(ORDER_ID)
+    assert (order.order_state.value, order.ticket_state.value, order.ready_by) == ('CANCELLED', 'ACCEPTED', READY_BY)
+    assert item(empty_dao)['consumer_order_state'] == {'S': '4#CANCELLED'}
+    assert (item(empty_dao)['order_event_id'], item(empty_dao)['ticket_event_id']) == ({'N': '12'}, {'N': '5'})
+
+
+def test_redelivered_order_created_batch_projects_new_events(dao):
+    creation_date = item(dao)['creation_date']
+
+    dao.save_events(ORDER_ID, [order_created(10), ticket_accepted(3)], order=created_order(), order_event_id=10)
+
+    assert dao.find_by_id(ORDER_ID).ticket_state.value == 'ACCEPTED'
+    assert item(dao)['creation_date'] == creation_date  # OrderCreated は書き直さない
+    with pytest.raises(order_history_dao.OrderAlreadyCreated):
+        dao.save(created_order(), 10)
+
+
+def test_merge_rereads_when_an_event_is_projected_concurrently(empty_dao, monkeypatch):
+    empty_dao.project_events(ORDER_ID, [order_event(events.OrderAuthorized, 11)])
+    get_order_item = empty_dao.get_order_item
+    reads = []
+
+    def get_order_item_then_project(order_id):
+        current = get_order_item(order_id)
+        if not reads:  # 読んだ後、書き込む前に OrderCancelled が届く
+            empty_dao.project_events(ORDER_ID, [order_event(events.OrderCancelled, 12)])
+        reads.append(current)
+        return current
+    monkeypatch.setattr(empty_dao, 'get_order_item', get_order_item_then_project)
+
+    empty_dao.save(created_order(), 10)
+
+    assert len(reads) == 2
+    assert empty_dao.find_by_id(ORDER_ID).order_state.value == 'CANCELLED'
+    assert item(empty_dao)['consumer_order_state'] == {'S': '4#CANCELLED'}
+
+
+def test_unsupported_event():
+    with pytest.raises(Exception, match='NotSupportEvent'):
+        projection.projection_of(order_created(1))
@@ -0,0 +1,141 @@
+import pytest
+from order_history_layers.service import events
+from order_history_layers.service import service
+from order_history_layers.store import dynamo_codec
+from order_history_layers.store import order_history_dao
+from order_history_layers.store import rebuild
+
+TIMESTAMP = '2023-01-10T07:53:41.478405Z'
+READY_BY = '2022-11-30T05:00:30.001000Z'
+ORDER_DETAILS = {
+    'consumer_id': 4, 'restaurant_id': 27,
+    'order_line_items': [{'menu_id': '000001', 'name': 'Curry Rice',
+                          'price': {'value': 800, 'currency': 'JPY'}, 'quantity': 3}],
+    'order_total': {'value': 2400, 'currency': 'JPY'},
+}
+DELIVERY_INFORMATION = {
+    'delivery_time': '2022-11-30T05:00:30.001000Z',
+    'delivery_address': {'street1': '9 Amazing View', 'street2': 'Soi 8',
+                         'city': 'Oakland', 'state': 'CA', 'zip': '94612'},
+}
+
+
+def event_item(aggregate, event_type, event_id, aggregate_id, **attributes) -> dict:
+    """ event table の Item (domain event function の event repository が書き込む形) """
+    return dynamo_codec.ItemCodec({}).encode({
+        'PK': f'{aggregate}#{aggregate_id}',
+        'SK': f'EVENTTYPE#{event_type}#EVENTID#{event_id}',
+        'timestamp': TIMESTAMP, 'event_id': event_id, **attributes})
+
+
+def order_tables(order_ids) -> dict:
+    """ 1 order 毎に OrderCreated, OrderAuthorized, TicketAccepted, DeliveryPickedup (i が奇数の order は Cancelled) """
+    tables = {'OrderEvent': [], 'KitchenEvent': [], 'DeliveryEvent': []}
+    for i, order_id in enumerate(order_ids):
+        tables['OrderEvent'] += [
+            event_item('ORDER', 'OrderCreated', 10 * i + 1, order_id, order_id=order_id,
+                       order_details=ORDER_DETAILS, delivery_information=DELIVERY_INFORMATION),
+            event_item('ORDER', 'OrderAuthorized', 10 * i + 2, order_id, order_id=order_id)]
+        tables['KitchenEvent'] += [
+            event_item('TICKET', 'TicketCreated', 10 * i + 3, order_id, ticket_id=order_id),  # projection の対象外
+            event_item('TICKET', 'TicketAccepted', 10 * i + 4, order_id, ticket_id=order_id, ready_by=READY_BY)]
+        tables['DeliveryEvent'] += [
+            event_item('DELIVERY', 'DeliveryPickedup', 10 * i + 5, order_id, delivery_id=order_id)]
+        if i % 2:
+            tables['OrderEvent'].append(event_item('ORDER', 'OrderCancelled', 10 * i + 6, order_id, order_id=order_id))
+    for items in tables.values():
+        items.reverse()  # Scan の順序は event_id の順ではない
+    return tables
+
+
+def order_ids(n) -> list[str]:
+    return [f'{i:032x}' for i in range(n)]
+
+
+def make_rebuild(tables, work_dir, dao=None, **kwargs) -> rebuild.InMemoryRebuild:
+    return rebuild.InMemoryRebuild(dao or order_history_dao.InMemoryDao(), tables, work_dir,
+                                   page_size=3, **{'segments': 4, 'shards': 8, 'workers': 4, **kwargs})
+
+
+def test_rebuild_is_same_as_projection_of_live_events(tmp_path):
+    tables = order_tables(order_ids(20))
+    live = order_history_dao.InMemoryDao()
+    order_history_service = service.OrderHistoryService(live)
+    for item in sorted((item for items in tables.values() for item in items if rebuild.event_type_of(item)
+                        in rebuild.EVENT_CLASSES), key=lambda item: int(item['SK']['S'].split('#')[3])):
+        event = rebuild.to_event(item)
+        if isinstance(event, events.OrderCreated):
+            order_history_service.create_order(event)
+        else:
+            live.project_events(event.aggregate_id, [event])
+
+    rebuilt = make_rebuild(tables, tmp_path)
+    stats = rebuilt.run()
+
+    assert stats['orders'] == 20 and stats['skipped'] == 0
+    assert stats['events'] == 20 * 4 + 10
+    # Keyword Item の SK は creation_date (live は projection した時刻、rebuild は OrderCreated の timestamp)
+    assert sorted((pk, sk.split('#')[-1]) for pk, sk in rebuilt.dao.items) == \
+        sorted((pk, sk.split('#')[-1]) for pk, sk in live.items)
+    for order_id in order_ids(20):
+        assert rebuilt.dao.find_by_id(order_id).to_dict() == live.find_by_id(order_id).to_dict()
+    order_item = rebuilt.dao.items[(f'ORDER#{order_ids(20)[1]}', f'METADATA#{order_ids(20)[1]}')]
+    assert order_item['creation_date'] == {'S': TIMESTAMP}
+    assert order_item['consumer_order_state'] == {'S': '4#CANCELLED'}
+    assert {version: order_item[version]['N'] for version in ('order_event_id', 'ticket_event_id',
+                                                              'delivery_event_id')} == \
+        {'order_event_id': '16', 'ticket_event_id': '14', 'delivery_event_id': '15'}
+
+
+def test_order_without_order_created_is_skipped(tmp_path):
+    tables = order_tables(order_ids(3))
+    tables['OrderEvent'] = [item for item in tables['OrderEvent']
+                            if item['PK']['S'] != f'ORDER#{order_ids(3)[0]}']
+
+    stats = make_rebuild(tables, tmp_path).run()
+
+    assert (stats['orders'], stats['skipped']) == (2, 1)
+
+
+def test_resume_from_checkpoint(tmp_path):
+    tables = order_tables(order_ids(20))
+
+    class FailingDao(order_history_dao.InMemoryDao):
+        def write_items(self, items):
+            if any(item['PK']['S'] == f'ORDER#{order_ids(20)[7]}' for item in items):
+                raise order_history_dao.dx.ProvisionedThroughputExceededException('UnprocessedItems')
+            super().write_items(items)
+
+    failed = make_rebuild(tables, tmp_path, dao=FailingDao())
+    with pytest.raises(order_history_dao.dx.ProvisionedThroughputExceededException):
+        failed.run()
+    assert len(failed.checkpoint.state['segments']) == 3 * 4
+    assert len(failed.checkpoint.state['shards']) == 8 - 1
+
+    dao = order_history_dao.InMemoryDao()
+    resumed = make_rebuild(tables, tmp_path, dao=dao)
+    stats = resumed.run()
+
+    assert resumed.scan_pages == 0  # scan は完了しているので読み直さない
+    assert stats['orders'] == 20
+    assert {key for key in dao.items if key[1].startswith('METADATA#')} == \
+        {(f'ORDER#{order_id}', f'METADATA#{order_id}') for order_id in order_ids(20)
+         if rebuild.shard_of(order_id, 8) == rebuild.shard_of(order_ids(20)[7], 8)}
+
+
+def test_checkpoint_with_other_parameters(tmp_path):
+    make_rebuild(order_tables(order_ids(1)), tmp_path).run()
+
+    with pytest.raises(ValueError):
+        make_rebuild(order_tables(order_ids(1)), tmp_path, segments=8)
+
+
+def test_rate_limiter_waits_for_tokens(monkeypatch):
+    waits = []
+    monkeypatch.setattr(rebuild.time, 'sleep', waits.append)
+    limiter = rebuild.RateLimiter(100)
+
+    limiter.acquire(100)
+    limiter.acquire(50)
+
+    assert len(waits) == 1 and waits[0] == pytest.approx(0.5, abs=0.05)
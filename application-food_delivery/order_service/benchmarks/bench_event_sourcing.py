@@ -0,0 +1,170 @@
+"""
+Order write capacity benchmark: METADATA Item の更新 vs version Item の追記 (event sourced)
+    order_repository.InMemoryRepository (METADATA Item を UpdateItem) と
+    order_event_sourced_repository.InMemoryRepository (version Item を Put, snapshot は SNAPSHOT_INTERVAL 毎) で
+    同じ Saga を実行し、1 Saga あたりの WCU と find_by_id() 1回の RCU を DynamoDB の計算方法で見積もる。
+        WCU: Item 毎に ceil(Item size / 1KB)。UpdateItem は更新前と更新後の大きい方。TransactWriteItems は2倍。
+        RCU: eventually consistent (GetItem / Query) で ceil(読んだ Item size の合計 / 4KB) * 0.5
+        Item size: attribute 名の長さ + 値の大きさ (DynamoDB Developer Guide の Item Size の計算)
+
+    cd application-food_delivery
+    PYTHONPATH=order_service/order_function python order_service/benchmarks/bench_event_sourcing.py
+"""
+import datetime
+import decimal
+import math
+from order_layers.common import common
+from order_layers.domain import order_model
+from order_layers.domain import restaurant_model
+from order_layers.service import commands
+from order_layers.service import service
+from order_layers.adaptors import order_repository
+from order_layers.adaptors import order_event_sourced_repository
+from order_layers.adaptors import order_event_repository
+from order_layers.adaptors import restaurant_replica_repository
+from order_layers.adaptors import unit_of_work
+
+SAGAS = 100
+SNAPSHOT_INTERVAL = 10
+LINE_ITEMS = [5, 50]
+
+DELIVERY_INFORMATION = order_model.DeliveryInformation(
+    delivery_time=datetime.datetime(2022, 11, 30, 5, 0, 30, 1000),
+    delivery_address=common.Address('9 Amazing View', 'Soi 8', 'Oakland', 'CA', '94612'))
+
+
+def value_size(attribute_value: dict) -> int:
+    [(dynamodb_type, value)] = attribute_value.items()
+    if dynamodb_type == 'S':
+        return len(value.encode())
+    if dynamodb_type == 'N':
+        digits = len(decimal.Decimal(value).normalize().as_tuple().digits)
+        return (digits + 1) // 2 + 1
+    if dynamodb_type == 'B':
+        return len(value)
+    if dynamodb_type in ('BOOL', 'NULL'):
+        return 1
+    if dynamodb_type == 'M':
+        return 3 + sum(len(k.encode()) + value_size(v) + 1 for k, v in value.items())
+    if dynamodb_type == 'L':
+        return 3 + sum(value_size(v) + 1 for v in value)
+    return sum(len(v.encode()) if isinstance(v, str) else len(v) for v in value)  # SS / NS / BS
+
+
+def item_size(item: dict) -> int:
+    return sum(len(name.encode()) + value_size(value) for name, value in item.items())
+
+
+def write_units(size: int) -> int:
+    return max(math.ceil(size / 1024), 1)
+
+
+def read_units(size: int) -> float:
+    return max(math.ceil(size / 4096), 1) * 0.5
+
+
+class MeteredUnitOfWork(unit_of_work.InMemoryUnitOfWork):
+    """ InMemoryUnitOfWork が書き込んだ Item の WCU を数える """
+
+    def __init__(self, order_repo, order_event_repo):
+        super().__init__(order_repo, order_event_repo)
+        self.write_units = 0
+
+    def commit(self):
+        requests = [request for transact_item in self.transact_items for request in transact_item.values()]
+        before = {self.order_repo.key(request): item_size(self.order_repo.items.get(self.order_repo.key(request), {}))
+                  for request in requests}
+        super().commit()
+        multiplier = 2 if len(requests) > 1 else 1
+        for request in requests:
+            key = self.order_repo.key(request)
+            if request['TableName'] == self.order_repo.table_name:
+                after = self.order_repo.items[key]
+            else:
+                after = request['Item']
+            self.write_units += multiplier * write_units(max(before[key], item_size(after)))
+
+
+def make_service(order_repo, line_items) -> service.OrderService:
+    order_event_repo = order_event_repository.InMemoryRepository()
+    restaurant_replica_repo = restaurant_replica_repository.InMemoryRepository()
+    restaurant_replica_repo.save(
+        restaurant_model.Restaurant(1, 'Ajenta', [
+            restaurant_model.MenuItem(f'{i:06}', f'menu-{i}', common.Money(800 + i * 10, 'JPY'))
+            for i in range(line_items)]),
+        event_id=1, timestamp='2022-11-30T05:00:30.001000Z')
+    return service.OrderService(order_repo, order_event_repo, restaurant_replica_repo,
+                                MeteredUnitOfWork(order_repo, order_event_repo))
+
+
+def create_order(order_service, line_items) -> str:
+    order = order_service.create_order(commands.CreateOrder(
+        consumer_id=1, restaurant_id=1,
+        order_line_items=[commands.OrderRequestLineItems(f'{i:06}', 2) for i in range(line_items)],
+        delivery_information=DELIVERY_INFORMATION))
+    order_service.approve_order(commands.ApproveOrder(order_id=order.order_id))
+    return order.order_id
+
+
+def cancel_order(order_service, order_id):
+    order_service.start_cancel_order_saga(commands.CancelOrder(order_id=order_id))
+    order_service.begin_cancel(commands.BeginCancelOrder(order_id=order_id))
+    order_service.confirm_cancel(commands.ConfirmCancelOrder(order_id=order_id))
+
+
+def revise_order(order_service, order_id):
+    order_revision = order_model.OrderRevision(
+        delivery_information=None,
+        revised_order_line_items=[order_model.RevisedOrderLineItem(menu_id='000000', quantity=3)])
+    order_service.start_revise_order_saga(commands.ReviseOrder(order_id=order_id, order_revision=order_revision))
+    order_service.begin_revise_order(commands.BeginReviseOrder(order_id=order_id, order_revision=order_revision))
+    order_service.confirm_revise_order(commands.ConfirmReviseOrder(order_id=order_id, order_revision=order_revision))
+
+
+def load_read_units(order_repo, order_id) -> float:
+    if isinstance(order_repo, order_event_sourced_repository.EventSourcedRepository):
+        return read_units(sum(item_size(item) for item in order_repo.query_versions(order_id)))
+    return read_units(item_size(order_repo.items[(f'ORDER#{order_id}', f'METADATA#{order_id}')]))
+
+
+def measure(order_repo, line_items) -> dict:
+    """ Saga 毎の平均 WCU と、revise を SAGAS 回繰り返した order の find_by_id() の RCU """
+    order_service = make_service(order_repo, line_items)
+    uow = order_service.order_uow
+    result = {}
+
+    start = uow.write_units
+    order_ids = [create_order(order_service, line_items) for _ in range(SAGAS)]
+    result['create+approve'] = (uow.write_units - start) / SAGAS
+
+    start = uow.write_units
+    for order_id in order_ids:
+        revise_order(order_service, order_id)
+    result['revise'] = (uow.write_units - start) / SAGAS
+
+    start = uow.write_units
+    for order_id in order_ids:
+        cancel_order(order_service, order_id)
+    result['cancel'] = (uow.write_units - start) / SAGAS
+
+    order_id = create_order(order_service, line_items)
+    for _ in range(SAGAS):
+        revise_order(order_service, order_id)
+    result['load RCU'] = max(load_read_units(order_repo, order_id) for order_id in order_ids + [order_id])
+    return result
+
+
+def main():
+    print(f'sagas: {SAGAS}, snapshot interval: {SNAPSHOT_INTERVAL}')
+    print(f'{"line items":>10} {"repository":<14} {"create+approve":>14} {"revise":>8} {"cancel":>8} {"load RCU":>9}')
+    for line_items in LINE_ITEMS:
+        for name, order_repo in [
+                ('item', order_repository.InMemoryRepository()),
+                ('event_sourced', order_event_sourced_repository.InMemoryRepository(SNAPSHOT_INTERVAL))]:
+            result = measure(order_repo, line_items)
+            print(f'{line_items:>10} {name:<14} {result["create+approve"]:>14.1f} {result["revise"]:>8.1f} '
+                  f'{result["cancel"]:>8.1f} {result["load RCU"]:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Menu / Line Item lookup benchmark
+    1,000 menu items の Restaurant と 200 line items の Order で
+    線形探索 (変更前) と menu_id index (変更後) を比較する。
+
+    cd application-food_delivery
+    PYTHONPATH=order_service/order_function python order_service/benchmarks/bench_menu_lookup.py
+"""
+import contextlib
+import io
+import timeit
+from order_layers.common import common
+from order_layers.domain import order_model
+from order_layers.domain import restaurant_model
+from order_layers.service import commands
+from order_layers.service import service
+
+MENU_ITEMS = 1000
+LINE_ITEMS = 200
+NUMBER = 20
+
+
+def make_restaurant():
+    menu_items = [restaurant_model.MenuItem(f'{i:06}', f'menu-{i}', common.Money(100 + i, 'JPY'))
+                  for i in range(MENU_ITEMS)]
+    return restaurant_model.Restaurant(1, 'catering', menu_items)
+
+
+def make_request_line_items():
+    # 後ろのmenuほど線形探索が遅くなるため、menu全体に散らす
+    step = MENU_ITEMS // LINE_ITEMS
+    return [commands.OrderRequestLineItems(menu_id=f'{i * step:06}', quantity=1)
+            for i in range(LINE_ITEMS)]
+
+
+def make_order_revision(request_line_items):
+    return order_model.OrderRevision(
+        delivery_information=None,
+        revised_order_line_items=[order_model.RevisedOrderLineItem(menu_id=item.menu_id, quantity=2)
+                                  for item in request_line_items])
+
+
+# ---- 変更前の実装 ----
+def linear_find_menu_item(restaurant, menu_id):
+    menus = [menu for menu in restaurant.menu_items if menu.menu_id == menu_id]
+    return menus[0]
+
+
+def linear_make_order_line_items(request_line_items, restaurant):
+    return order_model.OrderLineItems(line_items=[
+        order_model.OrderLineItem(
+            menu_id=item.menu_id,
+            name=linear_find_menu_item(restaurant, item.menu_id).menu_name,
+            price=linear_find_menu_item(restaurant, item.menu_id).price,
+            quantity=item.quantity)
+        for item in request_line_items])
+
+
+def linear_find_order_line_items(line_items, menu_id):
+    for line_item in line_items.line_items:
+        if line_item.menu_id == menu_id:
+            return line_item
+
+
+def linear_update_line_items(line_items, order_revision):
+    for line_item in line_items.line_items:
+        for item in order_revision.revised_order_line_items:
+            if line_item.menu_id == item.menu_id:
+                line_item.quantity = item.quantity
+
+
+def report(name, before, after):
+    print(f'{name:<28} before: {before / NUMBER * 1000:8.3f} ms  '
+          f'after: {after / NUMBER * 1000:8.3f} ms  x{before / after:6.1f}')
+
+
+def main():
+    restaurant = make_restaurant()
+    request_line_items = make_request_line_items()
+    order_revision = make_order_revision(request_line_items)
+    line_items = order_model.OrderLineItems(
+        linear_make_order_line_items(request_line_items, restaurant).line_items)
+
+    # service層のprintは計測対象外にする
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = [
+            ('make_order_line_items',
+             timeit.timeit(lambda: linear_make_order_line_items(request_line_items, restaurant),
+                           number=NUMBER),
+             timeit.timeit(lambda: service.OrderService._make_order_line_items(request_line_items,
+                                                                               restaurant),
+                           number=NUMBER)),
+            ('update_line_items',
+             timeit.timeit(lambda: linear_update_line_items(line_items, order_revision),
+                           number=NUMBER),
+             timeit.timeit(lambda: line_items.update_line_items(order_revision), number=NUMBER)),
+            ('find_order_line_items',
+             timeit.timeit(lambda: [linear_find_order_line_items(line_items, item.menu_id)
+                                    for item in request_line_items], number=NUMBER),
+             timeit.timeit(lambda: [line_items.find_order_line_items(item.menu_id)
+                                    for item in request_line_items], number=NUMBER)),
+        ]
+
+    print(f'menu_items: {MENU_ITEMS}, line_items: {LINE_ITEMS}, number: {NUMBER}')
+    for name, before, after in results:
+        report(name, before, after)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+EMF instrumentation overhead benchmark
+    DynamoDB の GetItem を3回呼んで item を decode する commands_handler を、
+    METRICS_ENABLED=false (instrument() / timed() / register() が何もしない) と true で比較する。
+    DynamoDB は botocore.stub.Stubber で応答するので、差は instrument の処理 (hook, EMF の出力) の時間。
+
+    cd application-food_delivery
+    PYTHONPATH=order_service/order_function python order_service/benchmarks/bench_metrics.py
+"""
+import contextlib
+import functools
+import os
+import timeit
+import boto3
+from botocore.stub import Stubber
+from order_layers.adaptors import dynamo_codec
+from order_layers.common import metrics
+
+NUMBER = 2000
+CALLS = 3
+ITEM = {'PK': {'S': 'ORDER#1'}, 'order_state': {'S': 'APPROVED'}, 'consumer_id': {'N': '1'},
+        'order_line_items': {'L': [{'M': {'menu_id': {'S': f'{i:06}'}, 'quantity': {'N': '2'}}}
+                                   for i in range(10)]}}
+
+# import 時に timed() で包まれているので、包む前の ItemCodec.decode
+ITEM_DECODE = getattr(dynamo_codec.ItemCodec.decode, '__wrapped__', dynamo_codec.ItemCodec.decode)
+
+
+class GetOrder:
+    pass
+
+
+def make_handler(enabled: bool):
+    """ import 時と同じく、metrics.ENABLED を見て decorator を適用する """
+    metrics.ENABLED = enabled
+    decode = metrics.timed(functools.partial(ITEM_DECODE, dynamo_codec.ItemCodec({})))
+    client = metrics.register(boto3.client('dynamodb', region_name='ap-northeast-1',
+                                           aws_access_key_id='test', aws_secret_access_key='test'))
+    stubber = Stubber(client)
+
+    class Handler:
+        @metrics.instrument('commands')
+        def commands_handler(self, cmd):
+            return [decode(client.get_item(TableName='order', Key={'PK': {'S': 'ORDER#1'}})['Item'])
+                    for _ in range(CALLS)]
+
+    return Handler(), stubber
+
+
+def main():
+    print(f'requests: {NUMBER}, GetItem per request: {CALLS}')
+    results = {}
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for enabled in (False, True):
+            handler, stubber = make_handler(enabled)
+            for _ in range(NUMBER * CALLS + CALLS):
+                stubber.add_response('get_item', {'Item': ITEM})
+            with stubber:
+                handler.commands_handler(GetOrder())  # 1回目の client の初期化を除く
+                results[enabled] = timeit.timeit(lambda: handler.commands_handler(GetOrder()),
+                                                 number=NUMBER) / NUMBER
+
+    for enabled, elapsed in results.items():
+        print(f'METRICS_ENABLED={str(enabled).lower():<6} {elapsed * 1e6:8.1f} us/request')
+    print(f'overhead: {(results[True] - results[False]) * 1e6:+.1f} us/request')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Order total / revision pricing benchmark (500 line items)
+    Revise Order Saga の begin_revise_order と同じく、500 line items の order の
+    line_item_quantity_change() (order_total, change_to_order_total, LineItemQuantityChange) と
+    OrderRevisionProposed event の to_dict() を測る。
+    order_line_items は DynamoDB から読んだ order と同じく、Decimal の dict から from_dict_list() で作る。
+
+    cd application-food_delivery
+    PYTHONPATH=order_service/order_function python order_service/benchmarks/bench_money.py
+"""
+import decimal
+import timeit
+from order_layers.domain import order_domain_events
+from order_layers.domain import order_model
+
+LINE_ITEMS = 500
+NUMBER = 500
+D = decimal.Decimal
+
+
+def make_order_line_items():
+    return order_model.OrderLineItems.from_dict_list([
+        {'menu_id': f'{i:06}', 'name': f'menu-{i}', 'price': {'value': D(100 + i), 'currency': 'JPY'},
+         'quantity': D(1 + i % 3)}
+        for i in range(LINE_ITEMS)])
+
+
+def make_order_revision():
+    return order_model.OrderRevision(
+        delivery_information=None,
+        revised_order_line_items=[order_model.RevisedOrderLineItem(menu_id=f'{i:06}', quantity=2)
+                                  for i in range(LINE_ITEMS)])
+
+
+def price_revision(order_line_items, order_revision):
+    change = order_line_items.line_item_quantity_change(order_revision)
+    return order_domain_events.OrderRevisionProposed(order_id='abc',
+                                                     order_revision=order_revision,
+                                                     current_order_total=change.current_order_total,
+                                                     new_order_total=change.new_order_total)
+
+
+def main():
+    order_line_items = make_order_line_items()
+    order_revision = make_order_revision()
+    event = price_revision(order_line_items, order_revision)
+    print(f'line items: {LINE_ITEMS}, '
+          f'order total: {event.current_order_total.to_dict()} -> {event.new_order_total.to_dict()}')
+
+    order_total = timeit.timeit(order_line_items.order_total, number=NUMBER) / NUMBER
+    change = timeit.timeit(lambda: order_line_items.line_item_quantity_change(order_revision),
+                           number=NUMBER) / NUMBER
+    revision = timeit.timeit(lambda: price_revision(order_line_items, order_revision).to_dict(),
+                             number=NUMBER) / NUMBER
+
+    print(f'order_total()                  {order_total * 1e6:8.1f} us')
+    print(f'line_item_quantity_change()    {change * 1e6:8.1f} us')
+    print(f'+ OrderRevisionProposed dict   {revision * 1e6:8.1f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+REST Router / Saga Registry dispatch benchmark
+    変更前の re.fullmatch(文字列pattern) と if/elif の連鎖と、
+    controller.ROUTER.resolve() / controller.SAGA_REGISTRY.get() を request 1件あたりで比較する。
+    (commandの生成とHandlerの呼び出しは含まない)
+
+    cd application-food_delivery
+    PYTHONPATH=order_service/order_function python order_service/benchmarks/bench_router.py
+"""
+import contextlib
+import io
+import os
+import re
+import timeit
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-1')  # boto3.client()の生成のみ
+with contextlib.redirect_stdout(io.StringIO()):
+    from order_layers.presentation import controller  # noqa: E402
+
+NUMBER = 100000
+
+REQUESTS = [
+    ('POST', '/orders'),
+    ('GET', '/orders/dc83abae951c4185ab3780a5b7c5f055'),
+    ('POST', '/orders/dc83abae951c4185ab3780a5b7c5f055/cancel'),
+    ('POST', '/orders/dc83abae951c4185ab3780a5b7c5f055/revise'),
+]
+
+SAGA_TASKS = [
+    ('CreateOrderSaga', 'APPROVE_ORDER'),
+    ('CancelOrderSaga', 'CONFIRM_CANCEL_ORDER'),
+    ('ReviseOrderSaga', 'UNDO_BEGIN_REVISE_ORDER'),
+]
+
+
+# ---- 変更前の実装 ----
+def legacy_route(path, http_method):
+    if re.fullmatch('/orders', path) and http_method == 'POST':
+        return 'create_order'
+    elif re.fullmatch('/orders/[0-9a-f]+', path) and http_method == 'GET':
+        return 'get_order'
+    elif re.fullmatch('/orders/[0-9a-f]+/cancel', path) and http_method == 'POST':
+        return 'cancel_order'
+    elif re.fullmatch('/orders/[0-9a-f]+/revise', path) and http_method == 'POST':
+        return 'revise_order'
+    raise Exception('Unsupported Route')
+
+
+def legacy_saga(state_machine, action):
+    if state_machine == "CreateOrderSaga" and action == 'APPROVE_ORDER':
+        return 'approve_order'
+    elif state_machine == "CreateOrderSaga" and action == 'REJECT_ORDER':
+        return 'reject_order'
+    elif state_machine == "CancelOrderSaga" and action == 'BEGIN_CANCEL_ORDER':
+        return 'begin_cancel_order'
+    elif state_machine == "CancelOrderSaga" and action == 'UNDO_BEGIN_CANCEL_ORDER':
+        return 'undo_begin_cancel_order'
+    elif state_machine == "CancelOrderSaga" and action == 'CONFIRM_CANCEL_ORDER':
+        return 'confirm_cancel_order'
+    elif state_machine == "ReviseOrderSaga" and action == 'BEGIN_REVISE_ORDER':
+        return 'begin_revise_order'
+    elif state_machine == "ReviseOrderSaga" and action == 'CONFIRM_REVISE_ORDER':
+        return 'confirm_revise_order'
+    elif state_machine == "ReviseOrderSaga" and action == 'UNDO_BEGIN_REVISE_ORDER':
+        return 'undo_begin_revise_order'
+    raise Exception('InvalidSagaCmd')
+
+
+def report(name, before, after):
+    print(f'{name:<52} before: {before / NUMBER * 1e9:7.0f} ns  '
+          f'after: {after / NUMBER * 1e9:7.0f} ns  x{before / after:5.1f}')
+
+
+def main():
+    print(f'number: {NUMBER}')
+    for http_method, path in REQUESTS:
+        handler, _ = controller.ROUTER.resolve(http_method, path)
+        assert handler.__name__ == legacy_route(path, http_method)
+        report(f'{http_method} {path}',
+               timeit.timeit(lambda: legacy_route(path, http_method), number=NUMBER),
+               timeit.timeit(lambda: controller.ROUTER.resolve(http_method, path), number=NUMBER))
+
+    for state_machine, action in SAGA_TASKS:
+        assert controller.SAGA_REGISTRY.get((state_machine, action)).__name__ == \
+               legacy_saga(state_machine, action)
+        report(f'{state_machine} {action}',
+               timeit.timeit(lambda: legacy_saga(state_machine, action), number=NUMBER),
+               timeit.timeit(lambda: controller.SAGA_REGISTRY.get((state_machine, action)),
+                             number=NUMBER))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Saga start-up benchmark (order_domain_event_function)
+    DynamoDB Streams の batch (100 records) を、record毎に順番に処理する場合と、
+    stream_batch.process_records(group_key=Order, max_workers=8) で処理する場合の wall-clock を比較する。
+    start_execution / put_events は time.sleep() で latency を模擬する。
+
+    cd application-food_delivery
+    python order_service/benchmarks/bench_saga_start.py
+"""
+import contextlib
+import io
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'order_domain_event_function'))
+import event_publisher  # noqa: E402
+import stream_batch  # noqa: E402
+
+RECORDS = 100
+ORDERS = 40                      # batch内のOrder数 (1 Orderに複数のevent)
+START_EXECUTION_SECONDS = (0.02, 0.06)  # start_execution の latency (一様分布)
+PUT_EVENTS_SECONDS = 0.02
+MAX_WORKERS = 8
+
+
+class FakeEventBridge:
+    def put_events(self, Entries):
+        time.sleep(PUT_EVENTS_SECONDS)
+        return {'FailedEntryCount': 0, 'Entries': [{'EventId': 'xxx'} for _ in Entries]}
+
+
+def make_records():
+    rnd = random.Random(0)
+    records = []
+    for i in range(RECORDS):
+        order_id = f'order-{rnd.randrange(ORDERS)}'
+        records.append({
+            'eventSource': 'aws:dynamodb',
+            'eventName': 'INSERT',
+            'dynamodb': {
+                'SequenceNumber': str(1000 + i),
+                'Keys': {'PK': {'S': f'ORDER#{order_id}'}},
+                'latency': rnd.uniform(*START_EXECUTION_SECONDS),
+            },
+        })
+    return records
+
+
+def event_handler(record, publisher):
+    time.sleep(record['dynamodb']['latency'])  # stepfunction.start_execution()
+    publisher.add(json.dumps({'sequence_number': record['dynamodb']['SequenceNumber']}),
+                  ordering_key=record['dynamodb']['Keys']['PK']['S'])
+
+
+def aggregate_key(record):
+    return record['dynamodb']['Keys']['PK']['S']
+
+
+def run(records, **kwargs):
+    publisher = event_publisher.EventPublisher(FakeEventBridge(), 'bus', 'com.order', 'OrderEvent')
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        resp = stream_batch.process_records(records, lambda record: event_handler(record, publisher),
+                                            publisher, **kwargs)
+    assert resp == {'batchItemFailures': []}
+    return time.perf_counter() - started
+
+
+def main():
+    records = make_records()
+    latencies = {}
+    for record in records:
+        key = aggregate_key(record)
+        latencies[key] = latencies.get(key, 0) + record['dynamodb']['latency']
+
+    print(f'records: {RECORDS}, orders: {len(latencies)}, max_workers: {MAX_WORKERS}')
+    print(f'sum of start_execution latency:        {sum(latencies.values()):6.2f} s')
+    print(f'slowest order (sequential within it):  {max(latencies.values()):6.2f} s')
+    before = run(records)
+    after = run(records, group_key=aggregate_key, max_workers=MAX_WORKERS)
+    print(f'sequential: {before:6.2f} s  grouped/concurrent: {after:6.2f} s  x{before / after:5.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+OrderService throughput benchmark (pytest-benchmark, in-memory repositories)
+    order_repository / order_event_repository / restaurant_replica_repository の InMemoryRepository と
+    unit_of_work.InMemoryUnitOfWork で OrderService を組み立て、I/O なしで domain と
+    serialization (to_dict / dynamo_codec) の時間を測る。repository には ORDERS 件の order を入れておく。
+
+    cd application-food_delivery
+    PYTHONPATH=order_service/order_function python -m pytest order_service/benchmarks/test_bench_order_service.py
+
+    profile: --benchmark-cprofile=cumtime
+"""
+import datetime
+import pytest
+from order_layers.common import common
+from order_layers.domain import order_model
+from order_layers.domain import restaurant_model
+from order_layers.service import commands
+from order_layers.service import service
+from order_layers.adaptors import order_repository
+from order_layers.adaptors import order_event_repository
+from order_layers.adaptors import restaurant_replica_repository
+from order_layers.adaptors import unit_of_work
+
+pytest.importorskip('pytest_benchmark')
+
+ORDERS = 1000
+MENU_ITEMS = 20
+LINE_ITEMS = 5
+
+DELIVERY_INFORMATION = order_model.DeliveryInformation(
+    delivery_time=datetime.datetime(2022, 11, 30, 5, 0, 30, 1000),
+    delivery_address=common.Address('9 Amazing View', 'Soi 8', 'Oakland', 'CA', '94612'))
+
+
+@pytest.fixture(scope='module')
+def order_service():
+    order_repo = order_repository.InMemoryRepository()
+    order_event_repo = order_event_repository.InMemoryRepository()
+    restaurant_replica_repo = restaurant_replica_repository.InMemoryRepository()
+    restaurant_replica_repo.save(
+        restaurant_model.Restaurant(1, 'Ajenta', [
+            restaurant_model.MenuItem(f'{i:06}', f'menu-{i}', common.Money(800 + i * 10, 'JPY'))
+            for i in range(MENU_ITEMS)]),
+        event_id=1, timestamp='2022-11-30T05:00:30.001000Z')
+    order_service = service.OrderService(order_repo, order_event_repo, restaurant_replica_repo,
+                                         unit_of_work.InMemoryUnitOfWork(order_repo, order_event_repo))
+    for _ in range(ORDERS):
+        create_order(order_service)
+    return order_service
+
+
+def create_order(order_service) -> order_model.Order:
+    return order_service.create_order(commands.CreateOrder(
+        consumer_id=1, restaurant_id=1,
+        order_line_items=[commands.OrderRequestLineItems(f'{i:06}', 2) for i in range(LINE_ITEMS)],
+        delivery_information=DELIVERY_INFORMATION))
+
+
+def test_create_order(benchmark, order_service):
+    order = benchmark(create_order, order_service)
+
+    assert order.order_state == order_model.OrderState.APPROVAL_PENDING
+
+
+def test_create_order_saga(benchmark, order_service):
+    """ create_order -> approve_order """
+    def create_order_saga():
+        order = create_order(order_service)
+        order_service.approve_order(commands.ApproveOrder(order_id=order.order_id))
+        return order.order_id
+
+    order_id = benchmark(create_order_saga)
+
+    assert order_service.order_repo.find_by_id(order_id).order_state == order_model.OrderState.APPROVED
+
+
+def test_create_order_saga_rejected(benchmark, order_service):
+    """ create_order -> reject_order (補償トランザクション) """
+    def create_order_saga_rejected():
+        order = create_order(order_service)
+        order_service.reject_order(commands.RejectOrder(order_id=order.order_id))
+        return order.order_id
+
+    order_id = benchmark(create_order_saga_rejected)
+
+    assert order_service.order_repo.find_by_id(order_id).order_state == order_model.OrderState.REJECTED
+
+
+def test_cancel_order_saga(benchmark, order_service):
+    """ 承認済みの order の begin_cancel -> confirm_cancel """
+    def setup():
+        order = create_order(order_service)
+        order_service.approve_order(commands.ApproveOrder(order_id=order.order_id))
+        return (order.order_id,), {}
+
+    def cancel_order_saga(order_id):
+        order_service.start_cancel_order_saga(commands.CancelOrder(order_id=order_id))
+        order_service.begin_cancel(commands.BeginCancelOrder(order_id=order_id))
+        order_service.confirm_cancel(commands.ConfirmCancelOrder(order_id=order_id))
+
+    benchmark.pedantic(cancel_order_saga, setup=setup, rounds=500)
+
+
+def test_find_order_by_id(benchmark, order_service):
+    order_id = next(iter(order_service.order_repo.items))[0].split('#')[1]
+
+    order = benchmark(order_service.find_order_by_id, commands.GetOrder(order_id=order_id))
+
+    assert order.order_id == order_id
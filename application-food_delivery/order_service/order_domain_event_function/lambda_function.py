@@ -1,25 +1,38 @@
 import os
 import json
 from json_encoder import JSONEncoder
+import event_publisher
+import stream_batch
+import aws_clients
 import boto3
 from boto3.dynamodb.types import TypeDeserializer
 from botocore.exceptions import ClientError
 from aws_xray_sdk import core as x_ray
 from aws_xray_sdk.core import xray_recorder  # x-ray for StepFunctions
+import log
 
+logger = log.get_logger(__name__)
 
-x_ray.patch_all()
+
+# XRAY_PATCH=botocore: AWS SDK の呼び出しだけを patch する (patch_all() は対応する全 library を import する)
+if os.environ.get('XRAY_PATCH', 'all') == 'botocore':
+    x_ray.patch(['botocore'])
+else:
+    x_ray.patch_all()
 
 STATEMACHINE_ARN_FOR_CREATE_ORDER_SAGA = os.environ.get('STATEMACHINE_ARN_FOR_CREATE_ORDER_SAGA')
 STATEMACHINE_ARN_FOR_CANCEL_ORDER_SAGA = os.environ.get('STATEMACHINE_ARN_FOR_CANCEL_ORDER_SAGA')
 STATEMACHINE_ARN_FOR_REVISE_ORDER_SAGA = os.environ.get('STATEMACHINE_ARN_FOR_REVISE_ORDER_SAGA')
 
+# stream batch内の異なるOrderの record を並行に処理するthread数 (BOTO_MAX_POOL_CONNECTIONS=10 以下)
+SAGA_START_CONCURRENCY = int(os.environ.get('SAGA_START_CONCURRENCY', '8'))
+
 EVENTBUS_NAME = os.environ.get('EVENT_BUS_NAME')
 EVENT_SOURCE = os.environ.get('EVENT_SOURCE')
 EVENT_DETAIL_TYPE = os.environ.get('EVENT_DETAIL_TYPE')
 
-eventbus = boto3.client('events')
-stepfunction = boto3.client('stepfunctions')
+eventbus = aws_clients.client('events')
+stepfunction = aws_clients.client('stepfunctions')
 
 
 class UnsupportedEventTypeException(Exception):
@@ -30,7 +43,7 @@ def convert_to_python_obj(dynamo_item) -> dict:
     deserializer = boto3.dynamodb.types.TypeDeserializer()
     python_obj = {k: deserializer.deserialize(v) for k, v in dynamo_item.items()}
 
-    print(f'convert_to_python_obj() python_obj: {python_obj}')
+    logger.payload('convert_to_python_obj() python_obj', python_obj)
 
     # EventEnvelopの変換
     python_obj['aggregate'] = python_obj['PK'].split('#')[0]
@@ -66,7 +79,7 @@ def xray_integrate_upstream_services():
         trace_id = f'Root={xray_recorder.current_subsegment().trace_id};Sampled=1'
     else:
         trace_id = 'Root=not enabled;Sampled=0'
-    print(f'trace_id: {trace_id}')
+    logger.debug('trace_id: %s', trace_id)
     return trace_id
 
 
@@ -74,7 +87,7 @@ def start_create_order_saga(record):
     input_json = json.dumps(record, cls=JSONEncoder)
     run_name = f"ORDER@{record['order_id']}@EVENTID@{record['event_id']}"
     # run_name must have length less than or equal to 80
-    print(f'start_create_order_saga: name: {run_name}, input: {input_json}')
+    logger.debug('start_create_order_saga: name: %s, input: %s', run_name, input_json)
 
     # ------------------------
     # 注: run_nameがあることによりlambdaの再実行で、Stepfunctionのリトライが防げる
@@ -103,26 +116,29 @@ def start_create_order_saga(record):
             input=input_json,
             traceHeader=trace_id  # Todo: x-ray for StepFunctions
         )
-        print(f"Start CreateOrderSaga: ARN:{resp['executionArn']}, name:{run_name}")
+        logger.info('Start CreateOrderSaga: ARN:%s, name:%s', resp['executionArn'], run_name)
 
     except ClientError as e:
         error_code = e.response.get('Error', {}).get('Code')
+        if error_code == 'ExecutionAlreadyExists':
+            # 同じrun_nameのexecutionは開始済み (recordの再実行): 成功として扱う
+            logger.warning('ExecutionAlreadyExists: name:%s', run_name)
+            return
         if error_code in ['ExecutionLimitExceeded',
-                          'ExecutionAlreadyExists',
                           'InvalidArn',
                           'InvalidExecutionInput',
                           'InvalidName',
                           'StateMachineDoesNotExist',
                           'StateMachineDeleting',
                           'ValidationException']:
-            print(e)
+            logger.warning('%s', e)
             raise e
         else:
-            print(e)
+            logger.warning('%s', e)
             raise e
 
     except Exception as e:
-        print(e)
+        logger.exception('%s', e)
         raise Exception
 
 
@@ -131,7 +147,7 @@ def start_cancel_order_saga(record):
     run_name = f"ORDER@{record['order_id']}@EVENTID@{record['event_id']}"
     # run_name must have length less than or equal to 80
 
-    print(f'start_cancel_order_saga: name: {run_name}, input: {input_json}')
+    logger.debug('start_cancel_order_saga: name: %s, input: %s', run_name, input_json)
 
     try:
         trace_id = xray_integrate_upstream_services()
@@ -141,26 +157,29 @@ def start_cancel_order_saga(record):
             input=input_json,
             traceHeader=trace_id  # Todo: x-ray for StepFunctions
         )
-        print(f"Start CANCELOrderSaga: ARN:{resp['executionArn']}, name:{run_name}")
+        logger.info('Start CANCELOrderSaga: ARN:%s, name:%s', resp['executionArn'], run_name)
 
     except ClientError as e:
         error_code = e.response.get('Error', {}).get('Code')
+        if error_code == 'ExecutionAlreadyExists':
+            # 同じrun_nameのexecutionは開始済み (recordの再実行): 成功として扱う
+            logger.warning('ExecutionAlreadyExists: name:%s', run_name)
+            return
         if error_code in ['ExecutionLimitExceeded',
-                          'ExecutionAlreadyExists',
                           'InvalidArn',
                           'InvalidExecutionInput',
                           'InvalidName',
                           'StateMachineDoesNotExist',
                           'StateMachineDeleting',
                           'ValidationException']:
-            print(e)
+            logger.warning('%s', e)
             raise e
         else:
-            print(e)
+            logger.warning('%s', e)
             raise e
 
     except Exception as e:
-        print(e)
+        logger.exception('%s', e)
         raise Exception
 
 
@@ -170,7 +189,7 @@ def start_revise_order_saga(record):
     run_name = f"ORDER@{record['order_id']}@EVENTID@{record['event_id']}"
     # run_name must have length less than or equal to 80
 
-    print(f'start_revise_order_saga: name: {run_name}, input: {input_json}')
+    logger.debug('start_revise_order_saga: name: %s, input: %s', run_name, input_json)
 
     try:
         trace_id = xray_integrate_upstream_services()
@@ -180,45 +199,38 @@ def start_revise_order_saga(record):
             input=input_json,
             traceHeader=trace_id  # Todo: x-ray for StepFunctions
         )
-        print(f"Start ReviseOrderSaga: ARN:{resp['executionArn']}, name:{run_name}")
+        logger.info('Start ReviseOrderSaga: ARN:%s, name:%s', resp['executionArn'], run_name)
 
     except ClientError as e:
         error_code = e.response.get('Error', {}).get('Code')
+        if error_code == 'ExecutionAlreadyExists':
+            # 同じrun_nameのexecutionは開始済み (recordの再実行): 成功として扱う
+            logger.warning('ExecutionAlreadyExists: name:%s', run_name)
+            return
         if error_code in ['ExecutionLimitExceeded',
-                          'ExecutionAlreadyExists',
                           'InvalidArn',
                           'InvalidExecutionInput',
                           'InvalidName',
                           'StateMachineDoesNotExist',
                           'StateMachineDeleting',
                           'ValidationException']:
-            print(e)
+            logger.warning('%s', e)
             raise e
         else:
-            print(e)
+            logger.warning('%s', e)
             raise e
 
     except Exception as e:
-        print(e)
+        logger.exception('%s', e)
         raise Exception
 
 
-def event_publish(record):
-
-    print(f'put_event.Detail: {json.dumps(record, cls=JSONEncoder)}')
+def event_publish(record, publisher):
+    detail_json = json.dumps(record, cls=JSONEncoder)
+    logger.payload('put_event.Detail', detail_json)
 
-    # publish to EventBridge
-    resp = eventbus.put_events(
-        Entries=[
-            {
-                'EventBusName': EVENTBUS_NAME,
-                'Source': EVENT_SOURCE,
-                'DetailType': EVENT_DETAIL_TYPE,
-                'Detail': json.dumps(record, cls=JSONEncoder),  # needs JSON
-            }
-        ],
-    )
-    print(f'EventBridge put_events resp: {resp}')
+    # publish to EventBridge: lambda_handler()の最後にまとめてput_eventsする
+    publisher.add(detail_json, ordering_key=f"{record['aggregate']}#{record['aggregate_id']}")
 
 
 def is_dynamo_insert(record):
@@ -235,7 +247,13 @@ def is_order_domain_event(record):
     return True
 
 
-def event_handler(record):
+def aggregate_key(record):
+    dynamodb = record.get('dynamodb', {})
+    keys = dynamodb.get('Keys') or dynamodb.get('NewImage') or {}
+    return keys.get('PK', {}).get('S')
+
+
+def event_handler(record, publisher):
     if not is_dynamo_insert(record):
         return
     if not is_order_domain_event(record):
@@ -246,13 +264,13 @@ def event_handler(record):
     event_type = item_dict['event_type']
     if event_type == "OrderCreated":
         start_create_order_saga(item_dict)
-        event_publish(item_dict)
+        event_publish(item_dict, publisher)
     elif event_type == "OrderAuthorized":
-        event_publish(item_dict)
+        event_publish(item_dict, publisher)
     elif event_type == "OrderCancelled":
-        event_publish(item_dict)
+        event_publish(item_dict, publisher)
     elif event_type == "OrderRejected":
-        event_publish(item_dict)
+        event_publish(item_dict, publisher)
     elif event_type == "CancelOrderSagaRequested":
         start_cancel_order_saga(item_dict)
     elif event_type == "OrderCancelled":
@@ -306,15 +324,20 @@ def event_handler(record):
 #
 
 def lambda_handler(event, context):
-    print(f'event: {json.dumps(event)}')
+    log.sample()  # LOG_DEBUG_SAMPLE_RATE の割合で、この invocation を DEBUG で出力する
+    logger.payload('event', event)
 
     resp = None
     if event.get('Records', None):  # from SQS or DynamoDB Streams
-        for record in event['Records']:
-            if record['eventSource'] == 'aws:dynamodb':
-                event_handler(record)
-            else:
-                raise Exception(f"NotSupportEvent:{record['eventSource']}")
+        publisher = event_publisher.EventPublisher(eventbus, EVENTBUS_NAME,
+                                                   EVENT_SOURCE, EVENT_DETAIL_TYPE)
+        # 最初に失敗したrecordのSequenceNumberを batchItemFailures で返す
+        # Order (PK) ごとに順番に、異なるOrderは並行に saga開始 (start_execution) する
+        resp = stream_batch.process_records(event['Records'],
+                                            lambda record: event_handler(record, publisher),
+                                            publisher,
+                                            group_key=aggregate_key,
+                                            max_workers=SAGA_START_CONCURRENCY)
     else:
         raise Exception(f"NotSupportEvent: {event}")
 
@@ -0,0 +1,90 @@
+import os
+import threading
+from order_layers.adaptors import dynamo_exception as dx
+
+DEFAULT_BLOCK_SIZE = int(os.environ.get('ID_LEASE_BLOCK_SIZE', '100'))
+# event_id は consumer が順序に使う (冪等性の条件 #event_id < :event_id や、event_id 順の replay)。
+# コンテナ間でも発行順に増えるよう、event_id は block にせず1件ずつ採番する
+EVENT_ID_BLOCK_SIZE = 1
+
+
+class SequentialIdAllocator:
+    """
+    IDCOUNTER ItemからIDをブロック単位でリースする
+        PK: IDCOUNTER#EVENT
+        SK: IDCOUNTER#EVENT
+        id_count: 200       # リース済みの最大ID
+
+    1回の ADD #id_count :block で block_size 個のIDを確保し、コンテナ内のプールから払い出す。
+    IDはユニークで、同一コンテナ内では単調増加する。
+    (注) コンテナ間ではリースした順になるので、全体の発行順とは一致しない。
+         順序に使う ID (event_id) は block_size=EVENT_ID_BLOCK_SIZE で1件ずつ採番する。
+         ID_LEASE_BLOCK_SIZE は順序に使わない ID (consumer_id, restaurant_id) の block_size。
+    """
+
+    def __init__(self, client, table_name, counter_key, block_size=DEFAULT_BLOCK_SIZE):
+        self.client = client
+        self.table_name = table_name
+        self.counter_key = counter_key
+        self.block_size = block_size
+        self.lease_hits = 0     # プールから払い出した回数
+        self.lease_misses = 0   # DynamoDBからリースした回数
+        self._next_id = 0
+        self._last_id = -1      # プールが空
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        with self._lock:
+            if self._next_id > self._last_id:
+                self.lease_misses += 1
+                self._lease_block()
+            else:
+                self.lease_hits += 1
+            new_id = self._next_id
+            self._next_id += 1
+            return new_id
+
+    def _lease_block(self):
+        with dx.dynamo_exception_check():
+            resp = self.client.update_item(
+                TableName=self.table_name,
+                Key={
+                    'PK': {'S': self.counter_key},
+                    'SK': {'S': self.counter_key},
+                },
+                UpdateExpression='ADD #id_count :block',
+                # ADDはattributeが無ければ0として加算する。
+                ExpressionAttributeNames={
+                    '#id_count': 'id_count',
+                },
+                ExpressionAttributeValues={
+                    ':block': {'N': str(self.block_size)},
+                },
+                ReturnValues='UPDATED_NEW',
+            )
+        last_id = int(resp['Attributes']['id_count']['N'])
+        self._next_id = last_id - self.block_size + 1
+        self._last_id = last_id
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'counter_key': self.counter_key,
+                'block_size': self.block_size,
+                'lease_hits': self.lease_hits,
+                'lease_misses': self.lease_misses,
+                'remaining': self._last_id - self._next_id + 1,
+            }
+
+
+# コンテナ(Lambda実行環境)ごとのプール
+_ALLOCATORS: dict[tuple[str, str], SequentialIdAllocator] = {}
+_ALLOCATORS_LOCK = threading.Lock()
+
+
+def get_allocator(client, table_name, counter_key, block_size=DEFAULT_BLOCK_SIZE) -> SequentialIdAllocator:
+    key = (table_name, counter_key)
+    with _ALLOCATORS_LOCK:
+        if key not in _ALLOCATORS:
+            _ALLOCATORS[key] = SequentialIdAllocator(client, table_name, counter_key, block_size)
+        return _ALLOCATORS[key]
@@ -1,12 +1,21 @@
 import os
 import abc
 import datetime
-import boto3
-from boto3.dynamodb.types import TypeSerializer
-from boto3.dynamodb.types import TypeDeserializer
+import itertools
 from order_layers.domain import order_domain_events
 from order_layers.service import domain_event_envelope
 from order_layers.adaptors import dynamo_exception as dx
+from order_layers.adaptors import dynamo_codec
+from order_layers.adaptors import id_allocator
+from order_layers.adaptors import aws_clients
+
+
+ORDER_EVENT_CODEC = dynamo_codec.ItemCodec({
+    'PK': dynamo_codec.S,
+    'SK': dynamo_codec.S,
+    'timestamp': dynamo_codec.S,
+    'event_id': dynamo_codec.N,
+})
 
 
 class AbstractRepository(abc.ABC):
@@ -52,8 +61,12 @@ class DynamoDbRepository(AbstractRepository):
     """
 
     def __init__(self):
-        self.client = boto3.client('dynamodb')
+        self.client = aws_clients.client('dynamodb')
         self.table_name = os.environ.get('DYNAMODB_EVENT_TABLE_NAME', 'OrderEvent')
+        self.event_id_allocator = id_allocator.get_allocator(self.client,
+                                                             self.table_name,
+                                                             'IDCOUNTER#EVENT',
+                                                             block_size=id_allocator.EVENT_ID_BLOCK_SIZE)
 
     # def save(self, events: list[order_domain_events.DomainEvent]):
     def save(self, event: domain_event_envelope.DomainEventEnvelope):
@@ -101,8 +114,7 @@ class DynamoDbRepository(AbstractRepository):
         event_dict['event_id'] = event_id
 
         # DynamoDBシリアライズ
-        serializer = boto3.dynamodb.types.TypeSerializer()
-        item = {k: serializer.serialize(v) for k, v in event_dict.items()}
+        item = ORDER_EVENT_CODEC.encode(event_dict)
 
         # 不要なものを削除
         # del event_dict['order_id']
@@ -110,27 +122,7 @@ class DynamoDbRepository(AbstractRepository):
         return item
 
     def _get_sequential_event_id(self) -> int:
-        with dx.dynamo_exception_check():
-            resp = self.client.update_item(
-                TableName=self.table_name,
-                Key={
-                    'PK': {'S': 'IDCOUNTER#EVENT'},
-                    'SK': {'S': 'IDCOUNTER#EVENT'},
-                },
-                # UpdateExpression='SET #id_count = #id_count + :incr',
-                UpdateExpression='SET #id_count = if_not_exists(#id_count, :default) + :incr',
-                # Todo: itemがあれば+1更新、itemがなければif_not_exists()で:default値を初期値とする。
-                ExpressionAttributeNames={
-                  '#id_count': 'id_count',
-                },
-                ExpressionAttributeValues={
-                    ':incr': {'N': '1'},
-                    ':default': {'N': '0'}
-                },
-                ReturnValues='UPDATED_NEW',
-            )
-        new_consumer_id = int(resp['Attributes']['id_count']['N'])
-        return new_consumer_id
+        return self.event_id_allocator.next_id()
 
 
     # def to_dynamo_dict_list(self, events: list[domain_event_envelope.DomainEventEnvelope]):
@@ -178,3 +170,23 @@ class DynamoDbRepository(AbstractRepository):
     #         }
     #     batch_items = [to_put_item(item) for item in items]
     #     return batch_items
+
+
+class InMemoryRepository(DynamoDbRepository):
+    """
+    test / benchmark 用の in-memory 実装
+        DynamoDbRepository と同じ Item を dict (PK, SK) -> Item に書き込む。
+        event_id は IDCOUNTER の代わりに container 内の連番で採番する。
+    """
+    def __init__(self):
+        self.table_name = 'OrderEvent'
+        self.items = {}
+        self._event_ids = itertools.count(1)
+
+    def save(self, event: domain_event_envelope.DomainEventEnvelope):
+        item = self.to_dynamo_dict(event)
+        self.items[(item['PK']['S'], item['SK']['S'])] = item
+        return item['event_id']
+
+    def _get_sequential_event_id(self) -> int:
+        return next(self._event_ids)
@@ -0,0 +1,185 @@
+import os
+import bisect
+from order_layers.domain import order_model
+from order_layers.adaptors import dynamo_exception as dx
+from order_layers.adaptors import dynamo_codec
+from order_layers.adaptors import order_repository
+from order_layers.common import exception as ex
+from order_layers.adaptors import aws_clients
+
+SNAPSHOT_INTERVAL = int(os.environ.get('ORDER_SNAPSHOT_INTERVAL', '10'))
+
+ORDER_VERSION_CODEC = dynamo_codec.ItemCodec({
+    **order_repository.ORDER_CODEC.schema,
+    'snapshot': dynamo_codec.BOOL,
+})
+
+
+class EventSourcedRepository(order_repository.AbstractRepository):
+    """
+    Order を version 毎の Item の追記で保存し、partition の Query で組み立てる。
+    (order_repository.DynamoDbRepository の METADATA Item を書き換える代わり)
+
+    Order Version Item
+        PK: ORDER#{order_id}
+        SK: VERSION#{lock_version:010}      ex. VERSION#0000000003
+        lock_version: 3
+        snapshot: false
+        order_state: APPROVED               update() で変更したattributeだけ
+
+    Snapshot Item (lock_version == 1 と SNAPSHOT_INTERVAL の倍数の version)
+        PK: ORDER#{order_id}
+        SK: VERSION#0000000010
+        lock_version: 10
+        snapshot: true
+        order_state, consumer_id, ... Order の全attribute (DynamoDbRepository の Item と同じ)
+
+    OrderEvent Table の Domain Event からは組み立てない。cancel(), undo_pending_cancel(),
+    undo_revise_order() は Domain Event を発行しないため、Order の状態を復元できない。
+
+    find_by_id(): SK の降順に Query し、最初の snapshot に後の version の変更を適用する。
+                  snapshot は SNAPSHOT_INTERVAL 毎なので、1回の Query (最大 SNAPSHOT_INTERVAL Item) で読める。
+    楽観ロック:   新しい version の Item を attribute_not_exists(PK) で書く。
+                  同じ version を書いた他の処理があれば ConditionalCheckFailedException になる。
+    update() の WCU は変更したattributeの大きさで決まり、Order の line item の数に依存しない。
+    (SNAPSHOT_INTERVAL 回に1回は Order 全体を書く)
+
+    環境変数
+        ORDER_SNAPSHOT_INTERVAL: 10
+    """
+
+    def __init__(self):
+        self.client = aws_clients.client('dynamodb')
+        self.table_name = os.environ.get('DYNAMODB_TABLE_NAME', 'OrderService')
+        self.snapshot_interval = SNAPSHOT_INTERVAL
+
+    def save(self, order: order_model.Order):
+        with dx.dynamo_exception_check():
+            resp = self.client.put_item(**self.to_put_request(order))
+
+    def update(self, order: order_model.Order, attributes: list[str] = None):
+        with dx.dynamo_exception_check():
+            resp = self.client.put_item(**self.to_update_request(order, attributes))
+
+    def to_put_request(self, order: order_model.Order) -> dict:
+        return {
+            'TableName': self.table_name,
+            'Item': self.to_version_item(order, None),
+            'ConditionExpression': 'attribute_not_exists(PK)',
+        }
+
+    def to_update_request(self, order: order_model.Order, attributes: list[str] = None) -> dict:
+        """
+        lock_versionを+1した version の Item を追記する (UnitOfWork では Put)
+        attributes: ['order_state'] など変更したattribute。Noneの場合は snapshot を書く。
+        """
+        order.lock_version = order.lock_version + 1
+        return {
+            'TableName': self.table_name,
+            'Item': self.to_version_item(order, attributes),
+            'ConditionExpression': 'attribute_not_exists(PK)',
+        }
+
+    def to_version_item(self, order: order_model.Order, attributes: list[str] = None) -> dict:
+        order_dict = order.to_dict()
+        snapshot = not attributes or order.lock_version == 1 or order.lock_version % self.snapshot_interval == 0
+        if snapshot:
+            version_dict = {k: v for k, v in order_dict.items() if v is not None and k != 'order_id'}
+        else:
+            version_dict = {attribute: order_dict[attribute] for attribute in attributes}
+            version_dict['lock_version'] = order.lock_version
+
+        version_dict['PK'] = f'ORDER#{order.order_id}'
+        version_dict['SK'] = f'VERSION#{order.lock_version:010}'
+        version_dict['snapshot'] = snapshot
+        return ORDER_VERSION_CODEC.encode(version_dict)
+
+    def find_by_id(self, order_id) -> order_model.Order:
+        return self.replay(order_id, self.query_versions(order_id))
+
+    def query_versions(self, order_id) -> list[dict]:
+        """ 新しい version から最新の snapshot までの Item (SK の降順) """
+        items = []
+        request = {
+            'TableName': self.table_name,
+            'KeyConditionExpression': 'PK = :pk AND begins_with(SK, :sk)',
+            'ExpressionAttributeValues': {
+                ':pk': {'S': f'ORDER#{order_id}'},
+                ':sk': {'S': 'VERSION#'},
+            },
+            'ScanIndexForward': False,
+            'Limit': self.snapshot_interval,
+        }
+        while True:
+            with dx.dynamo_exception_check():
+                resp = self.client.query(**request)
+            for item in resp.get('Items', []):
+                items.append(item)
+                if item['snapshot']['BOOL']:
+                    return items
+            if 'LastEvaluatedKey' not in resp:  # snapshot が無い (ORDER_SNAPSHOT_INTERVAL を変更した等)
+                return items
+            request['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+
+    @staticmethod
+    def replay(order_id, items: list[dict]) -> order_model.Order:
+        """ snapshot (items の最後) に、古い順に version の変更を適用する """
+        if not items:
+            raise ex.ItemNotFoundException(f'order_id: {order_id}')
+        if not items[-1]['snapshot']['BOOL']:
+            raise ex.ItemNotFoundException(f'order_id: {order_id} snapshot')
+
+        order_dict = {}
+        for item in reversed(items):
+            order_dict.update(ORDER_VERSION_CODEC.decode(item))
+        for key in ('PK', 'SK', 'snapshot'):
+            del order_dict[key]
+        order_dict['order_id'] = order_id
+        return order_model.Order.from_dict(order_dict)
+
+
+class InMemoryRepository(EventSourcedRepository):
+    """
+    test / benchmark 用の in-memory 実装
+        EventSourcedRepository と同じ Item を dict (PK, SK) -> Item に追記する。
+        書き込み条件も同じ: attribute_not_exists(PK) (満たさない場合は dx.ConditionalCheckFailedException)
+        unit_of_work.InMemoryUnitOfWork から check() / apply() で書き込む。
+    """
+    def __init__(self, snapshot_interval: int = SNAPSHOT_INTERVAL):
+        self.client = None
+        self.table_name = 'OrderService'
+        self.snapshot_interval = snapshot_interval
+        self.items = {}
+        self.partitions = {}  # PK -> [SK] (昇順)
+
+    def save(self, order: order_model.Order):
+        self.write(self.to_put_request(order))
+
+    def update(self, order: order_model.Order, attributes: list[str] = None):
+        self.write(self.to_update_request(order, attributes))
+
+    def write(self, request: dict):
+        self.check(request)
+        self.apply(request)
+
+    @staticmethod
+    def key(request: dict) -> tuple:
+        return request['Item']['PK']['S'], request['Item']['SK']['S']
+
+    def check(self, request: dict):
+        if self.key(request) in self.items:
+            raise dx.ConditionalCheckFailedException(f'ConditionalCheckFailedException: {self.key(request)}')
+
+    def apply(self, request: dict):
+        pk, sk = self.key(request)
+        self.items[(pk, sk)] = request['Item']
+        bisect.insort(self.partitions.setdefault(pk, []), sk)
+
+    def query_versions(self, order_id) -> list[dict]:
+        pk = f'ORDER#{order_id}'
+        items = []
+        for sk in reversed(self.partitions.get(pk, [])):
+            items.append(self.items[(pk, sk)])
+            if items[-1]['snapshot']['BOOL']:
+                break
+        return items
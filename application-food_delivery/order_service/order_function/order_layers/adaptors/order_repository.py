@@ -1,12 +1,32 @@
 import os
 import abc
-import boto3
-from boto3.dynamodb.types import TypeSerializer
-from boto3.dynamodb.types import TypeDeserializer
 from order_layers.domain import order_model
 from order_layers.common import common
 from order_layers.adaptors import dynamo_exception as dx
+from order_layers.adaptors import dynamo_codec
 from order_layers.common import exception as ex
+from order_layers.adaptors import aws_clients
+
+
+ORDER_CODEC = dynamo_codec.ItemCodec({
+    'PK': dynamo_codec.S,
+    'SK': dynamo_codec.S,
+    'lock_version': dynamo_codec.N,
+    'order_state': dynamo_codec.S,
+    'order_minimum': dynamo_codec.MONEY,
+    'consumer_id': dynamo_codec.N,
+    'restaurant_id': dynamo_codec.N,
+    'order_line_items': dynamo_codec.List(dynamo_codec.Map({
+        'menu_id': dynamo_codec.S,
+        'name': dynamo_codec.S,
+        'price': dynamo_codec.MONEY,
+        'quantity': dynamo_codec.N,
+    })),
+    'delivery_information': dynamo_codec.Map({
+        'delivery_time': dynamo_codec.S,
+        'delivery_address': dynamo_codec.ADDRESS,
+    }),
+})
 
 
 class AbstractRepository(abc.ABC):
@@ -14,6 +34,10 @@ class AbstractRepository(abc.ABC):
     def save(self, order: order_model.Order):
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def update(self, order: order_model.Order, attributes: list[str] = None):
+        raise NotImplementedError
+
     @abc.abstractmethod
     def find_by_id(self, order_id) -> order_model.Order:
         raise NotImplementedError
@@ -50,16 +74,77 @@ class DynamoDbRepository(AbstractRepository):
             }
         }
         payment_information: None  (注)
+
+    楽観ロック (Optimistic Lock)
+        save():   新規Orderのみ書き込む  attribute_not_exists(PK)
+        update(): lock_version = :expected_lock_version の時だけ書き込み、lock_versionを+1する。
+                  attributesを指定するとUpdateItemで変更したattributeだけを書き込む。
     """
     def __init__(self):
-        self.client = boto3.client('dynamodb')
+        self.client = aws_clients.client('dynamodb')
         self.table_name = os.environ.get('DYNAMODB_TABLE_NAME', 'OrderService')
 
     def save(self, order: order_model.Order):
-        order_dynamo_dict = self.to_dynamo_dict(order)
         with dx.dynamo_exception_check():
-            resp = self.client.put_item(TableName=self.table_name,
-                                        Item=order_dynamo_dict)
+            resp = self.client.put_item(**self.to_put_request(order))
+
+    def update(self, order: order_model.Order, attributes: list[str] = None):
+        request = self.to_update_request(order, attributes)
+        with dx.dynamo_exception_check():
+            if attributes:
+                resp = self.client.update_item(**request)
+            else:
+                resp = self.client.put_item(**request)
+
+    def to_put_request(self, order: order_model.Order) -> dict:
+        return {
+            'TableName': self.table_name,
+            'Item': self.to_dynamo_dict(order),
+            'ConditionExpression': 'attribute_not_exists(PK)',
+        }
+
+    def to_update_request(self, order: order_model.Order, attributes: list[str] = None) -> dict:
+        """
+        lock_versionを+1して、書き込み時の条件を lock_version = :expected_lock_version にする
+        attributes: ['order_state'] など変更したattribute。Noneの場合はItem全体をPutする。
+        """
+        expected_lock_version = order.lock_version
+        order.lock_version = expected_lock_version + 1
+
+        if not attributes:
+            return {
+                'TableName': self.table_name,
+                'Item': self.to_dynamo_dict(order),
+                'ConditionExpression': '#lock_version = :expected_lock_version',
+                'ExpressionAttributeNames': {'#lock_version': 'lock_version'},
+                'ExpressionAttributeValues': {
+                    ':expected_lock_version': {'N': str(expected_lock_version)},
+                },
+            }
+
+        order_dict = order.to_dict()
+        names = {'#lock_version': 'lock_version'}
+        values = {
+            ':lock_version': {'N': str(order.lock_version)},
+            ':expected_lock_version': {'N': str(expected_lock_version)},
+        }
+        set_actions = ['#lock_version = :lock_version']
+        for attribute in attributes:
+            names[f'#{attribute}'] = attribute
+            values[f':{attribute}'] = ORDER_CODEC.encode_attribute(attribute, order_dict[attribute])
+            set_actions.append(f'#{attribute} = :{attribute}')
+
+        return {
+            'TableName': self.table_name,
+            'Key': {
+                'PK': {'S': f'ORDER#{order.order_id}'},
+                'SK': {'S': f'METADATA#{order.order_id}'},
+            },
+            'UpdateExpression': 'SET ' + ', '.join(set_actions),
+            'ConditionExpression': '#lock_version = :expected_lock_version',
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': values,
+        }
 
     def find_by_id(self, order_id) -> order_model.Order:
         with dx.dynamo_exception_check():
@@ -91,17 +176,79 @@ class DynamoDbRepository(AbstractRepository):
         order_dict.clear()
         order_dict.update(without_none)
 
-        serializer = boto3.dynamodb.types.TypeSerializer()
-        dynamo_dict = {k: serializer.serialize(v) for k, v in order_dict.items()}
+        dynamo_dict = ORDER_CODEC.encode(order_dict)
         return dynamo_dict
 
     @staticmethod
     def _dynamo_obj_to_order_obj(dynamo_item):
         """ DynamoDB obj -> Order Obj """
-        deserializer = boto3.dynamodb.types.TypeDeserializer()
-        python_obj = {k: deserializer.deserialize(v) for k, v in dynamo_item.items()}
+        python_obj = ORDER_CODEC.decode(dynamo_item)
         python_obj['order_id'] = python_obj['PK'].split('#')[1]
         del python_obj['PK']
         del python_obj['SK']
         order = order_model.Order.from_dict(python_obj)
         return order
+
+
+class InMemoryRepository(DynamoDbRepository):
+    """
+    test / benchmark 用の in-memory 実装
+        DynamoDbRepository と同じ request (to_put_request / to_update_request) を作り、
+        DynamoDB の代わりに dict (PK, SK) -> Item に書き込む。Item の encode / decode も同じ。
+        書き込み条件も同じで、満たさない場合は dx.ConditionalCheckFailedException を送出する。
+            save():   attribute_not_exists(PK)
+            update(): #lock_version = :expected_lock_version
+    """
+    def __init__(self):
+        self.client = None
+        self.table_name = 'OrderService'
+        self.items = {}
+
+    def save(self, order: order_model.Order):
+        self.write(self.to_put_request(order))
+
+    def update(self, order: order_model.Order, attributes: list[str] = None):
+        self.write(self.to_update_request(order, attributes))
+
+    def write(self, request: dict):
+        self.check(request)
+        self.apply(request)
+
+    @staticmethod
+    def key(request: dict) -> tuple:
+        key = request['Key'] if 'Key' in request else request['Item']
+        return key['PK']['S'], key['SK']['S']
+
+    def check(self, request: dict):
+        """ request の ConditionExpression を評価する """
+        current = self.items.get(self.key(request))
+        condition = request['ConditionExpression']
+        if condition == 'attribute_not_exists(PK)':
+            satisfied = current is None
+        elif condition == '#lock_version = :expected_lock_version':
+            expected = request['ExpressionAttributeValues'][':expected_lock_version']
+            satisfied = current is not None and int(current['lock_version']['N']) == int(expected['N'])
+        else:
+            raise ex.UnsupportedOperationException(f'ConditionExpression: {condition}')
+        if not satisfied:
+            raise dx.ConditionalCheckFailedException(f'ConditionalCheckFailedException: {self.key(request)}')
+
+    def apply(self, request: dict):
+        key = self.key(request)
+        if 'Item' in request:
+            self.items[key] = request['Item']
+            return
+        # UpdateExpression: 'SET #a = :a, #b = :b'
+        item = dict(self.items.get(key, request['Key']))
+        names = request['ExpressionAttributeNames']
+        values = request['ExpressionAttributeValues']
+        for action in request['UpdateExpression'].removeprefix('SET ').split(', '):
+            name, value = action.split(' = ')
+            item[names[name]] = values[value]
+        self.items[key] = item
+
+    def find_by_id(self, order_id) -> order_model.Order:
+        item = self.items.get((f'ORDER#{order_id}', f'METADATA#{order_id}'))
+        if item is None:
+            raise ex.ItemNotFoundException(f'order_id: {order_id}')
+        return self._dynamo_obj_to_order_obj(item)
@@ -0,0 +1,39 @@
+import os
+from order_layers.common import lru_cache
+from order_layers.domain import restaurant_model
+from order_layers.adaptors import restaurant_replica_repository
+
+RESTAURANT_CACHE_MAX_SIZE = int(os.environ.get('RESTAURANT_CACHE_MAX_SIZE', '256'))
+RESTAURANT_CACHE_TTL_SECONDS = float(os.environ.get('RESTAURANT_CACHE_TTL_SECONDS', '300'))
+
+
+class CachedRepository(restaurant_replica_repository.AbstractRepository):
+    """
+    Restaurant Replicaの Read-Through Cache (コンテナごと)
+        key: restaurant_id
+        version: Restaurant Replicaを書き込んだRestaurant Eventのevent_id
+
+    - find_by_id(): Cacheに無い(またはTTL切れ)場合だけDynamoDBから取得する
+    - save(): RestaurantCreated Eventを受けたコンテナはDynamoDB保存後すぐにCacheを更新する
+    (注) 他のコンテナのCacheはTTLで更新される。(EventBridgeは1コンテナにしか配信しないため)
+    """
+
+    def __init__(self, repo: restaurant_replica_repository.DynamoDbRepository,
+                 max_size=RESTAURANT_CACHE_MAX_SIZE,
+                 ttl_seconds=RESTAURANT_CACHE_TTL_SECONDS):
+        self.repo = repo
+        self.cache = lru_cache.LruTtlCache(max_size=max_size, ttl_seconds=ttl_seconds)
+
+    def save(self, restaurant: restaurant_model.Restaurant, event_id, timestamp):
+        self.repo.save(restaurant, event_id, timestamp)
+        self.cache.put(restaurant.restaurant_id, restaurant, version=event_id)
+
+    def find_by_id(self, restaurant_id) -> restaurant_model.Restaurant:
+        restaurant = self.cache.get(restaurant_id)
+        if restaurant is None:
+            restaurant, event_id = self.repo.find_versioned_by_id(restaurant_id)
+            self.cache.put(restaurant_id, restaurant, version=event_id)
+        return restaurant
+
+    def stats(self) -> dict:
+        return self.cache.stats()
@@ -0,0 +1,213 @@
+import abc
+import json
+from order_layers.domain import order_model
+from order_layers.service import domain_event_envelope
+from order_layers.adaptors import dynamo_exception as dx
+from order_layers.common import exception as ex
+from order_layers.common import log
+from order_layers.common import metrics
+
+logger = log.get_logger(__name__)
+
+TRANSACT_WRITE_ITEMS_LIMIT = 100
+
+
+def attribute_value_bytes(attribute_value: dict) -> int:
+    """ DynamoDB の Item size の計算方法 (attribute名 + 値) で見積もった attribute value の大きさ """
+    [(dynamodb_type, value)] = attribute_value.items()
+    if dynamodb_type in ('S', 'N', 'B'):
+        return len(value)  # S は文字数、N は桁数で近似する
+    if dynamodb_type == 'M':
+        return 3 + sum(len(name) + attribute_value_bytes(v) + 1 for name, v in value.items())
+    if dynamodb_type == 'L':
+        return 3 + sum(attribute_value_bytes(v) + 1 for v in value)
+    if dynamodb_type in ('BOOL', 'NULL'):
+        return 1
+    return sum(len(v) for v in value)  # SS / NS / BS
+
+
+def estimate_request_bytes(request: dict) -> int:
+    """ Put は Item、Update は Key と ExpressionAttributeValues の大きさ """
+    attributes = request.get('Item') or {**request.get('Key', {}), **request.get('ExpressionAttributeValues', {})}
+    return sum(len(name) + attribute_value_bytes(value) for name, value in attributes.items())
+
+
+class AbstractUnitOfWork(abc.ABC):
+    """
+    Transactional Outbox
+        with uow:
+            uow.save_order(order)                       # 新規Order
+            uow.update_order(order, ['order_state'])    # 既存Order (楽観ロック)
+            uow.save_event(DomainEventEnvelope.wrap(domain_event))
+        # with を抜けるときに Order と Domain Event をまとめて書き込む。例外時は書き込まない。
+    """
+
+    def __enter__(self):
+        self.begin()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    @abc.abstractmethod
+    def begin(self):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def save_order(self, order: order_model.Order):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def update_order(self, order: order_model.Order, attributes: list[str] = None):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def save_event(self, event: domain_event_envelope.DomainEventEnvelope) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def commit(self):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def rollback(self):
+        raise NotImplementedError
+
+
+class DynamoDbUnitOfWork(AbstractUnitOfWork):
+    """
+    Order Item (OrderService Table) と Order Domain Event Item (OrderEvent Table) を
+    1回の TransactWriteItems で書き込む。
+    Orderが保存されてDomain Eventが失われる(Sagaが起動しない)ことが無くなる。
+    1 Itemだけの場合は put_item/update_item を使う。(TransactWriteItemsはWCUが2倍になるため)
+    update_order()のlock_versionが一致しない場合は OptimisticLockException を送出する。
+    """
+
+    def __init__(self, order_repo, order_event_repo):
+        self.order_repo = order_repo
+        self.order_event_repo = order_event_repo
+        self.client = order_repo.client
+        self.transact_items = []
+        self.versioned_orders = []  # 楽観ロック対象 (order_id, expected_lock_version)
+        self.payload_bytes = 0  # 集めた transact item の大きさの見積もり
+        # for metrics
+        self.last_item_count = 0
+        self.last_payload_bytes = 0  # 見積もり (毎回)
+        self.last_payload_json_bytes = 0  # json.dumps した大きさ (DEBUG log が有効な commit だけ)
+        self.total_calls_saved = 0
+
+    def begin(self):
+        self.transact_items = []
+        self.versioned_orders = []
+        self.payload_bytes = 0
+
+    def _append(self, operation: str, request: dict):
+        self.transact_items.append({operation: request})
+        self.payload_bytes += estimate_request_bytes(request)
+
+    def save_order(self, order: order_model.Order):
+        self._append('Put', self.order_repo.to_put_request(order))
+
+    def update_order(self, order: order_model.Order, attributes: list[str] = None):
+        self.versioned_orders.append((order.order_id, order.lock_version))
+        request = self.order_repo.to_update_request(order, attributes)
+        # order_event_sourced_repository は version の Item を Put する
+        self._append('Update' if 'UpdateExpression' in request else 'Put', request)
+
+    def save_event(self, event: domain_event_envelope.DomainEventEnvelope) -> int:
+        item = self.order_event_repo.to_dynamo_dict(event)
+        self._append('Put', {
+            'TableName': self.order_event_repo.table_name,
+            'Item': item,
+        })
+        return int(item['event_id']['N'])
+        # Todo: CQRSのレイテンシーがあるため、REST API Clientがpollingするidとして使えるようにリターンする。
+
+    def commit(self):
+        transact_items, self.transact_items = self.transact_items, []
+        versioned_orders, self.versioned_orders = self.versioned_orders, []
+        payload_bytes, self.payload_bytes = self.payload_bytes, 0
+        if not transact_items:
+            return
+        if len(transact_items) > TRANSACT_WRITE_ITEMS_LIMIT:
+            raise ex.IllegalArgumentException(
+                f'TransactWriteItems supports up to {TRANSACT_WRITE_ITEMS_LIMIT} items: '
+                f'{len(transact_items)}')
+
+        self.last_item_count = len(transact_items)
+        self.last_payload_bytes = payload_bytes
+        # json.dumps は transact item 全体を encode するので、DEBUG log に出す時だけ払う
+        self.last_payload_json_bytes = len(json.dumps(transact_items)) if logger.enabled(log.DEBUG) else 0
+
+        try:
+            with dx.dynamo_exception_check():
+                if len(transact_items) == 1:
+                    [(operation, request)] = transact_items[0].items()
+                    if operation == 'Update':
+                        self.client.update_item(**request)
+                    else:
+                        self.client.put_item(**request)
+                else:
+                    self.client.transact_write_items(TransactItems=transact_items)
+        except dx.ConditionalCheckFailedException as e:
+            if versioned_orders:
+                raise ex.OptimisticLockException(
+                    f'(order_id, expected lock_version): {versioned_orders}') from e
+            raise e
+
+        calls_saved = len(transact_items) - 1
+        self.total_calls_saved += calls_saved
+        metrics.add('UnitOfWorkItems', len(transact_items))
+        metrics.add('UnitOfWorkPayloadBytes', payload_bytes, unit='Bytes')
+        metrics.add('UnitOfWorkCallsSaved', calls_saved)
+        logger.debug('unit_of_work.commit(): items: %s, payload_bytes: %s (json: %s), calls_saved: %s, '
+                     'total_calls_saved: %s', len(transact_items), payload_bytes, self.last_payload_json_bytes,
+                     calls_saved, self.total_calls_saved)
+
+    def rollback(self):
+        # DynamoDBには未送信なので破棄するだけ
+        self.transact_items = []
+        self.versioned_orders = []
+
+
+class InMemoryUnitOfWork(DynamoDbUnitOfWork):
+    """
+    test / benchmark 用の in-memory 実装
+        DynamoDbUnitOfWork と同じ transact item を作り、order_repository.InMemoryRepository と
+        order_event_repository.InMemoryRepository に書き込む。
+        TransactWriteItems と同じく、全ての条件を満たす時だけ全ての item を書き込む。
+    """
+
+    def commit(self):
+        transact_items, self.transact_items = self.transact_items, []
+        versioned_orders, self.versioned_orders = self.versioned_orders, []
+        payload_bytes, self.payload_bytes = self.payload_bytes, 0
+        if len(transact_items) > TRANSACT_WRITE_ITEMS_LIMIT:
+            raise ex.IllegalArgumentException(
+                f'TransactWriteItems supports up to {TRANSACT_WRITE_ITEMS_LIMIT} items: '
+                f'{len(transact_items)}')
+
+        requests = [request for transact_item in transact_items for request in transact_item.values()]
+        try:
+            for request in requests:
+                if request['TableName'] == self.order_repo.table_name:
+                    self.order_repo.check(request)
+        except dx.ConditionalCheckFailedException as e:
+            if versioned_orders:
+                raise ex.OptimisticLockException(
+                    f'(order_id, expected lock_version): {versioned_orders}') from e
+            raise e
+
+        for request in requests:
+            if request['TableName'] == self.order_repo.table_name:
+                self.order_repo.apply(request)
+            else:
+                item = request['Item']
+                self.order_event_repo.items[(item['PK']['S'], item['SK']['S'])] = item
+        self.last_item_count = len(requests)
+        self.last_payload_bytes = payload_bytes
+        self.total_calls_saved += max(len(requests) - 1, 0)
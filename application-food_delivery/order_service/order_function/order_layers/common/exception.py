@@ -40,3 +40,7 @@ class ItemNotFoundException(Exception):
 
 class InvalidSagaCmd(Exception):
     pass
+
+
+class OptimisticLockException(Exception):
+    pass
@@ -0,0 +1,56 @@
+import threading
+import time
+import collections
+
+
+class LruTtlCache:
+    """
+    コンテナ(Lambda実行環境)内のLRU + TTL Cache
+        max_size: 超えた場合は最も古く参照されたentryを削除する
+        ttl_seconds: 経過したentryは期限切れ(miss)として扱う
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()  # key -> (expires_at, version, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                self.misses += 1
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, value, version=None):
+        """ versionが古い場合は上書きしない """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and version is not None and entry[1] is not None \
+                    and entry[1] > version:
+                return
+            self._entries[key] = (self.clock() + self.ttl_seconds, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+            }
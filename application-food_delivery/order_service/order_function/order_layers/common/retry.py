@@ -0,0 +1,13 @@
+import os
+import random
+
+OPTIMISTIC_LOCK_MAX_ATTEMPTS = int(os.environ.get('OPTIMISTIC_LOCK_MAX_ATTEMPTS', '5'))
+BASE_DELAY_SECONDS = 0.05
+MAX_DELAY_SECONDS = 1.0
+
+
+def backoff_delay(attempt: int,
+                  base: float = BASE_DELAY_SECONDS,
+                  cap: float = MAX_DELAY_SECONDS) -> float:
+    """ Exponential Backoff + Full Jitter: random(0, min(cap, base * 2 ** attempt)) """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
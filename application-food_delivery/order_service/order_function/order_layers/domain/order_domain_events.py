@@ -60,7 +60,7 @@ class CancelOrderSagaRequested(DomainEvent):
     order_total: common.Money
 
     def to_dict(self):
-        return dataclasses.asdict(self)
+        return {'order_id': self.order_id, 'consumer_id': self.consumer_id, 'order_total': self.order_total.to_dict()}
 
 
 @dataclasses.dataclass
@@ -110,7 +110,7 @@ class OrderRevised(DomainEvent):
             if isinstance(o, common.Address):
                 return dataclasses.asdict(o)
             if isinstance(o, common.Money):
-                return dataclasses.asdict(o)
+                return o.to_dict()
             if isinstance(o, datetime.datetime):
                 return o.isoformat() + 'Z'
             if isinstance(o, decimal.Decimal):
@@ -144,7 +144,7 @@ class OrderRevisionProposed(DomainEvent):
             if isinstance(o, common.Address):
                 return dataclasses.asdict(o)
             if isinstance(o, common.Money):
-                return dataclasses.asdict(o)
+                return o.to_dict()
             if isinstance(o, datetime.datetime):
                 return o.isoformat() + 'Z'
             if isinstance(o, decimal.Decimal):
@@ -1,13 +1,12 @@
 from __future__ import annotations  # classの依存関係の許可
 import dataclasses
-import json
-import decimal
 import enum
 import datetime
 import uuid
 import typing
 from order_layers.common import common
 from order_layers.common import exception
+from order_layers.common import serializer
 from order_layers.domain import restaurant_model
 from order_layers.domain import order_domain_events
 
@@ -34,9 +33,11 @@ class DeliveryInformation:
         return cls(**d)
 
     def to_dict(self):
-        d = dataclasses.asdict(self)
-        d['delivery_time'] = datetime.datetime.strftime(d['delivery_time'], '%Y-%m-%dT%H:%M:%S.%fZ')
-        return d
+        return {
+            'delivery_time':
+                datetime.datetime.strftime(self.delivery_time, '%Y-%m-%dT%H:%M:%S.%fZ'),
+            'delivery_address': self.delivery_address.to_dict(),
+        }
 
 
 # ------------------ for order change ---------------------------------
@@ -64,26 +65,17 @@ class OrderRevision:
                    revised_order_line_items=revised_order_line_items)
 
     def to_dict(self):
-        def encoder_(o):
-            if isinstance(o, OrderRevision):
-                return o.__dict__  # Todo: ここがポイント
-            if isinstance(o, DeliveryInformation):
-                return o.to_dict()
-            if isinstance(o, RevisedOrderLineItem):
-                return dataclasses.asdict(o)
-            if isinstance(o, common.Address):
-                return o.to_dict()
-            if isinstance(o, common.Money):
-                return o.to_dict()
-            if isinstance(o, decimal.Decimal):
-                if int(o) == o:
-                    return int(o)
-                else:
-                    return float(o)
-            raise TypeError(f'{repr(o)} is not serializable')
-
-        d = json.loads(json.dumps(self, default=encoder_))
-        return d
+        return {
+            'delivery_information':
+                serializer.to_plain(self.delivery_information.to_dict())
+                if self.delivery_information is not None else None,
+            'revised_order_line_items': [
+                {
+                    'quantity': serializer.to_plain(item.quantity),
+                    'menu_id': serializer.to_plain(item.menu_id),
+                }
+                for item in self.revised_order_line_items],
+        }
 
 
 @dataclasses.dataclass(unsafe_hash=True, frozen=True)
@@ -95,7 +87,11 @@ class LineItemQuantityChange:
     delta: common.Money
 
     def to_dict(self):
-        return dataclasses.asdict(self)
+        return {
+            'current_order_total': self.current_order_total.to_dict(),
+            'new_order_total': self.new_order_total.to_dict(),
+            'delta': self.delta.to_dict(),
+        }
 
 # ------------------ for order change ---------------------------------
 
@@ -114,24 +110,12 @@ class OrderDetails:
     order_total: common.Money
 
     def to_dict(self):
-        def encoder_(o):
-            if isinstance(o, OrderDetails):
-                return o.__dict__  # Todo: ここがポイント
-            if isinstance(o, OrderLineItem):
-                return o.to_dict()
-            if isinstance(o, common.Address):
-                return o.to_dict()
-            if isinstance(o, common.Money):
-                return o.to_dict()
-            if isinstance(o, decimal.Decimal):
-                if int(o) == o:
-                    return int(o)
-                else:
-                    return float(o)
-            raise TypeError(f'{repr(o)} is not serializable')
-
-        d = json.loads(json.dumps(self, default=encoder_))
-        return d
+        return {
+            'consumer_id': serializer.to_plain(self.consumer_id),
+            'restaurant_id': serializer.to_plain(self.restaurant_id),
+            'order_line_items': [item.to_dict() for item in self.order_line_items],
+            'order_total': serializer.to_plain(self.order_total.to_dict()),
+        }
 
 
 @dataclasses.dataclass
@@ -146,21 +130,17 @@ class OrderLineItem:
     @classmethod
     def from_dict(cls, d):
         d['price'] = common.Money.from_dict(d['price'])
+        if type(d['quantity']) is not int and d['quantity'] == int(d['quantity']):
+            d['quantity'] = int(d['quantity'])  # DynamoDB の Number (Decimal) -> int
         return cls(**d)
 
     def to_dict(self):
-        def encoder_(o):
-            if isinstance(o, OrderLineItem):
-                return o.__dict__  # ここがポイント
-            if isinstance(o, common.Money):
-                return o.to_dict()
-            if isinstance(o, decimal.Decimal):
-                if int(o) == o:
-                    return int(o)
-                else:
-                    return float(o)
-            raise TypeError(f'{repr(o)} is not serializable')
-        return json.loads(json.dumps(self, default=encoder_))
+        return {
+            'menu_id': serializer.to_plain(self.menu_id),
+            'name': serializer.to_plain(self.name),
+            'price': serializer.to_plain(self.price.to_dict()),
+            'quantity': serializer.to_plain(self.quantity),
+        }
 
     def delta_for_changed_quantity(self, new_quantity: int) -> common.Money:
         return self.price * (new_quantity - self.quantity)
@@ -184,6 +164,10 @@ class OrderLineItems:
 
     def __init__(self, line_items: list[OrderLineItem]) -> None:
         self.line_items: list[OrderLineItem] = line_items
+        # menu_id -> OrderLineItem (同じmenu_idが複数ある場合は先頭を使う)
+        self._line_item_index: dict[str, OrderLineItem] = {}
+        for line_item in line_items:
+            self._line_item_index.setdefault(line_item.menu_id, line_item)
 
     @classmethod
     def from_dict_list(cls, item_list: list[dict]):
@@ -191,24 +175,11 @@ class OrderLineItems:
         return cls(list_)
 
     def to_dict_list(self):
-        def encoder_(o):
-            if isinstance(o, OrderLineItems):
-                return o.__dict__  # ここがポイント
-            if isinstance(o, OrderLineItem):
-                return o.to_dict()  # ここがポイント
-            if isinstance(o, common.Money):
-                return o.to_dict()
-            raise TypeError(f'{repr(o)} is not serializable')
-
-        d_list = [json.loads(json.dumps(item, default=encoder_))
-                  for item in self.line_items]
-        return d_list
+        return [item.to_dict() for item in self.line_items]
 
     def order_total(self) -> common.Money:
-        money_list = [line_item.get_total() for line_item in self.line_items]
-        sum_value = sum(money.value for money in money_list)
-        currency = money_list[0].currency
-        return common.Money(sum_value, currency)
+        return common.Money.total([line_item.price for line_item in self.line_items],
+                                  [line_item.quantity for line_item in self.line_items])
 
     def line_item_quantity_change(self, order_revision) -> LineItemQuantityChange:
         """ quantityの変更で変わる金額を算出 """
@@ -218,33 +189,29 @@ class OrderLineItems:
         return LineItemQuantityChange(current_order_total, new_order_total, delta)
 
     def change_to_order_total(self, order_revision: OrderRevision) -> common.Money:
-        price_list = []
-        for item in order_revision.revised_order_line_items:
-            """
-            order_revision.revised_order_line_items: list[RevisedOrderLineItem]
-            item:RevisedOrderLineItem
-            """
-            line_item: OrderLineItem = self.find_order_line_items(item.menu_id)
-            price = line_item.delta_for_changed_quantity(item.quantity)
-            price_list.append(price)
-
-        # common.Money Listの合計を算出
-        sum_value = sum(money.value for money in price_list)
-        currency = price_list[0].currency
-        line_item_total_price = common.Money(sum_value, currency)
-        return line_item_total_price
+        """
+        order_revision.revised_order_line_items: list[RevisedOrderLineItem]
+        sum(price * (新しいquantity - 現在のquantity))
+        """
+        line_items = [self.find_order_line_items(item.menu_id)
+                      for item in order_revision.revised_order_line_items]
+        return common.Money.total([line_item.price for line_item in line_items],
+                                  [item.quantity - line_item.quantity
+                                   for item, line_item in zip(order_revision.revised_order_line_items, line_items)])
 
     def find_order_line_items(self, line_item_id: str):
-        for line_item in self.line_items:
-            if line_item.menu_id == line_item_id:
-                return line_item
-        raise exception.LineItemNotFound(f'Line item not found {line_item_id}')
+        line_item = self._line_item_index.get(line_item_id)
+        if line_item is None:
+            raise exception.LineItemNotFound(f'Line item not found {line_item_id}')
+        return line_item
 
     def update_line_items(self, order_revision: OrderRevision):
+        # 同じmenu_idのrevisionが複数ある場合は最後のquantityを使う
+        revised_quantities = {item.menu_id: item.quantity
+                              for item in order_revision.revised_order_line_items}
         for line_item in self.line_items:
-            for item in order_revision.revised_order_line_items:
-                if line_item.menu_id == item.menu_id:
-                    line_item.quantity = item.quantity
+            if line_item.menu_id in revised_quantities:
+                line_item.quantity = revised_quantities[line_item.menu_id]
 
     # def __eq__(self, other):
     #     if isinstance(other, OrderLineItems):
@@ -290,29 +257,18 @@ class Order:
         return cls(**d)
 
     def to_dict(self):
-        def encoder_(o):
-            if isinstance(o, Order):
-                return o.__dict__  # ここがポイント
-            if isinstance(o, DeliveryInformation):
-                return o.to_dict()  # ここがポイント
-            if isinstance(o, OrderLineItems):
-                return o.to_dict_list()
-            if isinstance(o, OrderState):
-                return o.value
-            if isinstance(o, common.Money):
-                return o.to_dict()
-            if isinstance(o, datetime.datetime):
-                return o.isoformat() + 'Z'
-            if isinstance(o, common.Address):
-                return o.to_dict()
-            if isinstance(o, decimal.Decimal):
-                if int(o) == o:
-                    return int(o)
-                else:
-                    return float(o)
-            raise TypeError(f'{repr(o)} is not serializable')
-
-        return json.loads(json.dumps(self, default=encoder_))
+        # JSON文字列を経由せずにattributeを1回だけ辿る (keyの順序は__init__と同じ)
+        return {
+            'order_id': serializer.to_plain(self.order_id),
+            'lock_version': serializer.to_plain(self.lock_version),
+            'order_state': serializer.to_plain(self.order_state),
+            'order_minimum': serializer.to_plain(self.order_minimum.to_dict()),
+            'consumer_id': serializer.to_plain(self.consumer_id),
+            'restaurant_id': serializer.to_plain(self.restaurant_id),
+            'order_line_items': self.order_line_items.to_dict_list(),
+            'delivery_information': serializer.to_plain(self.delivery_information.to_dict()),
+            'payment_information': serializer.to_plain(self.payment_information),
+        }
 
     @classmethod
     def create_order(cls,
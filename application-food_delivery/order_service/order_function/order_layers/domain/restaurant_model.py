@@ -1,9 +1,8 @@
 from __future__ import annotations  # classの依存関係の許可
 import dataclasses
-import decimal
-import json
 from order_layers.common import common
 from order_layers.common import exception
+from order_layers.common import serializer
 
 
 @dataclasses.dataclass(unsafe_hash=True)
@@ -18,6 +17,13 @@ class MenuItem:
         d['price'] = common.Money.from_dict(d['price'])
         return cls(**d)
 
+    def to_dict(self):
+        return {
+            'menu_id': serializer.to_plain(self.menu_id),
+            'menu_name': serializer.to_plain(self.menu_name),
+            'price': serializer.to_plain(self.price.to_dict()),
+        }
+
 
 class Restaurant:
 
@@ -29,6 +35,10 @@ class Restaurant:
         self.restaurant_id: int = restaurant_id
         self.restaurant_name: str = restaurant_name
         self.menu_items: list[MenuItem] = menu_items
+        # menu_id -> MenuItem (同じmenu_idが複数ある場合は先頭を使う)
+        self._menu_index: dict[str, MenuItem] = {}
+        for menu in menu_items:
+            self._menu_index.setdefault(menu.menu_id, menu)
 
     @classmethod
     def from_dict(cls, d: dict):
@@ -36,26 +46,14 @@ class Restaurant:
         return cls(**d)
 
     def to_dict(self):
-        def encoder_(o):
-            if isinstance(o, Restaurant):
-                return o.__dict__
-            if isinstance(o, MenuItem):
-                return dataclasses.asdict(o)
-            if isinstance(o, common.Money):
-                return dataclasses.asdict(o)
-            if isinstance(o, decimal.Decimal):
-                if int(o) == o:
-                    return int(o)
-                else:
-                    return float(o)
-            raise TypeError(f'{repr(o)} is not serializable')
-
-        d = json.loads(json.dumps(self, default=encoder_))
-        return d
+        return {
+            'restaurant_id': serializer.to_plain(self.restaurant_id),
+            'restaurant_name': serializer.to_plain(self.restaurant_name),
+            'menu_items': [menu.to_dict() for menu in self.menu_items],
+        }
 
     def find_menu_item(self, menu_id: str) -> MenuItem:
-        menus = [menu for menu in self.menu_items if menu.menu_id == menu_id]
-        if len(menus) == 0:
+        menu = self._menu_index.get(menu_id)
+        if menu is None:
             raise exception.MenuItemNotFound(f'MenuItemNotFound: {menu_id}')
-        else:
-            return menus[0]
+        return menu
@@ -1,23 +1,50 @@
+from __future__ import annotations  # classの依存関係の許可
 import decimal
-import re
+import functools
 import json
-import traceback
+import os
+from typing import TYPE_CHECKING
 from order_layers.common import exception
 from order_layers.common import json_encoder
-from order_layers.service import commands
-from order_layers.service import events
-from order_layers.service import handlers
-from order_layers.adaptors import restaurant_replica_repository
-from order_layers.adaptors import order_repository
-from order_layers.adaptors import order_event_repository
-from order_layers.domain import order_model
-
-ORDER_REPOSITORY = order_repository.DynamoDbRepository()
-ORDER_EVENT_REPOSITORY = order_event_repository.DynamoDbRepository()
-RESTAURANT_REPLICA_REPOSITORY = restaurant_replica_repository.DynamoDbRepository()
-HANDLER = handlers.Handler(order_repo=ORDER_REPOSITORY,
-                           order_event_repo=ORDER_EVENT_REPOSITORY,
-                           restaurant_replica_repo=RESTAURANT_REPLICA_REPOSITORY)
+from order_layers.presentation import router
+from order_layers.common import log
+
+if TYPE_CHECKING:  # service / adaptors の module は route と handler() の中でだけ import する
+    from order_layers.service import handlers
+
+logger = log.get_logger(__name__)
+
+ROUTER = router.Router()
+SAGA_REGISTRY = router.Registry()
+
+
+@functools.lru_cache(maxsize=None)
+def handler() -> handlers.Handler:
+    """
+    repository と Handler は最初の invocation で生成する (import 時に DynamoDB client を作らない)
+    環境変数 ORDER_REPOSITORY: item (default, METADATA Item を更新) | event_sourced (version Item を追記)
+    """
+    from order_layers.service import handlers
+    from order_layers.adaptors import restaurant_replica_repository
+    from order_layers.adaptors import restaurant_replica_cache
+    from order_layers.adaptors import order_event_repository
+    from order_layers.adaptors import unit_of_work
+    if os.environ.get('ORDER_REPOSITORY', 'item') == 'event_sourced':
+        from order_layers.adaptors import order_event_sourced_repository
+        order_repo = order_event_sourced_repository.EventSourcedRepository()
+    else:
+        from order_layers.adaptors import order_repository
+        order_repo = order_repository.DynamoDbRepository()
+    order_event_repo = order_event_repository.DynamoDbRepository()
+    restaurant_replica_repo = restaurant_replica_cache.CachedRepository(
+                                    restaurant_replica_repository.DynamoDbRepository())
+    order_uow = unit_of_work.DynamoDbUnitOfWork(order_repo=order_repo,
+                                                order_event_repo=order_event_repo)
+    return handlers.Handler(order_repo=order_repo,
+                            order_event_repo=order_event_repo,
+                            restaurant_replica_repo=restaurant_replica_repo,
+                            order_uow=order_uow)
+
 
 # -------------------------------------------------
 # Eventbus Invocation
@@ -139,12 +166,14 @@ def eventbus_invocation(event: dict):
     }
     """
     try:
-        print(f'eventbus_invocation() event: {json.dumps(event, cls=json_encoder.JSONEncoder)}')
+        logger.payload('eventbus_invocation() event', event)
 
         event_source, event_detail, event_type = extract_parameter_from_event(event)
         if event_source == 'com.restaurant.created' and event_type == 'RestaurantCreated':
+            # 更新 (writer path) の module は EventBridge の invocation でだけ import する
+            from order_layers.service import events
             event_ = events.RestaurantCreated.from_event(event_detail)
-            HANDLER.events_handler(event_)
+            handler().events_handler(event_)
         else:
             raise Exception(f"NotSupportEvent: {event_source} : {event_type}")
         return None
@@ -164,144 +193,159 @@ def rest_request(event):
     query_string_parameters = event.get('queryStringParameters')
     body_json = event.get('body', '{}')  # JSON
 
-    print(f'http_method: {http_method}')
-    print(f'query_string_parameters: {query_string_parameters}')
-    print(f'path: {path}')
-    print(f'path_parameters: {path_parameters}')
-    print(f'body_json: {body_json}')
+    logger.debug('http_method: %s', http_method)
+    logger.debug('query_string_parameters: %s', query_string_parameters)
+    logger.debug('path: %s', path)
+    logger.debug('path_parameters: %s', path_parameters)
+    logger.payload('body_json', body_json)
 
     return http_method, query_string_parameters, path, path_parameters, body_json
 
 
+@ROUTER.route('POST', '/orders')
+def create_order(request: router.Request):
+    """
+    - Create Order
+    POST /orders
+    http_method: POST
+    path: "/orders"
+    path_parameters: None
+    query_string_parameters: None
+    body = Order Information JSON
+    """
+    """
+    body JSON sample
+    {
+        "consumer_id": 4,
+        "restaurant_id": 1,
+        "delivery_information": {
+           "delivery_time": "2022-11-30T05:00:30.001000Z",
+           "delivery_address": {
+                "street1": "9 Amazing View",
+                "street2": "Soi 8",
+                "city": "Oakland",
+                "state": "CA",
+                "zip": "94612"
+            }
+        },
+        "order_line_items": [
+            {
+                "menu_id": "000001",
+                "quantity": 3
+            },
+            {
+                "menu_id": "000002",
+                "quantity": 2
+            },
+            {
+                "menu_id": "000003",
+                "quantity": 1
+            }
+        ]
+    }
+    """
+    from order_layers.service import commands
+    return commands.CreateOrder.from_json(body_json=request.body_json)
+
+
+@ROUTER.route('GET', '/orders/{order_id:[0-9a-f]+}')  # uuid
+def get_order(request: router.Request):
+    """
+    - Get Order
+    GET /orders/xxxxxx
+    http_method: GET
+    path: "/orders/dc83abae951c4185ab3780a5b7c5f055"
+    path_parameters: {"order_id": "dc83abae951c4185ab3780a5b7c5f055"}
+    query_string_parameters: None
+    body: None
+    """
+    from order_layers.service import commands
+    return commands.GetOrder(order_id=request.path_parameters['order_id'])
+
+
+@ROUTER.route('POST', '/orders/{order_id:[0-9a-f]+}/cancel')
+def cancel_order(request: router.Request):
+    """
+    - Cancel Order
+    POST /orders/dc83abae951c4185ab3780a5b7c5f055/cancel
+    http_method: POST
+    path: "/orders/dc83abae951c4185ab3780a5b7c5f055/cancel"
+    path_parameters: {"order_id": "dc83abae951c4185ab3780a5b7c5f055"}
+    query_string_parameters: None
+    body None
+    """
+    from order_layers.service import commands
+    return commands.CancelOrder(order_id=request.path_parameters['order_id'])
+
+
+@ROUTER.route('POST', '/orders/{order_id:[0-9a-f]+}/revise')
+def revise_order(request: router.Request):
+    """
+    - Revise Order
+    POST /orders/dc83abae951c4185ab3780a5b7c5f055/revise
+    http_method: POST
+    path: "/orders/dc83abae951c4185ab3780a5b7c5f055/revise"
+    path_parameters: {"order_id": "dc83abae951c4185ab3780a5b7c5f055"}
+    query_string_parameters: None
+    body = Order Information JSON
+    """
+    """
+    # body_json
+    {
+        "delivery_information": {
+           "delivery_time": "2022-11-30T05:00:30.001000Z",
+           "delivery_address": {
+                "street1": "9 Amazing View",
+                "street2": "Soi 8",
+                "city": "Oakland",
+                "state": "CA",
+                "zip": "94612"
+            }
+        },
+        "revised_order_line_items": [
+            {                           # RevisedOrderLineItem
+                "menu_id": "000001",
+                "quantity": 3
+            },
+            {                           # RevisedOrderLineItem
+                "menu_id": "000002",
+                "quantity": 2
+            },
+            {                           # RevisedOrderLineItem
+                "menu_id": "000003",
+                "quantity": 1
+            }
+        ]
+    }
+    """
+    from order_layers.domain import order_model
+    from order_layers.service import commands
+    d = json.loads(request.body_json, parse_float=decimal.Decimal)
+    delivery_information = order_model.DeliveryInformation.from_dict(
+                                                        d['delivery_information'])
+    revised_order_line_items = [order_model.RevisedOrderLineItem.from_dict(item)
+                                for item in d['revised_order_line_items']]
+    order_revision = order_model.OrderRevision(
+                                    delivery_information=delivery_information,
+                                    revised_order_line_items=revised_order_line_items)
+    return commands.ReviseOrder(order_id=request.path_parameters['order_id'],
+                                order_revision=order_revision)
+
+
 def rest_invocation(event: dict):
     try:
         http_method, query_string_parameters, path, path_parameters, body_json \
             = rest_request(event)
 
-        cmd = None
-        if re.fullmatch('/orders', path) and http_method == 'POST':
-            """
-            - Create Order
-            POST /orders
-            http_method: POST
-            path: "/orders"
-            path_parameters: None
-            query_string_parameters: None
-            body = Order Information JSON
-            """
-            """
-            body JSON sample
-            {
-                "consumer_id": 4,
-                "restaurant_id": 1,
-                "delivery_information": {
-                   "delivery_time": "2022-11-30T05:00:30.001000Z",
-                   "delivery_address": {
-                        "street1": "9 Amazing View",
-                        "street2": "Soi 8",
-                        "city": "Oakland",
-                        "state": "CA",
-                        "zip": "94612"
-                    }
-                },
-                "order_line_items": [
-                    {
-                        "menu_id": "000001",
-                        "quantity": 3
-                    },
-                    {
-                        "menu_id": "000002",
-                        "quantity": 2
-                    },
-                    {
-                        "menu_id": "000003",
-                        "quantity": 1
-                    }
-                ]
-            }
-            """
-            cmd = commands.CreateOrder.from_json(body_json=body_json)
-
-        elif re.fullmatch('/orders/[0-9a-f]+', path) and http_method == 'GET':  # uuid
-            """
-            - Get Order 
-            GET /orders/xxxxxx
-            http_method: GET
-            path: "/orders/dc83abae951c4185ab3780a5b7c5f055"
-            path_parameters: {"order_id": "dc83abae951c4185ab3780a5b7c5f055"}
-            query_string_parameters: None
-            body: None
-            """
-            cmd = commands.GetOrder(order_id=path_parameters.get('order_id'))
-
-        elif re.fullmatch('/orders/[0-9a-f]+/cancel', path) and http_method == 'POST':
-            """
-            - Cancel Order
-            POST /orders/dc83abae951c4185ab3780a5b7c5f055/cancel
-            http_method: POST
-            path: "/orders/dc83abae951c4185ab3780a5b7c5f055/cancel"
-            path_parameters: {"order_id": "dc83abae951c4185ab3780a5b7c5f055"}
-            query_string_parameters: None
-            body None 
-            """
-            # cmd = commands.CancelOrder.from_json(body_json=body_json)  # いまここ
-            cmd = commands.CancelOrder(order_id=path_parameters.get('order_id'))
-
-        elif re.fullmatch('/orders/[0-9a-f]+/revise', path) and http_method == 'POST':
-            """
-            - Revise Order
-            POST /orders/dc83abae951c4185ab3780a5b7c5f055/revise
-            http_method: POST
-            path: "/orders/dc83abae951c4185ab3780a5b7c5f055/revise"
-            path_parameters: {"order_id": "dc83abae951c4185ab3780a5b7c5f055"}
-            query_string_parameters: None
-            body = Order Information JSON
-            """
-            """
-            # body_json
-            {
-                "delivery_information": {
-                   "delivery_time": "2022-11-30T05:00:30.001000Z",
-                   "delivery_address": {
-                        "street1": "9 Amazing View",
-                        "street2": "Soi 8",
-                        "city": "Oakland",
-                        "state": "CA",
-                        "zip": "94612"
-                    }
-                },
-                "revised_order_line_items": [  
-                    {                           # RevisedOrderLineItem
-                        "menu_id": "000001",
-                        "quantity": 3
-                    },
-                    {                           # RevisedOrderLineItem
-                        "menu_id": "000002",
-                        "quantity": 2
-                    },
-                    {                           # RevisedOrderLineItem
-                        "menu_id": "000003",
-                        "quantity": 1
-                    }
-                ]
-            }
-            """
-
-            d = json.loads(body_json, parse_float=decimal.Decimal)
-            delivery_information = order_model.DeliveryInformation.from_dict(
-                                                                d['delivery_information'])
-            revised_order_line_items = [order_model.RevisedOrderLineItem.from_dict(item)
-                                        for item in d['revised_order_line_items']]
-            order_revision = order_model.OrderRevision(
-                                            delivery_information=delivery_information,
-                                            revised_order_line_items=revised_order_line_items)
-            cmd = commands.ReviseOrder(order_id=path_parameters.get('order_id'),
-                                       order_revision=order_revision)
+        # method + 先頭segment で route を引き、path parameterはpathから取り出す
+        route_handler, path_parameters = ROUTER.resolve(http_method, path)
+        cmd = route_handler(router.Request(http_method=http_method,
+                                           path=path,
+                                           path_parameters=path_parameters,
+                                           query_string_parameters=query_string_parameters,
+                                           body_json=body_json))
 
-        else:
-            raise exception.UnsupportedRoute(f'Unsupported Route :{http_method}')
-
-        resp = HANDLER.commands_handler(cmd)
+        resp = handler().commands_handler(cmd)
 
         resp_dict = resp.to_dict() if hasattr(resp, 'to_dict') else resp
 
@@ -315,12 +359,11 @@ def rest_invocation(event: dict):
                         cls=json_encoder.JSONEncoder
                     )
         }
-        print(f'return response: {rest_response}')
+        logger.payload('return response', rest_response)
         return rest_response
 
     except exception.InvalidName as e:
-        print(str(e))
-        traceback.print_exc()
+        logger.exception('%s', e)
         return {
             'statusCode': 400,
             'body': json.dumps({
@@ -328,19 +371,27 @@ def rest_invocation(event: dict):
             })
         }
 
-    except exception.UnsupportedRoute as e:
-        print(str(e))
-        traceback.print_exc()
+    except router.RouteNotFound as e:
+        logger.warning('%s', e)
+        return {
+            'statusCode': 404,
+            'body': json.dumps({
+                'message': str(e),
+            })
+        }
+
+    except router.MethodNotAllowed as e:
+        logger.warning('%s', e)
         return {
             'statusCode': 405,
+            'headers': {'Allow': ', '.join(e.allowed_methods)},
             'body': json.dumps({
                 'message': str(e),
             })
         }
 
     except Exception as e:
-        print(str(e))
-        traceback.print_exc()
+        logger.exception('%s', e)
         return {
             'statusCode': 500,
             'body': json.dumps({
@@ -354,8 +405,71 @@ def rest_invocation(event: dict):
 # StepFunctions - Saga
 # -------------------------------------------------
 
+# ------------------------------------------------------------------
+# Create Order Saga
+# ------------------------------------------------------------------
+@SAGA_REGISTRY.register('CreateOrderSaga', 'APPROVE_ORDER')
+def approve_order(event):
+    from order_layers.service import commands
+    return commands.ApproveOrder(order_id=event['order_id'])
+
+
+@SAGA_REGISTRY.register('CreateOrderSaga', 'REJECT_ORDER')
+def reject_order(event):
+    # 補償トランザクション
+    from order_layers.service import commands
+    return commands.RejectOrder(order_id=event['order_id'])
+
+
+# ------------------------------------------------------------------
+# Cancel Order Saga
+# ------------------------------------------------------------------
+@SAGA_REGISTRY.register('CancelOrderSaga', 'BEGIN_CANCEL_ORDER')
+def begin_cancel_order(event):
+    from order_layers.service import commands
+    return commands.BeginCancelOrder(order_id=event['order_id'])
+
+
+@SAGA_REGISTRY.register('CancelOrderSaga', 'UNDO_BEGIN_CANCEL_ORDER')
+def undo_begin_cancel_order(event):
+    # 補償トランザクション
+    from order_layers.service import commands
+    return commands.UndoBeginCancelOrder(order_id=event['order_id'])
+
+
+@SAGA_REGISTRY.register('CancelOrderSaga', 'CONFIRM_CANCEL_ORDER')
+def confirm_cancel_order(event):
+    from order_layers.service import commands
+    return commands.ConfirmCancelOrder(order_id=event['order_id'])
+
+
+# ------------------------------------------------------------------
+# Revise Order Saga
+# ------------------------------------------------------------------
+@SAGA_REGISTRY.register('ReviseOrderSaga', 'BEGIN_REVISE_ORDER')
+def begin_revise_order(event):
+    from order_layers.domain import order_model
+    from order_layers.service import commands
+    order_revision = order_model.OrderRevision.from_dict(event['order_revision'])
+    return commands.BeginReviseOrder(order_id=event['order_id'], order_revision=order_revision)
+
+
+@SAGA_REGISTRY.register('ReviseOrderSaga', 'CONFIRM_REVISE_ORDER')
+def confirm_revise_order(event):
+    from order_layers.domain import order_model
+    from order_layers.service import commands
+    order_revision = order_model.OrderRevision.from_dict(event['order_revision'])
+    return commands.ConfirmReviseOrder(order_id=event['order_id'], order_revision=order_revision)
+
+
+@SAGA_REGISTRY.register('ReviseOrderSaga', 'UNDO_BEGIN_REVISE_ORDER')
+def undo_begin_revise_order(event):
+    from order_layers.service import commands
+    return commands.UndoBeginReviseOrder(order_id=event['order_id'])
+
+
 def stepfunctions_invocation(event: dict):
-    print(f'stepfunctions_invocation(): event: {event}')
+    logger.payload('stepfunctions_invocation(): event', event)
     """
     {
         "task_context": {
@@ -427,51 +541,16 @@ def stepfunctions_invocation(event: dict):
         state_machine = event['task_context']['value']['state_machine']
         action = event['task_context']['value']['action']
 
-        cmd = None
-        # ------------------------------------------------------------------
-        # Create Order Saga
-        # ------------------------------------------------------------------
-        if state_machine == "CreateOrderSaga" and action == 'APPROVE_ORDER':
-            cmd = commands.ApproveOrder(order_id=event['order_id'])
-        elif state_machine == "CreateOrderSaga" and action == 'REJECT_ORDER':
-            # 補償トランザクション
-            cmd = commands.RejectOrder(order_id=event['order_id'])
-
-        # ------------------------------------------------------------------
-        # Cancel Order Saga
-        # ------------------------------------------------------------------
-        elif state_machine == "CancelOrderSaga" and action == 'BEGIN_CANCEL_ORDER':
-            cmd = commands.BeginCancelOrder(order_id=event['order_id'])
-        elif state_machine == "CancelOrderSaga" and action == 'UNDO_BEGIN_CANCEL_ORDER':
-            # 補償トランザクション
-            cmd = commands.UndoBeginCancelOrder(order_id=event['order_id'])
-        elif state_machine == "CancelOrderSaga" and action == 'CONFIRM_CANCEL_ORDER':
-            cmd = commands.ConfirmCancelOrder(order_id=event['order_id'])
-        # ------------------------------------------------------------------
-        # Revise Order Saga
-        # ------------------------------------------------------------------
-        elif state_machine == "ReviseOrderSaga" and action == 'BEGIN_REVISE_ORDER':
-            order_revision = order_model.OrderRevision.from_dict(event['order_revision'])
-            cmd = commands.BeginReviseOrder(order_id=event['order_id'],
-                                            order_revision=order_revision)
-
-        elif state_machine == "ReviseOrderSaga" and action == 'CONFIRM_REVISE_ORDER':
-            order_revision = order_model.OrderRevision.from_dict(event['order_revision'])
-            cmd = commands.ConfirmReviseOrder(order_id=event['order_id'],
-                                              order_revision=order_revision)
-
-        elif state_machine == "ReviseOrderSaga" and action == 'UNDO_BEGIN_REVISE_ORDER':
-            cmd = commands.UndoBeginReviseOrder(order_id=event['order_id'])
-
-        else:
+        to_command = SAGA_REGISTRY.get((state_machine, action))
+        if to_command is None:
             raise exception.InvalidSagaCmd(f'state_machine:{state_machine}, action:{action}')
+        cmd = to_command(event)
 
-        saga_resp = HANDLER.saga_commands_handler(cmd)
+        saga_resp = handler().saga_commands_handler(cmd)
 
         resp_dict = saga_resp.to_dict() if hasattr(saga_resp, 'to_dict') else saga_resp
         return resp_dict
 
     except Exception as e:
-        print(str(e))
-        traceback.print_exc()
+        logger.exception('%s', e)
         raise e
@@ -1,66 +1,99 @@
+from __future__ import annotations  # classの依存関係の許可
+from typing import TYPE_CHECKING
 from order_layers.service import service
-from order_layers.service import commands
-from order_layers.service import events
+from order_layers.common import log
+from order_layers.common import metrics
+
+if TYPE_CHECKING:  # commands / events は table を組み立てる時にだけ import する
+    from order_layers.service import commands
+    from order_layers.service import events
+
+logger = log.get_logger(__name__)
 
 
 class Handler:
-    def __init__(self, order_repo, order_event_repo, restaurant_replica_repo):
+    def __init__(self, order_repo, order_event_repo, restaurant_replica_repo, order_uow):
 
         self.order_service = service.OrderService(order_repo,
                                                   order_event_repo,
-                                                  restaurant_replica_repo)
-        self.COMMAND_HANDLER = {
-            commands.CreateOrder: getattr(self.order_service, 'create_order'),
-            commands.GetOrder: getattr(self.order_service, 'find_order_by_id'),
-            # commands.CancelOrder: getattr(self.order_service, 'cancel_order'),
-            commands.CancelOrder: getattr(self.order_service, 'start_cancel_order_saga'),
-            commands.ReviseOrder: getattr(self.order_service, 'start_revise_order_saga'),
-        }
+                                                  restaurant_replica_repo,
+                                                  order_uow)
+        # table は route (REST / Saga / EventBridge) ごとに最初の呼び出しで組み立てる
+        self._command_handler = None
+        self._saga_command_handler = None
+        self._event_handler = None
+
+    @property
+    def COMMAND_HANDLER(self) -> dict:
+        if self._command_handler is None:
+            from order_layers.service import commands
+            self._command_handler = {
+                commands.CreateOrder: getattr(self.order_service, 'create_order'),
+                commands.GetOrder: getattr(self.order_service, 'find_order_by_id'),
+                # commands.CancelOrder: getattr(self.order_service, 'cancel_order'),
+                commands.CancelOrder: getattr(self.order_service, 'start_cancel_order_saga'),
+                commands.ReviseOrder: getattr(self.order_service, 'start_revise_order_saga'),
+            }
+        return self._command_handler
 
-        self.SAGACOMMAND_HANDLER = {
-            commands.ApproveOrder: getattr(self.order_service, 'approve_order'),
-            commands.RejectOrder: getattr(self.order_service, 'reject_order'),
-            commands.BeginCancelOrder: getattr(self.order_service, 'begin_cancel'),
-            commands.UndoBeginCancelOrder: getattr(self.order_service, 'undo_cancel'),
-            commands.ConfirmCancelOrder: getattr(self.order_service, 'confirm_cancel'),
-            commands.BeginReviseOrder: getattr(self.order_service, 'begin_revise_order'),
-            commands.ConfirmReviseOrder: getattr(self.order_service, 'confirm_revise_order'),
-            commands.UndoBeginReviseOrder: getattr(self.order_service, 'undo_begin_revise_order'),
-        }
+    @property
+    def SAGACOMMAND_HANDLER(self) -> dict:
+        if self._saga_command_handler is None:
+            from order_layers.service import commands
+            self._saga_command_handler = {
+                commands.ApproveOrder: getattr(self.order_service, 'approve_order'),
+                commands.RejectOrder: getattr(self.order_service, 'reject_order'),
+                commands.BeginCancelOrder: getattr(self.order_service, 'begin_cancel'),
+                commands.UndoBeginCancelOrder: getattr(self.order_service, 'undo_cancel'),
+                commands.ConfirmCancelOrder: getattr(self.order_service, 'confirm_cancel'),
+                commands.BeginReviseOrder: getattr(self.order_service, 'begin_revise_order'),
+                commands.ConfirmReviseOrder: getattr(self.order_service, 'confirm_revise_order'),
+                commands.UndoBeginReviseOrder: getattr(self.order_service, 'undo_begin_revise_order'),
+            }
+        return self._saga_command_handler
 
-        self.EVENT_HANDLER = {
-            events.RestaurantCreated: getattr(self.order_service, 'create_replica_restaurant'),
-        }
+    @property
+    def EVENT_HANDLER(self) -> dict:
+        # 更新 (writer path) の table は最初の event で組み立てる
+        if self._event_handler is None:
+            from order_layers.service import events
+            self._event_handler = {
+                events.RestaurantCreated: getattr(self.order_service, 'create_replica_restaurant'),
+            }
+        return self._event_handler
 
+    @metrics.instrument('events')
     def events_handler(self, event: events.Event):
         try:
             method = self.EVENT_HANDLER[event.__class__]
-            print(f'event_handler: method: {method}')
+            logger.debug('event_handler: method: %s', method)
             response = method(event)
             return response
 
         except Exception as e:
-            print(str(e))
+            logger.exception('%s', e)
             raise e
 
+    @metrics.instrument('commands')
     def commands_handler(self, cmd: commands.Command):
         try:
             method = self.COMMAND_HANDLER[cmd.__class__]
-            print(f'commands_handler: method: {method}')
+            logger.debug('commands_handler: method: %s', method)
             response = method(cmd)
             return response
 
         except Exception as e:
-            print(str(e))
+            logger.exception('%s', e)
             raise e
 
+    @metrics.instrument('saga_commands')
     def saga_commands_handler(self, cmd: commands.Command):
         try:
             method = self.SAGACOMMAND_HANDLER[cmd.__class__]
-            print(f'saga_commands_handler: method: {method}')
+            logger.debug('saga_commands_handler: method: %s', method)
             response = method(cmd)
             return response
 
         except Exception as e:
-            print(str(e))
+            logger.exception('%s', e)
             raise e
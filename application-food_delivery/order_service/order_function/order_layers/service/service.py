@@ -1,18 +1,25 @@
 from __future__ import annotations  # classの依存関係の許可
+import time
+from order_layers.common import exception
+from order_layers.common import retry
 from order_layers.domain import order_model
 from order_layers.domain import restaurant_model
 from order_layers.service import events
 from order_layers.service import commands
 from order_layers.domain import order_domain_events
 from order_layers.service.domain_event_envelope import DomainEventEnvelope
+from order_layers.common import log
+
+logger = log.get_logger(__name__)
 
 
 class OrderService:
 
-    def __init__(self, order_repo, order_event_repo, restaurant_replica_repo) -> None:
+    def __init__(self, order_repo, order_event_repo, restaurant_replica_repo, order_uow) -> None:
         self.order_repo = order_repo
         self.order_event_repo = order_event_repo
         self.restaurant_replica_repo = restaurant_replica_repo
+        self.order_uow = order_uow  # Transactional Outbox: Order + Domain Event
 
     # ------------------------------------------------------------
     # for Restaurant Service Events
@@ -45,7 +52,7 @@ class OrderService:
 
     # POST /orders
     def create_order(self, cmd: commands.CreateOrder) -> order_model.Order:  # test目的でリターンを返す
-        print("create_order:")
+        logger.debug('create_order:')
 
         restaurant = self.restaurant_replica_repo.find_by_id(cmd.restaurant_id)
         order_line_items = self._make_order_line_items(cmd.order_line_items, restaurant)
@@ -56,11 +63,10 @@ class OrderService:
             delivery_information=cmd.delivery_information,
             order_line_items=order_line_items)
 
-        # Todo: 1. Sagaを実行するためorder_event_repo.save()をトランザクションで実行する
-        # Todo: 2. 並列処理は楽観ロックの実装をする。
-        self.order_repo.save(order)
-
-        event_id = self.order_event_repo.save(DomainEventEnvelope.wrap(domain_event))
+        # Sagaを実行するため、OrderとOrderCreatedを1つのトランザクションで保存する
+        with self.order_uow as uow:
+            uow.save_order(order)
+            event_id = uow.save_event(DomainEventEnvelope.wrap(domain_event))
         # Todo: event_idの理由:
         #  CQRSのレイテンシーがあるため、REST API Clientがpollingするidとして使えるようにリターンする。
         #  現段階ではREST APIのresultには入れてない。
@@ -71,15 +77,17 @@ class OrderService:
             order_line_items: list[commands.OrderRequestLineItems],
             restaurant: restaurant_model.Restaurant) -> order_model.OrderLineItems:
 
-        print("_make_order_line_items:")
+        logger.debug('_make_order_line_items:')
 
-        order_line_item_list = [
-            order_model.OrderLineItem(
-                menu_id=item.menu_id,
-                name=restaurant.find_menu_item(item.menu_id).menu_name,
-                price=restaurant.find_menu_item(item.menu_id).price,
-                quantity=item.quantity)
-            for item in order_line_items]
+        order_line_item_list = []
+        for item in order_line_items:
+            menu = restaurant.find_menu_item(item.menu_id)
+            order_line_item_list.append(
+                order_model.OrderLineItem(
+                    menu_id=item.menu_id,
+                    name=menu.menu_name,
+                    price=menu.price,
+                    quantity=item.quantity))
 
         return order_model.OrderLineItems(line_items=order_line_item_list)
 
@@ -87,21 +95,44 @@ class OrderService:
         order = self.order_repo.find_by_id(cmd.order_id)
         return order
 
+    def _save_event(self, domain_event: order_domain_events.DomainEvent):
+        with self.order_uow as uow:
+            return uow.save_event(DomainEventEnvelope.wrap(domain_event))
+
+    def _update_order(self, order_id, transition, attributes: list[str]):
+        """
+        楽観ロック (Optimistic Lock)
+            1. RepositoryからAggregateを取得
+            2. transition(order)でAggregateを変更 -> (order, ..., domain_event)
+            3. lock_versionが一致する時だけ、変更したattributesとDomain Eventを保存する
+            4. 割り込みがあれば(OptimisticLockException) Backoffしてから1.からリトライする
+        """
+        for attempt in range(1, retry.OPTIMISTIC_LOCK_MAX_ATTEMPTS + 1):
+            order = self.order_repo.find_by_id(order_id)
+            result = transition(order)
+            order_, domain_event = result[0], result[-1]
+            try:
+                with self.order_uow as uow:
+                    uow.update_order(order_, attributes)
+                    if domain_event:
+                        uow.save_event(DomainEventEnvelope.wrap(domain_event))
+                return result
+            except exception.OptimisticLockException as e:
+                if attempt == retry.OPTIMISTIC_LOCK_MAX_ATTEMPTS:
+                    raise e
+                logger.warning('OptimisticLockException. Retrying again... attempt: %s', attempt)
+                time.sleep(retry.backoff_delay(attempt))
+
     # Create Order Saga
     def approve_order(self, cmd: commands.ApproveOrder):
-        """ Todo 1: ここでは楽観ロックすること。
-             　　　Orderは複数Userが編集する前提。
-            Todo 2: Outboxパターンを行うため、order.save()とorder_domain_event.save()を一つの関数にして、
-                    Transaction処理を行うこと。
+        """ Orderは複数Userが編集する前提なので楽観ロックで更新する。
             Todo 3: Domain Event - EventIDシーケンシャル番号を持つこと。Timestampを持つこと。変更を加えたUserIDを持つこと。
         """
-        order = self.order_repo.find_by_id(cmd.order_id)
-        order_, domain_event = order.note_approved()
-
-        self.order_repo.save(order_)
-        self.order_event_repo.save(DomainEventEnvelope.wrap(domain_event))
+        self._update_order(cmd.order_id,
+                           lambda order: order.note_approved(),
+                           attributes=['order_state'])
         return
-    # Todo: 楽観ロックの対応
+    # (参考) 楽観ロックの設計メモ -> _update_order()で実装した
     # def approve_order(order_id, order_repo, order_aggregate_event_pub):
     #     # Orderを承認する
     #     # OrderService.update_order(
@@ -150,40 +181,33 @@ class OrderService:
                                                             order_id=order.order_id,
                                                             consumer_id=order.consumer_id,
                                                             order_total=order.get_order_total())
-        self.order_event_repo.save(DomainEventEnvelope.wrap(domain_event))
+        self._save_event(domain_event)
         return
 
     # Cancel Order Saga member
     def begin_cancel(self, cmd: commands.BeginCancelOrder):
-        order: order_model.Order = self.order_repo.find_by_id(cmd.order_id)
-        order_, domain_event = order.cancel()
-        self.order_repo.save(order_)
-        if domain_event:
-            self.order_event_repo.save(DomainEventEnvelope.wrap(domain_event))
+        self._update_order(cmd.order_id,
+                           lambda order: order.cancel(),
+                           attributes=['order_state'])
         return
 
     def confirm_cancel(self, cmd: commands.ConfirmCancelOrder):
-        order: order_model.Order = self.order_repo.find_by_id(cmd.order_id)
-        order_, domain_event = order.note_canceled()
-        self.order_repo.save(order_)
-        if domain_event:
-            self.order_event_repo.save(DomainEventEnvelope.wrap(domain_event))
+        self._update_order(cmd.order_id,
+                           lambda order: order.note_canceled(),
+                           attributes=['order_state'])
         return
 
     def undo_cancel(self, cmd: commands.UndoBeginCancelOrder):
         # Cancel Order Saga の補償トランザクション
-        order: order_model.Order = self.order_repo.find_by_id(cmd.order_id)
-        order_, domain_event = order.undo_pending_cancel()
-        self.order_repo.save(order_)
-        if domain_event:
-            self.order_event_repo.save(DomainEventEnvelope.wrap(domain_event))
+        self._update_order(cmd.order_id,
+                           lambda order: order.undo_pending_cancel(),
+                           attributes=['order_state'])
         return
 
     def reject_order(self, cmd: commands.RejectOrder):
-        order = self.order_repo.find_by_id(cmd.order_id)
-        order_, domain_event = order.note_rejected()
-        self.order_repo.save(order_)
-        self.order_event_repo.save(DomainEventEnvelope.wrap(domain_event))
+        self._update_order(cmd.order_id,
+                           lambda order: order.note_rejected(),
+                           attributes=['order_state'])
         return
 
     # ---------------------------------------------
@@ -201,31 +225,29 @@ class OrderService:
                                                                 order_id=order.order_id,
                                                                 consumer_id=order.consumer_id,
                                                                 order_revision=cmd.order_revision)
-        self.order_event_repo.save(DomainEventEnvelope.wrap(domain_event))
+        self._save_event(domain_event)
         return order
 
     # from Revise Order Saga
     def begin_revise_order(self, cmd: commands.BeginReviseOrder):
-        order: order_model.Order = self.order_repo.find_by_id(cmd.order_id)
-        order_, line_item_quantity_change, domain_event = order.revise(cmd.order_revision)
-        self.order_repo.save(order_)
-        self.order_event_repo.save(DomainEventEnvelope.wrap(domain_event))
+        order_, line_item_quantity_change, domain_event = self._update_order(
+                                                cmd.order_id,
+                                                lambda order: order.revise(cmd.order_revision),
+                                                attributes=['order_state'])
         return line_item_quantity_change  # new_order_totalをAccount Serviceに伝える必要がある
 
     def confirm_revise_order(self, cmd: commands.ConfirmReviseOrder):
-        order: order_model.Order = self.order_repo.find_by_id(cmd.order_id)
-        order_, domain_event = order.confirm_revision(order_revision=cmd.order_revision)
-        self.order_repo.save(order_)
-        self.order_event_repo.save(DomainEventEnvelope.wrap(domain_event))
-        return order
+        order_, domain_event = self._update_order(
+                cmd.order_id,
+                lambda order: order.confirm_revision(order_revision=cmd.order_revision),
+                attributes=['order_state', 'order_line_items', 'delivery_information'])
+        return order_
 
     # 補償トランザクション
     def undo_begin_revise_order(self, cmd: commands.UndoBeginReviseOrder):
-        order: order_model.Order = self.order_repo.find_by_id(cmd.order_id)
-        order_, domain_event = order.undo_revise_order()
-        self.order_repo.save(order_)
-        if domain_event:
-            self.order_event_repo.save(DomainEventEnvelope.wrap(domain_event))
+        self._update_order(cmd.order_id,
+                           lambda order: order.undo_revise_order(),
+                           attributes=['order_state'])
         return
 
     # def confirm_change_line_item_quantity(order_id, order_revision):
@@ -0,0 +1,55 @@
+import pytest
+from order_layers.adaptors import aws_clients
+from order_layers.adaptors import order_repository
+from order_layers.adaptors import order_event_repository
+from order_layers.adaptors import restaurant_replica_repository
+
+
+@pytest.fixture(autouse=True)
+def clients(monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'ap-northeast-1')
+    aws_clients.reset()
+    yield
+    aws_clients.reset()
+
+
+def test_client_is_shared_per_service():
+    dynamodb = aws_clients.client('dynamodb')
+
+    assert aws_clients.client('dynamodb') is dynamodb
+    assert aws_clients.client('stepfunctions') is not dynamodb
+
+
+def test_repositories_share_one_dynamodb_client():
+    repositories = [order_repository.DynamoDbRepository(),
+                    order_event_repository.DynamoDbRepository(),
+                    restaurant_replica_repository.DynamoDbRepository()]
+
+    assert {id(repo.client) for repo in repositories} == {id(aws_clients.client('dynamodb'))}
+
+
+def test_default_config():
+    config = aws_clients.client('dynamodb').meta.config
+
+    assert config.retries == {'mode': 'adaptive', 'total_max_attempts': 3}
+    assert config.max_pool_connections == 10
+    assert config.connect_timeout == 2
+    assert config.read_timeout == 5
+    assert config.tcp_keepalive is True
+
+
+def test_config_from_environment(monkeypatch):
+    monkeypatch.setenv('BOTO_RETRY_MODE', 'standard')
+    monkeypatch.setenv('BOTO_MAX_ATTEMPTS', '5')
+    monkeypatch.setenv('BOTO_MAX_POOL_CONNECTIONS', '32')
+    monkeypatch.setenv('BOTO_CONNECT_TIMEOUT', '0.5')
+    monkeypatch.setenv('BOTO_READ_TIMEOUT', '3')
+    monkeypatch.setenv('BOTO_TCP_KEEPALIVE', 'false')
+
+    config = aws_clients.client('dynamodb').meta.config
+
+    assert config.retries == {'mode': 'standard', 'total_max_attempts': 5}
+    assert config.max_pool_connections == 32
+    assert config.connect_timeout == 0.5
+    assert config.read_timeout == 3
+    assert config.tcp_keepalive is False
@@ -0,0 +1,100 @@
+import decimal
+import enum
+import collections
+import pytest
+from boto3.dynamodb.types import Binary
+from boto3.dynamodb.types import TypeSerializer
+from boto3.dynamodb.types import TypeDeserializer
+from order_layers.adaptors import dynamo_codec
+from order_layers.adaptors import order_repository
+
+
+class Color(str, enum.Enum):
+    RED = 'RED'
+
+
+serializer = TypeSerializer()
+deserializer = TypeDeserializer()
+
+
+def make_order_dict():
+    return {
+        'PK': 'ORDER#a1b2',
+        'SK': 'METADATA#a1b2',
+        'lock_version': 3,
+        'order_state': 'APPROVED',
+        'order_minimum': {'value': 1000, 'currency': 'JPY'},
+        'consumer_id': decimal.Decimal('1'),
+        'restaurant_id': 1,
+        'order_line_items': [
+            {'menu_id': '000001', 'name': 'Curry Rice',
+             'price': {'value': 800, 'currency': 'JPY'}, 'quantity': 2},
+            {'menu_id': '000002', 'name': 'Hamburger',
+             'price': {'value': decimal.Decimal('1.5'), 'currency': 'USD'}, 'quantity': 1},
+        ],
+        'delivery_information': {
+            'delivery_time': '2022-11-30T05:00:30.001000Z',
+            'delivery_address': {'street1': '9 Amazing View', 'street2': 'Soi 8',
+                                 'city': 'Oakland', 'state': 'CA', 'zip': '94612'},
+        },
+        'payment_information': None,
+    }
+
+
+@pytest.mark.parametrize('value', [
+    None, True, False, 0, -1, 10 ** 38 - 1, -10 ** 38 + 1, decimal.Decimal('1.50'),
+    decimal.Decimal('-0.001'), '', 'abc', Color.RED, b'\x00', bytearray(b'ab'), Binary(b'x'),
+    {1, 2}, {'a'}, {b'a'}, frozenset({decimal.Decimal('3')}),
+    [], (1, 'a'), {}, collections.OrderedDict(a=1), {'a': [{'b': None}]},
+])
+def test_encode_decode_value_same_as_boto3(value):
+    assert dynamo_codec.encode_value(value) == serializer.serialize(value)
+
+    attribute_value = serializer.serialize(value)
+    assert dynamo_codec.decode_value(attribute_value) == deserializer.deserialize(attribute_value)
+
+
+@pytest.mark.parametrize('value', [1.5, decimal.Decimal('Infinity'), decimal.Decimal('NaN'),
+                                   object(), {1, 'a'}])
+def test_encode_value_rejects_same_as_boto3(value):
+    with pytest.raises(TypeError):
+        serializer.serialize(value)
+    with pytest.raises(TypeError):
+        dynamo_codec.encode_value(value)
+
+
+def test_encode_value_rejects_over_38_digits_same_as_boto3():
+    with pytest.raises(decimal.Rounded):
+        serializer.serialize(10 ** 40)
+    with pytest.raises(decimal.Rounded):
+        dynamo_codec.encode_value(10 ** 40)
+
+
+def test_order_codec_same_as_boto3():
+    order_dict = make_order_dict()
+    item = {k: serializer.serialize(v) for k, v in order_dict.items()}
+
+    assert order_repository.ORDER_CODEC.encode(order_dict) == item
+    assert order_repository.ORDER_CODEC.decode(item) == \
+        {k: deserializer.deserialize(v) for k, v in item.items()}
+
+
+def test_schema_falls_back_on_type_mismatch():
+    codec = dynamo_codec.ItemCodec({'n': dynamo_codec.N, 's': dynamo_codec.S,
+                                    'm': dynamo_codec.MONEY})
+    d = {'n': '1', 's': 1, 'm': None}
+    item = {k: serializer.serialize(v) for k, v in d.items()}
+
+    assert codec.encode(d) == item
+    assert codec.decode(item) == {'n': '1', 's': decimal.Decimal('1'), 'm': None}
+    with pytest.raises(TypeError):
+        codec.encode({'n': 1.5})
+
+
+def test_decoded_numbers_are_decimal():
+    item = order_repository.ORDER_CODEC.encode(make_order_dict())
+
+    decoded = order_repository.ORDER_CODEC.decode(item)
+
+    assert type(decoded['lock_version']) is decimal.Decimal
+    assert type(decoded['order_line_items'][0]['price']['value']) is decimal.Decimal
@@ -0,0 +1,97 @@
+import threading
+import pytest
+from order_layers.adaptors import id_allocator
+from order_layers.adaptors import order_event_repository
+
+
+class FakeCounterClient:
+    """ IDCOUNTER Itemの ADD #id_count :block だけを再現する """
+    def __init__(self, id_count=0):
+        self.id_count = id_count
+        self.update_item_count = 0
+
+    def update_item(self, **kwargs):
+        self.update_item_count += 1
+        self.id_count += int(kwargs['ExpressionAttributeValues'][':block']['N'])
+        return {'Attributes': {'id_count': {'N': str(self.id_count)}}}
+
+
+@pytest.fixture
+def client():
+    return FakeCounterClient()
+
+
+def test_next_id_leases_one_block(client):
+    allocator = id_allocator.SequentialIdAllocator(client, 'OrderEvent', 'IDCOUNTER#EVENT',
+                                                   block_size=100)
+
+    ids = [allocator.next_id() for _ in range(250)]
+
+    assert ids == list(range(1, 251))
+    assert client.update_item_count == 3
+    stats = allocator.stats()
+    assert stats['lease_misses'] == 3
+    assert stats['lease_hits'] == 247
+    assert stats['remaining'] == 50
+
+
+def test_next_id_is_unique_between_containers(client):
+    container_a = id_allocator.SequentialIdAllocator(client, 'OrderEvent', 'IDCOUNTER#EVENT',
+                                                     block_size=10)
+    container_b = id_allocator.SequentialIdAllocator(client, 'OrderEvent', 'IDCOUNTER#EVENT',
+                                                     block_size=10)
+
+    ids_a = [container_a.next_id() for _ in range(15)]
+    ids_b = [container_b.next_id() for _ in range(15)]
+
+    assert ids_a == sorted(ids_a)
+    assert ids_b == sorted(ids_b)
+    assert len(set(ids_a) | set(ids_b)) == 30
+
+
+def test_next_id_is_thread_safe(client):
+    allocator = id_allocator.SequentialIdAllocator(client, 'OrderEvent', 'IDCOUNTER#EVENT',
+                                                   block_size=7)
+    ids = []
+
+    def worker():
+        for _ in range(100):
+            ids.append(allocator.next_id())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(ids) == list(range(1, 801))
+
+
+def test_get_allocator_returns_container_pool(client):
+    allocator_1 = id_allocator.get_allocator(client, 'TestTable', 'IDCOUNTER#EVENT')
+    allocator_2 = id_allocator.get_allocator(client, 'TestTable', 'IDCOUNTER#EVENT')
+    other = id_allocator.get_allocator(client, 'TestTable', 'IDCOUNTER#Consumer')
+
+    assert allocator_1 is allocator_2
+    assert allocator_1 is not other
+
+
+def test_event_ids_follow_issue_order_between_containers(client):
+    # event_id は順序の条件に使うので、コンテナが交互に採番しても発行順に増える
+    container_a = id_allocator.SequentialIdAllocator(client, 'OrderEvent', 'IDCOUNTER#EVENT',
+                                                     block_size=id_allocator.EVENT_ID_BLOCK_SIZE)
+    container_b = id_allocator.SequentialIdAllocator(client, 'OrderEvent', 'IDCOUNTER#EVENT',
+                                                     block_size=id_allocator.EVENT_ID_BLOCK_SIZE)
+
+    ids = [container.next_id() for _ in range(5) for container in (container_a, container_b)]
+
+    assert ids == list(range(1, 11))
+
+
+def test_event_repository_leases_one_event_id_at_a_time(monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'ap-northeast-1')
+    monkeypatch.setattr(id_allocator, '_ALLOCATORS', {})
+
+    order_event_repo = order_event_repository.DynamoDbRepository()
+
+    assert order_event_repo.event_id_allocator.block_size == id_allocator.EVENT_ID_BLOCK_SIZE == 1
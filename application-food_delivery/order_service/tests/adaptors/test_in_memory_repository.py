@@ -0,0 +1,126 @@
+import datetime
+import pytest
+from order_layers.common import common
+from order_layers.common import exception
+from order_layers.domain import order_model
+from order_layers.domain import order_domain_events
+from order_layers.domain import restaurant_model
+from order_layers.service import commands
+from order_layers.service import service
+from order_layers.service.domain_event_envelope import DomainEventEnvelope
+from order_layers.adaptors import dynamo_exception as dx
+from order_layers.adaptors import order_repository
+from order_layers.adaptors import order_event_repository
+from order_layers.adaptors import restaurant_replica_repository
+from order_layers.adaptors import unit_of_work
+
+DELIVERY_INFORMATION = order_model.DeliveryInformation(
+    delivery_time=datetime.datetime(2022, 11, 30, 5, 0, 30, 1000),
+    delivery_address=common.Address('9 Amazing View', 'Soi 8', 'Oakland', 'CA', '94612'))
+RESTAURANT = restaurant_model.Restaurant(1, 'Ajenta', [
+    restaurant_model.MenuItem('000001', 'Curry Rice', common.Money(800, 'JPY')),
+    restaurant_model.MenuItem('000002', 'Hamburger', common.Money(1000, 'JPY')),
+])
+
+
+@pytest.fixture
+def order_repo():
+    return order_repository.InMemoryRepository()
+
+
+@pytest.fixture
+def order_event_repo():
+    return order_event_repository.InMemoryRepository()
+
+
+@pytest.fixture
+def uow(order_repo, order_event_repo):
+    return unit_of_work.InMemoryUnitOfWork(order_repo, order_event_repo)
+
+
+@pytest.fixture
+def order():
+    line_items = order_model.OrderLineItems([
+        order_model.OrderLineItem('000001', 'Curry Rice', common.Money(800, 'JPY'), 3),
+    ])
+    return order_model.Order(consumer_id=1, restaurant_id=1,
+                             delivery_information=DELIVERY_INFORMATION,
+                             order_line_items=line_items)
+
+
+def test_save_and_find_round_trip(order_repo, order):
+    order_repo.save(order)
+
+    found = order_repo.find_by_id(order.order_id)
+
+    assert found.to_dict() == order.to_dict()
+    with pytest.raises(exception.ItemNotFoundException):
+        order_repo.find_by_id('unknown')
+
+
+def test_save_is_attribute_not_exists(order_repo, order):
+    order_repo.save(order)
+
+    with pytest.raises(dx.ConditionalCheckFailedException):
+        order_repo.save(order)
+
+
+def test_update_checks_lock_version(order_repo, order):
+    order_repo.save(order)
+    stale = order_repo.find_by_id(order.order_id)
+
+    order.order_state = order_model.OrderState.APPROVED
+    order_repo.update(order, attributes=['order_state'])
+
+    found = order_repo.find_by_id(order.order_id)
+    assert found.order_state == order_model.OrderState.APPROVED
+    assert found.lock_version == stale.lock_version + 1
+    with pytest.raises(dx.ConditionalCheckFailedException):
+        order_repo.update(stale, attributes=['order_state'])
+
+
+def test_unit_of_work_writes_order_and_event_together(uow, order_repo, order_event_repo, order):
+    with uow:
+        uow.save_order(order)
+        uow.save_event(DomainEventEnvelope.wrap(order_domain_events.OrderAuthorized(order_id=order.order_id)))
+
+    assert order_repo.find_by_id(order.order_id).order_id == order.order_id
+    assert list(order_event_repo.items) == [(f'ORDER#{order.order_id}', 'EVENTTYPE#OrderAuthorized#EVENTID#1')]
+
+
+def test_unit_of_work_is_all_or_nothing(uow, order_repo, order_event_repo, order):
+    order_repo.save(order)
+    stale = order_repo.find_by_id(order.order_id)
+    order_repo.update(order_repo.find_by_id(order.order_id), attributes=['order_state'])
+
+    with pytest.raises(exception.OptimisticLockException):
+        with uow:
+            uow.update_order(stale, ['order_state'])
+            uow.save_event(DomainEventEnvelope.wrap(order_domain_events.OrderAuthorized(order_id=order.order_id)))
+
+    assert order_event_repo.items == {}
+
+
+def test_restaurant_replica_ignores_old_events():
+    repo = restaurant_replica_repository.InMemoryRepository()
+    repo.save(RESTAURANT, event_id=2, timestamp='2022-11-30T05:00:30.001000Z')
+
+    with pytest.raises(dx.ConditionalCheckFailedException):
+        repo.save(RESTAURANT, event_id=2, timestamp='2022-11-30T05:00:30.001000Z')
+    assert repo.find_versioned_by_id(1)[1] == 2
+
+
+def test_order_service_create_and_approve(order_repo, order_event_repo, uow):
+    restaurant_replica_repo = restaurant_replica_repository.InMemoryRepository()
+    restaurant_replica_repo.save(RESTAURANT, event_id=1, timestamp='2022-11-30T05:00:30.001000Z')
+    order_service = service.OrderService(order_repo, order_event_repo, restaurant_replica_repo, uow)
+
+    order = order_service.create_order(commands.CreateOrder(
+        consumer_id=1, restaurant_id=1,
+        order_line_items=[commands.OrderRequestLineItems('000001', 2),
+                          commands.OrderRequestLineItems('000002', 1)],
+        delivery_information=DELIVERY_INFORMATION))
+    order_service.approve_order(commands.ApproveOrder(order_id=order.order_id))
+
+    assert order_repo.find_by_id(order.order_id).order_state == order_model.OrderState.APPROVED
+    assert [sk.split('#')[1] for _, sk in order_event_repo.items] == ['OrderCreated', 'OrderAuthorized']
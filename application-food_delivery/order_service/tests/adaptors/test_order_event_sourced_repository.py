@@ -0,0 +1,147 @@
+import datetime
+import pytest
+from order_layers.common import common
+from order_layers.common import exception
+from order_layers.domain import order_model
+from order_layers.domain import order_domain_events
+from order_layers.domain import restaurant_model
+from order_layers.service import commands
+from order_layers.service import service
+from order_layers.service.domain_event_envelope import DomainEventEnvelope
+from order_layers.adaptors import dynamo_exception as dx
+from order_layers.adaptors import order_event_sourced_repository
+from order_layers.adaptors import order_event_repository
+from order_layers.adaptors import restaurant_replica_repository
+from order_layers.adaptors import unit_of_work
+
+SNAPSHOT_INTERVAL = 3
+DELIVERY_INFORMATION = order_model.DeliveryInformation(
+    delivery_time=datetime.datetime(2022, 11, 30, 5, 0, 30, 1000),
+    delivery_address=common.Address('9 Amazing View', 'Soi 8', 'Oakland', 'CA', '94612'))
+RESTAURANT = restaurant_model.Restaurant(1, 'Ajenta', [
+    restaurant_model.MenuItem('000001', 'Curry Rice', common.Money(800, 'JPY')),
+    restaurant_model.MenuItem('000002', 'Hamburger', common.Money(1000, 'JPY')),
+])
+
+
+@pytest.fixture
+def order_repo():
+    return order_event_sourced_repository.InMemoryRepository(snapshot_interval=SNAPSHOT_INTERVAL)
+
+
+@pytest.fixture
+def order_event_repo():
+    return order_event_repository.InMemoryRepository()
+
+
+@pytest.fixture
+def uow(order_repo, order_event_repo):
+    return unit_of_work.InMemoryUnitOfWork(order_repo, order_event_repo)
+
+
+@pytest.fixture
+def order():
+    line_items = order_model.OrderLineItems([
+        order_model.OrderLineItem('000001', 'Curry Rice', common.Money(800, 'JPY'), 3),
+    ])
+    return order_model.Order(consumer_id=1, restaurant_id=1,
+                             delivery_information=DELIVERY_INFORMATION,
+                             order_line_items=line_items)
+
+
+def snapshots(order_repo, order) -> list[bool]:
+    pk = f'ORDER#{order.order_id}'
+    return [order_repo.items[(pk, sk)]['snapshot']['BOOL'] for sk in order_repo.partitions[pk]]
+
+
+def test_save_and_find_round_trip(order_repo, order):
+    order_repo.save(order)
+
+    found = order_repo.find_by_id(order.order_id)
+
+    assert found.to_dict() == order.to_dict()
+    assert snapshots(order_repo, order) == [True]
+    with pytest.raises(exception.ItemNotFoundException):
+        order_repo.find_by_id('unknown')
+
+
+def test_update_appends_changed_attributes(order_repo, order):
+    order_repo.save(order)
+    order.order_state = order_model.OrderState.APPROVED
+    order_repo.update(order, attributes=['order_state'])
+
+    item = order_repo.items[(f'ORDER#{order.order_id}', 'VERSION#0000000002')]
+    assert set(item) == {'PK', 'SK', 'snapshot', 'lock_version', 'order_state'}
+    assert order_repo.find_by_id(order.order_id).to_dict() == order.to_dict()
+
+
+def test_snapshot_every_interval(order_repo, order):
+    order_repo.save(order)
+    for state in [order_model.OrderState.APPROVED, order_model.OrderState.CANCEL_PENDING,
+                  order_model.OrderState.APPROVED, order_model.OrderState.CANCEL_PENDING,
+                  order_model.OrderState.CANCELLED]:
+        order.order_state = state
+        order_repo.update(order, attributes=['order_state'])
+
+    # version 1..6: 1 と 3, 6 が snapshot
+    assert snapshots(order_repo, order) == [True, False, True, False, False, True]
+    assert len(order_repo.query_versions(order.order_id)) == 1
+    found = order_repo.find_by_id(order.order_id)
+    assert found.order_state == order_model.OrderState.CANCELLED
+    assert found.lock_version == 6
+
+
+def test_load_reads_at_most_snapshot_interval_items(order_repo, order):
+    order_repo.save(order)
+    for lock_version in range(2, 12):
+        order_repo.update(order, attributes=['order_state'])
+
+        assert len(order_repo.query_versions(order.order_id)) <= SNAPSHOT_INTERVAL
+        assert order_repo.find_by_id(order.order_id).lock_version == lock_version
+
+
+def test_update_same_version_conflicts(order_repo, order):
+    order_repo.save(order)
+    stale = order_repo.find_by_id(order.order_id)
+
+    order.order_state = order_model.OrderState.APPROVED
+    order_repo.update(order, attributes=['order_state'])
+
+    with pytest.raises(dx.ConditionalCheckFailedException):
+        order_repo.update(stale, attributes=['order_state'])
+    assert order_repo.find_by_id(order.order_id).order_state == order_model.OrderState.APPROVED
+
+
+def test_unit_of_work_raises_optimistic_lock(uow, order_repo, order_event_repo, order):
+    order_repo.save(order)
+    stale = order_repo.find_by_id(order.order_id)
+    order_repo.update(order_repo.find_by_id(order.order_id), attributes=['order_state'])
+
+    with pytest.raises(exception.OptimisticLockException):
+        with uow:
+            uow.update_order(stale, ['order_state'])
+            uow.save_event(DomainEventEnvelope.wrap(order_domain_events.OrderAuthorized(order_id=order.order_id)))
+
+    assert order_event_repo.items == {}
+
+
+def test_order_service_cancel_saga_compensation(order_repo, order_event_repo, uow):
+    """ cancel() / undo_pending_cancel() は Domain Event を発行しないが、version Item から状態を復元できる """
+    restaurant_replica_repo = restaurant_replica_repository.InMemoryRepository()
+    restaurant_replica_repo.save(RESTAURANT, event_id=1, timestamp='2022-11-30T05:00:30.001000Z')
+    order_service = service.OrderService(order_repo, order_event_repo, restaurant_replica_repo, uow)
+
+    order = order_service.create_order(commands.CreateOrder(
+        consumer_id=1, restaurant_id=1,
+        order_line_items=[commands.OrderRequestLineItems('000001', 2),
+                          commands.OrderRequestLineItems('000002', 1)],
+        delivery_information=DELIVERY_INFORMATION))
+    order_service.approve_order(commands.ApproveOrder(order_id=order.order_id))
+    order_service.begin_cancel(commands.BeginCancelOrder(order_id=order.order_id))
+    assert order_repo.find_by_id(order.order_id).order_state == order_model.OrderState.CANCEL_PENDING
+    order_service.undo_cancel(commands.UndoBeginCancelOrder(order_id=order.order_id))
+
+    found = order_repo.find_by_id(order.order_id)
+    assert found.order_state == order_model.OrderState.APPROVED
+    assert found.lock_version == 4
+    assert found.get_order_total() == common.Money(2600, 'JPY')
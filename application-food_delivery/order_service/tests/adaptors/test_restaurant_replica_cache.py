@@ -0,0 +1,77 @@
+import pytest
+from order_layers.common import common
+from order_layers.common import lru_cache
+from order_layers.domain import restaurant_model
+from order_layers.adaptors import restaurant_replica_cache
+
+
+class FakeRestaurantReplicaRepository:
+    def __init__(self):
+        self.items = {}
+        self.get_item_count = 0
+
+    def save(self, restaurant, event_id, timestamp):
+        self.items[restaurant.restaurant_id] = (restaurant, event_id)
+
+    def find_versioned_by_id(self, restaurant_id):
+        self.get_item_count += 1
+        return self.items[restaurant_id]
+
+
+def make_restaurant(restaurant_id, price):
+    return restaurant_model.Restaurant(
+        restaurant_id, 'skylark',
+        [restaurant_model.MenuItem('000001', 'Curry Rice', common.Money(price, 'JPY'))])
+
+
+@pytest.fixture
+def repo():
+    repo = FakeRestaurantReplicaRepository()
+    repo.save(make_restaurant(1, 800), event_id=10, timestamp=None)
+    return repo
+
+
+def test_find_by_id_reads_dynamodb_once(repo):
+    cached_repo = restaurant_replica_cache.CachedRepository(repo)
+
+    for _ in range(5):
+        restaurant = cached_repo.find_by_id(1)
+
+    assert restaurant.restaurant_id == 1
+    assert repo.get_item_count == 1
+    assert cached_repo.stats()['hits'] == 4
+    assert cached_repo.stats()['misses'] == 1
+
+
+def test_save_refreshes_cache(repo):
+    cached_repo = restaurant_replica_cache.CachedRepository(repo)
+    cached_repo.find_by_id(1)
+
+    cached_repo.save(make_restaurant(1, 900), event_id=11, timestamp=None)
+
+    assert cached_repo.find_by_id(1).find_menu_item('000001').price == common.Money(900, 'JPY')
+    assert repo.get_item_count == 1
+
+
+def test_older_event_does_not_overwrite_cache():
+    cache = lru_cache.LruTtlCache(max_size=10, ttl_seconds=60)
+    cache.put(1, 'new', version=11)
+
+    cache.put(1, 'old', version=10)
+
+    assert cache.get(1) == 'new'
+
+
+def test_cache_expires_and_evicts():
+    now = [0.0]
+    cache = lru_cache.LruTtlCache(max_size=2, ttl_seconds=60, clock=lambda: now[0])
+    cache.put(1, 'a')
+    cache.put(2, 'b')
+    cache.get(1)
+    cache.put(3, 'c')  # 2 is least recently used
+
+    assert cache.get(2) is None
+    assert cache.get(1) == 'a'
+
+    now[0] = 61.0
+    assert cache.get(1) is None
@@ -0,0 +1,158 @@
+import datetime
+import json
+import pytest
+from botocore import exceptions
+from order_layers.common import common
+from order_layers.common import exception
+from order_layers.domain import order_model
+from order_layers.domain import order_domain_events
+from order_layers.service.domain_event_envelope import DomainEventEnvelope
+from order_layers.adaptors import id_allocator
+from order_layers.adaptors import order_repository
+from order_layers.adaptors import order_event_repository
+from order_layers.adaptors import unit_of_work
+
+
+class FakeDynamoClient:
+    def __init__(self):
+        self.calls = []
+        self.id_count = 0
+
+    def put_item(self, **kwargs):
+        self.calls.append(('put_item', kwargs))
+
+    def transact_write_items(self, **kwargs):
+        self.calls.append(('transact_write_items', kwargs))
+
+    def update_item(self, **kwargs):
+        if kwargs['Key']['PK']['S'].startswith('IDCOUNTER#'):
+            self.id_count += int(kwargs['ExpressionAttributeValues'][':block']['N'])
+            return {'Attributes': {'id_count': {'N': str(self.id_count)}}}
+        self.calls.append(('update_item', kwargs))
+
+
+@pytest.fixture
+def client():
+    return FakeDynamoClient()
+
+
+@pytest.fixture
+def uow(client, monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'ap-northeast-1')
+    order_repo = order_repository.DynamoDbRepository()
+    order_repo.client = client
+    order_event_repo = order_event_repository.DynamoDbRepository()
+    order_event_repo.client = client
+    order_event_repo.event_id_allocator = id_allocator.SequentialIdAllocator(
+        client, order_event_repo.table_name, 'IDCOUNTER#EVENT')
+    return unit_of_work.DynamoDbUnitOfWork(order_repo, order_event_repo)
+
+
+@pytest.fixture
+def order():
+    delivery_information = order_model.DeliveryInformation(
+        delivery_time=datetime.datetime(2022, 11, 30, 5, 0, 30, 1000),
+        delivery_address=common.Address('9 Amazing View', 'Soi 8', 'Oakland', 'CA', '94612'))
+    line_items = order_model.OrderLineItems([
+        order_model.OrderLineItem('000001', 'Curry Rice', common.Money(800, 'JPY'), 3),
+    ])
+    return order_model.Order(consumer_id=1, restaurant_id=1,
+                             delivery_information=delivery_information,
+                             order_line_items=line_items)
+
+
+def test_commit_order_and_event_in_one_transaction(uow, client, order):
+    with uow:
+        uow.save_order(order)
+        event_id = uow.save_event(DomainEventEnvelope.wrap(
+            order_domain_events.OrderAuthorized(order_id=order.order_id)))
+
+    assert event_id == 1
+    assert [name for name, _ in client.calls] == ['transact_write_items']
+    transact_items = client.calls[0][1]['TransactItems']
+    assert transact_items[0]['Put']['TableName'] == 'OrderService'
+    assert transact_items[0]['Put']['Item']['PK'] == {'S': f'ORDER#{order.order_id}'}
+    assert transact_items[1]['Put']['TableName'] == 'OrderEvent'
+    assert transact_items[1]['Put']['Item']['SK'] == {'S': 'EVENTTYPE#OrderAuthorized#EVENTID#1'}
+    assert uow.total_calls_saved == 1
+
+
+@pytest.mark.parametrize('log_level', ['INFO', 'DEBUG'])
+def test_payload_size_is_estimated_on_every_commit(uow, client, order, monkeypatch, log_level):
+    monkeypatch.setenv('LOG_LEVEL', log_level)
+
+    with uow:
+        uow.save_order(order)
+        uow.save_event(DomainEventEnvelope.wrap(
+            order_domain_events.OrderAuthorized(order_id=order.order_id)))
+
+    transact_items = client.calls[0][1]['TransactItems']
+    assert uow.last_item_count == 2
+    assert uow.last_payload_bytes == sum(unit_of_work.estimate_request_bytes(request)
+                                         for transact_item in transact_items for request in transact_item.values())
+    assert 0 < uow.last_payload_bytes < len(json.dumps(transact_items))
+    # json.dumps の大きさは DEBUG log が有効な時だけ
+    assert uow.last_payload_json_bytes == (len(json.dumps(transact_items)) if log_level == 'DEBUG' else 0)
+
+
+def test_estimate_request_bytes():
+    assert unit_of_work.estimate_request_bytes({
+        'TableName': 'OrderService',
+        'Item': {'PK': {'S': 'ORDER#1'}, 'total': {'N': '4400'}, 'paid': {'BOOL': True},
+                 'items': {'L': [{'M': {'name': {'S': 'Ramen'}}}]}},
+    }) == (2 + 7) + (5 + 4) + (4 + 1) + (5 + 3 + (3 + 4 + 5 + 1) + 1)
+    assert unit_of_work.estimate_request_bytes({
+        'TableName': 'OrderService',
+        'Key': {'PK': {'S': 'ORDER#1'}, 'SK': {'S': 'METADATA#1'}},
+        'UpdateExpression': 'SET #order_state = :order_state',
+        'ExpressionAttributeValues': {':order_state': {'S': 'APPROVED'}},
+    }) == (2 + 7) + (2 + 10) + (12 + 8)
+
+
+def test_commit_single_item_with_put_item(uow, client, order):
+    with uow:
+        uow.save_event(DomainEventEnvelope.wrap(
+            order_domain_events.OrderAuthorized(order_id=order.order_id)))
+
+    assert [name for name, _ in client.calls] == ['put_item']
+    assert uow.total_calls_saved == 0
+
+
+def test_rollback_on_exception(uow, client, order):
+    with pytest.raises(ValueError):
+        with uow:
+            uow.save_order(order)
+            raise ValueError('domain error')
+
+    assert client.calls == []
+    assert uow.transact_items == []
+
+
+def test_update_order_sends_changed_attributes_only(uow, client, order):
+    order.note_approved()
+    with uow:
+        uow.update_order(order, ['order_state'])
+
+    name, request = client.calls[0]
+    assert name == 'update_item'
+    assert request['UpdateExpression'] == \
+        'SET #lock_version = :lock_version, #order_state = :order_state'
+    assert request['ConditionExpression'] == '#lock_version = :expected_lock_version'
+    assert request['ExpressionAttributeValues'] == {
+        ':lock_version': {'N': '2'},
+        ':expected_lock_version': {'N': '1'},
+        ':order_state': {'S': 'APPROVED'},
+    }
+    assert 'order_line_items' not in str(request)
+    assert order.lock_version == 2
+
+
+def test_update_order_conflict_raises_optimistic_lock_exception(uow, order):
+    def conflict(**kwargs):
+        raise exceptions.ClientError(
+            {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': ''}}, 'UpdateItem')
+    uow.client.update_item = conflict
+
+    with pytest.raises(exception.OptimisticLockException):
+        with uow:
+            uow.update_order(order, ['order_state'])
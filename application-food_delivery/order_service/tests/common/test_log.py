@@ -0,0 +1,85 @@
+import json
+from decimal import Decimal
+import pytest
+from order_layers.common import log
+
+
+@pytest.fixture(autouse=True)
+def environment(monkeypatch):
+    monkeypatch.delenv('LOG_LEVEL', raising=False)
+    monkeypatch.delenv('LOG_PAYLOAD_MAX_CHARS', raising=False)
+    log.sample(0)
+    yield
+    log.sample(0)
+
+
+def records(capsys) -> list[dict]:
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_one_json_line_per_record(capsys):
+    logger = log.get_logger('test')
+
+    logger.info('order_id: %s, total: %s', 'o-1', Decimal('12.5'))
+
+    [record] = records(capsys)
+    assert record['level'] == 'INFO'
+    assert record['logger'] == 'test'
+    assert record['message'] == 'order_id: o-1, total: 12.5'
+
+
+def test_level_gating_skips_formatting(capsys):
+    class Unformattable:
+        def __str__(self):
+            raise AssertionError('formatted while DEBUG is disabled')
+
+    logger = log.get_logger('test')
+
+    logger.debug('value: %s', Unformattable())
+    logger.payload('resp', lambda: pytest.fail('payload built while DEBUG is disabled'))
+
+    assert records(capsys) == []
+
+
+def test_log_level_from_environment(monkeypatch, capsys):
+    monkeypatch.setenv('LOG_LEVEL', 'WARNING')
+    logger = log.get_logger('test')
+
+    logger.info('hidden')
+    logger.warning('shown')
+
+    assert [r['message'] for r in records(capsys)] == ['shown']
+
+
+def test_payload_is_truncated(monkeypatch, capsys):
+    monkeypatch.setenv('LOG_LEVEL', 'DEBUG')
+    monkeypatch.setenv('LOG_PAYLOAD_MAX_CHARS', '20')
+
+    log.get_logger('test').payload('query() resp', {'Items': [{'order_id': 'x' * 100}]})
+
+    [record] = records(capsys)
+    assert record['message'] == 'query() resp'
+    assert record['payload'].startswith('{"Items": [{"order_i')
+    assert record['payload'].endswith('...(truncated 109 chars)')
+
+
+def test_sampled_invocation_logs_debug(capsys):
+    logger = log.get_logger('test')
+
+    assert log.sample(1.0) is True
+    logger.debug('sampled')
+    assert log.sample(0) is False
+    logger.debug('not sampled')
+
+    assert [r['message'] for r in records(capsys)] == ['sampled']
+
+
+def test_exception_has_traceback(capsys):
+    try:
+        raise ValueError('boom')
+    except ValueError as e:
+        log.get_logger('test').exception('%r', e)
+
+    [record] = records(capsys)
+    assert record['message'] == "ValueError('boom')"
+    assert 'Traceback' in record['traceback']
@@ -0,0 +1,129 @@
+import json
+import boto3
+import pytest
+from botocore.stub import Stubber
+from order_layers.common import metrics
+
+
+class CreateOrder:
+    pass
+
+
+class Handler:
+    def __init__(self, client=None):
+        self.client = client
+
+    @metrics.instrument('commands')
+    def commands_handler(self, cmd):
+        if self.client is not None:
+            self.client.get_item(TableName='order', Key={'PK': {'S': 'ORDER#1'}})
+            self.client.get_item(TableName='order', Key={'PK': {'S': 'ORDER#2'}})
+        return 'ok'
+
+    @metrics.instrument('saga_commands')
+    def saga_commands_handler(self, cmd):
+        return self.commands_handler(cmd)
+
+    @metrics.instrument('events')
+    def events_handler(self, event):
+        raise ValueError('boom')
+
+
+def records(capsys) -> list[dict]:
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_one_emf_record_per_invocation(capsys):
+    assert Handler().commands_handler(CreateOrder()) == 'ok'
+
+    [record] = records(capsys)
+    [directive] = record['_aws']['CloudWatchMetrics']
+    assert directive['Namespace'] == 'FoodDelivery'
+    assert directive['Dimensions'] == [['Service', 'Operation']]
+    assert {'Name': 'Latency', 'Unit': 'Milliseconds'} in directive['Metrics']
+    assert (record['Service'], record['Operation'], record['Handler']) == ('order', 'CreateOrder', 'commands')
+    assert record['Latency'] >= 0
+    assert record['Errors'] == 0
+
+
+def test_nested_handler_emits_once(capsys):
+    Handler().saga_commands_handler(CreateOrder())
+
+    [record] = records(capsys)
+    assert record['Handler'] == 'saga_commands'
+
+
+def test_error_is_counted_and_raised(capsys):
+    with pytest.raises(ValueError):
+        Handler().events_handler(CreateOrder())
+
+    [record] = records(capsys)
+    assert record['Errors'] == 1
+
+
+def test_records_aws_calls_and_consumed_capacity(capsys):
+    client = metrics.register(boto3.client('dynamodb', region_name='ap-northeast-1',
+                                           aws_access_key_id='test', aws_secret_access_key='test'))
+    with Stubber(client) as stubber:
+        for order_id in ('1', '2'):
+            stubber.add_response('get_item',
+                                 {'ConsumedCapacity': {'TableName': 'order', 'CapacityUnits': 0.5}},
+                                 {'TableName': 'order', 'Key': {'PK': {'S': f'ORDER#{order_id}'}},
+                                  'ReturnConsumedCapacity': 'TOTAL'})
+
+        Handler(client).commands_handler(CreateOrder())
+
+    [record] = records(capsys)
+    assert record['DynamoDBCalls'] == 2
+    assert record['ConsumedCapacity'] == 1.0
+    assert record['AwsCalls']['DynamoDB.GetItem']['count'] == 2
+    assert {'Name': 'DynamoDBTime', 'Unit': 'Milliseconds'} in record['_aws']['CloudWatchMetrics'][0]['Metrics']
+
+
+def test_serialization_time_is_recorded(capsys):
+    @metrics.timed
+    def encode(d):
+        return d
+
+    class Serializing(Handler):
+        @metrics.instrument('commands')
+        def commands_handler(self, cmd):
+            return encode({'order_id': '1'})
+
+    assert encode({'a': 1}) == {'a': 1}  # invocation の外では記録しない
+    Serializing().commands_handler(CreateOrder())
+
+    [record] = records(capsys)
+    assert record['SerializationTime'] >= 0
+
+
+def test_disabled_returns_the_function_unchanged(monkeypatch):
+    monkeypatch.setattr(metrics, 'ENABLED', False)
+
+    def commands_handler(self, cmd):
+        pass
+
+    client = boto3.client('dynamodb', region_name='ap-northeast-1')
+
+    assert metrics.instrument('commands')(commands_handler) is commands_handler
+    assert metrics.timed(commands_handler) is commands_handler
+    assert metrics.register(client) is client
+
+
+def test_added_values_are_recorded(capsys):
+    class UnitOfWork(Handler):
+        @metrics.instrument('commands')
+        def commands_handler(self, cmd):
+            metrics.add('UnitOfWorkItems', 2)
+            metrics.add('UnitOfWorkItems', 1)
+            metrics.add('UnitOfWorkPayloadBytes', 512, unit='Bytes')
+
+    metrics.add('UnitOfWorkItems', 5)  # invocation の外では記録しない
+    UnitOfWork().commands_handler(CreateOrder())
+
+    [record] = records(capsys)
+    assert record['UnitOfWorkItems'] == 3
+    assert record['UnitOfWorkPayloadBytes'] == 512
+    units = {m['Name']: m['Unit'] for m in record['_aws']['CloudWatchMetrics'][0]['Metrics']}
+    assert units['UnitOfWorkItems'] == 'Count'
+    assert units['UnitOfWorkPayloadBytes'] == 'Bytes'
@@ -0,0 +1,72 @@
+import copy
+import dataclasses
+import decimal
+import pytest
+from order_layers.common import common
+from order_layers.common import exception
+from order_layers.domain import order_model
+
+D = decimal.Decimal
+
+
+def test_minor_units():
+    assert (common.Money(800).amount, common.Money(800).scale) == (800, 0)
+    assert (common.Money(D('800')).amount, common.Money(D('800')).scale) == (800, 0)
+    assert (common.Money(D('8.50'), 'USD').amount, common.Money(D('8.50'), 'USD').scale) == (850, 2)
+
+
+def test_value_is_exact_at_the_boundary():
+    assert type(common.Money(D('800')).value) is int
+    assert common.Money(D('8.50'), 'USD').value == D('8.50')
+    assert common.Money(D('8.50'), 'USD').to_dict() == {'value': D('8.50'), 'currency': 'USD'}
+    assert common.Money.from_dict({'value': D('100.5'), 'currency': 'JPY'}).value == D('100.5')
+
+
+def test_arithmetic():
+    assert common.Money(800) + common.Money(1000) == common.Money(1800)
+    assert common.Money(800) - common.Money(1000) == common.Money(-200)
+    assert common.Money(800) * 3 == common.Money(2400)
+    assert common.Money(800) * D('3') == common.Money(2400)
+    assert common.Money(D('8.50'), 'USD') + common.Money(D('0.125'), 'USD') == common.Money(D('8.625'), 'USD')
+    with pytest.raises(exception.InvalidCurrency):
+        common.Money(800, 'JPY') + common.Money(800, 'USD')
+
+
+def test_value_object():
+    assert common.Money(D('800')) == common.Money(800)
+    assert hash(common.Money(D('800.0'))) == hash(common.Money(800))
+    assert common.Money(800) < common.Money(1000)
+    assert common.Money(800) != common.Money(800, 'USD')
+    assert copy.deepcopy(common.Money(D('8.50'), 'USD')) == common.Money(D('8.50'), 'USD')
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        common.Money(800).amount = 1
+
+
+def test_total():
+    prices = [common.Money(800), common.Money(1000)]
+
+    assert common.Money.total(prices, [3, 2]) == common.Money(4400)
+    assert common.Money.total(prices, [D('3'), 2]) == common.Money(4400)
+    assert common.Money.total([common.Money(800), common.Money(D('0.5'))], [1, 3]) == common.Money(D('801.5'))
+    with pytest.raises(exception.InvalidCurrency):
+        common.Money.total([common.Money(800), common.Money(800, 'USD')], [1, 1])
+
+
+def test_line_item_quantity_change():
+    order_line_items = order_model.OrderLineItems.from_dict_list([
+        {'menu_id': '000001', 'name': 'Curry Rice', 'price': {'value': D('800'), 'currency': 'JPY'},
+         'quantity': D('3')},
+        {'menu_id': '000002', 'name': 'Hamburger', 'price': {'value': D('1000'), 'currency': 'JPY'},
+         'quantity': D('2')},
+    ])
+    order_revision = order_model.OrderRevision(
+        delivery_information=None,
+        revised_order_line_items=[order_model.RevisedOrderLineItem(quantity=1, menu_id='000002')])
+
+    change = order_line_items.line_item_quantity_change(order_revision)
+
+    assert change.to_dict() == {
+        'current_order_total': {'value': 4400, 'currency': 'JPY'},
+        'new_order_total': {'value': 3400, 'currency': 'JPY'},
+        'delta': {'value': -1000, 'currency': 'JPY'},
+    }
@@ -0,0 +1,60 @@
+import pytest
+from order_layers.common import common
+from order_layers.common import exception
+from order_layers.domain import order_model
+from order_layers.domain import restaurant_model
+from order_layers.service import commands
+from order_layers.service import service
+
+
+@pytest.fixture
+def restaurant():
+    return restaurant_model.Restaurant(1, 'skylark', [
+        restaurant_model.MenuItem('000001', 'Curry Rice', common.Money(800, 'JPY')),
+        restaurant_model.MenuItem('000002', 'Hamburger', common.Money(1000, 'JPY')),
+    ])
+
+
+@pytest.fixture
+def line_items():
+    return order_model.OrderLineItems([
+        order_model.OrderLineItem('000001', 'Curry Rice', common.Money(800, 'JPY'), 3),
+        order_model.OrderLineItem('000002', 'Hamburger', common.Money(1000, 'JPY'), 1),
+    ])
+
+
+def test_find_menu_item(restaurant):
+    assert restaurant.find_menu_item('000002').menu_name == 'Hamburger'
+    with pytest.raises(exception.MenuItemNotFound):
+        restaurant.find_menu_item('999999')
+
+
+def test_restaurant_to_dict_does_not_include_index(restaurant):
+    assert list(restaurant.to_dict().keys()) == ['restaurant_id', 'restaurant_name', 'menu_items']
+
+
+def test_make_order_line_items(restaurant):
+    line_items = service.OrderService._make_order_line_items(
+        [commands.OrderRequestLineItems(menu_id='000002', quantity=2)], restaurant)
+
+    assert line_items.line_items == [
+        order_model.OrderLineItem('000002', 'Hamburger', common.Money(1000, 'JPY'), 2)]
+
+
+def test_find_order_line_items(line_items):
+    assert line_items.find_order_line_items('000001').quantity == 3
+    with pytest.raises(exception.LineItemNotFound):
+        line_items.find_order_line_items('999999')
+
+
+def test_update_line_items(line_items):
+    order_revision = order_model.OrderRevision(
+        delivery_information=None,
+        revised_order_line_items=[
+            order_model.RevisedOrderLineItem(menu_id='000002', quantity=4),
+            order_model.RevisedOrderLineItem(menu_id='000002', quantity=5),
+        ])
+
+    line_items.update_line_items(order_revision)
+
+    assert [item.quantity for item in line_items.line_items] == [3, 5]
@@ -0,0 +1,81 @@
+import datetime
+import decimal
+import json
+import pytest
+from order_layers.common import common
+from order_layers.common import serializer
+from order_layers.domain import order_model
+
+
+def encoder_(o):
+    # 変更前のDomain Modelのencoder_と同じ変換
+    if isinstance(o, order_model.OrderState):
+        return o.value
+    if isinstance(o, datetime.datetime):
+        return o.isoformat() + 'Z'
+    if isinstance(o, decimal.Decimal):
+        if int(o) == o:
+            return int(o)
+        else:
+            return float(o)
+    raise TypeError(f'{repr(o)} is not serializable')
+
+
+@pytest.mark.parametrize('value', [
+    'str', 1, 1.5, -0.0, True, False, None,
+    decimal.Decimal('3'), decimal.Decimal('3.0'), decimal.Decimal('0.1'),
+    order_model.OrderState.APPROVED,
+    datetime.datetime(2022, 11, 30, 5, 0, 30), datetime.datetime(2022, 11, 30, 5, 0, 30, 1000),
+    (1, 'a'), [decimal.Decimal('1.25'), {'k': decimal.Decimal('2')}],
+    {1: 'int key', 1.5: 'float key', True: 'bool key', None: 'none key'},
+])
+@pytest.mark.parametrize('parse_float', [None, decimal.Decimal])
+def test_to_plain_matches_json_round_trip(value, parse_float):
+    expected = json.loads(json.dumps(value, default=encoder_), parse_float=parse_float)
+
+    actual = serializer.to_plain(value, parse_float=parse_float)
+
+    assert repr(actual) == repr(expected)  # int/float/Decimalの違いも比較する
+
+
+def test_to_plain_raises_type_error():
+    with pytest.raises(TypeError):
+        serializer.to_plain(object())
+
+
+def test_order_to_dict():
+    order = order_model.Order(
+        consumer_id=decimal.Decimal('1'),
+        restaurant_id=1,
+        delivery_information=order_model.DeliveryInformation(
+            delivery_time=datetime.datetime(2022, 11, 30, 5, 0, 30, 1000),
+            delivery_address=common.Address('9 Amazing View', 'Soi 8', 'Oakland', 'CA', '94612')),
+        order_line_items=order_model.OrderLineItems([
+            order_model.OrderLineItem('000001', 'Curry Rice',
+                                      common.Money(decimal.Decimal('800'), 'JPY'),
+                                      decimal.Decimal('3'))]),
+        order_id='abc',
+        lock_version=decimal.Decimal('2'),
+        order_minimum=common.Money(decimal.Decimal('100.5'), 'JPY'))
+
+    d = order.to_dict()
+
+    assert d == json.loads(json.dumps({
+        'order_id': 'abc',
+        'lock_version': 2,
+        'order_state': 'APPROVAL_PENDING',
+        'order_minimum': {'value': 100.5, 'currency': 'JPY'},
+        'consumer_id': 1,
+        'restaurant_id': 1,
+        'order_line_items': [
+            {'menu_id': '000001', 'name': 'Curry Rice',
+             'price': {'value': 800, 'currency': 'JPY'}, 'quantity': 3}],
+        'delivery_information': {
+            'delivery_time': '2022-11-30T05:00:30.001000Z',
+            'delivery_address': {'street1': '9 Amazing View', 'street2': 'Soi 8',
+                                 'city': 'Oakland', 'state': 'CA', 'zip': '94612'}},
+        'payment_information': None,
+    }))
+    assert list(d.keys())[:3] == ['order_id', 'lock_version', 'order_state']
+    assert type(d['consumer_id']) is int
+    assert type(d['order_minimum']['value']) is float
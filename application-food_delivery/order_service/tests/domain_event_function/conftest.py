@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Lambda では function の directory が sys.path の先頭になる (event_publisher 等は `import log` する)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                'order_domain_event_function'))
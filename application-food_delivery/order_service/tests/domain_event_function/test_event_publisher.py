@@ -0,0 +1,108 @@
+import json
+import pytest
+from order_service.order_domain_event_function import event_publisher
+
+
+class FakeEventBridge:
+    """ fail_details の Detail を持つ entry を、指定回数だけ失敗させる """
+
+    def __init__(self, fail_details=None):
+        self.fail_details = dict(fail_details or {})
+        self.calls = []
+
+    def put_events(self, Entries):
+        self.calls.append([json.loads(entry['Detail']) for entry in Entries])
+        results = []
+        for entry in Entries:
+            if self.fail_details.get(entry['Detail'], 0) > 0:
+                self.fail_details[entry['Detail']] -= 1
+                results.append({'ErrorCode': 'InternalFailure', 'ErrorMessage': 'retry'})
+            else:
+                results.append({'EventId': 'xxx'})
+        return {'FailedEntryCount': sum(1 for r in results if 'ErrorCode' in r),
+                'Entries': results}
+
+
+def detail(order_id, event_id, padding=''):
+    return json.dumps({'order_id': order_id, 'event_id': event_id, 'padding': padding})
+
+
+def make_publisher(client, **kwargs):
+    return event_publisher.EventPublisher(client, 'bus', 'com.order', 'OrderEvent',
+                                          sleep=lambda seconds: None, **kwargs)
+
+
+def published(client):
+    return [d for call in client.calls for d in call]
+
+
+def test_100_events_are_published_in_10_calls():
+    client = FakeEventBridge()
+    publisher = make_publisher(client)
+    for i in range(100):
+        publisher.add(detail(f'order-{i}', 1), ordering_key=f'ORDER#order-{i}')
+
+    publisher.flush()
+
+    assert len(client.calls) == 10
+    assert all(len(call) == 10 for call in client.calls)
+    assert [d['order_id'] for d in published(client)] == [f'order-{i}' for i in range(100)]
+
+
+def test_request_size_is_under_256kb():
+    client = FakeEventBridge()
+    publisher = make_publisher(client)
+    for i in range(10):
+        publisher.add(detail(f'order-{i}', 1, padding='x' * 60 * 1024), ordering_key=f'{i}')
+
+    publisher.flush()
+
+    assert [len(call) for call in client.calls] == [4, 4, 2]
+
+
+def test_same_aggregate_events_are_published_in_order():
+    client = FakeEventBridge()
+    publisher = make_publisher(client)
+    for event_id in range(3):
+        publisher.add(detail('a', event_id), ordering_key='ORDER#a')
+        publisher.add(detail('b', event_id), ordering_key='ORDER#b')
+
+    publisher.flush()
+
+    # 1回のput_eventsにはaggregateごとに1件まで
+    assert [[(d['order_id'], d['event_id']) for d in call] for call in client.calls] == \
+        [[('a', 0), ('b', 0)], [('a', 1), ('b', 1)], [('a', 2), ('b', 2)]]
+
+
+def test_only_failed_entries_are_retried_before_later_events_of_the_aggregate():
+    client = FakeEventBridge(fail_details={detail('a', 0): 1})
+    publisher = make_publisher(client)
+    publisher.add(detail('a', 0), ordering_key='ORDER#a')
+    publisher.add(detail('a', 1), ordering_key='ORDER#a')
+    publisher.add(detail('b', 0), ordering_key='ORDER#b')
+
+    publisher.flush()
+
+    assert [[(d['order_id'], d['event_id']) for d in call] for call in client.calls] == \
+        [[('a', 0), ('b', 0)], [('a', 0)], [('a', 1)]]
+
+
+def test_raise_after_max_attempts():
+    client = FakeEventBridge(fail_details={detail('a', 0): 3})
+    publisher = make_publisher(client, max_attempts=3)
+    publisher.add(detail('a', 0), ordering_key='ORDER#a')
+    publisher.add(detail('a', 1), ordering_key='ORDER#a')
+
+    with pytest.raises(event_publisher.PublishFailedException):
+        publisher.flush()
+
+    assert len(client.calls) == 3
+    assert ('a', 1) not in [(d['order_id'], d['event_id']) for d in published(client)]
+
+
+def test_flush_without_events_does_not_call_put_events():
+    client = FakeEventBridge()
+
+    make_publisher(client).flush()
+
+    assert client.calls == []
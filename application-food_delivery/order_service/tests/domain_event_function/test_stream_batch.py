@@ -0,0 +1,238 @@
+import collections
+import json
+import threading
+import time
+import pytest
+from order_service.order_domain_event_function import event_publisher
+from order_service.order_domain_event_function import stream_batch
+from order_service.tests.domain_event_function.test_event_publisher import FakeEventBridge
+
+
+class RecordingEventBridge(FakeEventBridge):
+    """ put_events に成功した entry の Detail を記録する """
+
+    def __init__(self, fail_details=None):
+        super().__init__(fail_details)
+        self.published = []
+
+    def put_events(self, Entries):
+        resp = super().put_events(Entries)
+        self.published.extend(json.loads(entry['Detail'])
+                              for entry, result in zip(Entries, resp['Entries'])
+                              if 'ErrorCode' not in result)
+        return resp
+
+
+def stream_record(i):
+    return {
+        'eventSource': 'aws:dynamodb',
+        'eventName': 'INSERT',
+        'dynamodb': {
+            'SequenceNumber': str(1000 + i),
+            'NewImage': {'PK': {'S': f'ORDER#order-{i}'}, 'SK': {'S': 'EVENTTYPE#OrderCreated#EVENTID#1'}},
+        },
+    }
+
+
+class Consumer:
+    """ domain event function の event_handler() 相当: record毎に saga開始 + put_events """
+
+    def __init__(self, client, fail_records=None):
+        self.fail_records = dict(fail_records or {})  # record index -> 失敗させる回数
+        self.saga_starts = collections.Counter()       # record index -> saga開始回数
+        self.client = client
+
+    def make_publisher(self):
+        # lambda_handler() の呼び出し毎に作る
+        return event_publisher.EventPublisher(self.client, 'bus', 'com.order', 'OrderEvent',
+                                              max_attempts=1, sleep=lambda seconds: None)
+
+    def event_handler(self, record, publisher):
+        i = int(record['dynamodb']['SequenceNumber']) - 1000
+        if self.fail_records.get(i, 0) > 0:
+            self.fail_records[i] -= 1
+            raise Exception(f'poison record: {i}')
+        self.saga_starts[i] += 1
+        publisher.add(json.dumps({'record': i}), ordering_key=record['dynamodb']['NewImage']['PK']['S'])
+
+    def legacy_lambda_handler(self, event):
+        """ 変更前: 最初に失敗したrecordでraiseし、batch全体をリトライさせる """
+        publisher = self.make_publisher()
+        for record in event['Records']:
+            self.event_handler(record, publisher)
+        publisher.flush()
+
+    def lambda_handler(self, event):
+        publisher = self.make_publisher()
+        return stream_batch.process_records(event['Records'],
+                                            lambda record: self.event_handler(record, publisher),
+                                            publisher)
+
+
+def replay(records, lambda_handler, batch_size=10):
+    """ DynamoDB Streams event source mapping: 例外はbatch全体を、batchItemFailuresはそのrecordから再実行 """
+    position = 0
+    while position < len(records):
+        batch = records[position:position + batch_size]
+        try:
+            resp = lambda_handler({'Records': batch})
+        except Exception:
+            continue
+        failures = (resp or {}).get('batchItemFailures')
+        if failures:
+            sequence_number = failures[0]['itemIdentifier']
+            position = [r['dynamodb']['SequenceNumber'] for r in records].index(sequence_number)
+        else:
+            position += len(batch)
+
+
+def reprocessed(consumer, client):
+    """ 2回以上実行された saga開始 と put_events entry の数 """
+    published = collections.Counter(d['record'] for d in client.published)
+    return (sum(n - 1 for n in consumer.saga_starts.values()),
+            sum(n - 1 for n in published.values()))
+
+
+def run(handler_name, fail_records=None, fail_details=None):
+    records = [stream_record(i) for i in range(20)]
+    client = RecordingEventBridge(fail_details)
+    consumer = Consumer(client, fail_records)
+    replay(records, getattr(consumer, handler_name))
+    assert sorted(consumer.saga_starts) == list(range(20))
+    return reprocessed(consumer, client)
+
+
+def test_poison_record_reprocessing_before_and_after():
+    # batch [0..9] の record 6 が1回失敗する
+    before = run('legacy_lambda_handler', fail_records={6: 1})
+    after = run('lambda_handler', fail_records={6: 1})
+    print(f'reprocessed (saga starts, put_events entries): before: {before}, after: {after}')
+
+    assert before == (6, 0)  # record 0-5 の saga開始を再実行 (put_eventsはflush前に失敗)
+    assert after == (0, 0)
+
+
+def test_put_events_failure_reprocessing_before_and_after():
+    # record 3 の entry の put_events が1回失敗する
+    fail_details = {json.dumps({'record': 3}): 1}
+    before = run('legacy_lambda_handler', fail_details=fail_details)
+    after = run('lambda_handler', fail_details=fail_details)
+    print(f'reprocessed (saga starts, put_events entries): before: {before}, after: {after}')
+
+    assert before == (10, 9)  # batch [0..9] 全体を再実行
+    assert after == (7, 6)    # record 3 から再実行 (record 4-9 の entry は同じput_eventsで送信済み)
+
+
+def test_all_records_succeeded():
+    consumer = Consumer(FakeEventBridge())
+    resp = consumer.lambda_handler({'Records': [stream_record(i) for i in range(3)]})
+
+    assert resp == {'batchItemFailures': []}
+
+
+def test_first_failed_record_is_reported_and_rest_are_not_processed():
+    client = FakeEventBridge()
+    consumer = Consumer(client, fail_records={1: 1})
+    resp = consumer.lambda_handler({'Records': [stream_record(i) for i in range(3)]})
+
+    assert resp == {'batchItemFailures': [{'itemIdentifier': '1001'}]}
+    assert sorted(consumer.saga_starts) == [0]
+    assert [d['record'] for call in client.calls for d in call] == [0]
+
+
+def test_entries_of_failed_record_are_not_published():
+    client = FakeEventBridge()
+    publisher = event_publisher.EventPublisher(client, 'bus', 'com.order', 'OrderEvent')
+
+    def event_handler(record):
+        publisher.add(json.dumps({'record': record['dynamodb']['SequenceNumber']}), ordering_key='ORDER#1')
+        if record['dynamodb']['SequenceNumber'] == '1001':
+            raise Exception('failed after add()')
+
+    resp = stream_batch.process_records([stream_record(i) for i in range(3)], event_handler, publisher)
+
+    assert resp == {'batchItemFailures': [{'itemIdentifier': '1001'}]}
+    assert [d['record'] for call in client.calls for d in call] == ['1000']
+
+
+def test_unsupported_event_source_is_reported():
+    records = [stream_record(0), dict(stream_record(1), eventSource='aws:sqs')]
+    resp = stream_batch.process_records(records, lambda record: None)
+
+    assert resp == {'batchItemFailures': [{'itemIdentifier': '1001'}]}
+
+
+def test_publish_failed_exception_has_unpublished_sequence_numbers():
+    client = FakeEventBridge({json.dumps({'record': 1}): 1})
+    publisher = event_publisher.EventPublisher(client, 'bus', 'com.order', 'OrderEvent',
+                                               max_attempts=1, sleep=lambda seconds: None)
+    for i, key in enumerate(['ORDER#a', 'ORDER#b', 'ORDER#b']):
+        publisher.sequence_number = str(1000 + i)
+        publisher.add(json.dumps({'record': i}), ordering_key=key)
+
+    with pytest.raises(event_publisher.PublishFailedException) as e:
+        publisher.flush()
+
+    assert sorted(e.value.sequence_numbers) == ['1001', '1002']
+
+
+def order_record(i, order_id):
+    record = stream_record(i)
+    record['dynamodb']['Keys'] = {'PK': {'S': f'ORDER#{order_id}'}}
+    return record
+
+
+def group_key(record):
+    return record['dynamodb']['Keys']['PK']['S']
+
+
+def test_records_of_same_aggregate_are_processed_in_order():
+    lock = threading.Lock()
+    processed = collections.defaultdict(list)  # order_id -> SequenceNumber (処理順)
+
+    def event_handler(record):
+        time.sleep(0.001)
+        with lock:
+            processed[group_key(record)].append(record['dynamodb']['SequenceNumber'])
+
+    records = [order_record(i, f'order-{i % 4}') for i in range(20)]
+    resp = stream_batch.process_records(records, event_handler, group_key=group_key, max_workers=4)
+
+    assert resp == {'batchItemFailures': []}
+    for n in range(4):
+        assert processed[f'ORDER#order-{n}'] == [str(1000 + i) for i in range(n, 20, 4)]
+
+
+def test_different_aggregates_are_processed_concurrently():
+    def event_handler(record):
+        time.sleep(0.05)  # start_execution
+
+    records = [order_record(i, f'order-{i}') for i in range(8)]
+    started = time.perf_counter()
+    stream_batch.process_records(records, event_handler, group_key=group_key, max_workers=8)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.05 * 8 / 2
+
+
+def test_failed_aggregate_stops_and_earliest_failure_is_reported():
+    client = FakeEventBridge()
+    publisher = event_publisher.EventPublisher(client, 'bus', 'com.order', 'OrderEvent')
+    handled = []
+
+    def event_handler(record):
+        sequence_number = record['dynamodb']['SequenceNumber']
+        if sequence_number in ('1003', '1005'):
+            raise Exception('start_execution failed')
+        handled.append(sequence_number)
+        publisher.add(json.dumps({'record': sequence_number}), ordering_key=group_key(record))
+
+    # order-a: 0, 2, 4, 6   order-b: 1, 3, 5, 7
+    records = [order_record(i, 'a' if i % 2 == 0 else 'b') for i in range(8)]
+    resp = stream_batch.process_records(records, event_handler, publisher,
+                                        group_key=group_key, max_workers=2)
+
+    assert resp == {'batchItemFailures': [{'itemIdentifier': '1003'}]}
+    assert sorted(handled) == ['1000', '1001', '1002', '1004', '1006']  # order-b は 1003 で止まる
+    # 1003 以降は再実行されるので publish しない
+    assert sorted(d['record'] for call in client.calls for d in call) == ['1000', '1001', '1002']
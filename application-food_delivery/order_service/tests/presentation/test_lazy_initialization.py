@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+
+FUNCTION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                            'order_function')
+
+# sys.modules を見るので、新しい process で controller を import する
+SCRIPT = '''
+import contextlib, io, sys
+from order_layers.presentation import controller
+
+def loaded():
+    return [m for m in ('order_layers.service.handlers', 'order_layers.service.commands',
+                        'order_layers.service.events', 'order_layers.adaptors.unit_of_work',
+                        'order_layers.adaptors.order_event_sourced_repository') if m in sys.modules]
+
+print(controller.handler.cache_info().currsize, *loaded())
+h = controller.handler()
+h.order_service.find_order_by_id = lambda cmd: {'order_id': cmd.order_id}
+with contextlib.redirect_stdout(io.StringIO()):
+    response = controller.rest_invocation({'httpMethod': 'GET', 'path': '/orders/dc83abae'})
+print(response['statusCode'],
+      h._command_handler is not None, h._saga_command_handler is not None, h._event_handler is not None)
+print(*loaded())
+'''
+
+
+def test_tables_are_built_per_route():
+    env = dict(os.environ, PYTHONPATH=FUNCTION_DIR, AWS_DEFAULT_REGION='ap-northeast-1')
+    env.pop('ORDER_REPOSITORY', None)
+    output = subprocess.run([sys.executable, '-c', SCRIPT], env=env, check=True,
+                            capture_output=True, text=True).stdout.splitlines()
+
+    assert output[0] == '0'                   # import 時は service / adaptors を import しない
+    assert output[1] == '200 True False False'  # GET は REST の table だけ組み立てる
+    # event_sourced repository は ORDER_REPOSITORY=event_sourced の時だけ import する
+    assert output[2] == ('order_layers.service.handlers order_layers.service.commands '
+                         'order_layers.service.events order_layers.adaptors.unit_of_work')
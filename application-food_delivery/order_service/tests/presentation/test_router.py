@@ -0,0 +1,81 @@
+import pytest
+from order_layers.presentation import router
+
+
+@pytest.fixture
+def order_router():
+    r = router.Router()
+
+    @r.route('POST', '/orders')
+    def create_order(request):
+        return 'create_order'
+
+    @r.route('GET', '/orders/{order_id:[0-9a-f]+}')
+    def get_order(request):
+        return 'get_order'
+
+    @r.route('POST', '/orders/{order_id:[0-9a-f]+}/cancel')
+    def cancel_order(request):
+        return 'cancel_order'
+
+    @r.route('GET', '/accounts/{account_id}')
+    def get_account(request):
+        return 'get_account'
+
+    return r
+
+
+@pytest.mark.parametrize('http_method, path, expected, path_parameters', [
+    ('POST', '/orders', 'create_order', {}),
+    ('GET', '/orders/dc83abae', 'get_order', {'order_id': 'dc83abae'}),
+    ('POST', '/orders/dc83abae/cancel', 'cancel_order', {'order_id': 'dc83abae'}),
+    ('GET', '/accounts/a.b-c', 'get_account', {'account_id': 'a.b-c'}),
+])
+def test_resolve(order_router, http_method, path, expected, path_parameters):
+    handler, params = order_router.resolve(http_method, path)
+
+    assert handler(None) == expected
+    assert params == path_parameters
+
+
+@pytest.mark.parametrize('path', ['/', '', None, '/restaurants', '/orders/XYZ', '/orders/',
+                                  '/orders/dc83abae/revise', '/orders/dc83abae/cancel/x',
+                                  '/accounts/a/b'])
+def test_resolve_not_found(order_router, path):
+    with pytest.raises(router.RouteNotFound):
+        order_router.resolve('GET', path)
+
+
+def test_resolve_method_not_allowed(order_router):
+    with pytest.raises(router.MethodNotAllowed) as e:
+        order_router.resolve('DELETE', '/orders/dc83abae')
+
+    assert e.value.allowed_methods == ['GET']
+
+
+def test_template_is_literal_except_parameters():
+    r = router.Router()
+    r.route('GET', '/orders.json')(lambda request: None)
+
+    with pytest.raises(router.RouteNotFound):
+        r.resolve('GET', '/ordersxjson')
+
+
+def test_duplicate_route_and_parameterized_first_segment_rejected(order_router):
+    with pytest.raises(ValueError):
+        order_router.route('POST', '/orders')(lambda request: None)
+    with pytest.raises(ValueError):
+        order_router.route('GET', '/{resource}')
+
+
+def test_registry():
+    registry = router.Registry()
+
+    @registry.register('CreateOrderSaga', 'APPROVE_ORDER')
+    def approve_order(event):
+        return event['order_id']
+
+    assert registry.get(('CreateOrderSaga', 'APPROVE_ORDER'))({'order_id': 'a1'}) == 'a1'
+    assert registry.get(('CreateOrderSaga', 'REJECT_ORDER')) is None
+    with pytest.raises(ValueError):
+        registry.register('CreateOrderSaga', 'APPROVE_ORDER')(approve_order)
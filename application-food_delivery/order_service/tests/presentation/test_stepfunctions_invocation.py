@@ -0,0 +1,44 @@
+import pytest
+from order_layers.service import commands
+from order_layers.presentation import controller
+
+ORDER_ID = '04516f76f6b0456d9e9916d667777890'
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.commands = []
+
+    def saga_commands_handler(self, cmd):
+        self.commands.append(cmd)
+        return {'order_id': cmd.order_id}
+
+
+@pytest.fixture
+def saga_handler(monkeypatch):
+    recording = RecordingHandler()
+    monkeypatch.setattr(controller, 'handler', lambda: recording)
+    return recording
+
+
+def task(state_machine, action, **payload) -> dict:
+    return {'task_context': {'type': 1, 'value': {'state_machine': state_machine, 'action': action}}, **payload}
+
+
+@pytest.mark.parametrize('state_machine, action, command', [
+    ('CreateOrderSaga', 'APPROVE_ORDER', commands.ApproveOrder),
+    ('CreateOrderSaga', 'REJECT_ORDER', commands.RejectOrder),
+    ('CancelOrderSaga', 'BEGIN_CANCEL_ORDER', commands.BeginCancelOrder),
+    ('ReviseOrderSaga', 'UNDO_BEGIN_REVISE_ORDER', commands.UndoBeginReviseOrder),
+])
+def test_saga_command_is_handled(saga_handler, state_machine, action, command):
+    resp = controller.stepfunctions_invocation(task(state_machine, action, order_id=ORDER_ID))
+
+    assert resp == {'order_id': ORDER_ID}
+    assert [type(cmd) for cmd in saga_handler.commands] == [command]
+
+
+def test_unregistered_action(saga_handler):
+    with pytest.raises(Exception, match='state_machine:CreateOrderSaga, action:UNKNOWN'):
+        controller.stepfunctions_invocation(task('CreateOrderSaga', 'UNKNOWN', order_id=ORDER_ID))
+    assert saga_handler.commands == []
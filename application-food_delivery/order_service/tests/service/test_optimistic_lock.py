@@ -0,0 +1,95 @@
+import copy
+import datetime
+import pytest
+from order_layers.common import common
+from order_layers.common import exception
+from order_layers.common import retry
+from order_layers.domain import order_model
+from order_layers.service import commands
+from order_layers.service import service
+
+
+class FakeOrderRepository:
+    def __init__(self, order_dict):
+        self.order_dict = order_dict
+        self.find_count = 0
+
+    def find_by_id(self, order_id) -> order_model.Order:
+        self.find_count += 1
+        # DynamoDbRepositoryと同じくvalueがNoneのattributeは保存されない
+        d = {k: v for k, v in copy.deepcopy(self.order_dict).items() if v is not None}
+        return order_model.Order.from_dict(d)
+
+
+class ConflictingUnitOfWork:
+    """ 最初のconflicts回は割り込みがあったものとして OptimisticLockException を送出する """
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        self.committed = []
+
+    def __enter__(self):
+        self.pending = []
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            if self.conflicts:
+                self.conflicts -= 1
+                raise exception.OptimisticLockException('conflict')
+            self.committed.append(self.pending)
+        return False
+
+    def update_order(self, order, attributes=None):
+        self.pending.append(('update_order', order.order_state, attributes))
+
+    def save_event(self, event):
+        self.pending.append(('save_event', event.event_type))
+        return 1
+
+
+@pytest.fixture
+def order_dict():
+    order = order_model.Order(
+        consumer_id=1,
+        restaurant_id=1,
+        delivery_information=order_model.DeliveryInformation(
+            delivery_time=datetime.datetime(2022, 11, 30, 5, 0, 30, 1000),
+            delivery_address=common.Address('9 Amazing View', 'Soi 8', 'Oakland', 'CA', '94612')),
+        order_line_items=order_model.OrderLineItems([
+            order_model.OrderLineItem('000001', 'Curry Rice', common.Money(800, 'JPY'), 3)]))
+    return order.to_dict()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(service.time, 'sleep', lambda seconds: None)
+
+
+def test_approve_order_retries_on_conflict(order_dict):
+    order_repo = FakeOrderRepository(order_dict)
+    uow = ConflictingUnitOfWork(conflicts=2)
+    order_service = service.OrderService(order_repo, None, None, uow)
+
+    order_service.approve_order(commands.ApproveOrder(order_id=order_dict['order_id']))
+
+    assert order_repo.find_count == 3
+    assert uow.committed == [[('update_order', order_model.OrderState.APPROVED, ['order_state']),
+                              ('save_event', 'OrderAuthorized')]]
+
+
+def test_approve_order_gives_up_after_max_attempts(order_dict):
+    order_repo = FakeOrderRepository(order_dict)
+    uow = ConflictingUnitOfWork(conflicts=retry.OPTIMISTIC_LOCK_MAX_ATTEMPTS)
+    order_service = service.OrderService(order_repo, None, None, uow)
+
+    with pytest.raises(exception.OptimisticLockException):
+        order_service.approve_order(commands.ApproveOrder(order_id=order_dict['order_id']))
+
+    assert order_repo.find_count == retry.OPTIMISTIC_LOCK_MAX_ATTEMPTS
+    assert uow.committed == []
+
+
+def test_backoff_delay_is_bounded():
+    delays = [retry.backoff_delay(attempt) for attempt in range(1, 20)]
+
+    assert all(0 <= delay <= retry.MAX_DELAY_SECONDS for delay in delays)
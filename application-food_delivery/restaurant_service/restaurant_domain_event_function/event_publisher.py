@@ -0,0 +1,162 @@
+"""
+EventBridge Batch Publisher
+    DynamoDB Streams の1回の起動 (record batch) で publish する event をまとめて、
+    1回の put_events で最大10 entries / 256KB まで送る。
+
+        publisher = event_publisher.EventPublisher(eventbus, EVENTBUS_NAME,
+                                                   EVENT_SOURCE, EVENT_DETAIL_TYPE)
+        for record in event['Records']:
+            publisher.add(detail_json, ordering_key='ORDER#xxx')
+        publisher.flush()
+
+    順序
+        同じ ordering_key (aggregate) の event は、前の event の put が成功してから次の put に入れる。
+        (1回の put_events には ordering_key ごとに1件まで)
+    リトライ
+        FailedEntryCount > 0 の場合は失敗した entry だけを次の put に入れ直す。
+        max_attempts 回失敗した entry があれば PublishFailedException を raise する。
+        exceptionの sequence_numbers (publishできなかった entry の DynamoDB Streams record) から
+        lambda_handler() は batchItemFailures を返し、Lambda にその record から再実行させる。
+    thread
+        add() / discard() は複数の thread から呼び出せる。 sequence_number は thread ごとの値。
+        flush() は全ての thread の add() が終わってから呼び出す。
+"""
+import collections
+import threading
+import time
+import log
+
+logger = log.get_logger(__name__)
+
+MAX_ENTRIES = 10             # PutEvents の entry数の上限
+MAX_REQUEST_BYTES = 256 * 1024  # PutEvents の request size の上限
+
+
+class PublishFailedException(Exception):
+    def __init__(self, message, sequence_numbers=()):
+        super().__init__(message)
+        self.sequence_numbers = list(sequence_numbers)  # publishできなかったentryのSequenceNumber
+
+
+def entry_size(entry: dict) -> int:
+    """ PutEvents entry size の計算 (Time, Source, DetailType, Detail, Resources) """
+    size = 0
+    if entry.get('Time') is not None:
+        size += 14
+    size += len(entry['Source'].encode('utf-8'))
+    size += len(entry['DetailType'].encode('utf-8'))
+    size += len(entry['Detail'].encode('utf-8'))
+    for resource in entry.get('Resources', []):
+        size += len(resource.encode('utf-8'))
+    return size
+
+
+class EventPublisher:
+
+    def __init__(self, client, event_bus_name, source, detail_type,
+                 max_attempts=3, backoff_seconds=0.1, sleep=time.sleep):
+        self.client = client
+        self.event_bus_name = event_bus_name
+        self.source = source
+        self.detail_type = detail_type
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.sleep = sleep
+        self._queues = collections.OrderedDict()  # ordering_key -> deque[entry] (追加順)
+        self._sequence_numbers = {}  # id(entry) -> entryを追加したrecordのSequenceNumber
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.put_events_count = 0
+
+    @property
+    def sequence_number(self):
+        """ 処理中の DynamoDB Streams record (stream_batch.process_records()が設定する) """
+        return getattr(self._local, 'sequence_number', None)
+
+    @sequence_number.setter
+    def sequence_number(self, sequence_number):
+        self._local.sequence_number = sequence_number
+
+    def add(self, detail_json: str, ordering_key: str):
+        entry = {
+            'EventBusName': self.event_bus_name,
+            'Source': self.source,
+            'DetailType': self.detail_type,
+            'Detail': detail_json,  # needs JSON
+        }
+        with self._lock:
+            self._queues.setdefault(ordering_key, collections.deque()).append(entry)
+            self._sequence_numbers[id(entry)] = self.sequence_number
+
+    def discard(self, *sequence_numbers):
+        """ 再実行される record が追加した entry を取り除く (再実行時に同じ entry が追加される) """
+        sequence_numbers = set(sequence_numbers)
+        with self._lock:
+            for ordering_key in list(self._queues):
+                queue = collections.deque()
+                for entry in self._queues[ordering_key]:
+                    if self._sequence_numbers.get(id(entry)) in sequence_numbers:
+                        del self._sequence_numbers[id(entry)]
+                    else:
+                        queue.append(entry)
+                if queue:
+                    self._queues[ordering_key] = queue
+                else:
+                    del self._queues[ordering_key]
+
+    def flush(self):
+        attempts = {}  # id(entry) -> 失敗回数
+        while self._queues:
+            batch = self._next_batch()
+            failed = self._put_events(batch)
+
+            retry = False
+            for ordering_key, entry in batch:
+                if id(entry) not in failed:
+                    queue = self._queues[ordering_key]
+                    self._sequence_numbers.pop(id(queue.popleft()), None)
+                    if not queue:
+                        del self._queues[ordering_key]
+                    continue
+
+                attempts[id(entry)] = attempts.get(id(entry), 0) + 1
+                if attempts[id(entry)] >= self.max_attempts:
+                    sequence_numbers = [self._sequence_numbers.get(id(e))
+                                        for queue in self._queues.values() for e in queue]
+                    self._queues.clear()
+                    self._sequence_numbers.clear()
+                    raise PublishFailedException(
+                        f'put_events failed {self.max_attempts} times: {failed[id(entry)]}',
+                        sequence_numbers)
+                retry = True
+
+            if retry:
+                self.sleep(self.backoff_seconds)
+
+    def _next_batch(self) -> list[tuple]:
+        """ ordering_keyごとの先頭の entry を、追加順に10件/256KBまで取り出す """
+        batch = []
+        batch_size = 0
+        for ordering_key, queue in self._queues.items():
+            entry = queue[0]
+            size = entry_size(entry)
+            if batch and (len(batch) >= MAX_ENTRIES or batch_size + size > MAX_REQUEST_BYTES):
+                break
+            batch.append((ordering_key, entry))
+            batch_size += size
+        return batch
+
+    def _put_events(self, batch: list[tuple]) -> dict:
+        """ 失敗した entry の {id(entry): ErrorCode: ErrorMessage} を返す """
+        entries = [entry for _, entry in batch]
+        resp = self.client.put_events(Entries=entries)
+        self.put_events_count += 1
+        logger.info('EventBridge put_events: entries: %s, FailedEntryCount: %s',
+                    len(entries), resp.get('FailedEntryCount', 0))
+
+        if not resp.get('FailedEntryCount'):
+            return {}
+        # resp['Entries'] は request の Entries と同じ順序
+        return {id(entry): f'{result.get("ErrorCode")}: {result.get("ErrorMessage")}'
+                for entry, result in zip(entries, resp['Entries'])
+                if result.get('ErrorCode')}
@@ -1,14 +1,20 @@
 import os
 import json
 from json_encoder import JSONEncoder
+import event_publisher
+import stream_batch
+import aws_clients
 import boto3
 from boto3.dynamodb.types import TypeDeserializer
+import log
+
+logger = log.get_logger(__name__)
 
 EVENTBUS_NAME = os.environ.get('EVENT_BUS_NAME')
 EVENT_SOURCE = os.environ.get('EVENT_SOURCE')
 EVENT_DETAIL_TYPE = os.environ.get('EVENT_DETAIL_TYPE')
 
-eventbus = boto3.client('events')
+eventbus = aws_clients.client('events')
 
 
 class UnsupportedEventChannelException(Exception):
@@ -19,7 +25,7 @@ def convert_to_python_obj(dynamo_item) -> dict:
     deserializer = boto3.dynamodb.types.TypeDeserializer()
     python_obj = {k: deserializer.deserialize(v) for k, v in dynamo_item.items()}
 
-    print(f'convert_to_python_obj()) python_obj: {json.dumps(python_obj, cls=JSONEncoder)}')
+    logger.payload('convert_to_python_obj() python_obj', python_obj)
 
     python_obj['aggregate'] = python_obj['PK'].split('#')[0]
     # python_obj['channel'] = python_obj['SK'].split('#')[1]
@@ -74,24 +80,15 @@ def convert_to_python_obj(dynamo_item) -> dict:
     return python_obj
 
 
-def dynamodb_streams_record_publish(record):
+def dynamodb_streams_record_publish(record, publisher):
     dynamo_item = record['dynamodb']['NewImage']
     python_obj = convert_to_python_obj(dynamo_item)
 
-    # publish to EventBridge
-    resp = eventbus.put_events(
-        Entries=[
-            {
-                'EventBusName': EVENTBUS_NAME,
-                'Source': EVENT_SOURCE,
-                'DetailType': EVENT_DETAIL_TYPE,
-                'Detail': json.dumps(python_obj, cls=JSONEncoder),  # needs JSON
-            }
-        ],
-    )
+    # publish to EventBridge: lambda_handler()の最後にまとめてput_eventsする
+    detail_json = json.dumps(python_obj, cls=JSONEncoder)
+    publisher.add(detail_json, ordering_key=dynamo_item['PK']['S'])  # RESTAURANT#{restaurant_id}
 
-    print(f'put_event.Detail: {json.dumps(python_obj, cls=JSONEncoder)}')
-    print(f'EventBridge put_events resp: {resp}')
+    logger.payload('put_event.Detail', detail_json)
 
 
 def is_dynamo_insert(record):
@@ -108,7 +105,7 @@ def is_restaurant_domain_event(record):
     return True
 
 
-def event_handler(record):
+def event_handler(record, publisher):
 
     if not is_dynamo_insert(record):
         return
@@ -118,26 +115,27 @@ def event_handler(record):
     dynamo_item = record['dynamodb']['NewImage']
 
     python_obj = convert_to_python_obj(dynamo_item)
-    print(json.dumps(python_obj, cls=JSONEncoder))
+    logger.payload('python_obj', python_obj)
 
     event_type = python_obj['event_type']
     if event_type == "RestaurantCreated":
-        dynamodb_streams_record_publish(record)
+        dynamodb_streams_record_publish(record, publisher)
     else:
         raise UnsupportedEventChannelException(f'event_type:{event_type}')
 
 
 def lambda_handler(event, context):
-    print(json.dumps(event))
+    log.sample()  # LOG_DEBUG_SAMPLE_RATE の割合で、この invocation を DEBUG で出力する
+    logger.payload('event', event)
 
     resp = None
     if event.get('Records', None):  # from SQS or DynamoDB Streams
-        for record in event['Records']:
-            if record['eventSource'] == 'aws:dynamodb':
-                # dynamodb_streams_record_publish(record)
-                event_handler(record)
-            else:
-                raise Exception(f"NotSupportEvent:{record['eventSource']}")
+        publisher = event_publisher.EventPublisher(eventbus, EVENTBUS_NAME,
+                                                   EVENT_SOURCE, EVENT_DETAIL_TYPE)
+        # 最初に失敗したrecordのSequenceNumberを batchItemFailures で返す
+        resp = stream_batch.process_records(event['Records'],
+                                            lambda record: event_handler(record, publisher),
+                                            publisher)
     elif event.get('detail-type', None):  # from event bridge  # Todo: delete
         # Event Bridge Invocation
         pass
@@ -0,0 +1,95 @@
+"""
+DynamoDB Streams Partial Batch Response (ReportBatchItemFailures)
+    record を先頭から順に処理し、最初に失敗した record の SequenceNumber を batchItemFailures で返す。
+    Lambda はその record から batch を再実行するので、成功済みの record (saga開始, put_events) は
+    再実行されない。
+
+        publisher = event_publisher.EventPublisher(...)
+        return stream_batch.process_records(event['Records'],
+                                            lambda record: event_handler(record, publisher),
+                                            publisher)
+
+    失敗した record
+        それ以降の record は処理しない。 (同じshardの順序を守るため、再実行でまとめて処理する)
+        失敗した record が publisher に追加した entry は publish しない。
+    publisher.flush() の失敗
+        publish できなかった entry を追加した record のうち最も前のものを返す。
+        (不明な場合は batch の先頭を返し、batch全体を再実行させる)
+
+    group_key / max_workers
+        group_key(record) (aggregate) ごとに record をまとめ、group内は順番に、group同士は
+        max_workers 個の thread で並行に処理する。
+        ある group で失敗した record 以降は、その group だけ処理を止める。
+        batchItemFailures には全groupで最も前の失敗した record を返し、それ以降の record が
+        publisher に追加した entry は publish しない。 (再実行時に publish する)
+        record_handler は同じ record の再実行を成功として扱えること (saga の run_name など)。
+
+    event source mapping には report_batch_item_failures=True の設定が必要。
+    (constructors/*/function.py)
+"""
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import log
+
+logger = log.get_logger(__name__)
+
+
+def batch_item_failures(sequence_number=None) -> dict:
+    if sequence_number is None:
+        return {'batchItemFailures': []}
+    return {'batchItemFailures': [{'itemIdentifier': sequence_number}]}
+
+
+def process_records(records: list[dict], record_handler, publisher=None,
+                    group_key=None, max_workers=1) -> dict:
+    groups = collections.OrderedDict()  # group_key(record) -> [position] (batch内の位置の順)
+    for position, record in enumerate(records):
+        key = group_key(record) if group_key is not None else None
+        groups.setdefault(key, []).append(position)
+
+    def process_group(positions):
+        """ 処理したrecordの位置と、失敗したrecordの位置 (無ければNone) を返す """
+        processed = []
+        for position in positions:
+            record = records[position]
+            sequence_number = record['dynamodb']['SequenceNumber']
+            if publisher is not None:
+                publisher.sequence_number = sequence_number
+            processed.append(position)
+            try:
+                if record['eventSource'] != 'aws:dynamodb':
+                    raise Exception(f"NotSupportEvent:{record['eventSource']}")
+                record_handler(record)
+            except Exception as e:
+                logger.exception('record failed: SequenceNumber: %s, %r', sequence_number, e)
+                return processed, position
+        return processed, None
+
+    if max_workers > 1 and len(groups) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(groups))) as executor:
+            results = list(executor.map(process_group, groups.values()))
+    else:
+        results = [process_group(positions) for positions in groups.values()]
+
+    failed = [failed_position for _, failed_position in results if failed_position is not None]
+    failed_position = min(failed) if failed else None
+
+    if publisher is not None:
+        if failed_position is not None:
+            # 失敗したrecord以降は再実行されるので、それらが追加したentryはpublishしない
+            publisher.discard(*(records[position]['dynamodb']['SequenceNumber']
+                                for processed, _ in results for position in processed
+                                if position >= failed_position))
+        positions = {record['dynamodb']['SequenceNumber']: position
+                     for position, record in enumerate(records)}
+        try:
+            publisher.flush()
+        except Exception as e:  # event_publisher.PublishFailedException
+            logger.exception('publish failed: %r', e)
+            unpublished = [positions.get(sequence_number, 0)
+                           for sequence_number in getattr(e, 'sequence_numbers', None) or [None]]
+            failed_position = min(unpublished + ([failed_position] if failed_position is not None else []))
+
+    if failed_position is None:
+        return batch_item_failures()
+    return batch_item_failures(records[failed_position]['dynamodb']['SequenceNumber'])
@@ -1,11 +1,14 @@
-import json
 from restaurant_layers.presentation import controller
+from restaurant_layers.common import log
+
+logger = log.get_logger(__name__)
 
 
 def lambda_handler(event, context):
 
-    print(json.dumps(event))
-    print(context)
+    log.sample()  # LOG_DEBUG_SAMPLE_RATE の割合で、この invocation を DEBUG で出力する
+    logger.payload('event', event)
+    logger.debug('context: %s', context)
 
     resp = None
     if event.get('Records', None):  # from SQS
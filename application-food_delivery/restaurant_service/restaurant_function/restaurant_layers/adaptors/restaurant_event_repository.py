@@ -1,12 +1,20 @@
 import os
 import abc
 import datetime
-import boto3
-from boto3.dynamodb.types import TypeSerializer
-from boto3.dynamodb.types import TypeDeserializer
 from restaurant_layers.domain import restaurant_domain_events
 from restaurant_layers.service.domain_event_envelope import DomainEventEnvelope
 from restaurant_layers.adaptors import dynamo_exception as dx
+from restaurant_layers.adaptors import dynamo_codec
+from restaurant_layers.adaptors import id_allocator
+from restaurant_layers.adaptors import aws_clients
+
+
+RESTAURANT_EVENT_CODEC = dynamo_codec.ItemCodec({
+    'PK': dynamo_codec.S,
+    'SK': dynamo_codec.S,
+    'timestamp': dynamo_codec.S,
+    'event_id': dynamo_codec.N,
+})
 
 
 class AbstractRepository(abc.ABC):
@@ -41,8 +49,12 @@ class DynamoDbRepository(AbstractRepository):
     """
 
     def __init__(self):
-        self.client = boto3.client('dynamodb')
+        self.client = aws_clients.client('dynamodb')
         self.table_name = os.environ.get('DYNAMODB_EVENT_TABLE_NAME', 'RestaurantEvent')
+        self.event_id_allocator = id_allocator.get_allocator(self.client,
+                                                             self.table_name,
+                                                             'IDCOUNTER#EVENT',
+                                                             block_size=id_allocator.EVENT_ID_BLOCK_SIZE)
 
     def save(self, event: restaurant_domain_events.DomainEvent):
         event_dict = self.to_dynamo_dict(event)
@@ -73,33 +85,12 @@ class DynamoDbRepository(AbstractRepository):
         event_dict['timestamp'] = timestamp
         event_dict['event_id'] = event_id
 
-        serializer = boto3.dynamodb.types.TypeSerializer()
-        item = {k: serializer.serialize(v) for k, v in event_dict.items()}
+        item = RESTAURANT_EVENT_CODEC.encode(event_dict)
         # del event_dict['restaurant_id']
         return item
 
     def _get_sequential_event_id(self) -> int:
-        with dx.dynamo_exception_check():
-            resp = self.client.update_item(
-                TableName=self.table_name,
-                Key={
-                    'PK': {'S': 'IDCOUNTER#EVENT'},
-                    'SK': {'S': 'IDCOUNTER#EVENT'},
-                },
-                # UpdateExpression='SET #id_count = #id_count + :incr',
-                # ↓ itemがあれば+1更新、itemがなければif_not_exists()で:default値を初期値とする。
-                UpdateExpression='SET #id_count = if_not_exists(#id_count, :default) + :incr',
-                ExpressionAttributeNames={
-                  '#id_count': 'id_count',
-                },
-                ExpressionAttributeValues={
-                    ':incr': {'N': '1'},
-                    ':default': {'N': '0'}
-                },
-                ReturnValues='UPDATED_NEW',
-            )
-        new_consumer_id = int(resp['Attributes']['id_count']['N'])
-        return new_consumer_id
+        return self.event_id_allocator.next_id()
 
     # @staticmethod
     # def to_dynamo_dict_list(events: list[restaurant_domain_events.DomainEvent]):
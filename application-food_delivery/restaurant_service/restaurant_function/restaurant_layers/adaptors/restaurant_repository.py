@@ -1,13 +1,27 @@
 import decimal
 import os
 import abc
-import boto3
-from boto3.dynamodb.types import TypeSerializer
-from boto3.dynamodb.types import TypeDeserializer
 from botocore.exceptions import ClientError
 from restaurant_layers.domain import restaurant_model
 from restaurant_layers.adaptors import dynamo_exception as dx
+from restaurant_layers.adaptors import dynamo_codec
+from restaurant_layers.adaptors import id_allocator
 from restaurant_layers.common import exception as ex
+from restaurant_layers.adaptors import aws_clients
+
+
+RESTAURANT_CODEC = dynamo_codec.ItemCodec({
+    'PK': dynamo_codec.S,
+    'SK': dynamo_codec.S,
+    'restaurant_id': dynamo_codec.N,
+    'restaurant_name': dynamo_codec.S,
+    'restaurant_address': dynamo_codec.ADDRESS,
+    'menu_items': dynamo_codec.List(dynamo_codec.Map({
+        'menu_id': dynamo_codec.S,
+        'menu_name': dynamo_codec.S,
+        'price': dynamo_codec.MONEY,
+    })),
+})
 
 
 class AbstractRepository(abc.ABC):
@@ -66,31 +80,14 @@ class DynamoDbRepository(AbstractRepository):
                     ]
     """
     def __init__(self):
-        self.client = boto3.client('dynamodb')
+        self.client = aws_clients.client('dynamodb')
         self.table_name = os.environ.get('DYNAMODB_TABLE_NAME', 'RestaurantService')
+        self.restaurant_id_allocator = id_allocator.get_allocator(self.client,
+                                                                  self.table_name,
+                                                                  'IDCOUNTER#Restaurant')
 
     def get_unique_restaurant_id(self) -> int:
-        with dx.dynamo_exception_check():
-            resp = self.client.update_item(
-                TableName=self.table_name,
-                Key={
-                    'PK': {'S': 'IDCOUNTER#Restaurant'},
-                    'SK': {'S': 'IDCOUNTER#Restaurant'},
-                },
-                UpdateExpression='SET #id_count = if_not_exists(#id_count, :default) + :incr',
-                # itemがあれば+1更新、itemがなければif_not_exists()で:default値を初期値とする。
-                ExpressionAttributeNames={
-                  '#id_count': 'id_count',
-                },
-                ExpressionAttributeValues={
-                    ':incr': {'N': '1'},
-                    ':default': {'N': '0'}
-                },
-                ReturnValues='UPDATED_NEW',
-            )
-
-        new_restaurant_id = int(resp['Attributes']['id_count']['N'])
-        return new_restaurant_id
+        return self.restaurant_id_allocator.next_id()
 
     def save(self, restaurant: restaurant_model.Restaurant):
         restaurant_dynamo_dict = self.to_dynamo_dict(restaurant)
@@ -103,8 +100,7 @@ class DynamoDbRepository(AbstractRepository):
         restaurant_dict = restaurant.to_dict()
         restaurant_dict['PK'] = f"RESTAURANT#{restaurant.restaurant_id}"
         restaurant_dict['SK'] = f"METADATA#{restaurant.restaurant_id}"
-        serializer = boto3.dynamodb.types.TypeSerializer()
-        item = {k: serializer.serialize(v) for k, v in restaurant_dict.items()}
+        item = RESTAURANT_CODEC.encode(restaurant_dict)
         del restaurant_dict['restaurant_id']
         return item
 
@@ -127,8 +123,7 @@ class DynamoDbRepository(AbstractRepository):
     @staticmethod
     def _dynamo_obj_to_ticket_python_obj(dynamo_item):
         """ DynamoDB obj -> Restaurant Obj """
-        deserializer = boto3.dynamodb.types.TypeDeserializer()
-        python_obj = {k: deserializer.deserialize(v) for k, v in dynamo_item.items()}
+        python_obj = RESTAURANT_CODEC.decode(dynamo_item)
         # Primary Keyの変更: PK, SKをticket attributeに変換
         python_obj['restaurant_id'] = int(python_obj['PK'].split('#')[1])
         del python_obj['PK']
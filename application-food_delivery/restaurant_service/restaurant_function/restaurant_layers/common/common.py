@@ -19,7 +19,7 @@ class Money:
         return Money(self.value * other)
 
     def to_dict(self):
-        return dataclasses.asdict(self)
+        return {'value': self.value, 'currency': self.currency}
 
     @classmethod
     def from_dict(cls, d):
@@ -35,7 +35,13 @@ class Address:
     zip: str
 
     def to_dict(self):
-        return dataclasses.asdict(self)
+        return {
+            'street1': self.street1,
+            'street2': self.street2,
+            'city': self.city,
+            'state': self.state,
+            'zip': self.zip,
+        }
 
     # Todo: classmethodは最後に書く必要がある？ 確認すること
     @classmethod
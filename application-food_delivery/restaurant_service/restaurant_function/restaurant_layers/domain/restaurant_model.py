@@ -1,9 +1,8 @@
 from __future__ import annotations  # classの依存関係の許可
 import dataclasses
-import json
-import decimal
 
 from restaurant_layers.common import common
+from restaurant_layers.common import serializer
 from restaurant_layers.domain import restaurant_domain_events
 
 
@@ -19,7 +18,11 @@ class MenuItem:
         return cls(**d)
 
     def to_dict(self):
-        return dataclasses.asdict(self)
+        return {
+            'menu_id': self.menu_id,
+            'menu_name': self.menu_name,
+            'price': self.price.to_dict(),
+        }
 
 
 class MenuItems:
@@ -59,24 +62,13 @@ class Restaurant:
         return cls(**d)
 
     def to_dict(self):
-        def encoder_(o):
-            if isinstance(o, Restaurant):
-                return o.__dict__  # Todo: ここがポイント
-            if isinstance(o, MenuItems):  # Enum
-                return o.to_dict_list()
-            if isinstance(o, MenuItem):  # Enum
-                return o.to_dict()
-            if isinstance(o, common.Address):
-                return dataclasses.asdict(o)
-            if isinstance(o, decimal.Decimal):
-                if int(o) == o:
-                    return int(o)
-                else:
-                    return float(o)
-            raise TypeError(f'{repr(o)} is not serializable')
-
-        d = json.loads(json.dumps(self, default=encoder_))
-        return d
+        # JSON文字列を経由せずにattributeを1回だけ辿る (keyの順序は__init__と同じ)
+        return serializer.to_plain({
+            'restaurant_id': self.restaurant_id,
+            'restaurant_name': self.restaurant_name,
+            'restaurant_address': self.restaurant_address.to_dict(),
+            'menu_items': self.menu_items.to_dict_list(),
+        })
 
     @classmethod
     def create(cls, restaurant_id, restaurant_name, restaurant_address, menu_items):
@@ -1,17 +1,30 @@
-import re
+from __future__ import annotations  # classの依存関係の許可
+import functools
 import json
-import traceback
-from restaurant_layers.adaptors import restaurant_repository
-from restaurant_layers.adaptors import restaurant_event_repository
-from restaurant_layers.service import handlers
-from restaurant_layers.service import commands
+from typing import TYPE_CHECKING
 from restaurant_layers.common import exception
 from restaurant_layers.common import json_encoder
+from restaurant_layers.presentation import router
+from restaurant_layers.common import log
+
+if TYPE_CHECKING:  # service / adaptors の module は route と handler() の中でだけ import する
+    from restaurant_layers.service import handlers
+
+logger = log.get_logger(__name__)
+
+
+ROUTER = router.Router()
 
 
 # injection
-RESTAURANT_REPOSITORY = restaurant_repository.DynamoDbRepository()
-RESTAURANT_EVENT_REPOSITORY = restaurant_event_repository.DynamoDbRepository()
+@functools.lru_cache(maxsize=None)
+def handler() -> handlers.Handler:
+    """ repository と Handler は最初の invocation で生成する (import 時に DynamoDB client を作らない) """
+    from restaurant_layers.service import handlers
+    from restaurant_layers.adaptors import restaurant_repository
+    from restaurant_layers.adaptors import restaurant_event_repository
+    return handlers.Handler(restaurant_repo=restaurant_repository.DynamoDbRepository(),
+                            restaurant_event_repo=restaurant_event_repository.DynamoDbRepository())
 
 
 def rest_request(event):
@@ -23,38 +36,45 @@ def rest_request(event):
     return http_method, query_string_parameters, path, path_parameters, body_json
 
 
+@ROUTER.route('POST', '/restaurants')
+def create_restaurant(request: router.Request):
+    """ POST /restaurants  - Create Restaurant
+    http_method: POST
+    path: "/restaurants"
+    path_parameters: None
+    query_string_parameters: None
+    body = Restaurant JSON
+    """
+    from restaurant_layers.service import commands
+    return commands.CreateRestaurant.from_json(body_json=request.body_json)
+
+
+@ROUTER.route('GET', '/restaurants/{restaurant_id:[0-9]+}')
+def get_restaurant(request: router.Request):
+    """ GET /restaurants  - Get Restaurant
+    http_method: GET
+    path: "/restaurants/9"
+    path_parameters: {"restaurant_id": "9"}
+    query_string_parameters: None
+    body: None
+    """
+    from restaurant_layers.service import commands
+    return commands.GetRestaurant(restaurant_id=request.path_parameters['restaurant_id'])
+
+
 def rest_invocation(event: dict):
     try:
         http_method, query_string_parameters, path, path_parameters, body_json = rest_request(event)
 
-        cmd = None
-        # if path == '/restaurants':
-        if re.fullmatch('/restaurants', path) and http_method == 'POST':
-            """ POST /restaurants  - Create Restaurant
-            http_method: POST
-            path: "/restaurants"
-            path_parameters: None
-            query_string_parameters: None
-            body = Restaurant JSON
-            """
-            cmd = commands.CreateRestaurant.from_json(body_json=body_json)
-        elif re.fullmatch('/restaurants/[0-9]+', path) and http_method == 'GET':
-            """ GET /restaurants  - Get Restaurant
-            http_method: GET
-            path: "/restaurants/9"
-            path_parameters: {"restaurant_id": "9"}
-            query_string_parameters: None
-            body: None
-            """
-            cmd = commands.GetRestaurant(
-                restaurant_id=path_parameters.get('restaurant_id'))
-        else:
-            raise exception.UnsupportedRoute(f'Unsupported Route :{http_method}')
-
-        handler = handlers.Handler(restaurant_repo=RESTAURANT_REPOSITORY,
-                                   restaurant_event_repo=RESTAURANT_EVENT_REPOSITORY)
-
-        response = handler.commands_handler(cmd=cmd)
+        # method + 先頭segment で route を引き、path parameterはpathから取り出す
+        route_handler, path_parameters = ROUTER.resolve(http_method, path)
+        cmd = route_handler(router.Request(http_method=http_method,
+                                           path=path,
+                                           path_parameters=path_parameters,
+                                           query_string_parameters=query_string_parameters,
+                                           body_json=body_json))
+
+        response = handler().commands_handler(cmd=cmd)
         response_dict = response.to_dict()
 
         rest_response = {
@@ -67,12 +87,11 @@ def rest_invocation(event: dict):
                         cls=json_encoder.JSONEncoder
                     )
         }
-        print(f'return response: {rest_response}')
+        logger.payload('return response', rest_response)
         return rest_response
 
     except exception.InvalidName as e:
-        print(str(e))
-        traceback.print_exc()
+        logger.exception('%s', e)
         return {
             'statusCode': 400,
             'body': json.dumps({
@@ -80,19 +99,27 @@ def rest_invocation(event: dict):
             })
         }
 
-    except exception.UnsupportedRoute as e:
-        print(str(e))
-        traceback.print_exc()
+    except router.RouteNotFound as e:
+        logger.warning('%s', e)
+        return {
+            'statusCode': 404,
+            'body': json.dumps({
+                'message': str(e),
+            })
+        }
+
+    except router.MethodNotAllowed as e:
+        logger.warning('%s', e)
         return {
             'statusCode': 405,
+            'headers': {'Allow': ', '.join(e.allowed_methods)},
             'body': json.dumps({
                 'message': str(e),
             })
         }
 
     except Exception as e:
-        print(e)
-        traceback.print_exc()
+        logger.exception('%s', e)
         return {
             'statusCode': 500,
             'body': json.dumps({
@@ -1,6 +1,9 @@
 from __future__ import annotations  # classの依存関係の許可
 import dataclasses
 from restaurant_layers.domain import restaurant_domain_events
+from restaurant_layers.common import log
+
+logger = log.get_logger(__name__)
 
 
 @dataclasses.dataclass(frozen=True)
@@ -15,7 +18,7 @@ class DomainEventEnvelope:
     @classmethod
     def wrap(cls, event: restaurant_domain_events.DomainEvent):
 
-        print(f'event: {event}')
+        logger.payload('event', event)
 
         return DomainEventEnvelope(
             aggregate='RESTAURANT',
@@ -1,6 +1,13 @@
-from restaurant_layers.adaptors import restaurant_repository
+from __future__ import annotations  # classの依存関係の許可
+from typing import TYPE_CHECKING
 from restaurant_layers.service import service
-from restaurant_layers.service import commands
+from restaurant_layers.common import log
+from restaurant_layers.common import metrics
+
+if TYPE_CHECKING:  # commands は table を組み立てる時にだけ import する
+    from restaurant_layers.service import commands
+
+logger = log.get_logger(__name__)
 
 
 class Handler:
@@ -8,12 +15,21 @@ class Handler:
 
         self.restaurant_service = service.RestaurantService(restaurant_repo,
                                                             restaurant_event_repo)
-        self.COMMAND_HANDLER = {
-            commands.CreateRestaurant: getattr(self.restaurant_service, 'create_restaurant'),
-            commands.GetRestaurant: getattr(self.restaurant_service, 'find_by_id'),
-        }
+        # table は route (REST / Saga / EventBridge) ごとに最初の呼び出しで組み立てる
+        self._command_handler = None
         self.EVENT_HANDLER = {}
 
+    @property
+    def COMMAND_HANDLER(self) -> dict:
+        if self._command_handler is None:
+            from restaurant_layers.service import commands
+            self._command_handler = {
+                commands.CreateRestaurant: getattr(self.restaurant_service, 'create_restaurant'),
+                commands.GetRestaurant: getattr(self.restaurant_service, 'find_by_id'),
+            }
+        return self._command_handler
+
+    @metrics.instrument('commands')
     def commands_handler(self, cmd: commands.Command):
         try:
             method = self.COMMAND_HANDLER[cmd.__class__]
@@ -21,5 +37,5 @@ class Handler:
             return response
 
         except Exception as e:
-            print(str(e))
+            logger.exception('%s', e)
             raise e
@@ -192,10 +192,18 @@ class DeliveryEventFunctionConstructor(Construct):
         self.eventbus.eventbus.grant_put_events_to(function)
 
         # DynamoDB Streams
+        # 失敗したrecordのSequenceNumberを返し (batchItemFailures)、そこから再実行させる。
+        # retry_attempts回失敗したrecordは分割 (bisect) した上でDLQに送り、shardを先に進める。
+        stream_dead_letter_queue = aws_sqs.Queue(self, 'DeliveryEventFunctionStreamDeadLetterQueue')
         function.add_event_source(
             aws_lambda_event_sources.DynamoEventSource(
                 table=self.dynamodb_streams_source,
                 starting_position=aws_lambda.StartingPosition.LATEST,
+                report_batch_item_failures=True,
+                bisect_batch_on_error=True,
+                retry_attempts=3,
+                max_record_age=aws_cdk.Duration.hours(6),
+                on_failure=aws_lambda_event_sources.SqsDlq(stream_dead_letter_queue),
                 # filters=[{"event_name": aws_lambda.FilterRule.is_equal("INSERT")}]
             )
         )
@@ -126,6 +126,7 @@ class OrderEventFunctionConstructor(Construct):
                 'STATEMACHINE_ARN_FOR_CREATE_ORDER_SAGA': self.state_machine_for_create_order_saga.state_machine_arn,
                 'STATEMACHINE_ARN_FOR_CANCEL_ORDER_SAGA': self.state_machine_for_cancel_order_saga.state_machine_arn,
                 'STATEMACHINE_ARN_FOR_REVISE_ORDER_SAGA': self.state_machine_for_revise_order_saga.state_machine_arn,
+                'SAGA_START_CONCURRENCY': '8',  # batch内の異なるOrderの saga開始を並行に行うthread数
                 'EVENT_BUS_NAME': self.eventbus_name,
                 'EVENT_SOURCE': self.event_source,
                 'EVENT_DETAIL_TYPE': self.event_detail_type,
@@ -137,10 +138,18 @@ class OrderEventFunctionConstructor(Construct):
         self.eventbus.eventbus.grant_put_events_to(function)
 
         # DynamoDB Streams
+        # 失敗したrecordのSequenceNumberを返し (batchItemFailures)、そこから再実行させる。
+        # retry_attempts回失敗したrecordは分割 (bisect) した上でDLQに送り、shardを先に進める。
+        stream_dead_letter_queue = aws_sqs.Queue(self, 'OrderEventFunctionStreamDeadLetterQueue')
         function.add_event_source(
             aws_lambda_event_sources.DynamoEventSource(
                 table=self.dynamodb_streams_source,
                 starting_position=aws_lambda.StartingPosition.LATEST,
+                report_batch_item_failures=True,
+                bisect_batch_on_error=True,
+                retry_attempts=3,
+                max_record_age=aws_cdk.Duration.hours(6),
+                on_failure=aws_lambda_event_sources.SqsDlq(stream_dead_letter_queue),
                 # filters=[{"event_name": aws_lambda.FilterRule.is_equal("INSERT")}]
             )
         )
@@ -3,6 +3,7 @@ from constructs import Construct
 from aws_cdk import Duration
 from aws_cdk import aws_stepfunctions
 from aws_cdk import aws_stepfunctions_tasks
+from constructors.order import stepfunctions_saga_options
 
 
 """
@@ -401,7 +402,8 @@ class CancelOrderSagaStepFunctions(Construct):
             state_machine_name='CancelOrderSaga',
             definition=self.cancel_order_definition(),
             timeout=Duration.minutes(3),
-            tracing_enabled=True)
+            tracing_enabled=True,
+            **stepfunctions_saga_options.state_machine_options(self, 'CancelOrderSaga', self.props))
         return state_machine
 
     # -------------------------------------------------------
@@ -3,6 +3,7 @@ from constructs import Construct
 from aws_cdk import Duration
 from aws_cdk import aws_stepfunctions
 from aws_cdk import aws_stepfunctions_tasks
+from constructors.order import stepfunctions_saga_options
 
 
 """
@@ -74,6 +75,9 @@ class CreateOrderSagaStepFunctions(Construct):
     def __init__(self, scope: Construct, id: str, props: dict) -> None:
         super().__init__(scope, id)
         self.props = props
+        # validate_consumer と create_ticket を Parallel state で実行する
+        self.parallel_validate_consumer_and_create_ticket = props.get(
+                                                'parallel_validate_consumer_and_create_ticket', False)
 
         # ------------------------------------------------------
         # Saga 参加 function
@@ -131,13 +135,17 @@ class CreateOrderSagaStepFunctions(Construct):
             state_machine_name='CreateOrderSaga',
             definition=self.create_order_definition(),
             timeout=Duration.minutes(3),
-            tracing_enabled=True)
+            tracing_enabled=True,
+            **stepfunctions_saga_options.state_machine_options(self, 'CreateOrderSaga', self.props))
         return state_machine
 
     # -------------------------------------------------------
     # task definition
     # -------------------------------------------------------
     def create_order_definition(self):
+        if self.parallel_validate_consumer_and_create_ticket:
+            return self.parallel_create_order_definition()
+
         definition = \
             self.validate_consumer_task\
                 .next(self.create_ticket_task)\
@@ -146,6 +154,24 @@ class CreateOrderSagaStepFunctions(Construct):
                 .next(self.approve_order_task)
         return definition
 
+    def parallel_create_order_definition(self):
+        # validate_consumer と create_ticket は独立しているので並行に実行する。
+        # validate_consumer の失敗で create_ticket の branch を中断すると、実行中の Lambda が
+        # 後から Ticket を作りうるので、両方の branch の完了を待ってから補償トランザクションを行う。
+        is_consumer_validated = aws_stepfunctions.Choice(self, 'IsConsumerValidated')
+        is_consumer_validated.when(
+            aws_stepfunctions.Condition.is_present('$.validate_consumer_result.Error'),
+            self.cancel_create_ticket_task)  # cancel_create_ticket -> reject_order
+        is_consumer_validated.otherwise(
+            self.authorize_card_task
+                .next(self.confirm_create_ticket_task)
+                .next(self.approve_order_task))
+
+        definition = \
+            self.task_validate_consumer_and_create_ticket()\
+                .next(is_consumer_validated)
+        return definition
+
     # 補償トランザクション definition
     def reject_order_compensation_transaction_definition(self):
         # approve_consumerが失敗したときの補償トランザクション
@@ -182,12 +208,33 @@ class CreateOrderSagaStepFunctions(Construct):
             result_path='$.validate_consumer_result',
             output_path='$')
 
+        if self.parallel_validate_consumer_and_create_ticket:
+            # Parallel の branch は失敗を結果として返して終わり、IsConsumerValidated で補償する
+            task.add_catch(aws_stepfunctions.Pass(self, 'ConsumerValidationFailed'),
+                           errors=['ConsumerVerificationFailedException',
+                                   'ConsumerNotFoundException'],
+                           result_path='$.validate_consumer_result')
+            return task
+
         task.add_catch(self.reject_order_compensation_transaction_definition(),
                        errors=['ConsumerVerificationFailedException',
                                'ConsumerNotFoundException'],
                        result_path='$.validate_consumer_result')  # 注意: $にするとinputが上書きされる。
         return task
 
+    def task_validate_consumer_and_create_ticket(self):
+        parallel = aws_stepfunctions.Parallel(
+            self,
+            'ValidateConsumerAndCreateTicket',
+            # 各branchの出力 (input + validate_consumer_result / create_ticket_result) を1つにする
+            result_selector={
+                'input.$': 'States.JsonMerge($[0], $[1], false)'
+            },
+            output_path='$.input')
+        parallel.branch(self.validate_consumer_task)
+        parallel.branch(self.create_ticket_task)
+        return parallel
+
     def task_reject_order(self):
         # ------------------------ payload ----------------------------
         payload = aws_stepfunctions.TaskInput.from_object({
@@ -0,0 +1,44 @@
+import aws_cdk
+from constructs import Construct
+from aws_cdk import aws_logs
+from aws_cdk import aws_stepfunctions
+
+
+"""
+Saga State Machine の option (props)
+
+    'state_machine_type': 'STANDARD' (default) | 'EXPRESS'
+        EXPRESS は実行履歴を CloudWatch Logs (level: ALL, execution dataを含む) に出力する。
+        注: EXPRESS の start_execution は name (ORDER@{order_id}@EVENTID@{event_id}) で
+            重複排除されない。DynamoDB Streams recordの再実行で同じsagaが2回実行されうるので、
+            saga 参加 function の冪等性が前提になる。
+    'parallel_validate_consumer_and_create_ticket': False (default) | True
+        CreateOrderSaga の validate_consumer と create_ticket を Parallel state で実行する。
+"""
+
+STANDARD = 'STANDARD'
+EXPRESS = 'EXPRESS'
+
+
+def state_machine_options(scope: Construct, state_machine_name: str, props: dict) -> dict:
+    """ aws_stepfunctions.StateMachine() に追加する引数 """
+    state_machine_type = props.get('state_machine_type') or STANDARD
+    if state_machine_type == STANDARD:
+        return {}  # 既存の State Machine の template を変えない
+
+    if state_machine_type == EXPRESS:
+        log_group = aws_logs.LogGroup(
+            scope,
+            f'{state_machine_name}LogGroup',
+            log_group_name=f'/aws/vendedlogs/states/{state_machine_name}',
+            retention=aws_logs.RetentionDays.ONE_MONTH,
+            removal_policy=aws_cdk.RemovalPolicy.DESTROY)
+        return {
+            'state_machine_type': aws_stepfunctions.StateMachineType.EXPRESS,
+            'logs': aws_stepfunctions.LogOptions(
+                destination=log_group,
+                level=aws_stepfunctions.LogLevel.ALL,
+                include_execution_data=True),
+        }
+
+    raise ValueError(f'unsupported state_machine_type: {state_machine_type}')
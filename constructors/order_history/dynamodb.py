@@ -38,4 +38,15 @@ class OrderHistoryTableConstructor(Construct):
                                          # write_capacity=1  PAY_PER_REQUESTなので指定できない
                                          )
 
+        # GET /orders?status= : consumer_order_state = {consumer_id}#{order_state}
+        table.add_global_secondary_index(index_name='OrderHistoryByConsumerOrderState',
+                                         partition_key=aws_dynamodb.Attribute(
+                                                        name='consumer_order_state',
+                                                        type=aws_dynamodb.AttributeType.STRING),
+                                         sort_key=aws_dynamodb.Attribute(
+                                                        name='creation_date',
+                                                        type=aws_dynamodb.AttributeType.STRING),
+                                         projection_type=aws_dynamodb.ProjectionType.ALL,
+                                         )
+
         return table
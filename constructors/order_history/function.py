@@ -6,6 +6,9 @@ from aws_cdk import aws_events_targets
 from aws_cdk import aws_sqs
 from aws_cdk import aws_lambda_event_sources
 from aws_cdk import aws_sam
+from aws_cdk import aws_secretsmanager
+
+FUNCTION_TIMEOUT_SECONDS = 30
 
 
 class OrderHistoryFunctionConstructor(Construct):
@@ -26,22 +29,60 @@ class OrderHistoryFunctionConstructor(Construct):
             handler='lambda_function.lambda_handler',
             code=aws_lambda.Code.from_asset('application-food_delivery'
                                             '/order_history_service/order_history_function'),
+            timeout=aws_cdk.Duration.seconds(FUNCTION_TIMEOUT_SECONDS),  # SQS の batch (最大100 event)
             tracing=aws_lambda.Tracing.ACTIVE,  # for X-Ray
             layers=[self.lambda_powertools()],  # for X-Ray SDK
             environment={
                 'DYNAMODB_TABLE_NAME': self.order_history_table.table_name,
+                'ORDER_HISTORY_PAGE_TOKEN_KEY': self.page_token_key(),
             }
         )
         # function grant
         self.order_history_table.table.grant_read_write_data(order_history_function)
 
         # add EventBus
-        self.add_order_event_bus_target(order_history_function)
-        self.add_delivery_event_bus_target(order_history_function)
+        # Order / Kitchen / Delivery の event は SQS に貯め、batch (最大100 event) で Lambda を起動する。
+        # order 毎に event をまとめて書き込むので、起動の回数と WCU が減る。
+        event_queue = self.create_event_queue()
+        self.add_order_event_bus_target(event_queue)
+        self.add_kitchen_event_bus_target(event_queue)
+        self.add_delivery_event_bus_target(event_queue)
+        order_history_function.add_event_source(
+            aws_lambda_event_sources.SqsEventSource(
+                event_queue,
+                batch_size=100,
+                max_batching_window=aws_cdk.Duration.seconds(5),
+                report_batch_item_failures=True))  # 失敗した order の message だけを再試行する
 
         return order_history_function
 
-    def add_order_event_bus_target(self, lambda_function):
+    def page_token_key(self) -> str:
+        """
+        GET /orders の page token の署名の key
+            context (order_history_page_token_key) が無い時は Secrets Manager に生成した値を使う。
+            (deploy 時に dynamic reference で解決するので、template と repository には値が残らない)
+        """
+        if self.props.get('page_token_key'):
+            return self.props['page_token_key']
+        secret = aws_secretsmanager.Secret(
+            self,
+            'OrderHistoryPageTokenKey',
+            description='HMAC key of the GET /orders page token',
+            generate_secret_string=aws_secretsmanager.SecretStringGenerator(
+                password_length=64, exclude_punctuation=True))
+        return secret.secret_value.unsafe_unwrap()
+
+    def create_event_queue(self) -> aws_sqs.Queue:
+        dead_letter_queue = aws_sqs.Queue(self, 'OrderHistoryEventDeadLetterQueue')
+        return aws_sqs.Queue(
+            self,
+            'OrderHistoryEventQueue',
+            # Lambda の timeout の6倍 (AWS の推奨)
+            visibility_timeout=aws_cdk.Duration.seconds(FUNCTION_TIMEOUT_SECONDS * 6),
+            dead_letter_queue=aws_sqs.DeadLetterQueue(max_receive_count=5, queue=dead_letter_queue),
+        )
+
+    def add_order_event_bus_target(self, event_queue):
         order_service_eventbus_arn = aws_cdk.Fn.import_value('OrderServiceEventBusARN')
         order_eventbus = aws_events.EventBus.from_event_bus_arn(
             self,
@@ -61,18 +102,52 @@ class OrderHistoryFunctionConstructor(Construct):
             enabled=True,
         )
 
+        # SQS に送れなかった event
         dead_letter_queue = aws_sqs.Queue(self, 'OrderHistoryOrderCreatedEventDeadLetterQueue')
 
         order_history_service_order_event_rule.add_target(
-                                            aws_events_targets.LambdaFunction(
-                                                lambda_function,
+                                            aws_events_targets.SqsQueue(
+                                                event_queue,
+                                                dead_letter_queue=dead_letter_queue,
+                                                max_event_age=aws_cdk.Duration.hours(2),
+                                                retry_attempts=2))
+
+    def add_kitchen_event_bus_target(self, event_queue):
+        kitchen_service_eventbus_arn = aws_cdk.Fn.import_value('KitchenServiceTicketEventBusARN')
+        kitchen_eventbus = aws_events.EventBus.from_event_bus_arn(
+            self,
+            'KitchenServiceTicketEventBus',
+            event_bus_arn=kitchen_service_eventbus_arn
+        )
+        order_history_service_kitchen_event_rule = aws_events.Rule(
+            self,
+            'OrderHistoryServiceKitchenEventRule',
+            rule_name='OrderHistoryServiceKitchenEventRule',
+            description='Kitchen Service Events',
+            event_bus=kitchen_eventbus,
+            event_pattern=aws_events.EventPattern(
+                source=['com.ticket.accepted'],
+                detail_type=['TicketAccepted'],
+                # Kitchen Service は全ての Ticket の event を同じ detail-type で publish する。
+                # projection.PROJECTIONS の event だけを受け取る (TicketCreated は受け取らない)
+                detail={'event_type': ['TicketAccepted', 'TicketCancelled']},
+            ),
+            enabled=True,
+        )
+
+        # SQS に送れなかった event
+        dead_letter_queue = aws_sqs.Queue(self, 'OrderHistoryKitchenEventDeadLetterQueue')
+
+        order_history_service_kitchen_event_rule.add_target(
+                                            aws_events_targets.SqsQueue(
+                                                event_queue,
                                                 dead_letter_queue=dead_letter_queue,
                                                 max_event_age=aws_cdk.Duration.hours(2),
                                                 retry_attempts=2))
 
     # Todo: ここから 2023.01.16
     #  DeliveryServiceからEventを受け取る
-    def add_delivery_event_bus_target(self, lambda_function):
+    def add_delivery_event_bus_target(self, event_queue):
 
         delivery_service_eventbus_arn = aws_cdk.Fn.import_value('DeliveryServiceEventBusARN')
         delivery_eventbus = aws_events.EventBus.from_event_bus_arn(
@@ -93,11 +168,12 @@ class OrderHistoryFunctionConstructor(Construct):
             enabled=True,
         )
 
+        # SQS に送れなかった event
         dead_letter_queue = aws_sqs.Queue(self, 'OrderHistoryDeliveryEventDeadLetterQueue')
 
         order_history_service_delivery_event_rule.add_target(
-                                            aws_events_targets.LambdaFunction(
-                                                lambda_function,
+                                            aws_events_targets.SqsQueue(
+                                                event_queue,
                                                 dead_letter_queue=dead_letter_queue,
                                                 max_event_age=aws_cdk.Duration.hours(2),
                                                 retry_attempts=2))
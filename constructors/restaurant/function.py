@@ -1,5 +1,7 @@
+import aws_cdk
 from constructs import Construct
 from aws_cdk import aws_lambda
+from aws_cdk import aws_sqs
 from aws_cdk import aws_lambda_event_sources
 from aws_cdk import aws_sam
 
@@ -86,10 +88,18 @@ class RestaurantEventFunctionConstructor(Construct):
         )
         self.eventbus.eventbus.grant_put_events_to(function)
 
+        # 失敗したrecordのSequenceNumberを返し (batchItemFailures)、そこから再実行させる。
+        # retry_attempts回失敗したrecordは分割 (bisect) した上でDLQに送り、shardを先に進める。
+        stream_dead_letter_queue = aws_sqs.Queue(self, 'RestaurantEventFunctionStreamDeadLetterQueue')
         function.add_event_source(
             aws_lambda_event_sources.DynamoEventSource(
                 table=self.props.get('dynamodb_streams_source'),
                 starting_position=aws_lambda.StartingPosition.LATEST,
+                report_batch_item_failures=True,
+                bisect_batch_on_error=True,
+                retry_attempts=3,
+                max_record_age=aws_cdk.Duration.hours(6),
+                on_failure=aws_lambda_event_sources.SqsDlq(stream_dead_letter_queue),
                 # filters=[{"event_name": aws_lambda.FilterRule.is_equal("INSERT")}]
             )
         )
@@ -0,0 +1,397 @@
+"""
+ASL (Amazon States Language) Interpreter
+    CDK が生成した State Machine の definition (dict) を、AWSにdeployせずにprocessの中で実行する。
+
+        execution = asl.Execution(definition, invoke_task)
+        output = execution.run({'order_id': '...', 'order_details': {...}})
+        execution.steps            # 実行した state (並行に実行した Parallel branch の state を含む)
+        execution.state_transitions
+
+    invoke_task(resource, parameters) -> result
+        Task state の Resource と (Parameters を適用した) input で呼び出される。
+        失敗は StatesError(error, cause) を raise する。 (それ以外の exception は class名を error にする)
+        Lambda の invoke は lambda_invoke() で作る。
+
+    対応している state
+        Task (Retry, Catch), Pass, Choice, Parallel, Wait, Succeed, Fail
+    input / output
+        InputPath, Parameters, ResultSelector, ResultPath, OutputPath
+        JsonPath は $, $.a.b, $[0], $['a'] と Context Object ($$) のみ。
+        Intrinsic function は States.JsonMerge / Format / StringToJson / JsonToString / Array のみ。
+    Parallel
+        branch は thread で並行に実行する。どれかの branch が失敗すると Parallel も失敗するが、
+        実行中の他の branch は中断しない。 (Step Functions では中断される)
+"""
+import copy
+import dataclasses
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+_PATH_TOKEN = re.compile(r"\.([^.\[\]]+)|\[(\d+)\]|\['([^']*)'\]")
+_INTRINSIC = re.compile(r'^(States\.\w+)\((.*)\)$', re.DOTALL)
+
+
+class StatesError(Exception):
+    def __init__(self, error: str, cause: str = ''):
+        super().__init__(f'{error}: {cause}')
+        self.error = error
+        self.cause = cause
+
+
+@dataclasses.dataclass
+class Step:
+    name: str
+    state_type: str
+    elapsed: float                # 秒 (Parallel は branch の実行時間を含む)
+    error: Optional[str] = None   # Catchした/Retryした error を含む
+
+
+# ------------------------------ JsonPath ------------------------------
+def _tokens(path: str) -> list:
+    tokens = []
+    position = 0
+    while position < len(path):
+        m = _PATH_TOKEN.match(path, position)
+        if m is None:
+            raise StatesError('States.Runtime', f'unsupported JsonPath: {path}')
+        name, index, quoted = m.groups()
+        tokens.append(int(index) if index is not None else (name if name is not None else quoted))
+        position = m.end()
+    return tokens
+
+
+def get_path(data, path: str, context: Optional[dict] = None):
+    if path.startswith('$$'):
+        data, path = context or {}, path[1:]
+    if not path.startswith('$'):
+        raise StatesError('States.Runtime', f'invalid JsonPath: {path}')
+    for token in _tokens(path[1:]):
+        try:
+            data = data[token]
+        except (KeyError, IndexError, TypeError):
+            raise StatesError('States.Runtime', f'JsonPath {path} could not be found in the input')
+    return data
+
+
+def set_path(data, path: str, value):
+    """ ResultPath: dataのコピーのpathにvalueを設定して返す """
+    if path == '$':
+        return value
+    tokens = _tokens(path[1:])
+    root = copy.copy(data) if isinstance(data, dict) else {}
+    node = root
+    for token in tokens[:-1]:
+        child = node.get(token)
+        node[token] = copy.copy(child) if isinstance(child, dict) else {}
+        node = node[token]
+    node[tokens[-1]] = value
+    return root
+
+
+def has_path(data, path: str) -> bool:
+    try:
+        get_path(data, path)
+        return True
+    except StatesError:
+        return False
+
+
+# ------------------------------ Parameters / ResultSelector ------------------------------
+def _split_arguments(arguments: str) -> list[str]:
+    args, depth, quoted, current = [], 0, False, ''
+    for i, c in enumerate(arguments):
+        if c == "'" and (i == 0 or arguments[i - 1] != '\\'):
+            quoted = not quoted
+        elif not quoted and c == '(':
+            depth += 1
+        elif not quoted and c == ')':
+            depth -= 1
+        elif not quoted and depth == 0 and c == ',':
+            args.append(current.strip())
+            current = ''
+            continue
+        current += c
+    if current.strip():
+        args.append(current.strip())
+    return args
+
+
+def _argument(argument: str, data, context):
+    if argument.startswith("'"):
+        return argument[1:-1].replace("\\'", "'")
+    if argument.startswith('$'):
+        return get_path(data, argument, context)
+    if argument.startswith('States.'):
+        return _intrinsic(argument, data, context)
+    return json.loads(argument)  # number, true, false, null
+
+
+def _intrinsic(expression: str, data, context):
+    m = _INTRINSIC.match(expression)
+    if m is None:
+        raise StatesError('States.Runtime', f'unsupported expression: {expression}')
+    name = m.group(1)
+    args = [_argument(a, data, context) for a in _split_arguments(m.group(2))]
+    if name == 'States.JsonMerge':
+        left, right, deep = args
+        if deep:
+            raise StatesError('States.Runtime', 'States.JsonMerge: deep merge is not supported')
+        return {**left, **right}
+    if name == 'States.Format':
+        template, *values = args
+        parts = template.split('{}')
+        if len(parts) != len(values) + 1:
+            raise StatesError('States.Runtime', f'States.Format: {expression}')
+        formatted = parts[0]
+        for value, part in zip(values, parts[1:]):
+            formatted += (value if isinstance(value, str) else json.dumps(value)) + part
+        return formatted
+    if name == 'States.StringToJson':
+        return json.loads(args[0])
+    if name == 'States.JsonToString':
+        return json.dumps(args[0], separators=(',', ':'))
+    if name == 'States.Array':
+        return list(args)
+    raise StatesError('States.Runtime', f'unsupported intrinsic function: {name}')
+
+
+def render(template, data, context: Optional[dict] = None):
+    """ Parameters / ResultSelector: '.$' で終わるkeyの値を JsonPath / intrinsic function で置き換える """
+    if isinstance(template, dict):
+        rendered = {}
+        for key, value in template.items():
+            if key.endswith('.$') and isinstance(value, str):
+                rendered[key[:-2]] = _argument(value, data, context)
+            else:
+                rendered[key] = render(value, data, context)
+        return rendered
+    if isinstance(template, list):
+        return [render(v, data, context) for v in template]
+    return template
+
+
+# ------------------------------ Choice ------------------------------
+_COMPARISONS = {
+    'StringEquals': lambda a, b: isinstance(a, str) and a == b,
+    'StringLessThan': lambda a, b: isinstance(a, str) and a < b,
+    'StringGreaterThan': lambda a, b: isinstance(a, str) and a > b,
+    'NumericEquals': lambda a, b: _is_number(a) and a == b,
+    'NumericLessThan': lambda a, b: _is_number(a) and a < b,
+    'NumericLessThanEquals': lambda a, b: _is_number(a) and a <= b,
+    'NumericGreaterThan': lambda a, b: _is_number(a) and a > b,
+    'NumericGreaterThanEquals': lambda a, b: _is_number(a) and a >= b,
+    'BooleanEquals': lambda a, b: isinstance(a, bool) and a == b,
+}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def evaluate(rule: dict, data) -> bool:
+    if 'And' in rule:
+        return all(evaluate(r, data) for r in rule['And'])
+    if 'Or' in rule:
+        return any(evaluate(r, data) for r in rule['Or'])
+    if 'Not' in rule:
+        return not evaluate(rule['Not'], data)
+
+    variable = rule['Variable']
+    if 'IsPresent' in rule:
+        return has_path(data, variable) == rule['IsPresent']
+    value = get_path(data, variable)
+    if 'IsNull' in rule:
+        return (value is None) == rule['IsNull']
+    for operator, compare in _COMPARISONS.items():
+        if operator in rule:
+            return compare(value, rule[operator])
+        if operator + 'Path' in rule:
+            return compare(value, get_path(data, rule[operator + 'Path']))
+    raise StatesError('States.Runtime', f'unsupported Choice rule: {rule}')
+
+
+# ------------------------------ Execution ------------------------------
+def _matches(error_equals: list[str], error: str) -> bool:
+    return ('States.ALL' in error_equals or error in error_equals
+            or ('States.TaskFailed' in error_equals and error != 'States.Timeout'))
+
+
+class Execution:
+
+    def __init__(self, definition: dict, invoke_task: Callable[[str, dict], Any],
+                 sleep: Callable[[float], None] = time.sleep, max_workers: int = 10,
+                 name: str = 'local'):
+        self.definition = definition
+        self.invoke_task = invoke_task
+        self.sleep = sleep
+        self.max_workers = max_workers
+        self.context = {'Execution': {'Id': f'arn:aws:states:local:execution:{name}', 'Name': name},
+                        'StateMachine': {'Id': 'arn:aws:states:local:stateMachine'}}
+        self.steps: list[Step] = []
+        self._lock = threading.Lock()
+
+    @property
+    def state_transitions(self) -> int:
+        return len(self.steps)
+
+    def run(self, execution_input: dict):
+        self.context['Execution']['Input'] = execution_input
+        return self._run_states(self.definition, execution_input)
+
+    def _record(self, step: Step):
+        with self._lock:
+            self.steps.append(step)
+
+    def _run_states(self, machine: dict, data):
+        states = machine['States']
+        name = machine['StartAt']
+        while True:
+            state = states[name]
+            started = time.perf_counter()
+            error = None
+            try:
+                data, next_name, error = self._run_state(name, state, data)
+            except StatesError as e:
+                self._record(Step(name, state['Type'], time.perf_counter() - started, e.error))
+                raise
+            self._record(Step(name, state['Type'], time.perf_counter() - started, error))
+            if next_name is None:
+                return data
+            name = next_name
+
+    def _run_state(self, name: str, state: dict, data) -> tuple:
+        """ (output, 次のstate名 (終了はNone), CatchしたerrorかNone) """
+        state_type = state['Type']
+        if state_type == 'Succeed':
+            return self._output(state, self._input(state, data)), None, None
+        if state_type == 'Fail':
+            raise StatesError(state.get('Error', 'States.Fail'), state.get('Cause', ''))
+        if state_type == 'Choice':
+            effective_input = self._input(state, data)
+            for rule in state['Choices']:
+                if evaluate(rule, effective_input):
+                    return self._output(state, effective_input), rule['Next'], None
+            if 'Default' not in state:
+                raise StatesError('States.NoChoiceMatched', f'{name}: no Choice rule matched')
+            return self._output(state, effective_input), state['Default'], None
+        if state_type == 'Wait':
+            self.sleep(state.get('Seconds', 0))
+            return self._output(state, self._input(state, data)), self._next(state), None
+        if state_type == 'Pass':
+            effective_input = self._parameters(state, self._input(state, data))
+            result = state.get('Result', effective_input)
+            return self._output(state, self._result(state, data, result)), self._next(state), None
+        if state_type in ('Task', 'Parallel'):
+            return self._run_with_retry_and_catch(name, state, data)
+        raise StatesError('States.Runtime', f'unsupported state type: {state_type}')
+
+    def _run_with_retry_and_catch(self, name, state, data) -> tuple:
+        attempts = {}  # retrier index -> 回数
+        while True:
+            started = time.perf_counter()
+            try:
+                effective_input = self._parameters(state, self._input(state, data))
+                if state['Type'] == 'Task':
+                    result = self._invoke(state['Resource'], effective_input)
+                else:
+                    result = self._run_parallel(state, effective_input)
+                if 'ResultSelector' in state:
+                    result = render(state['ResultSelector'], result, self.context)
+                return self._output(state, self._result(state, data, result)), self._next(state), None
+            except StatesError as e:
+                retry = self._retry_interval(state, e.error, attempts)
+                if retry is not None:
+                    self._record(Step(name, state['Type'], time.perf_counter() - started, e.error))
+                    self.sleep(retry)
+                    continue
+                for catcher in state.get('Catch', []):
+                    if _matches(catcher['ErrorEquals'], e.error):
+                        result_path = catcher.get('ResultPath', '$')
+                        error_output = {'Error': e.error, 'Cause': e.cause}
+                        output = data if result_path is None else set_path(data, result_path, error_output)
+                        return output, catcher['Next'], e.error
+                raise
+
+    def _retry_interval(self, state, error, attempts) -> Optional[float]:
+        for i, retrier in enumerate(state.get('Retry', [])):
+            if _matches(retrier['ErrorEquals'], error):
+                count = attempts.get(i, 0)
+                if count >= retrier.get('MaxAttempts', 3):
+                    return None
+                attempts[i] = count + 1
+                return retrier.get('IntervalSeconds', 1) * retrier.get('BackoffRate', 2.0) ** count
+        return None
+
+    def _invoke(self, resource, parameters):
+        try:
+            return self.invoke_task(resource, parameters)
+        except StatesError:
+            raise
+        except Exception as e:
+            raise StatesError(type(e).__name__, str(e))
+
+    def _run_parallel(self, state, effective_input) -> list:
+        branches = state['Branches']
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(branches))) as executor:
+            futures = [executor.submit(self._run_states, branch, copy.deepcopy(effective_input))
+                       for branch in branches]
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except StatesError:
+                    raise
+                except Exception as e:
+                    raise StatesError(type(e).__name__, str(e))
+        return results
+
+    # ---- input / output processing ----
+    def _input(self, state, data):
+        input_path = state.get('InputPath', '$')
+        return {} if input_path is None else get_path(data, input_path, self.context)
+
+    def _parameters(self, state, effective_input):
+        if 'Parameters' not in state:
+            return effective_input
+        return render(state['Parameters'], effective_input, self.context)
+
+    def _result(self, state, data, result):
+        result_path = state.get('ResultPath', '$')
+        return data if result_path is None else set_path(data, result_path, result)
+
+    def _output(self, state, data):
+        output_path = state.get('OutputPath', '$')
+        return {} if output_path is None else get_path(data, output_path, self.context)
+
+    @staticmethod
+    def _next(state) -> Optional[str]:
+        return None if state.get('End') else state['Next']
+
+
+# ------------------------------ Lambda ------------------------------
+def lambda_invoke(functions: dict[str, Callable[[dict], Any]]) -> Callable[[str, dict], Any]:
+    """
+    'arn:...:states:::lambda:invoke' の invoke_task
+        functions: FunctionName -> function(payload) (lambda_handler(event, context) を包んだもの)
+        FunctionName は synth した definition の token 名 (local_saga.synth 参照)
+    """
+    def invoke_task(resource: str, parameters: dict):
+        if not resource.endswith(':states:::lambda:invoke'):
+            raise StatesError('States.Runtime', f'unsupported resource: {resource}')
+        function_name = parameters['FunctionName']
+        function = functions.get(function_name)
+        if function is None:
+            raise StatesError('Lambda.ResourceNotFoundException', f'Function not found: {function_name}')
+        try:
+            payload = function(copy.deepcopy(parameters.get('Payload')))
+        except Exception as e:
+            # Lambda の errorType は exception の class名
+            raise StatesError(type(e).__name__,
+                              json.dumps({'errorMessage': str(e), 'errorType': type(e).__name__}))
+        return {'ExecutedVersion': '$LATEST', 'Payload': payload, 'StatusCode': 200}
+
+    return invoke_task
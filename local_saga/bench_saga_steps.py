@@ -0,0 +1,85 @@
+"""
+Order Saga step count / latency benchmark
+    CDKで synth した CreateOrderSaga の ASL を local_saga.asl で実行し、
+    逐次 (default) と parallel_validate_consumer_and_create_ticket=True を比較する。
+    saga 参加 function は time.sleep() で latency を模擬する。
+
+    state transitions: 実行した state の数 (STANDARD workflow の課金単位)
+    elapsed:           execution の wall-clock (EXPRESS workflow は実行時間で課金される)
+
+    cd <repository root>
+    python -m local_saga.bench_saga_steps
+"""
+import statistics
+import time
+from local_saga import asl
+from local_saga import runner
+from local_saga import synth
+
+RUNS = 20
+FUNCTION_LATENCY = {  # action -> 秒
+    'VALIDATE_CONSUMER': 0.04,
+    'CREATE_TICKET': 0.06,
+    'AUTHORIZE_CARD': 0.05,
+    'CONFIRM_CREATE_TICKET': 0.03,
+    'APPROVE_ORDER': 0.03,
+    'CANCEL_CREATE_TICKET': 0.03,
+    'REJECT_ORDER': 0.03,
+}
+SAGA_INPUT = {
+    'order_id': '8a4347b048034e80bfa45a5d70c8f301',
+    'order_details': {
+        'consumer_id': 4,
+        'restaurant_id': 1,
+        'order_line_items': [{'menu_id': '000001', 'quantity': 3}],
+        'order_total': {'currency': 'JPY', 'value': 2400},
+    },
+}
+
+
+class ConsumerVerificationFailedException(Exception):
+    pass
+
+
+def saga_function(consumer_valid):
+    def function(payload):
+        action = runner.task_action(payload)
+        time.sleep(FUNCTION_LATENCY[action])
+        if action == 'VALIDATE_CONSUMER' and not consumer_valid:
+            raise ConsumerVerificationFailedException('consumer_id: 4')
+        if action == 'CREATE_TICKET':
+            return {'ticket_id': payload['order_id']}
+        return True
+    return function
+
+
+def run(definition, consumer_valid):
+    function = saga_function(consumer_valid)
+    invoke_task = asl.lambda_invoke({name: function for name in
+                                     [synth.ORDER_SERVICE_FUNCTION, 'ConsumerServiceFunctionARN',
+                                      'KitchenServiceFunctionARN', 'AccountServiceFunctionARN']})
+    elapsed = []
+    for _ in range(RUNS):
+        execution = asl.Execution(definition, invoke_task, sleep=lambda seconds: None)
+        started = time.perf_counter()
+        execution.run(SAGA_INPUT)
+        elapsed.append(time.perf_counter() - started)
+    return execution.state_transitions, statistics.median(elapsed)
+
+
+def main():
+    sequential = synth.synthesize_order_sagas()['CreateOrderSaga']
+    parallel = synth.synthesize_order_sagas(
+        parallel_validate_consumer_and_create_ticket=True)['CreateOrderSaga']
+
+    print(f'runs: {RUNS}')
+    for path, consumer_valid in [('approved', True), ('consumer rejected', False)]:
+        before_steps, before_elapsed = run(sequential, consumer_valid)
+        after_steps, after_elapsed = run(parallel, consumer_valid)
+        print(f'CreateOrderSaga ({path:<17}) '
+              f'sequential: {before_steps:2d} transitions {before_elapsed * 1000:6.1f} ms  '
+              f'parallel: {after_steps:2d} transitions {after_elapsed * 1000:6.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,420 @@
+"""
+Order Saga local runner
+    synth した Order Saga (Create / Cancel / Revise) の ASL を local_saga.asl で実行し、
+    saga 参加 function として order / consumer / kitchen / account の lambda_handler を
+    in-process で呼ぶ。DynamoDB は moto (in-memory) か --endpoint-url (DynamoDB Local) を使う。
+
+    N個の saga を concurrency 個の thread で並行に実行し、以下を出力する。
+        step (state) 毎: 実行回数, error数, latency (p50 / p99), 1 invocation あたりの DynamoDB call数
+        全体:            throughput (sagas/s), execution latency, saga あたりの state transitions
+
+    saga の input は production と同じく OrderEvent table の event item から作る。
+    (order_domain_event_function の convert_to_python_obj() + JSONEncoder)
+    CancelOrderSaga / ReviseOrderSaga は事前に CreateOrderSaga で承認した order に対して実行する。
+
+    cd <repository root>
+    pip install -r requirements-dev.txt     # moto, aws-xray-sdk
+    python -m local_saga.runner --saga CreateOrderSaga --sagas 50 --concurrency 8 [--parallel]
+"""
+import argparse
+import collections
+import contextlib
+import dataclasses
+import decimal
+import importlib.util
+import json
+import math
+import os
+import pathlib
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+import boto3
+from local_saga import asl
+
+APPLICATION_DIR = pathlib.Path(__file__).resolve().parent.parent / 'application-food_delivery'
+
+SAGA_FUNCTIONS = {  # FunctionName (local_saga.synth の token名) -> lambda_function.py のdirectory
+    'ORDER_SERVICE_FUNCTION': 'order_service/order_function',
+    'ConsumerServiceFunctionARN': 'consumer_service/consumer_function',
+    'KitchenServiceFunctionARN': 'kitchen_service/kitchen_function',
+    'AccountServiceFunctionARN': 'account_service/account_function',
+}
+ORDER_DOMAIN_EVENT_FUNCTION = 'order_service/order_domain_event_function'
+
+TABLES = [  # 各 repository の default の table名 (PK, SK)
+    'OrderService', 'OrderEvent', 'Order-RestaurantReplica',
+    'ConsumerService', 'ConsumerEvent',
+    'KitchenService', 'KitchenEvent', 'Kitchen-RestaurantReplica',
+    'AccountService', 'AccountEvent',
+]
+TABLE_NAME_ENVIRONMENT = ['DYNAMODB_TABLE_NAME', 'DYNAMODB_EVENT_TABLE_NAME',
+                          'DYNAMODB_RESTAURANT_REPLICA_TABLE_NAME']
+
+SAGA_STARTED_BY = {  # State Machine名 -> saga を開始する Order domain event
+    'CreateOrderSaga': 'OrderCreated',
+    'CancelOrderSaga': 'CancelOrderSagaRequested',
+    'ReviseOrderSaga': 'ReviseOrderSagaRequested',
+}
+
+REGION = 'ap-northeast-1'
+CONSUMERS = 10
+RESTAURANT_ID = 1
+DELIVERY_INFORMATION = {
+    'delivery_time': '2022-11-30T05:00:30.001000Z',
+    'delivery_address': {'street1': '9 Amazing View', 'street2': 'Soi 8',
+                         'city': 'Oakland', 'state': 'CA', 'zip': '94612'},
+}
+RESTAURANT_CREATED = {
+    'version': '0',
+    'id': '9c760233-cea2-6695-ceef-e81e049c39ff',
+    'detail-type': 'RestaurantCreated',
+    'source': 'com.restaurant.created',
+    'account': '123456789012',
+    'time': '2022-12-28T09:31:35Z',
+    'region': REGION,
+    'resources': [],
+    'detail': {
+        'event_id': 1,
+        'restaurant_id': RESTAURANT_ID,
+        'restaurant_address': {'zip': '94611', 'city': 'Oakland', 'street1': '1 Main Street',
+                               'street2': 'Unit 99', 'state': 'CA'},
+        'menu_items': [
+            {'price': {'currency': 'JPY', 'value': 800}, 'menu_name': 'Curry Rice', 'menu_id': '000001'},
+            {'price': {'currency': 'JPY', 'value': 1000}, 'menu_name': 'Hamburger', 'menu_id': '000002'},
+            {'price': {'currency': 'JPY', 'value': 700}, 'menu_name': 'Ramen', 'menu_id': '000003'},
+        ],
+        'restaurant_name': 'skylark',
+        'timestamp': '2022-12-28T09:31:33.650595Z',
+        'aggregate': 'RESTAURANT',
+        'event_type': 'RestaurantCreated',
+    },
+}
+
+
+def task_action(payload: dict) -> str:
+    """
+    payload の task_context から action を取り出す
+        TaskInput.from_object() を入れ子にした task_context は {"type": 1, "value": {...}} になる
+    """
+    task_context = payload['task_context']
+    return task_context.get('value', task_context)['action']
+
+
+def task_states(definition: dict) -> dict[str, str]:
+    """ action -> Task state名 (Parallel の branch を含む) """
+    states = {}
+    for name, state in definition['States'].items():
+        payload = state.get('Parameters', {}).get('Payload', {})
+        if state['Type'] == 'Task' and 'task_context' in payload:
+            states[task_action(payload)] = name
+        for branch in state.get('Branches', []):
+            states.update(task_states(branch))
+    return states
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)] if ordered else 0.0
+
+
+@dataclasses.dataclass
+class StepMetrics:
+    latencies: list = dataclasses.field(default_factory=list)  # state の実行時間 (秒)
+    errors: int = 0
+    invocations: int = 0      # lambda_handler の呼び出し回数
+    dynamodb_calls: int = 0
+
+
+class SagaMetrics:
+    """
+    step (state名) 毎の latency / DynamoDB call数 と execution 毎の elapsed を集計する
+        DynamoDB call は botocore の before-parameter-build.dynamodb event で数え、
+        その thread で実行中の lambda_handler の step に割り当てる。
+        (Parallel の branch は別 thread で実行されるので、thread local で区別できる)
+    """
+
+    def __init__(self):
+        self.steps: dict[str, StepMetrics] = collections.defaultdict(StepMetrics)
+        self.executions = []  # (elapsed, state_transitions, error)
+        self.unattributed_dynamodb_calls = 0  # saga 以外 (seed, scan) の call
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def register(self, session: boto3.Session):
+        # client は作成時に session の event handler を copy するので、client 作成前に登録する
+        session.events.register('before-parameter-build.dynamodb', self.count_dynamodb_call)
+
+    def count_dynamodb_call(self, **kwargs):
+        step = getattr(self._local, 'step', None)
+        with self._lock:
+            if step is None:
+                self.unattributed_dynamodb_calls += 1
+            else:
+                self.steps[step].dynamodb_calls += 1
+
+    @contextlib.contextmanager
+    def invocation(self, step: str):
+        self._local.step = step
+        try:
+            yield
+        finally:
+            self._local.step = None
+            with self._lock:
+                self.steps[step].invocations += 1
+
+    def add_execution(self, execution: asl.Execution, elapsed: float, error: Optional[str]):
+        with self._lock:
+            for step in execution.steps:
+                self.steps[step.name].latencies.append(step.elapsed)
+                if step.error:
+                    self.steps[step.name].errors += 1
+            self.executions.append((elapsed, execution.state_transitions, error))
+
+    def reset(self):
+        with self._lock:
+            self.steps.clear()
+            self.executions.clear()
+            self.unattributed_dynamodb_calls = 0
+
+    def report(self, saga_name: str, concurrency: int, wall_clock: float) -> str:
+        elapsed = [e[0] for e in self.executions]
+        failed = sum(1 for e in self.executions if e[2] is not None)
+        transitions = sum(e[1] for e in self.executions) / max(1, len(self.executions))
+        lines = [
+            f'{saga_name}  sagas: {len(self.executions)}  concurrency: {concurrency}  '
+            f'succeeded: {len(self.executions) - failed}  failed: {failed}',
+            f'throughput: {len(self.executions) / wall_clock:.1f} sagas/s  '
+            f'execution p50: {percentile(elapsed, 0.5) * 1000:.1f} ms  '
+            f'p99: {percentile(elapsed, 0.99) * 1000:.1f} ms  '
+            f'transitions/saga: {transitions:.1f}',
+            '',
+            f'{"step":<36} {"count":>6} {"errors":>6} {"p50 ms":>8} {"p99 ms":>8} {"DynamoDB calls":>15}',
+        ]
+        for name, step in self.steps.items():
+            calls = f'{step.dynamodb_calls / step.invocations:.1f}' if step.invocations else '-'
+            lines.append(f'{name:<36} {len(step.latencies):>6} {step.errors:>6} '
+                         f'{percentile(step.latencies, 0.5) * 1000:>8.1f} '
+                         f'{percentile(step.latencies, 0.99) * 1000:>8.1f} {calls:>15}')
+        return '\n'.join(lines)
+
+
+def _lambda_serializer(o):
+    # Lambda の python runtime と同じく Decimal は float で返す
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+def saga_function(lambda_handler: Callable, states: dict[str, str],
+                  metrics: SagaMetrics) -> Callable[[dict], object]:
+    """ lambda_handler(event, context) -> asl.lambda_invoke() の function(payload) """
+    def function(payload):
+        action = task_action(payload)
+        with metrics.invocation(states.get(action, action)):
+            response = lambda_handler(payload, None)
+        # Lambda の response は JSON で返る
+        return json.loads(json.dumps(response, default=_lambda_serializer))
+    return function
+
+
+def load_function(directory: str, module_name: str):
+    """ <directory>/lambda_function.py を module_name で import する """
+    path = APPLICATION_DIR / directory
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))  # layer package (order_layers 等) と domain event function の module
+    spec = importlib.util.spec_from_file_location(module_name, path / 'lambda_function.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def configure_environment():
+    for key in TABLE_NAME_ENVIRONMENT:
+        os.environ.pop(key, None)  # 各 repository の default の table名を使う
+    os.environ.setdefault('AWS_DEFAULT_REGION', REGION)
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    os.environ['AWS_XRAY_SDK_ENABLED'] = 'false'  # X-Ray daemon なしで patch_all() を通す
+
+
+@contextlib.contextmanager
+def dynamodb_backend(endpoint_url: Optional[str] = None):
+    if endpoint_url:
+        os.environ['AWS_ENDPOINT_URL_DYNAMODB'] = endpoint_url
+        yield
+        return
+    try:
+        import moto
+    except ImportError:
+        raise SystemExit('local_saga.runner: moto is required (pip install -r requirements-dev.txt) '
+                         'or use --endpoint-url for DynamoDB Local')
+    mock = getattr(moto, 'mock_aws', None) or moto.mock_dynamodb  # moto 5 / moto 4
+    with mock():
+        yield
+
+
+class LocalOrderSagas:
+    """
+    order / consumer / kitchen / account の lambda_handler を in-process で呼ぶ
+        data の登録は REST / EventBridge の invocation で行い、saga は State Machine の
+        definition を asl.Execution で実行する。
+    """
+
+    def __init__(self, metrics: SagaMetrics):
+        self.metrics = metrics
+        self.handlers = {name: load_function(directory, f'local_saga_{name.lower()}').lambda_handler
+                         for name, directory in SAGA_FUNCTIONS.items()}
+        self.domain_event = load_function(ORDER_DOMAIN_EVENT_FUNCTION, 'local_saga_order_domain_event')
+        self.dynamodb = boto3.client('dynamodb')
+
+    def create_tables(self):
+        for table_name in TABLES:
+            try:
+                self.dynamodb.create_table(
+                    TableName=table_name,
+                    KeySchema=[{'AttributeName': 'PK', 'KeyType': 'HASH'},
+                               {'AttributeName': 'SK', 'KeyType': 'RANGE'}],
+                    AttributeDefinitions=[{'AttributeName': 'PK', 'AttributeType': 'S'},
+                                          {'AttributeName': 'SK', 'AttributeType': 'S'}],
+                    BillingMode='PAY_PER_REQUEST')
+            except self.dynamodb.exceptions.ResourceInUseException:
+                pass  # DynamoDB Local に作成済み
+
+    # ---------------------------- seed ----------------------------
+    def rest(self, function_name: str, http_method: str, path: str, body: Optional[dict] = None):
+        event = {'httpMethod': http_method, 'path': path, 'pathParameters': None,
+                 'queryStringParameters': None, 'body': json.dumps(body or {})}
+        response = self.handlers[function_name](event, None)
+        if response['statusCode'] != 200:
+            raise RuntimeError(f'{http_method} {path}: {response}')
+        return json.loads(response['body'])['body']
+
+    def create_restaurant(self):
+        # RestaurantCreated は order と kitchen の Restaurant replica に届く
+        self.handlers['ORDER_SERVICE_FUNCTION'](RESTAURANT_CREATED, None)
+        self.handlers['KitchenServiceFunctionARN'](RESTAURANT_CREATED, None)
+
+    def create_consumer(self, index: int) -> int:
+        consumer = self.rest('ConsumerServiceFunctionARN', 'POST', '/consumers',
+                             {'name': {'first_name': 'Local', 'last_name': f'Saga{index}'}})
+        self.rest('AccountServiceFunctionARN', 'POST', '/accounts', {
+            'consumer_id': consumer['consumer_id'],
+            'card_information': {'card_number': '1234-5678-9012-3456',
+                                 'expiry_date': '2030-12-31T00:00:00.000000Z'}})
+        return consumer['consumer_id']
+
+    def create_order(self, consumer_id: int) -> str:
+        order = self.rest('ORDER_SERVICE_FUNCTION', 'POST', '/orders', {
+            'consumer_id': consumer_id,
+            'restaurant_id': RESTAURANT_ID,
+            'delivery_information': DELIVERY_INFORMATION,
+            'order_line_items': [{'menu_id': '000001', 'quantity': 3},
+                                 {'menu_id': '000002', 'quantity': 1}]})
+        return order['order_id']
+
+    def cancel_order(self, order_id: str):
+        self.rest('ORDER_SERVICE_FUNCTION', 'POST', f'/orders/{order_id}/cancel')
+
+    def revise_order(self, order_id: str):
+        self.rest('ORDER_SERVICE_FUNCTION', 'POST', f'/orders/{order_id}/revise', {
+            'delivery_information': DELIVERY_INFORMATION,
+            'revised_order_line_items': [{'menu_id': '000001', 'quantity': 1}]})
+
+    def saga_inputs(self, event_type: str, order_ids: list[str]) -> list[tuple[str, dict]]:
+        """ OrderEvent の event item -> (execution名, saga input) (order_domain_event_function と同じ変換) """
+        wanted = set(order_ids)
+        inputs = []
+        for page in self.dynamodb.get_paginator('scan').paginate(TableName='OrderEvent'):
+            for item in page['Items']:
+                if not item['PK']['S'].startswith('ORDER#') or item['SK']['S'].split('#')[1] != event_type:
+                    continue
+                record = self.domain_event.convert_to_python_obj(item)
+                if record['order_id'] in wanted:
+                    inputs.append((f"ORDER@{record['order_id']}@EVENTID@{record['event_id']}",
+                                   json.loads(json.dumps(record, cls=self.domain_event.JSONEncoder))))
+        return inputs
+
+    # ---------------------------- saga ----------------------------
+    def invoke_task(self, definition: dict):
+        states = task_states(definition)
+        return asl.lambda_invoke({name: saga_function(handler, states, self.metrics)
+                                  for name, handler in self.handlers.items()})
+
+    def run_saga(self, definition: dict, invoke_task, name: str, saga_input: dict):
+        execution = asl.Execution(definition, invoke_task, name=name)
+        started = time.perf_counter()
+        error = None
+        try:
+            execution.run(saga_input)
+        except asl.StatesError as e:
+            error = e.error
+        self.metrics.add_execution(execution, time.perf_counter() - started, error)
+
+    def run_sagas(self, definition: dict, inputs: list[tuple[str, dict]], concurrency: int) -> float:
+        """ 全 saga の wall-clock (秒) """
+        invoke_task = self.invoke_task(definition)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(self.run_saga, definition, invoke_task, name, saga_input)
+                           for name, saga_input in inputs]:
+                future.result()
+        return time.perf_counter() - started
+
+
+def run(definitions: dict[str, dict], saga_name: str, sagas: int, concurrency: int,
+        endpoint_url: Optional[str] = None) -> str:
+    configure_environment()
+    with dynamodb_backend(endpoint_url):
+        metrics = SagaMetrics()
+        boto3.setup_default_session(region_name=os.environ['AWS_DEFAULT_REGION'])
+        metrics.register(boto3.DEFAULT_SESSION)
+
+        local = LocalOrderSagas(metrics)
+        local.create_tables()
+        local.create_restaurant()
+        consumer_ids = [local.create_consumer(i) for i in range(min(sagas, CONSUMERS))]
+        order_ids = [local.create_order(consumer_ids[i % len(consumer_ids)]) for i in range(sagas)]
+
+        if saga_name != 'CreateOrderSaga':
+            # Cancel / Revise は承認済みの order が対象
+            local.run_sagas(definitions['CreateOrderSaga'],
+                            local.saga_inputs('OrderCreated', order_ids), concurrency)
+            for order_id in order_ids:
+                if saga_name == 'CancelOrderSaga':
+                    local.cancel_order(order_id)
+                else:
+                    local.revise_order(order_id)
+
+        inputs = local.saga_inputs(SAGA_STARTED_BY[saga_name], order_ids)
+        metrics.reset()
+        wall_clock = local.run_sagas(definitions[saga_name], inputs, concurrency)
+        return metrics.report(saga_name, concurrency, wall_clock)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m local_saga.runner')
+    parser.add_argument('--saga', choices=list(SAGA_STARTED_BY), default='CreateOrderSaga')
+    parser.add_argument('--sagas', type=int, default=20, help='実行する saga の数')
+    parser.add_argument('--concurrency', type=int, default=4, help='並行に実行する saga の数')
+    parser.add_argument('--parallel', action='store_true',
+                        help='parallel_validate_consumer_and_create_ticket=True で synth する')
+    parser.add_argument('--endpoint-url', help='DynamoDB Local の endpoint (default: moto)')
+    parser.add_argument('--verbose', action='store_true', help='lambda_handler の print を出力する')
+    args = parser.parse_args(argv)
+
+    from local_saga import synth  # aws_cdk が必要
+    definitions = synth.synthesize_order_sagas(
+        parallel_validate_consumer_and_create_ticket=args.parallel)
+
+    with contextlib.ExitStack() as stack:
+        if not args.verbose:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+        report = run(definitions, args.saga, args.sagas, args.concurrency, args.endpoint_url)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
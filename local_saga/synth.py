@@ -0,0 +1,75 @@
+"""
+Order Saga の ASL を synth する
+    CreateOrderSagaStepFunctions / CancelOrderSagaStepFunctions / ReviseOrderSagaStepFunctions を
+    1つの Stack で synth し、State Machine名 -> definition (dict) を返す。
+
+        definitions = synth.synthesize_order_sagas(state_machine_type='EXPRESS',
+                                                   parallel_validate_consumer_and_create_ticket=True)
+        definitions['CreateOrderSaga']['StartAt']
+
+    DefinitionString の token (Fn::ImportValue, Fn::GetAtt, Ref) は名前の文字列に置き換える。
+        Fn::ImportValue: 'KitchenServiceFunctionARN' -> 'KitchenServiceFunctionARN'
+        Fn::GetAtt: ['OrderServiceFunctionXXXX', 'Arn'] -> 'ORDER_SERVICE_FUNCTION'
+        Ref: 'AWS::Partition' -> 'aws'
+"""
+import json
+import aws_cdk
+from aws_cdk import assertions
+from aws_cdk import aws_lambda
+from constructors.order import stepfunctions_create_order_saga
+from constructors.order import stepfunctions_cancel_order_saga
+from constructors.order import stepfunctions_revise_order_saga
+
+ORDER_SERVICE_FUNCTION = 'ORDER_SERVICE_FUNCTION'
+_ORDER_SERVICE_FUNCTION_ID = 'OrderServiceFunction'
+
+
+def _token_name(token: dict) -> str:
+    if 'Fn::ImportValue' in token:
+        return token['Fn::ImportValue']
+    if 'Fn::GetAtt' in token:
+        logical_id = token['Fn::GetAtt'][0]
+        if logical_id.startswith(_ORDER_SERVICE_FUNCTION_ID):
+            return ORDER_SERVICE_FUNCTION
+        return logical_id
+    if 'Ref' in token:
+        return {'AWS::Partition': 'aws'}.get(token['Ref'], token['Ref'])
+    raise ValueError(f'unsupported token: {token}')
+
+
+def definition_of(state_machine: dict) -> dict:
+    """ AWS::StepFunctions::StateMachine resource の DefinitionString -> dict """
+    definition_string = state_machine['Properties']['DefinitionString']
+    if isinstance(definition_string, dict):
+        parts = definition_string['Fn::Join'][1]
+        definition_string = ''.join(p if isinstance(p, str) else _token_name(p) for p in parts)
+    return json.loads(definition_string)
+
+
+def synthesize_order_saga_stack(state_machine_type=None,
+                                parallel_validate_consumer_and_create_ticket=False) -> aws_cdk.Stack:
+    app = aws_cdk.App()
+    stack = aws_cdk.Stack(app, 'OrderSagaStack')
+    order_function = aws_lambda.Function(
+        stack,
+        _ORDER_SERVICE_FUNCTION_ID,
+        runtime=aws_lambda.Runtime.PYTHON_3_9,
+        handler='lambda_function.lambda_handler',
+        code=aws_lambda.Code.from_inline('def lambda_handler(event, context): pass'))
+    props = {
+        'order_service_function': order_function,
+        'state_machine_type': state_machine_type,
+        'parallel_validate_consumer_and_create_ticket': parallel_validate_consumer_and_create_ticket,
+    }
+    stepfunctions_create_order_saga.CreateOrderSagaStepFunctions(stack, 'CreateOrderSagaConstructor', props)
+    stepfunctions_cancel_order_saga.CancelOrderSagaStepFunctions(stack, 'CancelOrderSagaConstructor', props)
+    stepfunctions_revise_order_saga.ReviseOrderSagaStepFunctions(stack, 'ReviseOrderSagaConstructor', props)
+    return stack
+
+
+def synthesize_order_sagas(state_machine_type=None,
+                           parallel_validate_consumer_and_create_ticket=False) -> dict[str, dict]:
+    stack = synthesize_order_saga_stack(state_machine_type, parallel_validate_consumer_and_create_ticket)
+    template = assertions.Template.from_stack(stack)
+    return {resource['Properties']['StateMachineName']: definition_of(resource)
+            for resource in template.find_resources('AWS::StepFunctions::StateMachine').values()}
@@ -25,6 +25,9 @@ class OrderHistoryServiceStack(Stack):
                         'OrderHistoryServiceFunction',
                         props={
                             'order_history_table': order_history_table,
+                            # cdk deploy -c order_history_page_token_key=xxxx  (GET /orders の page token の署名)
+                            # 指定しない時は Secrets Manager に key を生成する
+                            'page_token_key': self.node.try_get_context('order_history_page_token_key'),
                         })
 
         # ------------------------------------------------------
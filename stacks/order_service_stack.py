@@ -51,6 +51,13 @@ class OrderServiceStack(Stack):
         # ------------------------------------------------------
         #  StepFunctions for Saga
         # ------------------------------------------------------
+        # cdk deploy -c order_saga_state_machine_type=EXPRESS
+        #            -c order_saga_parallel_validate_consumer_and_create_ticket=true
+        saga_options = {
+            'state_machine_type': self.node.try_get_context('order_saga_state_machine_type'),
+            'parallel_validate_consumer_and_create_ticket': str(self.node.try_get_context(
+                'order_saga_parallel_validate_consumer_and_create_ticket')).lower() == 'true',
+        }
 
         # ---
         #  Create Order Saga
@@ -59,6 +66,7 @@ class OrderServiceStack(Stack):
             'CreateOrderSagaConstructor',
             props={
                 'order_service_function': order_function.function,
+                **saga_options,
             }
         )
         # ---
@@ -68,6 +76,7 @@ class OrderServiceStack(Stack):
             'CancelOrderSagaConstructor',
             props={
                 'order_service_function': order_function.function,
+                **saga_options,
             }
         )
         # ---
@@ -77,6 +86,7 @@ class OrderServiceStack(Stack):
             'ReviseOrderSagaConstructor',
             props={
                 'order_service_function': order_function.function,
+                **saga_options,
             }
         )
 
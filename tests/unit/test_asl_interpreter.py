@@ -0,0 +1,221 @@
+import time
+import pytest
+from local_saga import asl
+
+LAMBDA_INVOKE = 'arn:aws:states:::lambda:invoke'
+LAMBDA_RETRY = [{'ErrorEquals': ['Lambda.ServiceException', 'Lambda.SdkClientException'],
+                 'IntervalSeconds': 2, 'MaxAttempts': 6, 'BackoffRate': 2}]
+
+
+def lambda_task(function_name, payload, result_path, next_state=None, catch=None):
+    state = {
+        'Type': 'Task',
+        'Resource': LAMBDA_INVOKE,
+        'Parameters': {'FunctionName': function_name, 'Payload': payload},
+        'ResultPath': result_path,
+        'OutputPath': '$',
+        'Retry': LAMBDA_RETRY,
+    }
+    if catch:
+        state['Catch'] = catch
+    if next_state:
+        state['Next'] = next_state
+    else:
+        state['End'] = True
+    return state
+
+
+# CreateOrderSaga (parallel_validate_consumer_and_create_ticket=True) と同じ構造
+CREATE_ORDER_SAGA = {
+    'StartAt': 'ValidateConsumerAndCreateTicket',
+    'States': {
+        'ValidateConsumerAndCreateTicket': {
+            'Type': 'Parallel',
+            'ResultSelector': {'input.$': 'States.JsonMerge($[0], $[1], false)'},
+            'OutputPath': '$.input',
+            'Next': 'IsConsumerValidated',
+            'Branches': [
+                {'StartAt': 'TaskValidateConsumer', 'States': {
+                    'TaskValidateConsumer': lambda_task(
+                        'ConsumerServiceFunctionARN',
+                        {'order_details.$': '$.order_details',
+                         'task_context': {'state_machine': 'CreateOrderSaga', 'action': 'VALIDATE_CONSUMER'}},
+                        '$.validate_consumer_result',
+                        catch=[{'ErrorEquals': ['ConsumerVerificationFailedException'],
+                                'ResultPath': '$.validate_consumer_result',
+                                'Next': 'ConsumerValidationFailed'}]),
+                    'ConsumerValidationFailed': {'Type': 'Pass', 'End': True},
+                }},
+                {'StartAt': 'TaskCreateTicket', 'States': {
+                    'TaskCreateTicket': lambda_task(
+                        'KitchenServiceFunctionARN',
+                        {'order_id.$': '$.order_id',
+                         'task_context': {'state_machine': 'CreateOrderSaga', 'action': 'CREATE_TICKET'}},
+                        '$.create_ticket_result'),
+                }},
+            ],
+        },
+        'IsConsumerValidated': {
+            'Type': 'Choice',
+            'Choices': [{'Variable': '$.validate_consumer_result.Error', 'IsPresent': True,
+                         'Next': 'TaskCancelCreateTicket'}],
+            'Default': 'TaskApproveOrder',
+        },
+        'TaskCancelCreateTicket': lambda_task(
+            'KitchenServiceFunctionARN',
+            {'ticket_id.$': '$.create_ticket_result.Payload.ticket_id',
+             'task_context': {'state_machine': 'CreateOrderSaga', 'action': 'CANCEL_CREATE_TICKET'}},
+            '$.cancel_create_ticket_result', next_state='TaskRejectOrder'),
+        'TaskRejectOrder': lambda_task(
+            'ORDER_SERVICE_FUNCTION',
+            {'order_id.$': '$.order_id',
+             'task_context': {'state_machine': 'CreateOrderSaga', 'action': 'REJECT_ORDER'}},
+            '$.reject_order_result'),
+        'TaskApproveOrder': lambda_task(
+            'ORDER_SERVICE_FUNCTION',
+            {'order_id.$': '$.order_id',
+             'task_context': {'state_machine': 'CreateOrderSaga', 'action': 'APPROVE_ORDER'}},
+            '$.approve_order_result'),
+    },
+}
+
+
+class ConsumerVerificationFailedException(Exception):
+    pass
+
+
+class Functions:
+    def __init__(self, consumer_valid=True, latency=0.0):
+        self.consumer_valid = consumer_valid
+        self.latency = latency
+        self.calls = []
+
+    def __call__(self, name):
+        def function(payload):
+            time.sleep(self.latency)
+            action = payload['task_context']['action']
+            self.calls.append(action)
+            if action == 'VALIDATE_CONSUMER' and not self.consumer_valid:
+                raise ConsumerVerificationFailedException('consumer_id: 1')
+            if action == 'CREATE_TICKET':
+                return {'ticket_id': payload['order_id']}
+            return True
+        return function
+
+    def invoke_task(self):
+        return asl.lambda_invoke({name: self(name) for name in
+                                  ['ConsumerServiceFunctionARN', 'KitchenServiceFunctionARN',
+                                   'ORDER_SERVICE_FUNCTION']})
+
+
+def saga_input():
+    return {'order_id': 'o-1', 'order_details': {'consumer_id': 1}}
+
+
+def test_parallel_branches_are_merged_and_saga_is_approved():
+    functions = Functions()
+    execution = asl.Execution(CREATE_ORDER_SAGA, functions.invoke_task())
+
+    output = execution.run(saga_input())
+
+    assert output['create_ticket_result']['Payload'] == {'ticket_id': 'o-1'}
+    assert output['validate_consumer_result']['Payload'] is True
+    assert output['approve_order_result']['StatusCode'] == 200
+    assert sorted(functions.calls) == ['APPROVE_ORDER', 'CREATE_TICKET', 'VALIDATE_CONSUMER']
+    assert execution.state_transitions == 5  # Parallel, 2 branches, Choice, ApproveOrder
+
+
+def test_consumer_validation_failure_is_compensated_after_both_branches():
+    functions = Functions(consumer_valid=False)
+    execution = asl.Execution(CREATE_ORDER_SAGA, functions.invoke_task())
+
+    output = execution.run(saga_input())
+
+    assert output['validate_consumer_result']['Error'] == 'ConsumerVerificationFailedException'
+    assert functions.calls[-2:] == ['CANCEL_CREATE_TICKET', 'REJECT_ORDER']
+    assert [s.name for s in execution.steps if s.error] == ['TaskValidateConsumer']
+
+
+def test_parallel_branches_run_concurrently():
+    functions = Functions(latency=0.05)
+    execution = asl.Execution(CREATE_ORDER_SAGA, functions.invoke_task())
+
+    execution.run(saga_input())
+
+    parallel = next(s for s in execution.steps if s.name == 'ValidateConsumerAndCreateTicket')
+    assert parallel.elapsed < 0.09
+
+
+def test_retry_then_success():
+    attempts = []
+
+    def invoke_task(resource, parameters):
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise asl.StatesError('Lambda.ServiceException', 'retry')
+        return {'Payload': 'ok'}
+
+    definition = {'StartAt': 'T', 'States': {'T': lambda_task('f', {}, '$.result')}}
+    sleeps = []
+    execution = asl.Execution(definition, invoke_task, sleep=sleeps.append)
+
+    assert execution.run({})['result'] == {'Payload': 'ok'}
+    assert sleeps == [2, 4]
+    assert execution.state_transitions == 3
+
+
+def test_uncaught_error_fails_execution():
+    definition = {'StartAt': 'T', 'States': {'T': lambda_task('f', {}, '$.result')}}
+
+    def invoke_task(resource, parameters):
+        raise ValueError('boom')
+
+    with pytest.raises(asl.StatesError) as e:
+        asl.Execution(definition, invoke_task).run({})
+    assert e.value.error == 'ValueError'
+
+
+def test_fail_state_and_choice_default():
+    definition = {
+        'StartAt': 'C',
+        'States': {
+            'C': {'Type': 'Choice',
+                  'Choices': [{'And': [{'Variable': '$.n', 'NumericGreaterThan': 1},
+                                       {'Not': {'Variable': '$.s', 'StringEquals': 'x'}}],
+                               'Next': 'Done'}],
+                  'Default': 'Failed'},
+            'Done': {'Type': 'Succeed'},
+            'Failed': {'Type': 'Fail', 'Error': 'Rejected', 'Cause': 'n <= 1'},
+        },
+    }
+    assert asl.Execution(definition, None).run({'n': 2, 's': 'y'}) == {'n': 2, 's': 'y'}
+    with pytest.raises(asl.StatesError) as e:
+        asl.Execution(definition, None).run({'n': 1, 's': 'y'})
+    assert e.value.error == 'Rejected'
+
+
+def test_pass_parameters_and_intrinsic_functions():
+    definition = {'StartAt': 'P', 'States': {'P': {
+        'Type': 'Pass',
+        'Parameters': {
+            'id.$': "States.Format('ORDER#{}#{}', $.order_id, $.n)",
+            'items.$': 'States.Array($.a, $.b[0])',
+            'json.$': 'States.JsonToString($.m)',
+            'name.$': '$$.Execution.Name',
+        },
+        'ResultPath': '$.p',
+        'End': True}}}
+
+    output = asl.Execution(definition, None, name='run-1').run(
+        {'order_id': 'o-1', 'n': 3, 'a': 'x', 'b': [1], 'm': {'k': 1}})
+
+    assert output['p'] == {'id': 'ORDER#o-1#3', 'items': ['x', 1], 'json': '{"k":1}', 'name': 'run-1'}
+
+
+def test_missing_json_path_is_runtime_error():
+    definition = {'StartAt': 'P', 'States': {'P': {
+        'Type': 'Pass', 'Parameters': {'x.$': '$.missing'}, 'End': True}}}
+
+    with pytest.raises(asl.StatesError) as e:
+        asl.Execution(definition, None).run({})
+    assert e.value.error == 'States.Runtime'
@@ -0,0 +1,239 @@
+import datetime
+import decimal
+import importlib
+import threading
+import boto3
+import pytest
+from botocore.stub import Stubber
+from local_saga import asl
+from local_saga import runner
+
+
+def task_context(action):
+    return {'type': 1, 'value': {'state_machine': 'CreateOrderSaga', 'action': action}}
+
+
+DEFINITION = {
+    'StartAt': 'ValidateConsumerAndCreateTicket',
+    'States': {
+        'ValidateConsumerAndCreateTicket': {
+            'Type': 'Parallel',
+            'ResultSelector': {'input.$': 'States.JsonMerge($[0], $[1], false)'},
+            'OutputPath': '$.input',
+            'Next': 'TaskApproveOrder',
+            'Branches': [
+                {'StartAt': 'TaskValidateConsumer', 'States': {'TaskValidateConsumer': {
+                    'Type': 'Task', 'Resource': 'arn:aws:states:::lambda:invoke',
+                    'Parameters': {'FunctionName': 'ConsumerServiceFunctionARN',
+                                   'Payload': {'order_id.$': '$.order_id',
+                                               'task_context': task_context('VALIDATE_CONSUMER')}},
+                    'ResultPath': '$.validate_consumer_result', 'End': True}}},
+                {'StartAt': 'TaskCreateTicket', 'States': {'TaskCreateTicket': {
+                    'Type': 'Task', 'Resource': 'arn:aws:states:::lambda:invoke',
+                    'Parameters': {'FunctionName': 'KitchenServiceFunctionARN',
+                                   'Payload': {'order_id.$': '$.order_id',
+                                               'task_context': task_context('CREATE_TICKET')}},
+                    'ResultPath': '$.create_ticket_result', 'End': True}}},
+            ],
+        },
+        'TaskApproveOrder': {
+            'Type': 'Task', 'Resource': 'arn:aws:states:::lambda:invoke',
+            'Parameters': {'FunctionName': 'ORDER_SERVICE_FUNCTION',
+                           'Payload': {'order_id.$': '$.order_id',
+                                       'task_context': task_context('APPROVE_ORDER')}},
+            'ResultPath': '$.approve_order_result', 'End': True},
+    },
+}
+
+
+SAGA_DEFINITION = {  # synth した CreateOrderSaga と同じ payload (validate_consumer の失敗で reject_order する)
+    'StartAt': 'TaskValidateConsumer',
+    'States': {
+        'TaskValidateConsumer': {
+            'Type': 'Task', 'Resource': 'arn:aws:states:::lambda:invoke',
+            'Parameters': {'FunctionName': 'ConsumerServiceFunctionARN',
+                           'Payload': {'order_details.$': '$.order_details',
+                                       'task_context': task_context('VALIDATE_CONSUMER')}},
+            'ResultPath': '$.validate_consumer_result', 'Next': 'TaskApproveOrder',
+            'Catch': [{'ErrorEquals': ['ConsumerVerificationFailedException', 'ConsumerNotFoundException'],
+                       'ResultPath': '$.validate_consumer_result', 'Next': 'TaskRejectOrder'}]},
+        'TaskApproveOrder': {
+            'Type': 'Task', 'Resource': 'arn:aws:states:::lambda:invoke',
+            'Parameters': {'FunctionName': 'ORDER_SERVICE_FUNCTION',
+                           'Payload': {'order_id.$': '$.order_id',
+                                       'task_context': task_context('APPROVE_ORDER')}},
+            'ResultPath': '$.approve_order_result', 'End': True},
+        'TaskRejectOrder': {
+            'Type': 'Task', 'Resource': 'arn:aws:states:::lambda:invoke',
+            'Parameters': {'FunctionName': 'ORDER_SERVICE_FUNCTION',
+                           'Payload': {'order_id.$': '$.order_id',
+                                       'validate_consumer_result.$': '$.validate_consumer_result',
+                                       'task_context': task_context('REJECT_ORDER')}},
+            'ResultPath': '$.reject_order_result', 'End': True},
+    },
+}
+
+
+class ConsumerNotFoundException(Exception):
+    pass
+
+
+@pytest.fixture
+def order_layers(monkeypatch):
+    """ order_function の layer package (lambda_function.py は aws_xray_sdk が必要なので controller を直接呼ぶ) """
+    monkeypatch.syspath_prepend(str(runner.APPLICATION_DIR / runner.SAGA_FUNCTIONS['ORDER_SERVICE_FUNCTION']))
+    return {name: importlib.import_module(f'order_layers.{name}')
+            for name in ['common.common', 'domain.order_model', 'domain.restaurant_model',
+                         'service.commands', 'service.handlers', 'presentation.controller',
+                         'adaptors.order_repository', 'adaptors.order_event_repository',
+                         'adaptors.restaurant_replica_repository', 'adaptors.unit_of_work']}
+
+
+@pytest.fixture
+def order_handler(order_layers, monkeypatch):
+    """ in-memory repository の handlers.Handler を controller.handler() が返すようにする """
+    common = order_layers['common.common']
+    restaurant_model = order_layers['domain.restaurant_model']
+    order_repo = order_layers['adaptors.order_repository'].InMemoryRepository()
+    order_event_repo = order_layers['adaptors.order_event_repository'].InMemoryRepository()
+    restaurant_replica_repo = order_layers['adaptors.restaurant_replica_repository'].InMemoryRepository()
+    restaurant_replica_repo.save(
+        restaurant_model.Restaurant(1, 'skylark', [
+            restaurant_model.MenuItem('000001', 'Curry Rice', common.Money(800, 'JPY'))]),
+        event_id=1, timestamp='2022-11-30T05:00:30.001000Z')
+    handler = order_layers['service.handlers'].Handler(
+        order_repo=order_repo,
+        order_event_repo=order_event_repo,
+        restaurant_replica_repo=restaurant_replica_repo,
+        order_uow=order_layers['adaptors.unit_of_work'].InMemoryUnitOfWork(order_repo, order_event_repo))
+    monkeypatch.setattr(order_layers['presentation.controller'], 'handler', lambda: handler)
+    return handler
+
+
+def create_order(order_layers, order_handler) -> str:
+    commands = order_layers['service.commands']
+    order = order_handler.commands_handler(commands.CreateOrder(
+        consumer_id=1, restaurant_id=1,
+        order_line_items=[commands.OrderRequestLineItems('000001', 3)],
+        delivery_information=order_layers['domain.order_model'].DeliveryInformation(
+            delivery_time=datetime.datetime(2022, 11, 30, 5, 0, 30, 1000),
+            delivery_address=order_layers['common.common'].Address(
+                '9 Amazing View', 'Soi 8', 'Oakland', 'CA', '94612'))))
+    return order.order_id
+
+
+@pytest.mark.parametrize('consumer_valid, order_state', [(True, 'APPROVED'), (False, 'REJECTED')])
+def test_saga_steps_reach_order_saga_commands_handler(order_layers, order_handler, consumer_valid, order_state):
+    controller = order_layers['presentation.controller']
+    order_id = create_order(order_layers, order_handler)
+    saga_commands = []
+    saga_commands_handler = order_handler.saga_commands_handler
+
+    def recording_saga_commands_handler(cmd):
+        saga_commands.append(type(cmd).__name__)
+        return saga_commands_handler(cmd)
+    order_handler.saga_commands_handler = recording_saga_commands_handler
+
+    def consumer_function(event, context):
+        if not consumer_valid:
+            raise ConsumerNotFoundException(f"consumer_id: {event['order_details']['consumer_id']}")
+        return None
+
+    def order_function(event, context):
+        # lambda_function.lambda_handler の StepFunctions invocation と同じ呼び出し
+        return controller.stepfunctions_invocation(event)
+
+    metrics = runner.SagaMetrics()
+    states = runner.task_states(SAGA_DEFINITION)
+    invoke_task = asl.lambda_invoke({
+        'ConsumerServiceFunctionARN': runner.saga_function(consumer_function, states, metrics),
+        'ORDER_SERVICE_FUNCTION': runner.saga_function(order_function, states, metrics)})
+    execution = asl.Execution(SAGA_DEFINITION, invoke_task)
+    execution.run({'order_id': order_id, 'order_details': {'consumer_id': 1, 'restaurant_id': 1}})
+
+    order_task = 'TaskApproveOrder' if consumer_valid else 'TaskRejectOrder'
+    assert saga_commands == ['ApproveOrder' if consumer_valid else 'RejectOrder']
+    assert order_handler.order_service.order_repo.find_by_id(order_id).order_state.value == order_state
+    assert {name: step.invocations for name, step in metrics.steps.items() if step.invocations} \
+        == {'TaskValidateConsumer': 1, order_task: 1}
+
+
+def test_create_order_saga_runs_through_real_lambda_handlers():
+    pytest.importorskip('moto')
+    pytest.importorskip('aws_xray_sdk')
+    synth = pytest.importorskip('local_saga.synth')  # aws_cdk が必要
+
+    report = runner.run(synth.synthesize_order_sagas(), 'CreateOrderSaga', sagas=2, concurrency=2)
+
+    assert report.splitlines()[0] == 'CreateOrderSaga  sagas: 2  concurrency: 2  succeeded: 2  failed: 0'
+
+
+def dynamodb_client(metrics, get_items):
+    session = boto3.Session(region_name='ap-northeast-1', aws_access_key_id='testing',
+                            aws_secret_access_key='testing')
+    metrics.register(session)
+    client = session.client('dynamodb')
+    stubber = Stubber(client)
+    for _ in range(get_items):
+        stubber.add_response('get_item', {})
+    stubber.activate()
+    return client
+
+
+def test_task_action_and_task_states():
+    assert runner.task_action({'task_context': task_context('CREATE_TICKET')}) == 'CREATE_TICKET'
+    assert runner.task_action({'task_context': {'action': 'CREATE_TICKET'}}) == 'CREATE_TICKET'
+    assert runner.task_states(DEFINITION) == {'VALIDATE_CONSUMER': 'TaskValidateConsumer',
+                                              'CREATE_TICKET': 'TaskCreateTicket',
+                                              'APPROVE_ORDER': 'TaskApproveOrder'}
+
+
+def test_dynamodb_calls_are_attributed_to_the_running_step():
+    metrics = runner.SagaMetrics()
+    calls = {'VALIDATE_CONSUMER': 1, 'CREATE_TICKET': 3, 'APPROVE_ORDER': 2}
+    client = dynamodb_client(metrics, get_items=sum(calls.values()) * 2 + 1)
+    lock = threading.Lock()
+
+    def lambda_handler(event, context):
+        action = runner.task_action(event)
+        for _ in range(calls[action]):
+            with lock:  # Stubber の response queue は thread safe ではない
+                client.get_item(TableName='OrderService', Key={'PK': {'S': event['order_id']}})
+        return {'ticket_id': event['order_id'], 'total': decimal.Decimal('2400')}
+
+    states = runner.task_states(DEFINITION)
+    invoke_task = asl.lambda_invoke({name: runner.saga_function(lambda_handler, states, metrics)
+                                     for name in runner.SAGA_FUNCTIONS})
+    client.get_item(TableName='OrderService', Key={'PK': {'S': 'seed'}})  # saga の外
+    for i in range(2):
+        execution = asl.Execution(DEFINITION, invoke_task)
+        output = execution.run({'order_id': f'o-{i}'})
+        metrics.add_execution(execution, 0.01, None)
+
+    assert output['create_ticket_result']['Payload'] == {'ticket_id': 'o-1', 'total': 2400.0}
+    assert metrics.unattributed_dynamodb_calls == 1
+    assert {name: (step.invocations, step.dynamodb_calls) for name, step in metrics.steps.items()
+            if step.invocations} == {'TaskValidateConsumer': (2, 2),
+                                     'TaskCreateTicket': (2, 6),
+                                     'TaskApproveOrder': (2, 4)}
+    assert len(metrics.steps['ValidateConsumerAndCreateTicket'].latencies) == 2
+
+
+def test_report():
+    metrics = runner.SagaMetrics()
+    metrics.steps['TaskApproveOrder'].latencies.extend([0.010, 0.030])
+    metrics.steps['TaskApproveOrder'].invocations = 2
+    metrics.steps['TaskApproveOrder'].dynamodb_calls = 5
+    metrics.executions.extend([(0.1, 5, None), (0.3, 5, 'ConsumerNotFoundException')])
+
+    report = metrics.report('CreateOrderSaga', 2, wall_clock=0.5).splitlines()
+
+    assert report[0] == 'CreateOrderSaga  sagas: 2  concurrency: 2  succeeded: 1  failed: 1'
+    assert report[1].startswith('throughput: 4.0 sagas/s  execution p50: 100.0 ms  p99: 300.0 ms')
+    assert report[-1].split() == ['TaskApproveOrder', '2', '0', '10.0', '30.0', '2.5']
+
+
+def test_percentile():
+    assert runner.percentile([], 0.5) == 0.0
+    assert runner.percentile([3, 1, 2], 0.5) == 2
+    assert runner.percentile(list(range(1, 101)), 0.99) == 99
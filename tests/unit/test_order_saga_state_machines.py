@@ -0,0 +1,109 @@
+import pytest
+import aws_cdk.assertions as assertions
+
+from local_saga import synth
+
+SAGAS = ['CreateOrderSaga', 'CancelOrderSaga', 'ReviseOrderSaga']
+
+
+def template_of(**options):
+    return assertions.Template.from_stack(synth.synthesize_order_saga_stack(**options))
+
+
+def next_states(definition, start):
+    """ StartAt から Next をたどった state名 """
+    names = [start]
+    while 'Next' in definition['States'][names[-1]]:
+        names.append(definition['States'][names[-1]]['Next'])
+    return names
+
+
+def test_default_is_standard_without_logging():
+    template = template_of()
+
+    for name in SAGAS:
+        template.has_resource_properties('AWS::StepFunctions::StateMachine', {
+            'StateMachineName': name,
+            'StateMachineType': assertions.Match.absent(),
+            'LoggingConfiguration': assertions.Match.absent(),
+            'TracingConfiguration': {'Enabled': True},
+        })
+    template.resource_count_is('AWS::Logs::LogGroup', 0)
+
+
+def test_default_create_order_saga_is_sequential():
+    definition = synth.synthesize_order_sagas()['CreateOrderSaga']
+
+    assert next_states(definition, definition['StartAt']) == [
+        'TaskValidateConsumer', 'TaskCreateTicket', 'TaskAuthorizeCard',
+        'TaskConfirmCreateTicket', 'TaskApproveOrder']
+    assert definition['States']['TaskValidateConsumer']['Catch'][0]['Next'] == 'TaskRejectOrder'
+    assert not any(state['Type'] == 'Parallel' for state in definition['States'].values())
+
+
+def test_express_state_machines_log_to_cloudwatch():
+    template = template_of(state_machine_type='EXPRESS')
+
+    for name in SAGAS:
+        template.has_resource_properties('AWS::StepFunctions::StateMachine', {
+            'StateMachineName': name,
+            'StateMachineType': 'EXPRESS',
+            'LoggingConfiguration': {
+                'Level': 'ALL',
+                'IncludeExecutionData': True,
+                'Destinations': [assertions.Match.any_value()],
+            },
+        })
+        template.has_resource_properties('AWS::Logs::LogGroup', {
+            'LogGroupName': f'/aws/vendedlogs/states/{name}',
+        })
+
+
+def test_express_keeps_the_same_asl():
+    assert synth.synthesize_order_sagas(state_machine_type='EXPRESS') == synth.synthesize_order_sagas()
+
+
+def test_unsupported_state_machine_type():
+    with pytest.raises(ValueError):
+        synth.synthesize_order_sagas(state_machine_type='SYNC')
+
+
+def test_parallel_validate_consumer_and_create_ticket():
+    definition = synth.synthesize_order_sagas(
+        parallel_validate_consumer_and_create_ticket=True)['CreateOrderSaga']
+    states = definition['States']
+
+    parallel = states[definition['StartAt']]
+    assert parallel['Type'] == 'Parallel'
+    assert [branch['StartAt'] for branch in parallel['Branches']] == ['TaskValidateConsumer',
+                                                                     'TaskCreateTicket']
+    assert parallel['ResultSelector'] == {'input.$': 'States.JsonMerge($[0], $[1], false)'}
+    assert parallel['OutputPath'] == '$.input'
+    assert 'Catch' not in parallel
+
+    # validate_consumer の失敗は branch 内で結果にして、両方の branch の完了を待つ
+    validate_branch = parallel['Branches'][0]['States']
+    assert validate_branch['TaskValidateConsumer']['Catch'] == [{
+        'ErrorEquals': ['ConsumerVerificationFailedException', 'ConsumerNotFoundException'],
+        'ResultPath': '$.validate_consumer_result',
+        'Next': 'ConsumerValidationFailed',
+    }]
+    assert validate_branch['ConsumerValidationFailed'] == {'Type': 'Pass', 'End': True}
+
+    choice = states[parallel['Next']]
+    assert choice['Type'] == 'Choice'
+    assert choice['Choices'] == [{'Variable': '$.validate_consumer_result.Error',
+                                  'IsPresent': True,
+                                  'Next': 'TaskCancelCreateTicket'}]
+    assert next_states(definition, choice['Default']) == [
+        'TaskAuthorizeCard', 'TaskConfirmCreateTicket', 'TaskApproveOrder']
+    assert next_states(definition, 'TaskCancelCreateTicket') == ['TaskCancelCreateTicket',
+                                                                 'TaskRejectOrder']
+
+
+def test_parallel_option_does_not_change_cancel_and_revise_sagas():
+    default = synth.synthesize_order_sagas()
+    parallel = synth.synthesize_order_sagas(parallel_validate_consumer_and_create_ticket=True)
+
+    assert parallel['CancelOrderSaga'] == default['CancelOrderSaga']
+    assert parallel['ReviseOrderSaga'] == default['ReviseOrderSaga']